@@ -56,8 +56,8 @@ class MaintenanceScheduler:
             info = self.maintenance.get_database_info()
             logger.info(f"資料庫大小: {info['size_mb']} MB")
             
-            if 'measurements' in info['tables']:
-                logger.info(f"測量記錄數: {info['tables']['measurements']['row_count']:,}")
+            if 'samples' in info['tables']:
+                logger.info(f"測量記錄數: {info['tables']['samples']['row_count']:,}")
             
             # 2. 執行自動維護
             result = self.maintenance.auto_maintain()
@@ -173,8 +173,8 @@ def show_status():
     print(f"資料庫路徑: {info['path']}")
     print(f"檔案大小: {info['size_mb']} MB")
     
-    if 'measurements' in info['tables']:
-        table = info['tables']['measurements']
+    if 'samples' in info['tables']:
+        table = info['tables']['samples']
         print(f"測量記錄數: {table['row_count']:,}")
         
         if table['row_count'] > 0:
@@ -84,23 +84,82 @@ DEFAULT_CONFIG: Dict[str, Any] = {
     # 數據管理配置
     "data": {
         "storage": {
-            "default_format": "csv",  # "csv", "json", "sqlite"
+            "default_format": "csv",  # "csv", "json" (JSON Lines), "parquet", "binary", "sqlite"
             "auto_save": True,
             "auto_save_interval": 900,  # 15分鐘
             "session_naming": "timestamp",  # "timestamp", "manual", "auto"
-            "base_path": "data"
+            "base_path": "data",
+            "csv": {
+                "buffer_kb": 1024,  # 寫入緩衝
+                "flush_interval_s": 1.0,  # 定期 flush/fsync 間隔
+                "fsync": True,
+                "rotate_mb": 256,  # 單一檔案大小上限 (未壓縮)，0表示不限制
+                "rotate_minutes": 0,  # 單一檔案時間上限，0表示不限制
+                "compression": False  # False, True/"zstd" (缺少 zstandard 時用 gzip), "gzip"
+            },
+            "jsonl": {
+                "buffer_kb": 1024,
+                "flush_interval_s": 1.0,  # 追蹤寫入中檔案的讀取端最多延遲此時間
+                "fsync": True,
+                "rotate_mb": 256,
+                "rotate_minutes": 0,
+                "compression": False
+            },
+            "parquet": {
+                "row_group_rows": 65536,  # 每個列組的數據點數 (檢查點時也會寫出列組)
+                "compression": "zstd",
+                "compression_level": 3,
+                "buffer_kb": 1024,
+                "fsync": True
+            },
+            "binary": {
+                "buffer_kb": 1024,
+                "fsync": True,
+                "index_block_rows": 4096  # 時間索引每組涵蓋的列數
+            },
+            "journal": {
+                "enabled": True,  # 非增量寫入的後端 (sqlite) 在採集期間寫入會話日誌，崩潰後恢復
+                "path": "journal",  # 相對於 base_path
+                "checkpoint_interval_s": 10,  # 檢查點間隔 (取代 auto_save_interval 的整個會話備份)
+                "recover_on_start": True,  # 啟動時在背景執行緒中恢復遺留的會話 (否則呼叫 recover_sessions())
+                "fsync": True
+            },
+            "rollups": {
+                # 1秒/1分鐘/1小時彙總存於 measurements.db；SQLite 會話寫入時自動更新，
+                # 檔案後端 (csv/json/parquet/binary) 的會話在採集期間另外寫入彙總
+                "file_sessions": True
+            },
+            "sqlite": {
+                "synchronous": "NORMAL",  # WAL下只在檢查點時fsync
+                "batch_size": 1000,  # 每個交易寫入的列數
+                "flush_interval_ms": 200,  # 數據列最長等待時間
+                "max_pending_rows": 100000  # 寫入佇列上限 (背壓)
+            }
         },
         "export": {
             "include_metadata": True,
             "include_statistics": True,
-            "compression": False,
-            "decimal_places": 6
+            "compression": False,  # CSV/JSON 導出的壓縮方式，同存儲設定 (Parquet 固定使用內部壓縮)
+            "decimal_places": 6,
+            "chunk_rows": 65536,  # 串流導出每段的列數 (Parquet 每段一個列組)
+            "max_concurrent_jobs": 2,  # 同時執行的背景導出數量
+            "worker_nice": 10,  # 導出執行緒降低的優先權 (POSIX nice)
+            "yield_ms": 2  # 每段數據之間讓出的毫秒數，讓採集執行緒優先
+        },
+        "compression": {
+            "level": 3,  # zstd 1-22 (gzip 最高 9)
+            "block_kb": 1024  # 交給背景壓縮執行緒的區塊大小
         },
         "buffer": {
             "real_time_buffer_size": 1000,
             "persistent_buffer_size": 10000,
             "cleanup_interval": 3600,  # 秒
             "memory_limit_mb": 100
+        },
+        "ingest": {
+            "queue_size": 65536,  # 每個儀器/生產者執行緒的佇列容量
+            "batch_size": 256,
+            "put_timeout_ms": 100  # 佇列已滿時生產者的最長等待，超過則丟棄 (持久化階段不丟棄，一直等待)
         }
     },
     
@@ -124,12 +183,22 @@ DEFAULT_CONFIG: Dict[str, Any] = {
         "worker_threads": {
             "measurement_priority": "normal",  # "low", "normal", "high"
             "connection_timeout": 10.0,
-            "max_concurrent_workers": 5
+            "max_concurrent_workers": 5,
+            "stop_timeout_ms": 1000  # 停止Worker時的最長等待時間
         },
         "memory": {
             "garbage_collection_interval": 300,  # 秒
             "max_memory_usage_mb": 500,
-            "warning_threshold_mb": 400
+            "warning_threshold_mb": 400,
+            "low_watermark": 0.8,  # 超出預算時回收到預算的此比例
+            "spill_path": None,  # None 表示存儲目錄 (data.storage.base_path) 下的 spill
+            # 各數據容器超出預算時的策略: "spill", "decimate", "drop_oldest"
+            "policies": {
+                "session_data": "spill",
+                "keithley.time_series_data": "decimate",
+                "keithley.iv_data": "drop_oldest",
+                "rigol.measurement_data": "drop_oldest"
+            }
         },
         "ui": {
             "update_throttle_ms": 50,
@@ -152,8 +221,14 @@ DEFAULT_CONFIG: Dict[str, Any] = {
         },
         "monitoring": {
             "connection_health_check": True,
-            "health_check_interval": 30,  # 秒
-            "auto_recovery": True
+            "health_check_interval": 30,  # 秒，鏈路閒置超過此時間才發送心跳
+            "auto_recovery": True,
+            "heartbeat_timeout": 2.0,  # 秒
+            "max_missed_heartbeats": 2,
+            "reconnect_initial_delay": 1.0,  # 秒
+            "reconnect_max_delay": 60.0,  # 秒
+            "reconnect_jitter": 0.2,  # 延遲隨機擾動比例
+            "max_recovery_attempts": 0  # 0 表示無限重試
         }
     },
     
@@ -188,6 +263,16 @@ CONFIG_VALIDATION_RULES = {
         "min": 100,
         "max": 10000
     },
+    "safety.monitoring.health_check_interval": {
+        "type": int,
+        "min": 1,
+        "max": 3600
+    },
+    "safety.monitoring.heartbeat_timeout": {
+        "type": float,
+        "min": 0.1,
+        "max": 30.0
+    },
     "data.buffer.real_time_buffer_size": {
         "type": int,
         "min": 50,
@@ -4,20 +4,59 @@
 """
 
 from .unified_data_manager import UnifiedDataManager, MeasurementPoint, get_data_manager
-from .storage_backends import StorageBackend, CSVStorage, JSONStorage, SQLiteStorage
-from .buffer_manager import CircularBuffer, BufferManager
+from .storage_backends import (
+    StorageBackend, StreamingStorage, CSVStorage, JSONStorage, ParquetStorage, BinaryStorage,
+    SQLiteStorage
+)
+from .binary_session import BinarySession, BinarySessionWriter
+from .session_journal import SessionJournal
+from .columnar import SessionColumns, MetadataColumn
+from .buffer_manager import CircularBuffer, ColumnarRingBuffer, BufferManager
 from .export_manager import ExportManager, ExportFormat
+from .export_jobs import ExportJob, ExportJobService, ExportJobState, get_export_service
+from .streaming_stats import StreamingStatistics, RollingStats, CumulativeStats
+from .memory_governor import MemoryGovernor, BudgetedList, get_memory_governor
+from .measurement_store import MeasurementStore, get_measurement_store
+from .stream_writer import RotatingFileWriter, JSONLTail, iter_jsonl
+from .compression import CompressedWriter, open_input, open_output
 
 __all__ = [
     'UnifiedDataManager',
     'MeasurementPoint',
     'get_data_manager',
     'StorageBackend',
+    'StreamingStorage',
     'CSVStorage',
     'JSONStorage', 
+    'ParquetStorage',
+    'BinaryStorage',
+    'BinarySession',
+    'BinarySessionWriter',
+    'SessionJournal',
+    'SessionColumns',
+    'MetadataColumn',
     'SQLiteStorage',
     'CircularBuffer',
+    'ColumnarRingBuffer',
     'BufferManager',
     'ExportManager',
-    'ExportFormat'
+    'ExportFormat',
+    'ExportJob',
+    'ExportJobService',
+    'ExportJobState',
+    'get_export_service',
+    'StreamingStatistics',
+    'RollingStats',
+    'CumulativeStats',
+    'MemoryGovernor',
+    'BudgetedList',
+    'get_memory_governor',
+    'MeasurementStore',
+    'get_measurement_store',
+    'RotatingFileWriter',
+    'JSONLTail',
+    'iter_jsonl',
+    'CompressedWriter',
+    'open_input',
+    'open_output'
 ]
\ No newline at end of file
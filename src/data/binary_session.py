@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+二進制會話格式 (.msb)
+固定寬度的數據列，採集期間只追加寫入，讀取時以 numpy.memmap 直接映射：
+打開檔案不讀取數據，取單一欄位或按時間切片只觸及需要的頁面。
+
+檔案結構：
+    <名稱>.msb       表頭 (HEADER_SIZE bytes) + 固定寬度數據列 (RECORD_DTYPE)
+    <名稱>.msb.idx   每 block_size 列一組 (最小, 最大) 時間戳 (int64)，追加寫入
+    <名稱>.msb.meta  JSON Lines：儀器名稱編號、逐點附加資訊、亂序標記，追加寫入
+
+三個檔案都只追加，任何時刻 (包括崩潰後) 都可讀取：未寫完的最後一列會被略過。
+"""
+
+import json
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.data.columnar import FLOAT_COLUMNS, SessionColumns, normalize_columns
+from src.data.stream_writer import part_path
+
+MAGIC = b'AMMSB\x00\x00\x01'
+VERSION = 1
+HEADER_SIZE = 4096  # 數據列從頁邊界開始
+HEADER_STRUCT = struct.Struct('<8sIIII')  # magic, version, header_size, record_size, block_size
+
+RECORD_DTYPE = np.dtype([
+    ('timestamp', '<i8'),  # Unix epoch ns
+    ('voltage', '<f8'),
+    ('current', '<f8'),
+    ('resistance', '<f8'),  # 缺值為 NaN
+    ('power', '<f8'),
+    ('temperature', '<f8'),
+    ('instrument', '<u2'),  # 儀器編號 (見 .meta)
+    ('flags', '<u2'),
+    ('reserved', '<u4')
+])
+
+FLAG_METADATA = 0x1  # 該列在 .meta 中有附加資訊
+
+INDEX_DTYPE = np.dtype([('min', '<i8'), ('max', '<i8')])
+
+
+def _sidecar(path: Path, suffix: str) -> Path:
+    return path.with_name(path.name + suffix)
+
+
+class BinarySessionWriter:
+    """二進制會話寫入器 (非執行緒安全，由呼叫端加鎖)
+    
+    每批數據點轉為一個結構化陣列後一次寫入；flush() 即為檢查點，
+    只寫出上次之後的新數據列。
+    """
+    
+    def __init__(self, path: Path, block_size: int = 4096,
+                 buffer_size: int = 1 << 20, fsync: bool = True):
+        """初始化寫入器 (第一次寫入時才建立檔案)
+        
+        Args:
+            path: 檔案路徑 (.msb)，已存在時改用 <stem>_partN.msb
+            block_size: 時間索引每組涵蓋的列數
+            buffer_size: 寫入緩衝大小 (bytes)
+            fsync: flush 時是否 fsync
+        """
+        self.path = Path(path)
+        self.block_size = block_size
+        self.buffer_size = buffer_size
+        self.fsync = fsync
+        
+        self.parts: List[Path] = []
+        self._final: Optional[Path] = None
+        self._data = None
+        self._index = None
+        self._meta = None
+        self._instruments: Dict[str, int] = {}
+        self._block_min: Optional[int] = None
+        self._block_max: Optional[int] = None
+        self._last_ts: Optional[int] = None
+        self._sorted = True
+        
+        # 統計
+        self.records = 0
+        self.flushes = 0
+        
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        index = 0
+        while True:
+            index += 1
+            final = part_path(self.path, index)
+            if not final.exists():
+                break
+        self._final = final
+        self._data = open(final, 'wb', buffering=self.buffer_size)
+        header = HEADER_STRUCT.pack(MAGIC, VERSION, HEADER_SIZE, RECORD_DTYPE.itemsize, self.block_size)
+        descr = json.dumps(RECORD_DTYPE.descr).encode('ascii')
+        self._data.write((header + descr).ljust(HEADER_SIZE, b'\0'))
+        self._index = open(_sidecar(final, '.idx'), 'wb')
+        self._meta = open(_sidecar(final, '.meta'), 'w', encoding='utf-8')
+        
+    def _instrument_key(self, name: str) -> int:
+        key = self._instruments.get(name)
+        if key is None:
+            key = self._instruments[name] = len(self._instruments)
+            self._meta.write(json.dumps({'instrument': name, 'key': key}, ensure_ascii=False) + '\n')
+        return key
+        
+    def write_points(self, points: Iterable):
+        """追加數據點 (具有 timestamp/instrument_id/數值欄位屬性的物件)"""
+        points = list(points)
+        if not points:
+            return
+        if self._data is None:
+            self._open()
+            
+        count = len(points)
+        records = np.zeros(count, RECORD_DTYPE)
+        records['timestamp'] = np.fromiter((point.timestamp for point in points), np.int64, count)
+        for name in FLOAT_COLUMNS:
+            records[name] = np.fromiter(
+                (np.nan if value is None else value
+                 for value in (getattr(point, name, None) for point in points)),
+                np.float64, count
+            )
+        records['instrument'] = np.fromiter(
+            (self._instrument_key(point.instrument_id) for point in points), np.uint16, count
+        )
+        for offset, point in enumerate(points):
+            if point.metadata:
+                records['flags'][offset] |= FLAG_METADATA
+                self._meta.write(json.dumps(
+                    {'row': self.records + offset, 'metadata': point.metadata}, ensure_ascii=False
+                ) + '\n')
+                
+        timestamps = records['timestamp']
+        if self._sorted and ((self._last_ts is not None and timestamps[0] < self._last_ts)
+                             or (count > 1 and bool(np.any(np.diff(timestamps) < 0)))):
+            # 亂序後讀取端改用區塊索引篩選，而非二分搜尋
+            self._sorted = False
+            self._meta.write(json.dumps({'unsorted_from': self.records}) + '\n')
+        self._last_ts = int(timestamps[-1])
+        
+        self._data.write(records.tobytes())
+        self._update_index(timestamps)
+        self.records += count
+        
+    def _update_index(self, timestamps: np.ndarray):
+        position = 0
+        count = len(timestamps)
+        while position < count:
+            room = self.block_size - self.records % self.block_size if position == 0 else self.block_size
+            chunk = timestamps[position:position + room]
+            low, high = int(chunk.min()), int(chunk.max())
+            self._block_min = low if self._block_min is None else min(self._block_min, low)
+            self._block_max = high if self._block_max is None else max(self._block_max, high)
+            position += len(chunk)
+            if len(chunk) == room:
+                # 區塊已滿：寫入索引
+                self._index.write(struct.pack('<qq', self._block_min, self._block_max))
+                self._block_min = self._block_max = None
+                
+    def flush(self, fsync: Optional[bool] = None):
+        """將緩衝寫入檔案 (檢查點)"""
+        if self._data is None:
+            return
+        do_fsync = self.fsync if fsync is None else fsync
+        for handle in (self._data, self._index, self._meta):
+            handle.flush()
+            if do_fsync:
+                os.fsync(handle.fileno())
+        self.flushes += 1
+        
+    def close(self) -> List[Path]:
+        """寫入剩餘數據並關閉檔案
+        
+        Returns:
+            List[Path]: 完成的檔案
+        """
+        if self._data is not None:
+            self.flush(fsync=True)
+            for handle in (self._data, self._index, self._meta):
+                handle.close()
+            self._data = self._index = self._meta = None
+            self.parts.append(self._final)
+        return list(self.parts)
+        
+    def stats(self) -> Dict[str, Any]:
+        """寫入統計"""
+        return {
+            'path': str(self._final or self.path),
+            'records': self.records,
+            'bytes': HEADER_SIZE + self.records * RECORD_DTYPE.itemsize,
+            'sorted': self._sorted,
+            'flushes': self.flushes
+        }
+
+
+class BinarySession:
+    """二進制會話讀取 (記憶體映射，零複製)
+    
+    records 為映射整個檔案的結構化陣列；column() 與按時間切片 (數據有序時)
+    返回映射的視圖，只有實際存取的頁面會被讀入。
+    """
+    
+    def __init__(self, path: Path):
+        """打開會話檔案 (不讀取數據列)
+        
+        Args:
+            path: .msb 檔案
+        """
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            header = f.read(HEADER_STRUCT.size)
+        magic, version, header_size, record_size, block_size = HEADER_STRUCT.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"不是二進制會話檔案: {self.path}")
+        if version != VERSION or record_size != RECORD_DTYPE.itemsize:
+            raise ValueError(f"不支援的二進制會話版本: {version}")
+        self.block_size = block_size
+        
+        # 只映射完整的數據列 (崩潰後未寫完的最後一列略過)
+        count = max(0, (self.path.stat().st_size - header_size) // record_size)
+        if count:
+            self.records = np.memmap(self.path, RECORD_DTYPE, mode='r', offset=header_size, shape=(count,))
+        else:
+            self.records = np.zeros(0, RECORD_DTYPE)
+            
+        index_path = _sidecar(self.path, '.idx')
+        index = np.fromfile(index_path, INDEX_DTYPE) if index_path.exists() else np.zeros(0, INDEX_DTYPE)
+        self.block_index = index[:count // block_size]
+        
+        self.instrument_names: List[str] = []
+        self.sorted = True
+        self._metadata: Dict[int, Dict[str, Any]] = {}
+        self._load_meta()
+        
+    def _load_meta(self):
+        meta_path = _sidecar(self.path, '.meta')
+        if not meta_path.exists():
+            return
+        names: Dict[int, str] = {}
+        with open(meta_path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                entry = json.loads(line)
+                if 'instrument' in entry:
+                    names[entry['key']] = entry['instrument']
+                elif 'row' in entry:
+                    self._metadata[entry['row']] = entry['metadata']
+                elif 'unsorted_from' in entry:
+                    self.sorted = False
+        self.instrument_names = [names[key] for key in sorted(names)]
+        
+    def __len__(self) -> int:
+        return len(self.records)
+        
+    def column(self, name: str) -> np.ndarray:
+        """單一欄位 (映射視圖，不複製)"""
+        return self.records[name]
+        
+    def instrument_ids(self, records: Optional[np.ndarray] = None) -> np.ndarray:
+        """數據列的儀器名稱 (object 陣列；崩潰時名稱尚未寫入的儀器為 None)"""
+        records = self.records if records is None else records
+        names = np.array(self.instrument_names + [None], dtype=object)
+        return names[np.minimum(records['instrument'], len(self.instrument_names))]
+        
+    def metadata(self, row: int) -> Optional[Dict[str, Any]]:
+        """數據列的附加資訊"""
+        return self._metadata.get(int(row))
+        
+    def index_range(self, start_ns: Optional[int] = None,
+                    end_ns: Optional[int] = None) -> Tuple[int, int]:
+        """有序數據中 [start_ns, end_ns] 的列範圍 (二分搜尋，只讀取 O(log n) 頁)"""
+        if not self.sorted:
+            raise ValueError("數據列不是按時間排序，請使用 time_slice()")
+        timestamps = self.records['timestamp']
+        low = 0 if start_ns is None else int(np.searchsorted(timestamps, start_ns, 'left'))
+        high = len(timestamps) if end_ns is None else int(np.searchsorted(timestamps, end_ns, 'right'))
+        return low, max(low, high)
+        
+    def time_slice(self, start_ns: Optional[int] = None,
+                   end_ns: Optional[int] = None) -> np.ndarray:
+        """時間範圍內的數據列 (按時間排序)
+        
+        有序數據返回映射視圖 (零複製)；亂序數據只掃描時間索引與範圍重疊的區塊。
+        """
+        if self.sorted:
+            low, high = self.index_range(start_ns, end_ns)
+            return self.records[low:high]
+        return self.records[self.rows(start_ns, end_ns)]
+        
+    def rows(self, start_ns: Optional[int] = None, end_ns: Optional[int] = None) -> np.ndarray:
+        """時間範圍內數據列的列號 (按時間排序)"""
+        if self.sorted:
+            low, high = self.index_range(start_ns, end_ns)
+            return np.arange(low, high)
+            
+        low = np.iinfo(np.int64).min if start_ns is None else start_ns
+        high = np.iinfo(np.int64).max if end_ns is None else end_ns
+        blocks = np.nonzero((self.block_index['max'] >= low) & (self.block_index['min'] <= high))[0]
+        spans = [(block * self.block_size, (block + 1) * self.block_size) for block in blocks]
+        tail = len(self.block_index) * self.block_size
+        if tail < len(self.records):
+            spans.append((tail, len(self.records)))
+            
+        pieces = []
+        for begin, end in spans:
+            timestamps = self.records['timestamp'][begin:end]
+            matched = np.nonzero((timestamps >= low) & (timestamps <= high))[0]
+            if len(matched):
+                pieces.append(matched + begin)
+        if not pieces:
+            return np.zeros(0, dtype=np.int64)
+        rows = np.concatenate(pieces)
+        return rows[np.argsort(self.records['timestamp'][rows], kind='stable')]
+        
+    def _metadata_column(self, rows: np.ndarray) -> np.ndarray:
+        """列號對應的附加資訊 (稀疏，只填入有附加資訊的列)"""
+        values = np.full(len(rows), None, dtype=object)
+        if self._metadata and len(rows):
+            keys = np.fromiter(self._metadata, dtype=np.int64, count=len(self._metadata))
+            for position in np.nonzero(np.isin(rows, keys))[0]:
+                values[position] = self._metadata[int(rows[position])]
+        return values
+        
+    def to_columns(self, start_ns: Optional[int] = None, end_ns: Optional[int] = None,
+                   columns: Optional[Iterable[str]] = None) -> SessionColumns:
+        """時間範圍內的數據轉為列式陣列
+        
+        有序數據的時間戳與數值欄位是映射的視圖，不複製也不讀取範圍外的頁面。
+        """
+        if self.sorted:
+            low, high = self.index_range(start_ns, end_ns)
+            rows = slice(low, high)
+            records = self.records[rows]
+        else:
+            rows = self.rows(start_ns, end_ns)
+            records = self.records[rows]
+        row_ids = np.arange(rows.start, rows.stop) if isinstance(rows, slice) else rows
+        return self._columns(records, row_ids, columns)
+        
+    def chunks(self, chunk_size: Optional[int] = 65536,
+               columns: Optional[Iterable[str]] = None) -> Iterator[SessionColumns]:
+        """按寫入順序分段讀取 (不排序，每段只讀入該段的頁面)
+        
+        Args:
+            chunk_size: 每段最多的列數，None表示不分段
+            columns: 需要的欄位，None表示全部
+            
+        Yields:
+            SessionColumns: 數據段
+        """
+        count = len(self.records)
+        step = chunk_size or max(1, count)
+        for start in range(0, count, step):
+            stop = min(start + step, count)
+            yield self._columns(self.records[start:stop], np.arange(start, stop), columns)
+            
+    def _columns(self, records: np.ndarray, row_ids: np.ndarray,
+                 columns: Optional[Iterable[str]]) -> SessionColumns:
+        """數據列轉為列式陣列 (數值欄位為映射的視圖)"""
+        result = {}
+        for name in normalize_columns(columns):
+            if name == 'instrument_id':
+                result[name] = self.instrument_ids(records)
+            elif name == 'metadata':
+                result[name] = self._metadata_column(row_ids)
+            else:
+                result[name] = records[name]
+        return SessionColumns(result)
+        
+    def to_dicts(self, start_ns: Optional[int] = None,
+                 end_ns: Optional[int] = None) -> List[Dict[str, Any]]:
+        """轉為字典列表 (與其他存儲後端的 load_session 相同欄位)"""
+        return self.to_columns(start_ns, end_ns).to_dicts()
\ No newline at end of file
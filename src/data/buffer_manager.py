@@ -4,11 +4,15 @@
 提供高效的實時數據緩存和內存管理
 """
 
+import heapq
 import threading
 import sys
 from collections import deque
-from typing import Dict, List, Optional, Any
-from datetime import datetime, timedelta
+from itertools import islice
+from typing import Dict, List, Optional, Any, Tuple
+import numpy as np
+from src.engine.clock import as_epoch_ns
+from .memory_governor import MemoryConsumer, MemoryGovernor, get_memory_governor
 from src.unified_logger import get_logger
 
 
@@ -24,10 +28,13 @@ class CircularBuffer:
         self.max_size = max_size
         self.buffer = deque(maxlen=max_size)
         self._lock = threading.RLock()
+        self._item_size = 0  # 以首個項目估算，項目為同類數據
         
     def append(self, item: Any):
         """添加項目到緩存"""
         with self._lock:
+            if not self._item_size:
+                self._item_size = sys.getsizeof(item)
             self.buffer.append(item)
             
     def get_recent(self, count: int) -> List[Any]:
@@ -40,7 +47,11 @@ class CircularBuffer:
             List: 最近的項目列表
         """
         with self._lock:
-            return list(self.buffer)[-count:] if count <= len(self.buffer) else list(self.buffer)
+            if count >= len(self.buffer):
+                return list(self.buffer)
+            items = list(islice(reversed(self.buffer), count))
+            items.reverse()
+            return items
             
     def get_all(self) -> List[Any]:
         """獲取所有項目"""
@@ -61,17 +72,337 @@ class CircularBuffer:
         return len(self.buffer) >= self.max_size
         
     def get_memory_size(self) -> int:
-        """估算內存使用大小（字節）"""
+        """估算內存使用大小（字節，O(1)）"""
         if not self.buffer:
             return 0
-        return sys.getsizeof(self.buffer) + sum(sys.getsizeof(item) for item in self.buffer)
+        return sys.getsizeof(self.buffer) + len(self.buffer) * self._item_size
 
 
-class BufferManager:
-    """緩存管理器 - 管理多個儀器的數據緩存"""
+class ColumnarRingBuffer:
+    """列式圓形緩存 (struct-of-arrays)
     
-    def __init__(self):
-        self.buffers: Dict[str, CircularBuffer] = {}
+    每個欄位是一個預先分配的 NumPy 陣列，追加只寫入一列，不建立物件；
+    每點約 56 字節 (6 個 float64/int64 欄位 + metadata 參照)，
+    而 MeasurementPoint 物件約數百字節。
+    
+    讀取最近 k 點的成本為 O(k)：未跨越環形邊界時返回零複製的視圖，
+    跨越時由兩段切片組成。數據按時間戳保持有序，時間範圍以二分搜尋定位。
+    """
+    
+    # 欄位 -> dtype；timestamp 為 epoch ns，缺失的浮點值以 NaN 表示
+    COLUMNS = {
+        'timestamp': np.int64,
+        'voltage': np.float64,
+        'current': np.float64,
+        'resistance': np.float64,
+        'power': np.float64,
+        'temperature': np.float64,
+    }
+    
+    def __init__(self, max_size: int, instrument_id: Optional[str] = None):
+        """初始化列式緩存
+        
+        Args:
+            max_size: 最大緩存點數
+            instrument_id: 儀器標識符 (重建數據點時使用)
+        """
+        if max_size <= 0:
+            raise ValueError("緩存大小必須大於0")
+        self.instrument_id = instrument_id
+        self._lock = threading.RLock()
+        self._allocate(max_size)
+        
+    def _allocate(self, max_size: int):
+        self.max_size = max_size
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.empty(max_size, dtype=dtype) for name, dtype in self.COLUMNS.items()
+        }
+        # 大多數點沒有 metadata，物件陣列只保存參照
+        self.metadata = np.full(max_size, None, dtype=object)
+        self._head = 0  # 下一個寫入位置
+        self._count = 0
+        
+    def append(self, point: Any):
+        """追加一個數據點 (按時間順序時 O(1))
+        
+        時間戳早於最新一點時按時間插入，保持緩存有序 (成本與錯位距離成正比)。
+        """
+        with self._lock:
+            if self._count and point.timestamp < self.columns['timestamp'][self._head - 1]:
+                self._insert_sorted(point)
+                return
+            self._store(self._head, point)
+            self._advance(1)
+            
+    def _store(self, index: int, point: Any):
+        columns = self.columns
+        columns['timestamp'][index] = point.timestamp
+        columns['voltage'][index] = point.voltage
+        columns['current'][index] = point.current
+        columns['resistance'][index] = np.nan if point.resistance is None else point.resistance
+        columns['power'][index] = np.nan if point.power is None else point.power
+        columns['temperature'][index] = np.nan if point.temperature is None else point.temperature
+        self.metadata[index] = point.metadata
+        
+    def _insert_sorted(self, point: Any):
+        """亂序數據點：二分定位後將較新的數據後移一格"""
+        position = self.search(point.timestamp, side='right')
+        if self.is_full():
+            if position == 0:
+                return  # 比緩存內所有數據都舊，視為已移出
+            # 移出最舊一點騰出空間
+            self._count -= 1
+            position -= 1
+        physical = (self._head - self._count + np.arange(position, self._count + 1)) % self.max_size
+        for column in self.columns.values():
+            column[physical[1:]] = column[physical[:-1]]
+        self.metadata[physical[1:]] = self.metadata[physical[:-1]]
+        self._store(int(physical[0]), point)
+        self._advance(1)
+        
+    def append_block(self, block: Dict[str, Any], metadata: Optional[List[Any]] = None):
+        """批量追加 (如硬體掃描讀回的整段數據)
+        
+        Args:
+            block: {欄位: 等長陣列}，必須包含 timestamp；缺少的欄位填 NaN
+            metadata: 與數據等長的 metadata 列表 (可選)
+        """
+        timestamps = np.asarray(block['timestamp'], dtype=np.int64)
+        n = len(timestamps)
+        if n == 0:
+            return
+        with self._lock:
+            in_order = bool(np.all(timestamps[1:] >= timestamps[:-1])) and (
+                self._count == 0 or timestamps[0] >= self.columns['timestamp'][self._head - 1]
+            )
+            if not in_order:
+                # 罕見情況：逐點按時間插入
+                for k in range(n):
+                    self.append(_BlockRow(block, k, metadata[k] if metadata is not None else None))
+                return
+                
+            # 超過容量時只保留最後 max_size 點
+            skip = max(0, n - self.max_size)
+            for name, column in self.columns.items():
+                values = block.get(name)
+                if values is None:
+                    values = np.full(n, np.nan)
+                self._write(column, np.asarray(values, dtype=column.dtype)[skip:])
+            meta = np.full(n - skip, None, dtype=object)
+            if metadata is not None:
+                meta[:] = list(metadata[skip:])
+            self._write(self.metadata, meta)
+            self._advance(n - skip)
+            
+    def _write(self, column: np.ndarray, values: np.ndarray):
+        """從 _head 起寫入，必要時繞回開頭"""
+        first = min(len(values), self.max_size - self._head)
+        column[self._head:self._head + first] = values[:first]
+        if first < len(values):
+            column[:len(values) - first] = values[first:]
+            
+    def _advance(self, n: int):
+        self._head = (self._head + n) % self.max_size
+        self._count = min(self.max_size, self._count + n)
+        
+    def _span(self, lo: int, hi: int) -> List[Tuple[int, int]]:
+        """邏輯索引 [lo, hi) (0 為最舊) 在陣列中的位置 (一段或跨邊界時兩段)"""
+        lo, hi = max(0, lo), min(hi, self._count)
+        if hi <= lo:
+            return []
+        start = (self._head - self._count + lo) % self.max_size
+        stop = start + hi - lo
+        if stop <= self.max_size:
+            return [(start, stop)]
+        return [(start, self.max_size), (0, stop - self.max_size)]
+        
+    def _segments(self, count: int) -> List[Tuple[int, int]]:
+        """最近 count 點在陣列中的位置"""
+        return self._span(self._count - count, self._count)
+        
+    def _slice(self, name: str, lo: int, hi: int) -> np.ndarray:
+        """單一欄位的邏輯區間：一段時為唯讀視圖，兩段時拼接"""
+        segments = self._span(lo, hi)
+        data = self.columns[name]
+        if not segments:
+            return data[:0]
+        if len(segments) == 1:
+            view = data[segments[0][0]:segments[0][1]]
+            view.flags.writeable = False
+            return view
+        return np.concatenate([data[a:b] for a, b in segments])
+        
+    def search(self, timestamp_ns: int, side: str = 'left') -> int:
+        """二分搜尋時間戳的邏輯插入位置 (O(log n))
+        
+        Args:
+            timestamp_ns: epoch ns
+            side: 'left' 返回第一個 >= 的位置，'right' 返回第一個 > 的位置
+        """
+        with self._lock:
+            timestamps = self.columns['timestamp']
+            offset = 0
+            segments = self._span(0, self._count)
+            for k, (a, b) in enumerate(segments):
+                segment = timestamps[a:b]
+                last = k == len(segments) - 1
+                beyond = segment[-1] < timestamp_ns if side == 'left' else segment[-1] <= timestamp_ns
+                if last or not beyond:
+                    return offset + int(np.searchsorted(segment, timestamp_ns, side=side))
+                offset += b - a
+            return offset
+            
+    def index_range(self, start_ns: Optional[int] = None,
+                    end_ns: Optional[int] = None) -> Tuple[int, int]:
+        """時間範圍 [start_ns, end_ns] 對應的邏輯索引區間 [lo, hi)"""
+        with self._lock:
+            lo = 0 if start_ns is None else self.search(start_ns, 'left')
+            hi = self._count if end_ns is None else self.search(end_ns, 'right')
+            return lo, max(lo, hi)
+            
+    def column(self, name: str, count: Optional[int] = None) -> np.ndarray:
+        """最近 count 點的單一欄位
+        
+        Args:
+            name: 欄位名稱 (COLUMNS 之一)
+            count: 點數，None表示全部
+            
+        Returns:
+            np.ndarray: 未跨邊界時為唯讀視圖，否則為兩段拼接的副本
+        """
+        with self._lock:
+            count = self._count if count is None else min(count, self._count)
+            return self._slice(name, self._count - count, self._count)
+            
+    def window(self, count: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """最近 count 點的所有欄位 (見 column())"""
+        with self._lock:
+            return {name: self.column(name, count) for name in self.columns}
+            
+    def time_window(self, start_ns: Optional[int] = None,
+                    end_ns: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """時間範圍內的所有欄位 (二分定位，未跨邊界時為零複製視圖)"""
+        with self._lock:
+            lo, hi = self.index_range(start_ns, end_ns)
+            return {name: self._slice(name, lo, hi) for name in self.columns}
+            
+    def time_segments(self, start_ns: Optional[int] = None,
+                      end_ns: Optional[int] = None) -> List[Dict[str, np.ndarray]]:
+        """時間範圍內的數據，以一或兩段零複製視圖返回 (按時間順序)"""
+        with self._lock:
+            lo, hi = self.index_range(start_ns, end_ns)
+            segments = []
+            for a, b in self._span(lo, hi):
+                views = {name: column[a:b] for name, column in self.columns.items()}
+                for view in views.values():
+                    view.flags.writeable = False
+                segments.append(views)
+            return segments
+            
+    def _points(self, lo: int, hi: int) -> List[Any]:
+        """重建邏輯區間 [lo, hi) 的 MeasurementPoint"""
+        with self._lock:
+            window = {name: self._slice(name, lo, hi).tolist() for name in self.columns}
+            metadata = [item for a, b in self._span(lo, hi) for item in self.metadata[a:b]]
+        return [
+            self._make_point(window, k, metadata[k]) for k in range(len(metadata))
+        ]
+        
+    def get_recent(self, count: int) -> List[Any]:
+        """獲取最近的數據點 (僅重建所需的 count 個 MeasurementPoint)"""
+        with self._lock:
+            return self._points(self._count - min(count, self._count), self._count)
+            
+    def get_all(self) -> List[Any]:
+        """獲取所有數據點"""
+        return self.get_recent(self._count)
+        
+    def get_range(self, start_ns: Optional[int] = None,
+                  end_ns: Optional[int] = None) -> List[Any]:
+        """獲取時間範圍內的數據點 (O(log n + k))"""
+        with self._lock:
+            return self._points(*self.index_range(start_ns, end_ns))
+            
+    def point_at(self, offset: int) -> Optional[Any]:
+        """按時間順序的索引讀取單點 (0 為最舊，-1 為最新)"""
+        with self._lock:
+            if not -self._count <= offset < self._count:
+                return None
+            offset %= self._count
+            return self._points(offset, offset + 1)[0]
+            
+    def _make_point(self, window: Dict[str, list], k: int, metadata: Any):
+        from .unified_data_manager import MeasurementPoint
+        
+        def optional(name):
+            value = window[name][k]
+            return None if value != value else value  # NaN -> None
+            
+        return MeasurementPoint(
+            timestamp=window['timestamp'][k],
+            instrument_id=self.instrument_id,
+            voltage=window['voltage'][k],
+            current=window['current'][k],
+            resistance=optional('resistance'),
+            power=optional('power'),
+            temperature=optional('temperature'),
+            metadata=metadata
+        )
+        
+    def resize(self, new_size: int):
+        """調整容量，保留最新的數據"""
+        with self._lock:
+            window = self.window(new_size)
+            metadata = [item for a, b in self._segments(new_size) for item in self.metadata[a:b]]
+            self._allocate(new_size)
+            self.append_block(window, metadata)
+            
+    def clear(self):
+        """清空緩存 (保留已分配的陣列)"""
+        with self._lock:
+            self.metadata[:] = None
+            self._head = 0
+            self._count = 0
+            
+    def size(self) -> int:
+        """獲取當前大小"""
+        return self._count
+        
+    def is_full(self) -> bool:
+        """檢查緩存是否已滿"""
+        return self._count >= self.max_size
+        
+    def get_memory_size(self) -> int:
+        """內存使用大小（字節，預先分配的陣列）"""
+        return sum(column.nbytes for column in self.columns.values()) + self.metadata.nbytes
+
+
+class _BlockRow:
+    """批量數據中的一列，提供與數據點相同的屬性"""
+    
+    def __init__(self, block: Dict[str, Any], k: int, metadata: Any):
+        self.timestamp = int(block['timestamp'][k])
+        for name in ('voltage', 'current', 'resistance', 'power', 'temperature'):
+            values = block.get(name)
+            setattr(self, name, None if values is None else float(values[k]))
+        self.metadata = metadata
+
+
+class BufferManager(MemoryConsumer):
+    """緩存管理器 - 管理多個儀器的數據緩存
+    
+    緩存預先分配，用量只在建立/調整/移除緩存時改變；以 'data' 群組
+    向內存預算管理器記帳，超出預算時由大到小將緩存容量減半 (移除最舊數據)。
+    """
+    
+    name = 'ring_buffers'
+    thread_safe = True
+    
+    # 回收時每個緩存至少保留的容量
+    MIN_BUFFER_SIZE = 100
+    
+    def __init__(self, governor: Optional[MemoryGovernor] = None):
+        self.buffers: Dict[str, ColumnarRingBuffer] = {}
         self.buffer_configs: Dict[str, Dict[str, Any]] = {}
         self.logger = get_logger("BufferManager")
         self._lock = threading.RLock()
@@ -80,6 +411,42 @@ class BufferManager:
         self.total_points_added = 0
         self.total_points_removed = 0
         
+        # 內存預算
+        self.nbytes = 0
+        self.governor = governor or get_memory_governor()
+        self.governor.register(self, 'data')
+        
+    def _recharge(self):
+        """重新計算預先分配的用量並向預算管理器回報差額"""
+        with self._lock:
+            nbytes = self._current_bytes()
+            delta = nbytes - self.nbytes
+            self.nbytes = nbytes
+        if delta:
+            self.governor.charge(self, delta)
+            
+    def reclaim(self, nbytes: int) -> int:
+        """每次將最大的緩存容量減半，直到釋放 nbytes 字節或都已到最小容量"""
+        with self._lock:
+            before = self.nbytes
+            while before - self._current_bytes() < nbytes:
+                candidates = [
+                    (instrument_id, buffer) for instrument_id, buffer in self.buffers.items()
+                    if buffer.max_size > self.MIN_BUFFER_SIZE
+                ]
+                if not candidates:
+                    break
+                instrument_id, buffer = max(candidates, key=lambda item: item[1].get_memory_size())
+                new_size = max(self.MIN_BUFFER_SIZE, buffer.max_size // 2)
+                self.total_points_removed += max(0, buffer.size() - new_size)
+                buffer.resize(new_size)
+                self.logger.info(f"內存超出預算，{instrument_id} 緩存縮減為 {new_size}")
+            self._recharge()
+            return before - self.nbytes
+            
+    def _current_bytes(self) -> int:
+        return sum(buffer.get_memory_size() for buffer in self.buffers.values())
+        
     def create_buffer(self, instrument_id: str, max_size: int, 
                      config: Optional[Dict[str, Any]] = None):
         """為儀器創建緩存
@@ -90,9 +457,10 @@ class BufferManager:
             config: 額外配置
         """
         with self._lock:
-            self.buffers[instrument_id] = CircularBuffer(max_size)
+            self.buffers[instrument_id] = ColumnarRingBuffer(max_size, instrument_id)
             self.buffer_configs[instrument_id] = config or {}
             self.logger.info(f"為 {instrument_id} 創建緩存，大小: {max_size}")
+        self._recharge()
             
     def add_point(self, instrument_id: str, point: Any):
         """添加數據點到緩存
@@ -124,6 +492,21 @@ class BufferManager:
                 return []
             return self.buffers[instrument_id].get_recent(count)
             
+    def get_window(self, instrument_id: str, count: int) -> Dict[str, np.ndarray]:
+        """以列式陣列獲取最近的數據 (不建立數據點物件)
+        
+        Args:
+            instrument_id: 儀器標識符
+            count: 數據點數量
+            
+        Returns:
+            Dict[str, np.ndarray]: {欄位: 陣列}，儀器不存在時為空字典
+        """
+        with self._lock:
+            if instrument_id not in self.buffers:
+                return {}
+            return self.buffers[instrument_id].window(count)
+            
     def get_all_points(self, instrument_id: str) -> List[Any]:
         """獲取所有數據點
         
@@ -139,24 +522,69 @@ class BufferManager:
             return self.buffers[instrument_id].get_all()
             
     def get_points_in_range(self, instrument_id: str, 
-                           start_time: datetime, 
-                           end_time: datetime) -> List[Any]:
+                           start_time, 
+                           end_time) -> List[Any]:
         """獲取時間範圍內的數據點
         
         Args:
             instrument_id: 儀器標識符
-            start_time: 開始時間
-            end_time: 結束時間
+            start_time: 開始時間 (epoch ns 或 datetime)
+            end_time: 結束時間 (epoch ns 或 datetime)
             
         Returns:
             List: 時間範圍內的數據點
         """
+        start_ns, end_ns = as_epoch_ns(start_time), as_epoch_ns(end_time)
+        with self._lock:
+            buffer = self.buffers.get(instrument_id)
+            if buffer is None:
+                return []
+            return buffer.get_range(start_ns, end_ns)
+            
+    def get_window_in_range(self, instrument_id: str,
+                            start_time=None,
+                            end_time=None) -> Dict[str, np.ndarray]:
+        """以列式陣列獲取時間範圍內的數據 (二分定位，盡量返回視圖)
+        
+        Args:
+            instrument_id: 儀器標識符
+            start_time: 開始時間，None表示不限
+            end_time: 結束時間，None表示不限
+            
+        Returns:
+            Dict[str, np.ndarray]: {欄位: 陣列}，儀器不存在時為空字典
+        """
+        start_ns = None if start_time is None else as_epoch_ns(start_time)
+        end_ns = None if end_time is None else as_epoch_ns(end_time)
         with self._lock:
-            all_points = self.get_all_points(instrument_id)
-            return [
-                point for point in all_points 
-                if hasattr(point, 'timestamp') and start_time <= point.timestamp <= end_time
+            buffer = self.buffers.get(instrument_id)
+            if buffer is None:
+                return {}
+            return buffer.time_window(start_ns, end_ns)
+            
+    def merge_points(self, instrument_ids: Optional[List[str]] = None,
+                     start_time=None, end_time=None) -> List[Any]:
+        """合併多台儀器的數據點為單一時間序列
+        
+        各緩存本身已按時間排序，以 k 路合併 (O(n log k)) 取代拼接後排序。
+        
+        Args:
+            instrument_ids: 儀器列表，None表示全部
+            start_time: 開始時間，None表示不限
+            end_time: 結束時間，None表示不限
+            
+        Returns:
+            List: 按時間戳排序的數據點
+        """
+        start_ns = None if start_time is None else as_epoch_ns(start_time)
+        end_ns = None if end_time is None else as_epoch_ns(end_time)
+        with self._lock:
+            ids = list(self.buffers) if instrument_ids is None else instrument_ids
+            streams = [
+                self.buffers[instrument_id].get_range(start_ns, end_ns)
+                for instrument_id in ids if instrument_id in self.buffers
             ]
+        return list(heapq.merge(*streams, key=lambda point: point.timestamp))
             
     def clear_buffer(self, instrument_id: str):
         """清空特定緩存
@@ -189,16 +617,10 @@ class BufferManager:
         """
         with self._lock:
             if instrument_id in self.buffers:
-                old_data = self.buffers[instrument_id].get_all()
-                self.buffers[instrument_id] = CircularBuffer(new_size)
-                
                 # 保留最新的數據
-                if old_data:
-                    keep_count = min(len(old_data), new_size)
-                    for point in old_data[-keep_count:]:
-                        self.buffers[instrument_id].append(point)
-                        
+                self.buffers[instrument_id].resize(new_size)
                 self.logger.info(f"{instrument_id} 緩存大小已調整為 {new_size}")
+        self._recharge()
                 
     def get_buffer_status(self, instrument_id: str) -> Dict[str, Any]:
         """獲取緩存狀態
@@ -270,16 +692,10 @@ class BufferManager:
             if empty_buffers:
                 self.logger.info(f"已清理 {len(empty_buffers)} 個空緩存")
                 
-            # 檢查內存使用並適當縮減緩存
-            memory_stats = self.get_memory_usage()
-            if memory_stats['total_memory_mb'] > 100:  # 100MB閾值
-                # 將所有緩存縮減到一半大小
-                for instrument_id, buffer in self.buffers.items():
-                    new_size = max(100, buffer.max_size // 2)
-                    self.resize_buffer(instrument_id, new_size)
-                    
-                self.logger.info("內存使用過高，已縮減緩存大小")
-                
+        # 超出 data.buffer.memory_limit_mb 或總預算時由預算管理器觸發回收
+        self._recharge()
+        self.governor.enforce()
+        
     def get_oldest_point(self, instrument_id: str) -> Optional[Any]:
         """獲取最舊的數據點
         
@@ -290,8 +706,8 @@ class BufferManager:
             Any: 最舊的數據點
         """
         with self._lock:
-            if instrument_id in self.buffers and self.buffers[instrument_id].size() > 0:
-                return self.buffers[instrument_id].get_all()[0]
+            if instrument_id in self.buffers:
+                return self.buffers[instrument_id].point_at(0)
             return None
             
     def get_newest_point(self, instrument_id: str) -> Optional[Any]:
@@ -304,6 +720,6 @@ class BufferManager:
             Any: 最新的數據點
         """
         with self._lock:
-            if instrument_id in self.buffers and self.buffers[instrument_id].size() > 0:
-                return self.buffers[instrument_id].get_all()[-1]
+            if instrument_id in self.buffers:
+                return self.buffers[instrument_id].point_at(-1)
             return None
\ No newline at end of file
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+列式會話數據
+所有存儲後端的 load_columns()/iter_columns() 返回 SessionColumns：
+每個欄位一個 NumPy 陣列 (時間戳 int64 ns、數值 float64 以 NaN 表示缺值、
+儀器ID為字串陣列)，逐點附加資訊保持原始 JSON 字串，存取時才解析。
+"""
+
+import json
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from src.engine.clock import as_epoch_ns
+
+FLOAT_COLUMNS = ('voltage', 'current', 'resistance', 'power', 'temperature')
+COLUMNS = ('timestamp', 'instrument_id') + FLOAT_COLUMNS + ('metadata',)
+
+
+def normalize_columns(columns: Optional[Iterable[str]] = None) -> tuple:
+    """檢查欄位名稱，None表示全部欄位 (按標準順序返回)"""
+    if columns is None:
+        return COLUMNS
+    requested = set(columns)
+    unknown = requested - set(COLUMNS)
+    if unknown:
+        raise ValueError(f"未知的欄位: {', '.join(sorted(unknown))}")
+    return tuple(name for name in COLUMNS if name in requested)
+
+
+def required_columns(projection: tuple, start_ns: Optional[int] = None,
+                     end_ns: Optional[int] = None) -> tuple:
+    """讀取時需要的欄位：投影欄位，有時間條件時另加 timestamp"""
+    if (start_ns is not None or end_ns is not None) and 'timestamp' not in projection:
+        return normalize_columns(projection + ('timestamp',))
+    return projection
+
+
+def empty_column(name: str, length: int = 0):
+    """指定長度的空欄位 (數值為 NaN，其他為 None)"""
+    if name == 'timestamp':
+        return np.zeros(length, dtype=np.int64)
+    if name in FLOAT_COLUMNS:
+        return np.full(length, np.nan)
+    if name == 'metadata':
+        return MetadataColumn(np.full(length, None, dtype=object))
+    return np.full(length, None, dtype=object)
+
+
+def as_column(name: str, values) -> Any:
+    """將序列轉為欄位的標準型別"""
+    if name == 'timestamp':
+        return np.asarray(values, dtype=np.int64)
+    if name in FLOAT_COLUMNS:
+        return np.asarray(values, dtype=np.float64)  # None -> NaN
+    if name == 'metadata':
+        return values if isinstance(values, MetadataColumn) else MetadataColumn(values)
+    array = np.asarray(values, dtype=object)
+    if array.ndim != 1:
+        # 序列元素本身是序列時 asarray 會升維，改為逐一放入
+        array = np.empty(len(values), dtype=object)
+        array[:] = list(values)
+    return array
+
+
+class MetadataColumn:
+    """延遲解析的附加資訊欄位
+    
+    保存原始值 (JSON 字串、已解析的字典或缺值)，取用某一列時才解析並快取；
+    不需要附加資訊的分析完全不付出解析成本。
+    """
+    
+    def __init__(self, raw):
+        self.raw = np.asarray(raw, dtype=object) if not isinstance(raw, np.ndarray) else raw
+        self._decoded: Dict[int, Any] = {}
+        
+    def __len__(self) -> int:
+        return len(self.raw)
+        
+    @staticmethod
+    def _decode(value) -> Optional[Dict[str, Any]]:
+        if isinstance(value, str):
+            return json.loads(value) if value else None
+        if isinstance(value, dict):
+            return value
+        return None  # None / NaN
+        
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            index = int(index)
+            if index < 0:
+                index += len(self.raw)
+            if index not in self._decoded:
+                self._decoded[index] = self._decode(self.raw[index])
+            return self._decoded[index]
+        return MetadataColumn(self.raw[index])
+        
+    def __iter__(self) -> Iterator[Optional[Dict[str, Any]]]:
+        for index in range(len(self.raw)):
+            yield self[index]
+            
+    def present(self) -> np.ndarray:
+        """有附加資訊的列 (不解析)"""
+        return np.fromiter(
+            (isinstance(value, dict) or (isinstance(value, str) and bool(value)) for value in self.raw),
+            dtype=bool, count=len(self.raw)
+        )
+        
+    def decode(self) -> List[Optional[Dict[str, Any]]]:
+        """解析全部附加資訊"""
+        return list(self)
+
+
+class SessionColumns:
+    """列式的會話數據
+    
+    columns 依標準順序保存請求的欄位；以欄位名稱取用 (data['voltage'])，
+    select() 以切片或布林遮罩取出子集 (切片不複製)。
+    """
+    
+    def __init__(self, columns: Dict[str, Any]):
+        """建立列式數據
+        
+        Args:
+            columns: 欄位名稱 -> 陣列 (各欄位長度須相同)
+        """
+        self.columns = {name: as_column(name, columns[name]) for name in normalize_columns(columns)}
+        lengths = {len(values) for values in self.columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("各欄位長度不一致")
+        self._length = lengths.pop() if lengths else 0
+        
+    @classmethod
+    def empty(cls, columns: Optional[Iterable[str]] = None) -> 'SessionColumns':
+        """沒有數據的結果"""
+        return cls({name: empty_column(name) for name in normalize_columns(columns)})
+        
+    @classmethod
+    def from_records(cls, records: Sequence[Dict[str, Any]],
+                     columns: Optional[Iterable[str]] = None) -> 'SessionColumns':
+        """由字典列表建立 (用於只能逐筆讀取的舊格式，時間戳可為ISO字串)"""
+        result = {}
+        for name in normalize_columns(columns):
+            values = [record.get(name) for record in records]
+            if name == 'timestamp':
+                values = [value if type(value) is int else as_epoch_ns(value) for value in values]
+            result[name] = values
+        return cls(result)
+        
+    @classmethod
+    def from_points(cls, points: Sequence[Any],
+                    columns: Optional[Iterable[str]] = None) -> 'SessionColumns':
+        """由 MeasurementPoint 列表建立 (每個欄位一次取出屬性)"""
+        return cls({
+            name: [getattr(point, name) for point in points]
+            for name in normalize_columns(columns)
+        })
+        
+    @classmethod
+    def from_frame(cls, frame, columns: Optional[Iterable[str]] = None) -> 'SessionColumns':
+        """由 pandas DataFrame 建立 (缺少的欄位補空值)"""
+        names = normalize_columns(columns)
+        return cls({
+            name: frame[name].to_numpy() if name in frame.columns else empty_column(name, len(frame))
+            for name in names
+        })
+        
+    @classmethod
+    def from_arrow(cls, table, columns: Optional[Iterable[str]] = None) -> 'SessionColumns':
+        """由 Arrow Table/RecordBatch 建立 (儀器ID字典解碼，數值空值轉為 NaN)"""
+        names = normalize_columns(columns)
+        result = {}
+        for name in names:
+            if name not in table.schema.names:
+                result[name] = empty_column(name, table.num_rows)
+                continue
+            column = table.column(name)
+            if hasattr(column, 'combine_chunks'):
+                column = column.combine_chunks()
+            if name == 'instrument_id' and hasattr(column, 'dictionary_decode'):
+                column = column.dictionary_decode()
+            if name in FLOAT_COLUMNS:
+                column = column.fill_null(float('nan')) if column.null_count else column
+            result[name] = column.to_numpy(zero_copy_only=False)
+        return cls(result)
+        
+    @classmethod
+    def concat(cls, parts: Iterable['SessionColumns'],
+               columns: Optional[Iterable[str]] = None) -> 'SessionColumns':
+        """依序合併多個結果"""
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return cls.empty(columns)
+        if len(parts) == 1:
+            return parts[0]
+        merged = {}
+        for name in parts[0].columns:
+            if name == 'metadata':
+                merged[name] = MetadataColumn(np.concatenate([part.columns[name].raw for part in parts]))
+            else:
+                merged[name] = np.concatenate([part.columns[name] for part in parts])
+        return cls(merged)
+        
+    def __len__(self) -> int:
+        return self._length
+        
+    def __contains__(self, name: str) -> bool:
+        return name in self.columns
+        
+    def __getitem__(self, name: str):
+        return self.columns[name]
+        
+    @property
+    def names(self) -> List[str]:
+        """欄位名稱"""
+        return list(self.columns)
+        
+    def select(self, index) -> 'SessionColumns':
+        """以切片、列號或布林遮罩取出子集"""
+        return SessionColumns({name: values[index] for name, values in self.columns.items()})
+        
+    def between(self, start_ns: Optional[int] = None, end_ns: Optional[int] = None) -> 'SessionColumns':
+        """時間範圍 [start_ns, end_ns] 內的數據 (需含 timestamp 欄位)"""
+        if start_ns is None and end_ns is None:
+            return self
+        timestamps = self.columns['timestamp']
+        mask = np.ones(len(timestamps), dtype=bool)
+        if start_ns is not None:
+            mask &= timestamps >= start_ns
+        if end_ns is not None:
+            mask &= timestamps <= end_ns
+        return self if mask.all() else self.select(mask)
+        
+    def project(self, columns: Optional[Iterable[str]] = None) -> 'SessionColumns':
+        """只保留指定欄位 (不複製)"""
+        names = normalize_columns(columns)
+        if tuple(self.columns) == names:
+            return self
+        return SessionColumns({name: self.columns[name] for name in names})
+        
+    def chunks(self, chunk_size: Optional[int] = None) -> Iterator['SessionColumns']:
+        """按列數切成多段 (切片不複製)"""
+        if not chunk_size or len(self) <= chunk_size:
+            if len(self):
+                yield self
+            return
+        for start in range(0, len(self), chunk_size):
+            yield self.select(slice(start, start + chunk_size))
+            
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """轉為字典列表 (與 load_session 相同格式，數值缺值為 None)"""
+        lists = {}
+        for name, values in self.columns.items():
+            if name == 'metadata':
+                lists[name] = values.decode()
+            elif name in FLOAT_COLUMNS:
+                lists[name] = [None if value != value else value for value in values.tolist()]
+            else:
+                lists[name] = values.tolist()
+        names = list(lists)
+        return [dict(zip(names, row)) for row in zip(*lists.values())]
+        
+    def to_pandas(self):
+        """轉為 pandas DataFrame (附加資訊會被解析)"""
+        import pandas as pd
+        
+        return pd.DataFrame({
+            name: values.decode() if name == 'metadata' else values
+            for name, values in self.columns.items()
+        })
+        
+    def to_arrow(self):
+        """轉為 Arrow Table (需要 pyarrow；儀器ID字典編碼，附加資訊保持 JSON 字串)"""
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("需要安裝 pyarrow 來支援 Arrow 格式")
+            
+        arrays = {}
+        for name, values in self.columns.items():
+            if name == 'metadata':
+                arrays[name] = pa.array(
+                    [value if isinstance(value, str) or value is None else
+                     (json.dumps(value) if isinstance(value, dict) else None)
+                     for value in values.raw],
+                    type=pa.string()
+                )
+            elif name == 'instrument_id':
+                arrays[name] = pa.array(values, type=pa.string()).dictionary_encode()
+            elif name in FLOAT_COLUMNS:
+                arrays[name] = pa.array(values, from_pandas=True)  # NaN -> null
+            else:
+                arrays[name] = pa.array(values)
+        return pa.table(arrays)
+
+
+def chunk_points(points: Iterable[Any], chunk_size: int = 65536,
+                 columns: Optional[Iterable[str]] = None) -> Iterator[SessionColumns]:
+    """將數據點串流 (MeasurementPoint 或字典) 分段轉為列式數據"""
+    iterator = iter(points)
+    while True:
+        batch = list(islice(iterator, chunk_size))
+        if not batch:
+            return
+        if isinstance(batch[0], dict):
+            yield SessionColumns.from_records(batch, columns)
+        else:
+            yield SessionColumns.from_points(batch, columns)
\ No newline at end of file
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+串流壓縮
+檔案存儲後端與導出共用的透明壓縮：寫入端把數據累積成區塊，交給背景執行緒
+壓縮後寫入檔案，採集執行緒只付出複製到緩衝的成本；讀取端依副檔名自動解壓縮。
+優先使用 zstd (需要 zstandard)，缺少時改用標準庫的 gzip。
+"""
+
+import importlib.util
+import io
+import queue
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from src.config import get_config
+
+CODEC_SUFFIXES = {'zstd': '.zst', 'gzip': '.gz'}
+
+# 壓縮工作的區塊種類
+_DATA, _SYNC, _FINISH = 0, 1, 2
+
+
+def zstd_available() -> bool:
+    """zstandard 是否可用 (不載入模組)"""
+    return importlib.util.find_spec('zstandard') is not None
+
+
+def resolve_codec(setting: Any) -> Optional[str]:
+    """配置值轉為實際使用的壓縮方式
+    
+    Args:
+        setting: False/None/'none' 表示不壓縮，True 表示預設 (zstd)，或 'zstd'/'gzip'
+        
+    Returns:
+        Optional[str]: 'zstd'、'gzip' 或 None (zstd 不可用時改用 gzip)
+    """
+    if setting is None or setting is False:
+        return None
+    codec = 'zstd' if setting is True else str(setting).lower()
+    if codec in ('none', 'off', ''):
+        return None
+    if codec in ('gz', 'gzip'):
+        return 'gzip'
+    if codec in ('zst', 'zstd'):
+        return 'zstd' if zstd_available() else 'gzip'
+    raise ValueError(f"不支援的壓縮方式: {setting}")
+
+
+def compression_options(setting: Any) -> Dict[str, Any]:
+    """寫入器的壓縮參數 (壓縮等級與區塊大小取自 data.compression)
+    
+    Returns:
+        Dict: compression、compression_level、compression_block_size
+    """
+    config = get_config().get('data.compression', {}) or {}
+    return {
+        'compression': resolve_codec(setting),
+        'compression_level': config.get('level', 3),
+        'compression_block_size': int(config.get('block_kb', 1024) * 1024)
+    }
+
+
+def codec_of(path: Path) -> Optional[str]:
+    """依副檔名判斷壓縮方式 (寫入中的 .partial 檔案亦可判斷)"""
+    suffixes = Path(path).suffixes[-2:]
+    for codec, suffix in CODEC_SUFFIXES.items():
+        if suffix in suffixes:
+            return codec
+    return None
+
+
+def compressed_path(path: Path, codec: Optional[str]) -> Path:
+    """加上壓縮副檔名的路徑 (如 session.csv -> session.csv.zst)"""
+    path = Path(path)
+    if codec is None:
+        return path
+    return path.with_name(path.name + CODEC_SUFFIXES[codec])
+
+
+class _StreamCompressor:
+    """單一壓縮串流 (只在壓縮執行緒中使用)"""
+    
+    def __init__(self, codec: str, level: int):
+        if codec == 'zstd':
+            import zstandard
+            self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+            self._sync_mode = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+            self._finish_mode = zstandard.COMPRESSOBJ_FLUSH_FINISH
+        else:
+            # wbits=31 產生 gzip 格式 (含檔頭與校驗)
+            self._compressor = zlib.compressobj(max(1, min(level, 9)), zlib.DEFLATED, 31)
+            self._sync_mode = zlib.Z_SYNC_FLUSH
+            self._finish_mode = zlib.Z_FINISH
+            
+    def compress(self, data: bytes, kind: int) -> bytes:
+        output = self._compressor.compress(data) if data else b''
+        if kind == _SYNC:
+            # 同步點之前的數據可完整解壓，崩潰時最多遺失上次檢查點之後的數據
+            output += self._compressor.flush(self._sync_mode)
+        elif kind == _FINISH:
+            output += self._compressor.flush(self._finish_mode)
+        return output
+
+
+class CompressedWriter(io.RawIOBase):
+    """背景壓縮的二進制寫入串流
+    
+    write() 只把數據附加到區塊緩衝，滿 block_size 時交給壓縮執行緒；
+    佇列中最多 queue_blocks 個區塊，壓縮跟不上時寫入端才會等待。
+    flush() 是檢查點：寫出目前的區塊並加入同步點，返回時數據已寫入檔案，
+    之後可對 fileno() 呼叫 fsync。close() 寫入串流結尾。
+    """
+    
+    def __init__(self, file, codec: str, level: int = 3, block_size: int = 1 << 20,
+                 queue_blocks: int = 4, closefd: bool = True):
+        """初始化寫入串流
+        
+        Args:
+            file: 已開啟的二進制檔案
+            codec: 'zstd' 或 'gzip'
+            level: 壓縮等級 (gzip 最高 9)
+            block_size: 交給壓縮執行緒的區塊大小 (bytes)
+            queue_blocks: 等待壓縮的區塊上限
+            closefd: close() 時是否關閉 file
+        """
+        super().__init__()
+        self.codec = codec
+        self.block_size = block_size
+        self._file = file
+        self._closefd = closefd
+        self._compressor = _StreamCompressor(codec, level)
+        self._block = bytearray()
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, queue_blocks))
+        self._error: Optional[BaseException] = None
+        
+        # 統計
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.blocks = 0
+        
+        self._thread = threading.Thread(target=self._run, name="Compressor", daemon=True)
+        self._thread.start()
+        
+    def writable(self) -> bool:
+        return True
+        
+    def fileno(self) -> int:
+        return self._file.fileno()
+        
+    def write(self, data) -> int:
+        self._check()
+        self._block += data
+        if len(self._block) >= self.block_size:
+            self._submit(_DATA)
+        return len(data)
+        
+    def _submit(self, kind: int):
+        block = bytes(self._block)
+        self._block.clear()
+        self.bytes_in += len(block)
+        self._queue.put((block, kind))
+        
+    def _run(self):
+        while True:
+            block, kind = self._queue.get()
+            try:
+                if self._error is None:
+                    output = self._compressor.compress(block, kind)
+                    if output:
+                        self._file.write(output)
+                        self.bytes_out += len(output)
+                    self.blocks += 1
+            except BaseException as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+            if kind == _FINISH:
+                return
+                
+    def _check(self):
+        if self._error is not None:
+            raise OSError(f"壓縮寫入失敗: {self._error}") from self._error
+            
+    def flush(self):
+        """寫出目前的區塊並加入同步點，等待壓縮執行緒寫入檔案"""
+        if self.closed or not self._thread.is_alive():
+            return
+        self._submit(_SYNC)
+        self._queue.join()
+        self._check()
+        self._file.flush()
+        
+    def close(self):
+        """寫入剩餘數據與串流結尾"""
+        if self.closed:
+            return
+        try:
+            if self._thread.is_alive():
+                self._submit(_FINISH)
+                self._thread.join()
+            self._check()
+            self._file.flush()
+        finally:
+            super().close()
+            if self._closefd:
+                self._file.close()
+                
+    @property
+    def ratio(self) -> float:
+        """壓縮比 (原始大小 / 壓縮後大小)"""
+        return self.bytes_in / self.bytes_out if self.bytes_out else 0.0
+
+
+class _DecompressingReader(io.RawIOBase):
+    """逐塊解壓縮讀取 (支援串接的多個 gzip 成員/zstd 幀)
+    
+    只解壓縮已寫入的數據，不要求串流結尾：寫入中或崩潰後遺留的檔案
+    可讀到最後一個同步點 (檢查點)。
+    """
+    
+    READ_SIZE = 1 << 18
+    
+    def __init__(self, file, codec: str):
+        super().__init__()
+        self._file = file
+        self._codec = codec
+        self._decompressor = self._new_decompressor()
+        self._pending = memoryview(b'')
+        
+    def _new_decompressor(self):
+        if self._codec == 'zstd':
+            import zstandard
+            return zstandard.ZstdDecompressor().decompressobj()
+        return zlib.decompressobj(31)
+        
+    def _decompress(self, data: bytes) -> bytes:
+        output = self._decompressor.decompress(data)
+        # 一個成員 (幀) 結束後，剩餘數據屬於下一個
+        while getattr(self._decompressor, 'eof', False) and self._decompressor.unused_data:
+            data = self._decompressor.unused_data
+            self._decompressor = self._new_decompressor()
+            output += self._decompressor.decompress(data)
+        return output
+        
+    def readable(self) -> bool:
+        return True
+        
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            data = self._file.read(self.READ_SIZE)
+            if not data:
+                return 0
+            self._pending = memoryview(self._decompress(data))
+        count = min(len(buffer), len(self._pending))
+        buffer[:count] = self._pending[:count]
+        self._pending = self._pending[count:]
+        return count
+        
+    def close(self):
+        if not self.closed:
+            self._file.close()
+        super().close()
+
+
+def open_input(path: Path, buffer_size: int = 1 << 20):
+    """以二進制模式開啟檔案，壓縮檔案 (.zst/.gz) 自動解壓縮
+    
+    Returns:
+        BinaryIO: 可逐行讀取的二進制串流
+    """
+    codec = codec_of(path)
+    if codec is None:
+        return open(path, 'rb', buffering=buffer_size)
+    if codec == 'zstd' and not zstd_available():
+        raise ImportError(f"需要安裝 zstandard 來讀取 {Path(path).name}")
+    return io.BufferedReader(_DecompressingReader(open(path, 'rb'), codec), buffer_size)
+
+
+def open_output(path: Path, codec: Optional[str], level: int = 3, block_size: int = 1 << 20,
+                text: bool = True, encoding: str = 'utf-8', buffer_size: int = 1 << 20):
+    """開啟寫入檔案，codec 不為 None 時經由背景壓縮寫入
+    
+    Args:
+        path: 檔案路徑 (呼叫端負責加上壓縮副檔名，見 compressed_path)
+        codec: 'zstd'、'gzip' 或 None
+        level: 壓縮等級
+        block_size: 壓縮區塊大小 (bytes)
+        text: 文字模式 (newline='')，否則為二進制
+        encoding: 文字編碼
+        buffer_size: 未壓縮時的寫入緩衝大小
+        
+    Returns:
+        IO: 檔案串流
+    """
+    if codec is None:
+        if text:
+            return open(path, 'w', encoding=encoding, newline='', buffering=buffer_size)
+        return open(path, 'wb', buffering=buffer_size)
+    stream = CompressedWriter(open(path, 'wb'), codec, level, block_size)
+    if text:
+        return io.TextIOWrapper(stream, encoding=encoding, newline='')
+    return stream
\ No newline at end of file
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+背景導出工作
+導出在工作執行緒池中執行，不佔用GUI執行緒；同時執行的數量受限，
+工作執行緒以較低的系統優先權運行並在每段數據之間讓出，採集執行緒優先。
+進度、吞吐量與結果以純Python信號發送 (GUI經由 QtExportJobAdapter 接收)。
+"""
+
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from src.config import get_config
+from src.engine.cancellation import CancellationToken, OperationCancelled
+from src.engine.signals import Signal
+from src.unified_logger import get_logger
+
+
+class ExportJobState(Enum):
+    """導出工作狀態"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+def _lower_thread_priority(nice: int):
+    """降低當前執行緒的系統優先權 (不支援的平台略過)"""
+    try:
+        if os.name == 'nt':
+            import ctypes
+            THREAD_PRIORITY_BELOW_NORMAL = -1
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_PRIORITY_BELOW_NORMAL)
+        elif nice > 0:
+            # Linux 上以執行緒ID設定只影響該執行緒
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), nice)
+    except (AttributeError, OSError):
+        pass
+
+
+class ExportJob:
+    """單一導出工作
+    
+    工作函數以 job.track(chunks) 包裝數據段 (或自行呼叫 advance()/check())，
+    藉此回報進度、在段與段之間讓出執行並回應取消。
+    """
+    
+    def __init__(self, job_id: int, description: str, total_rows: Optional[int] = None,
+                 yield_s: float = 0.0, progress_interval_s: float = 0.2):
+        self.job_id = job_id
+        self.description = description
+        self.total_rows = total_rows
+        self.state = ExportJobState.QUEUED
+        self.token = CancellationToken()
+        self.rows = 0
+        self.result: Optional[str] = None
+        self.error: Optional[str] = None
+        self.submitted_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.future: Optional[Future] = None
+        
+        self._yield_s = yield_s
+        self._progress_interval_s = progress_interval_s
+        self._last_progress = 0.0
+        self._on_progress: Optional[Callable[['ExportJob'], None]] = None
+        
+    @property
+    def done(self) -> bool:
+        """是否已結束 (完成、失敗或取消)"""
+        return self.state in (ExportJobState.COMPLETED, ExportJobState.FAILED, ExportJobState.CANCELLED)
+        
+    def cancel(self):
+        """取消工作 (排隊中的工作不會開始，執行中的工作在下一段數據前停止)"""
+        self.token.cancel()
+        if self.future is not None:
+            self.future.cancel()
+            
+    def check(self):
+        """已取消時拋出 OperationCancelled"""
+        self.token.raise_if_cancelled()
+        
+    def advance(self, rows: int):
+        """回報已寫出的列數，並在段與段之間讓出執行"""
+        self.rows += rows
+        now = time.monotonic()
+        if self._on_progress is not None and now - self._last_progress >= self._progress_interval_s:
+            self._last_progress = now
+            self._on_progress(self)
+        if self._yield_s > 0:
+            self.token.sleep(self._yield_s)
+        self.check()
+        
+    def track(self, chunks: Iterable) -> Iterator:
+        """包裝數據段迭代器：每段之前檢查取消，之後回報進度"""
+        for chunk in chunks:
+            self.check()
+            yield chunk
+            self.advance(len(chunk))
+            
+    def progress(self) -> Dict[str, Any]:
+        """進度與吞吐量"""
+        end = self.finished_at or time.monotonic()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        return {
+            'job_id': self.job_id,
+            'description': self.description,
+            'state': self.state.value,
+            'rows': self.rows,
+            'total_rows': self.total_rows,
+            'percent': (min(100.0, self.rows * 100.0 / self.total_rows)
+                        if self.total_rows else None),
+            'elapsed_s': elapsed,
+            'rows_per_s': self.rows / elapsed if elapsed > 0 else 0.0,
+            'queued_s': (self.started_at or end) - self.submitted_at,
+            'result': self.result,
+            'error': self.error
+        }
+
+
+class ExportJobService:
+    """導出工作服務
+    
+    工作提交後立即返回 ExportJob；最多 max_concurrent 個同時執行，其餘排隊。
+    """
+    
+    job_started = Signal(int)          # 工作ID
+    job_progress = Signal(int, dict)   # 工作ID，進度
+    job_finished = Signal(int, str)    # 工作ID，檔案路徑
+    job_failed = Signal(int, str)      # 工作ID，錯誤訊息
+    job_cancelled = Signal(int)        # 工作ID
+    
+    def __init__(self, max_concurrent: Optional[int] = None, nice: Optional[int] = None,
+                 yield_ms: Optional[float] = None):
+        """初始化服務，未提供的參數從配置讀取
+        
+        Args:
+            max_concurrent: 同時執行的導出數量
+            nice: 工作執行緒降低的優先權 (POSIX nice 值)
+            yield_ms: 每段數據之間讓出的毫秒數
+        """
+        config = get_config()
+        self.max_concurrent = max_concurrent or config.get('data.export.max_concurrent_jobs', 2)
+        self.nice = config.get('data.export.worker_nice', 10) if nice is None else nice
+        yield_ms = config.get('data.export.yield_ms', 2) if yield_ms is None else yield_ms
+        self.yield_s = yield_ms / 1000.0
+        self.logger = get_logger("ExportJobService")
+        
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrent, thread_name_prefix="ExportJob",
+            initializer=_lower_thread_priority, initargs=(self.nice,)
+        )
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._jobs: Dict[int, ExportJob] = {}
+        
+    def submit(self, task: Callable[[ExportJob], str], description: str = "導出",
+               total_rows: Optional[int] = None) -> ExportJob:
+        """提交導出工作
+        
+        Args:
+            task: 工作函數，接收 ExportJob 並返回檔案路徑
+            description: 工作說明
+            total_rows: 預計列數 (用於計算百分比)，未知時為 None
+            
+        Returns:
+            ExportJob: 工作物件
+        """
+        job = ExportJob(next(self._ids), description, total_rows, self.yield_s)
+        job._on_progress = lambda current: self.job_progress.emit(current.job_id, current.progress())
+        with self._lock:
+            self._jobs[job.job_id] = job
+        job.future = self._executor.submit(self._run, job, task)
+        job.future.add_done_callback(lambda future: self._on_done(job, future))
+        return job
+        
+    def _run(self, job: ExportJob, task: Callable[[ExportJob], str]) -> Optional[str]:
+        job.check()
+        job.state = ExportJobState.RUNNING
+        job.started_at = time.monotonic()
+        self.job_started.emit(job.job_id)
+        try:
+            job.result = task(job)
+            job.state = ExportJobState.COMPLETED
+        except OperationCancelled:
+            job.state = ExportJobState.CANCELLED
+        except Exception as e:
+            job.error = str(e)
+            job.state = ExportJobState.FAILED
+        finally:
+            job.finished_at = time.monotonic()
+        return job.result
+        
+    def _on_done(self, job: ExportJob, future: Future):
+        if future.cancelled() or job.state in (ExportJobState.QUEUED, ExportJobState.CANCELLED):
+            # 開始前 (future.cancel()) 或執行中取消
+            job.state = ExportJobState.CANCELLED
+            job.finished_at = job.finished_at or time.monotonic()
+            self.logger.info(f"導出已取消: {job.description}")
+            self.job_cancelled.emit(job.job_id)
+        elif job.state == ExportJobState.FAILED:
+            self.logger.error(f"導出失敗: {job.description}: {job.error}")
+            self.job_failed.emit(job.job_id, job.error)
+        else:
+            progress = job.progress()
+            self.logger.info(
+                f"導出完成: {job.result} ({job.rows} 列, {progress['elapsed_s']:.1f}s, "
+                f"{progress['rows_per_s']:.0f} 列/s)"
+            )
+            self.job_progress.emit(job.job_id, progress)
+            self.job_finished.emit(job.job_id, job.result or "")
+            
+    def get_job(self, job_id: int) -> Optional[ExportJob]:
+        """依ID取得工作"""
+        with self._lock:
+            return self._jobs.get(job_id)
+            
+    def cancel(self, job_id: int) -> bool:
+        """取消工作
+        
+        Returns:
+            bool: 是否找到未結束的工作
+        """
+        job = self.get_job(job_id)
+        if job is None or job.done:
+            return False
+        job.cancel()
+        return True
+        
+    def active_jobs(self) -> List[ExportJob]:
+        """排隊中與執行中的工作"""
+        with self._lock:
+            return [job for job in self._jobs.values() if not job.done]
+            
+    def get_stats(self) -> Dict[str, Any]:
+        """所有工作的進度 (已結束的工作保留到 clear_finished())"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {
+            'max_concurrent': self.max_concurrent,
+            'running': sum(job.state == ExportJobState.RUNNING for job in jobs),
+            'queued': sum(job.state == ExportJobState.QUEUED for job in jobs),
+            'jobs': [job.progress() for job in jobs]
+        }
+        
+    def clear_finished(self):
+        """移除已結束的工作記錄"""
+        with self._lock:
+            self._jobs = {job_id: job for job_id, job in self._jobs.items() if not job.done}
+            
+    def shutdown(self, cancel: bool = True, wait: bool = True):
+        """停止服務
+        
+        Args:
+            cancel: 是否取消排隊中與執行中的工作
+            wait: 是否等待執行中的工作結束
+        """
+        if cancel:
+            for job in self.active_jobs():
+                job.cancel()
+        self._executor.shutdown(wait=wait)
+
+
+# 全局導出工作服務實例
+_export_service = None
+_export_service_lock = threading.Lock()
+
+
+def get_export_service() -> ExportJobService:
+    """獲取全局導出工作服務實例
+    
+    Returns:
+        ExportJobService: 導出工作服務
+    """
+    global _export_service
+    if _export_service is None:
+        with _export_service_lock:
+            if _export_service is None:
+                _export_service = ExportJobService()
+    return _export_service
\ No newline at end of file
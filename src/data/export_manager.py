@@ -1,16 +1,25 @@
 #!/usr/bin/env python3
 """
 導出管理器
-統一處理數據導出功能
+統一處理數據導出功能；測量數據以列式數據段串流寫入，記憶體只保留一段；
+CSV/JSON 可依 data.export.compression 經由背景執行緒壓縮寫入
 """
 
 import csv
 import json
-import pandas as pd
+import os
 from enum import Enum
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Optional
+import numpy as np
+from src.config import get_config
+from src.data.columnar import FLOAT_COLUMNS, SessionColumns, chunk_points
+from src.data.compression import codec_of, compressed_path, compression_options, open_output
+from src.data.export_jobs import ExportJob, get_export_service
+from src.data.stream_writer import PARTIAL_SUFFIX
+from src.engine.cancellation import OperationCancelled
+from src.engine.clock import format_epoch_ns
 from src.unified_logger import get_logger
 
 
@@ -23,12 +32,49 @@ class ExportFormat(Enum):
 
 
 class ExportManager:
-    """導出管理器"""
+    """導出管理器
+    
+    測量數據 (MeasurementPoint 或存儲後端的 SessionColumns 數據段) 逐段寫入：
+    CSV 逐列、JSON 陣列逐筆、Excel 使用 openpyxl 唯寫模式、Parquet 每段一個列組，
+    記憶體用量與會話大小無關。寫入中的檔案帶 .partial 後綴，完成後才改為正式名稱。
+    """
+    
+    EXCEL_MAX_ROWS = 1_048_576  # 每個工作表的列數上限 (含表頭)
+    TEXT_FORMATS = ('csv', 'json')  # 可串流壓縮的格式 (xlsx 本身為 zip，Parquet 使用內部壓縮)
     
     def __init__(self, base_path: str = "exports"):
         self.base_path = Path(base_path)
         self.base_path.mkdir(parents=True, exist_ok=True)
         self.logger = get_logger("ExportManager")
+        config = get_config()
+        self.chunk_rows = config.get('data.export.chunk_rows', 65536)
+        self.compression = compression_options(config.get('data.export.compression', False))
+        
+    def _filepath(self, format: ExportFormat, filename: Optional[str]) -> Path:
+        if filename is None:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = f"export_{timestamp}.{format.value}"
+        filepath = self.base_path / filename
+        # 檔案名已帶壓縮副檔名 (.zst/.gz) 時依檔案名壓縮
+        if format.value in self.TEXT_FORMATS and codec_of(filepath) is None:
+            filepath = compressed_path(filepath, self.compression['compression'])
+        return filepath
+        
+    def _open_text(self, filepath: Path):
+        """開啟文字導出檔案 (壓縮副檔名的檔案經由背景壓縮寫入)"""
+        return open_output(filepath, codec_of(filepath), self.compression['compression_level'],
+                           self.compression['compression_block_size'])
+        
+    def _parquet_options(self) -> Dict[str, Any]:
+        """Parquet 內部壓縮：使用設定的壓縮方式與等級，未設定時為 zstd"""
+        return {
+            'compression': self.compression['compression'] or 'zstd',
+            'compression_level': self.compression['compression_level']
+        }
+        
+    @staticmethod
+    def _is_measurement(item) -> bool:
+        return hasattr(item, 'instrument_id') or isinstance(item, dict) and 'instrument_id' in item
         
     def export_data(self, data: List, format: ExportFormat, 
                    filename: Optional[str] = None) -> str:
@@ -45,14 +91,12 @@ class ExportManager:
         if not data:
             raise ValueError("沒有數據可導出")
             
-        # 生成檔案名
-        if filename is None:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"export_{timestamp}.{format.value}"
+        if self._is_measurement(data[0]):
+            return self.export_columns(chunk_points(data, self.chunk_rows), format, filename)
             
-        filepath = self.base_path / filename
+        filepath = self._filepath(format, filename)
         
-        # 根據格式調用對應的導出方法
+        # 非測量數據：根據格式調用對應的導出方法
         export_methods = {
             ExportFormat.CSV: self._export_csv,
             ExportFormat.JSON: self._export_json,
@@ -72,45 +116,236 @@ class ExportManager:
             self.logger.error(f"導出失敗: {e}")
             raise
             
-    def _export_csv(self, data: List, filepath: Path):
-        """導出為CSV格式"""
-        with open(filepath, 'w', newline='', encoding='utf-8') as f:
-            if hasattr(data[0], 'to_dict'):
-                # MeasurementPoint對象
-                first_dict = data[0].to_dict()
+    def export_columns(self, chunks: Iterable[SessionColumns], format: ExportFormat,
+                       filename: Optional[str] = None) -> str:
+        """串流導出列式數據段 (如 StorageBackend.iter_columns() 的結果)
+        
+        Args:
+            chunks: 按時間排序的數據段
+            format: 導出格式
+            filename: 自定義檔案名
+            
+        Returns:
+            str: 導出檔案路徑
+        """
+        stream_methods = {
+            ExportFormat.CSV: self._stream_csv,
+            ExportFormat.JSON: self._stream_json,
+            ExportFormat.EXCEL: self._stream_excel,
+            ExportFormat.PARQUET: self._stream_parquet
+        }
+        if format not in stream_methods:
+            raise ValueError(f"不支援的導出格式: {format}")
+            
+        filepath = self._filepath(format, filename)
+        partial = filepath.with_name(filepath.name + PARTIAL_SUFFIX)
+        try:
+            count = stream_methods[format]((chunk for chunk in chunks if len(chunk)), partial)
+            if count == 0:
+                raise ValueError("沒有數據可導出")
+            os.replace(partial, filepath)
+            self.logger.info(f"數據已導出: {filepath} ({count} 個數據點)")
+            return str(filepath)
+            
+        except BaseException as e:
+            if partial.exists():
+                partial.unlink()
+            if isinstance(e, OperationCancelled):
+                self.logger.info(f"導出已取消: {filepath}")
             else:
-                # 已經是字典
-                first_dict = data[0]
-                
-            writer = csv.DictWriter(f, fieldnames=first_dict.keys())
-            writer.writeheader()
+                self.logger.error(f"導出失敗: {e}")
+            raise
+            
+    def export_data_async(self, data: List, format: ExportFormat,
+                          filename: Optional[str] = None) -> ExportJob:
+        """在背景導出工作中導出數據列表 (參數同 export_data)
+        
+        數據列表在呼叫時取得淺複製，之後的修改不影響導出。
+        
+        Returns:
+            ExportJob: 導出工作 (進度與結果經由 get_export_service() 的信號發送)
+        """
+        data = list(data)
+        if data and self._is_measurement(data[0]):
+            task = lambda job: self.export_columns(job.track(chunk_points(data, self.chunk_rows)),
+                                                   format, filename)
+        else:
+            task = lambda job: self.export_data(data, format, filename)
+        return get_export_service().submit(
+            task, description=filename or f"export.{format.value}", total_rows=len(data)
+        )
+        
+    @staticmethod
+    def _local_time(timestamps: np.ndarray) -> np.ndarray:
+        """epoch ns 轉為本地時間 (datetime64[us]，向量化)"""
+        import pandas as pd
+        
+        local = (pd.to_datetime(timestamps, unit='ns', utc=True)
+                 .tz_convert(datetime.now().astimezone().tzinfo)
+                 .tz_localize(None))
+        return local.to_numpy().astype('datetime64[us]')
+        
+    def _chunk_columns(self, chunk: SessionColumns, datetime_text: bool = True,
+                       metadata_text: bool = True) -> Dict[str, list]:
+        """數據段轉為按欄的 Python 列表 (timestamp 後加入本地時間欄位，數值缺值為 None)
+        
+        Args:
+            chunk: 數據段
+            datetime_text: 本地時間為ISO字串 (否則為 datetime 物件)
+            metadata_text: 附加資訊為 JSON 字串 (否則為字典)
+        """
+        columns = {}
+        for name, values in chunk.columns.items():
+            if name == 'metadata':
+                if metadata_text:
+                    columns[name] = [
+                        json.dumps(value, ensure_ascii=False) if isinstance(value, dict) else
+                        (value if isinstance(value, str) and value else None)
+                        for value in values.raw
+                    ]
+                else:
+                    columns[name] = values.decode()
+            elif name in FLOAT_COLUMNS:
+                columns[name] = np.where(np.isnan(values), None, values).tolist()
+            else:
+                columns[name] = values.tolist()
+            if name == 'timestamp':
+                # 導出是唯一需要可讀時間的地方
+                local = self._local_time(values)
+                columns['datetime'] = (np.datetime_as_string(local).tolist() if datetime_text
+                                       else local.tolist())
+        return columns
+        
+    def _stream_csv(self, chunks: Iterable[SessionColumns], filepath: Path) -> int:
+        """逐段寫入CSV"""
+        count = 0
+        with self._open_text(filepath) as f:
+            writer = csv.writer(f)
+            for chunk in chunks:
+                columns = self._chunk_columns(chunk)
+                if count == 0:
+                    writer.writerow(columns.keys())
+                writer.writerows(zip(*columns.values()))
+                count += len(chunk)
+        return count
+        
+    def _stream_json(self, chunks: Iterable[SessionColumns], filepath: Path) -> int:
+        """逐筆寫入JSON陣列 (導出資訊在數據之後寫入，數據筆數寫入時才確定)"""
+        encode = json.JSONEncoder(ensure_ascii=False).encode
+        count = 0
+        with self._open_text(filepath) as f:
+            f.write('{\n  "data": [')
+            for chunk in chunks:
+                columns = self._chunk_columns(chunk, metadata_text=False)
+                names = list(columns)
+                for row in zip(*columns.values()):
+                    f.write((',\n    ' if count else '\n    ') + encode(dict(zip(names, row))))
+                    count += 1
+            export_info = {
+                'created_at': datetime.now().isoformat(),
+                'data_count': count,
+                'format': 'json'
+            }
+            f.write('\n  ],\n  "export_info": ' + json.dumps(export_info, ensure_ascii=False) + '\n}')
+        return count
+        
+    def _stream_excel(self, chunks: Iterable[SessionColumns], filepath: Path) -> int:
+        """以 openpyxl 唯寫模式逐列寫入 Excel (超過工作表上限時續寫到新工作表)"""
+        try:
+            import openpyxl
+        except ImportError:
+            raise ImportError("需要安裝 openpyxl 來支援Excel導出")
             
-            for item in data:
-                if hasattr(item, 'to_dict'):
-                    writer.writerow(item.to_dict())
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = None
+        sheet_rows = 0
+        count = 0
+        for chunk in chunks:
+            columns = self._chunk_columns(chunk, datetime_text=False)
+            for row in zip(*columns.values()):
+                if sheet is None or sheet_rows >= self.EXCEL_MAX_ROWS:
+                    sheet = workbook.create_sheet(f"data_{len(workbook.worksheets) + 1}"
+                                                  if workbook.worksheets else "data")
+                    sheet.append(list(columns))
+                    sheet_rows = 1
+                sheet.append(row)
+                sheet_rows += 1
+                count += 1
+        if count:
+            workbook.save(filepath)
+        return count
+        
+    def _stream_parquet(self, chunks: Iterable[SessionColumns], filepath: Path) -> int:
+        """每個數據段寫成一個列組 (儀器ID字典編碼，datetime 為本地時間 timestamp[us])"""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("需要安裝 pyarrow 來支援Parquet導出")
+            
+        writer = None
+        count = 0
+        try:
+            for chunk in chunks:
+                table = chunk.to_arrow()
+                if 'timestamp' in chunk:
+                    table = table.add_column(1, 'datetime', pa.array(self._local_time(chunk['timestamp'])))
+                if writer is None:
+                    writer = pq.ParquetWriter(filepath, table.schema, **self._parquet_options())
                 else:
-                    writer.writerow(item)
+                    table = table.cast(writer.schema)
+                writer.write_table(table, row_group_size=len(chunk))
+                count += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        return count
+        
+    def _to_records(self, data: List) -> List[Dict[str, Any]]:
+        """轉換為字典列表，並在 epoch ns 時間戳旁加入可讀時間欄位"""
+        records = []
+        for item in data:
+            record = item.to_dict() if hasattr(item, 'to_dict') else dict(item)
+            timestamp = record.get('timestamp')
+            if isinstance(timestamp, int):
+                # 導出是唯一需要可讀時間的地方
+                record = {'timestamp': timestamp, 'datetime': format_epoch_ns(timestamp),
+                          **{k: v for k, v in record.items() if k != 'timestamp'}}
+            records.append(record)
+        return records
+        
+    def _to_dataframe(self, data: List):
+        """轉換為DataFrame，可讀時間欄位以向量化方式生成"""
+        import pandas as pd
+        
+        df = pd.DataFrame([
+            item.to_dict() if hasattr(item, 'to_dict') else item for item in data
+        ])
+        if 'timestamp' in df.columns and pd.api.types.is_integer_dtype(df['timestamp']):
+            df.insert(df.columns.get_loc('timestamp') + 1, 'datetime',
+                      self._local_time(df['timestamp'].to_numpy()))
+        return df
+        
+    def _export_csv(self, data: List, filepath: Path):
+        """導出為CSV格式"""
+        records = self._to_records(data)
+        with self._open_text(filepath) as f:
+            writer = csv.DictWriter(f, fieldnames=records[0].keys())
+            writer.writeheader()
+            writer.writerows(records)
                     
     def _export_json(self, data: List, filepath: Path):
         """導出為JSON格式"""
-        export_data = []
-        
-        for item in data:
-            if hasattr(item, 'to_dict'):
-                export_data.append(item.to_dict())
-            else:
-                export_data.append(item)
-                
         output = {
             'export_info': {
                 'created_at': datetime.now().isoformat(),
                 'data_count': len(data),
                 'format': 'json'
             },
-            'data': export_data
+            'data': self._to_records(data)
         }
         
-        with open(filepath, 'w', encoding='utf-8') as f:
+        with self._open_text(filepath) as f:
             json.dump(output, f, indent=2, ensure_ascii=False)
             
     def _export_excel(self, data: List, filepath: Path):
@@ -120,15 +355,7 @@ class ExportManager:
         except ImportError:
             raise ImportError("需要安裝 openpyxl 來支援Excel導出")
             
-        # 轉換為DataFrame
-        df_data = []
-        for item in data:
-            if hasattr(item, 'to_dict'):
-                df_data.append(item.to_dict())
-            else:
-                df_data.append(item)
-                
-        df = pd.DataFrame(df_data)
+        df = self._to_dataframe(data)
         df.to_excel(filepath, index=False, engine='openpyxl')
         
     def _export_parquet(self, data: List, filepath: Path):
@@ -139,14 +366,5 @@ class ExportManager:
         except ImportError:
             raise ImportError("需要安裝 pyarrow 來支援Parquet導出")
             
-        # 轉換為DataFrame
-        df_data = []
-        for item in data:
-            if hasattr(item, 'to_dict'):
-                df_data.append(item.to_dict())
-            else:
-                df_data.append(item)
-                
-        df = pd.DataFrame(df_data)
-        table = pa.Table.from_pandas(df)
-        pq.write_table(table, filepath)
\ No newline at end of file
+        pq.write_table(pa.Table.from_pandas(self._to_dataframe(data)), filepath,
+                       **self._parquet_options())
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+數據接收管線
+生產者 (測量執行緒) 只把數據點放入自己的單生產者/單消費者佇列，
+由階段執行緒批量取出處理；佇列深度、等待與鎖競爭都有統計可查
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from src.unified_logger import get_logger
+
+
+class SPSCQueue:
+    """單生產者/單消費者環形佇列 (無鎖)
+    
+    生產者只寫 _tail，消費者只寫 _head；CPython 中列表元素與屬性的
+    單次讀寫是原子的，先寫入槽位再推進 _tail，消費者看到新的 _tail 時
+    數據已經就緒。多個生產者不可共用同一佇列。
+    """
+    
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("佇列容量必須大於0")
+        self.capacity = capacity
+        self._slots: List[Any] = [None] * capacity
+        self._head = 0  # 已取出總數 (消費者寫)
+        self._tail = 0  # 已放入總數 (生產者寫)
+        self.completed = 0  # 已處理完成總數 (消費者寫)
+        
+        # 生產者端統計
+        self.high_watermark = 0
+        self.full_waits = 0
+        self.dropped = 0
+        
+    def push(self, item: Any) -> bool:
+        """放入一項 (僅限生產者)，佇列已滿時返回 False"""
+        tail = self._tail
+        if tail - self._head >= self.capacity:
+            return False
+        self._slots[tail % self.capacity] = item
+        self._tail = tail + 1
+        depth = tail + 1 - self._head
+        if depth > self.high_watermark:
+            self.high_watermark = depth
+        return True
+        
+    def pop_batch(self, max_items: int) -> List[Any]:
+        """取出最多 max_items 項 (僅限消費者)"""
+        head = self._head
+        count = min(self._tail - head, max_items)
+        if count <= 0:
+            return []
+        slots, capacity = self._slots, self.capacity
+        items = []
+        for index in range(head, head + count):
+            position = index % capacity
+            items.append(slots[position])
+            slots[position] = None
+        self._head = head + count
+        return items
+        
+    @property
+    def enqueued(self) -> int:
+        """已放入總數"""
+        return self._tail
+        
+    def __len__(self) -> int:
+        return self._tail - self._head
+
+
+class InstrumentedLock:
+    """可統計競爭情況的可重入鎖
+    
+    先嘗試非阻塞取得；失敗時才計為一次競爭並記錄等待時間。
+    統計欄位只在持有鎖時更新。
+    """
+    
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_ns = 0
+        self.max_wait_ns = 0
+        
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        if self._lock.acquire(blocking=False):
+            self.acquisitions += 1
+            return True
+        if not blocking:
+            return False
+        started = time.perf_counter_ns()
+        if not self._lock.acquire(timeout=timeout):
+            return False
+        waited = time.perf_counter_ns() - started
+        self.acquisitions += 1
+        self.contended += 1
+        self.wait_ns += waited
+        self.max_wait_ns = max(self.max_wait_ns, waited)
+        return True
+        
+    def release(self):
+        self._lock.release()
+        
+    def __enter__(self):
+        self.acquire()
+        return self
+        
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+        
+    def stats(self) -> Dict[str, Any]:
+        """競爭統計"""
+        return {
+            'acquisitions': self.acquisitions,
+            'contended': self.contended,
+            'contention_ratio': self.contended / self.acquisitions if self.acquisitions else 0.0,
+            'total_wait_ms': self.wait_ns / 1e6,
+            'max_wait_ms': self.max_wait_ns / 1e6
+        }
+
+
+class IngestStage:
+    """管線階段 - 一個消費者執行緒處理多個 SPSC 佇列
+    
+    每個 (key, 生產者執行緒) 擁有獨立佇列，保證單生產者；消費者輪流
+    批量取出各佇列的數據交給 handler。佇列已滿時生產者短暫等待，
+    超過 put_timeout_s 仍無空間則丟棄並計數；put_timeout_s 為 None 時
+    生產者一直等待到有空間 (背壓，不丟棄)。生產者執行緒結束且佇列已
+    處理完成後，消費者回收該佇列。
+    """
+    
+    def __init__(self, name: str, handler: Callable[[List[Any]], None],
+                 queue_size: int = 65536, batch_size: int = 256,
+                 put_timeout_s: Optional[float] = 0.1, idle_wait_s: float = 0.005):
+        """初始化管線階段
+        
+        Args:
+            name: 階段名稱 (執行緒名稱)
+            handler: 批量處理函數，在階段執行緒中呼叫
+            queue_size: 每個佇列的容量
+            batch_size: 每個佇列每輪最多取出的數量
+            put_timeout_s: 佇列已滿時生產者的最長等待，None表示等待到有空間
+            idle_wait_s: 無數據時消費者的最長休眠
+        """
+        self.name = name
+        self.handler = handler
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.put_timeout_s = put_timeout_s
+        self.idle_wait_s = idle_wait_s
+        self.logger = get_logger(name)
+        
+        self._queues: Dict[Tuple[Hashable, threading.Thread], SPSCQueue] = {}
+        self._register_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._done = threading.Condition()
+        self._idle = False
+        self._stopping = False
+        self._last_reclaim = 0.0
+        self._thread: Optional[threading.Thread] = None
+        
+        # 消費者端統計
+        self.batches = 0
+        self.processed = 0
+        self.busy_ns = 0
+        self.errors = 0
+        self.reclaimed = 0
+        
+    def put(self, key: Hashable, item: Any) -> bool:
+        """放入一項 (生產者端，不取得任何共用鎖)
+        
+        Args:
+            key: 分流鍵 (如儀器ID)
+            item: 數據
+            
+        Returns:
+            bool: 是否成功放入 (佇列持續已滿時為 False)
+        """
+        queue = self._queues.get((key, threading.current_thread()))
+        if queue is None or self._stopping:
+            queue = self._register(key)
+            
+        if not queue.push(item):
+            queue.full_waits += 1
+            deadline = None if self.put_timeout_s is None else time.monotonic() + self.put_timeout_s
+            while not queue.push(item):
+                if deadline is not None and time.monotonic() >= deadline:
+                    queue.dropped += 1
+                    return False
+                if self._stopping or self._thread is None or not self._thread.is_alive():
+                    # 阻塞等待期間階段已停止：重新啟動消費者，避免永久等待
+                    self._register(key)
+                self._wake.set()
+                time.sleep(0.0005)
+                
+        if self._idle:
+            self._wake.set()
+        return True
+        
+    def _register(self, key: Hashable) -> SPSCQueue:
+        with self._register_lock:
+            queue_key = (key, threading.current_thread())
+            queue = self._queues.get(queue_key)
+            if queue is None:
+                queue = SPSCQueue(self.queue_size)
+                # 複製後替換，消費者迭代時不受影響
+                queues = dict(self._queues)
+                queues[queue_key] = queue
+                self._queues = queues
+            if self._stopping and self._thread is not None:
+                self._thread.join()
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            return queue
+            
+    def _reclaim(self):
+        """回收生產者執行緒已結束且已處理完成的佇列 (消費者端呼叫)"""
+        dead = [
+            queue_key for queue_key, queue in self._queues.items()
+            if not queue_key[1].is_alive() and len(queue) == 0
+            and queue.completed == queue.enqueued
+        ]
+        if not dead:
+            return
+        with self._register_lock:
+            queues = dict(self._queues)
+            for queue_key in dead:
+                queues.pop(queue_key, None)
+            self._queues = queues
+        self.reclaimed += len(dead)
+        
+    def _run(self):
+        while not self._stopping:
+            now = time.monotonic()
+            if now - self._last_reclaim >= 1.0:
+                self._last_reclaim = now
+                self._reclaim()
+            if not self._drain_once():
+                self._idle = True
+                if not self.pending():
+                    self._wake.wait(self.idle_wait_s)
+                self._wake.clear()
+                self._idle = False
+        while self._drain_once():
+            pass
+        
+    def _drain_once(self) -> bool:
+        """每個佇列取出一批並處理，返回是否有數據"""
+        batch = []
+        taken = []
+        for queue in self._queues.values():
+            items = queue.pop_batch(self.batch_size)
+            if items:
+                batch.extend(items)
+                taken.append((queue, queue._head))
+        if not batch:
+            return False
+            
+        started = time.perf_counter_ns()
+        try:
+            self.handler(batch)
+        except Exception as e:
+            self.errors += 1
+            self.logger.error(f"{self.name} 處理數據失敗: {e}")
+        self.busy_ns += time.perf_counter_ns() - started
+        self.batches += 1
+        self.processed += len(batch)
+        
+        with self._done:
+            for queue, head in taken:
+                queue.completed = head
+            self._done.notify_all()
+        return True
+        
+    def pending(self) -> int:
+        """尚未取出的數量"""
+        return sum(len(queue) for queue in self._queues.values())
+        
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待目前已放入的數據全部處理完成
+        
+        階段執行緒已停止 (或等待期間停止) 時不再等待，直接在呼叫端處理剩餘數據。
+        
+        Args:
+            timeout: 最長等待秒數，None表示無限等待
+            
+        Returns:
+            bool: 是否已全部處理
+        """
+        if threading.current_thread() is self._thread:
+            # 在階段執行緒中 (如信號槽內) 呼叫：直接處理
+            while self._drain_once():
+                pass
+            return True
+            
+        targets = [(queue, queue.enqueued) for queue in self._queues.values()]
+        if not targets:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self._wake.set()
+        with self._done:
+            while not all(queue.completed >= target for queue, target in targets):
+                if self._thread is None or not self._thread.is_alive():
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                # 定期檢查階段執行緒是否仍在運行
+                self._done.wait(0.1 if remaining is None else min(0.1, remaining))
+            else:
+                return True
+        return self._drain_stopped(deadline)
+        
+    def _drain_stopped(self, deadline: Optional[float]) -> bool:
+        """階段執行緒不存在時在呼叫端處理剩餘數據 (持有登記鎖，期間不會啟動新的消費者)"""
+        with self._register_lock:
+            if self._thread is None or not self._thread.is_alive():
+                while self._drain_once():
+                    pass
+                return True
+        # 生產者已重新啟動階段執行緒：改為等待
+        return self.flush(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        
+    def stop(self, timeout: Optional[float] = None):
+        """處理完剩餘數據後停止階段執行緒"""
+        self.flush(timeout)
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+            
+    def stats(self) -> Dict[str, Any]:
+        """佇列深度、等待/丟棄次數與處理耗時"""
+        queues = list(self._queues.items())
+        return {
+            'queues': len(queues),
+            'reclaimed': self.reclaimed,
+            'pending': sum(len(queue) for _, queue in queues),
+            'high_watermark': max((queue.high_watermark for _, queue in queues), default=0),
+            'full_waits': sum(queue.full_waits for _, queue in queues),
+            'dropped': sum(queue.dropped for _, queue in queues),
+            'processed': self.processed,
+            'batches': self.batches,
+            'avg_batch_size': self.processed / self.batches if self.batches else 0.0,
+            'busy_ms': self.busy_ns / 1e6,
+            'errors': self.errors
+        }
\ No newline at end of file
@@ -0,0 +1,1135 @@
+#!/usr/bin/env python3
+"""
+測量數據存儲 (SQLite)
+SQLiteStorage 與 EnhancedDataLogger 共用的精簡結構：時間戳為 INTEGER epoch ns，
+會話與儀器以小整數鍵引用維度表，樣本表以 (會話, 時間) 聚簇 (WITHOUT ROWID)；
+會話描述/配置只存一次，逐點的附加資訊另存於稀疏表。
+寫入樣本時在同一交易中增量更新多解析度彙總 (見 rollups)。
+
+舊版數據庫可用命令行轉換：
+    python -m src.data.measurement_store migrate data/measurement_data.db
+彙總可由樣本重新計算：
+    python -m src.data.measurement_store rollups --db data/measurements.db
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from src.config import get_config
+from src.data.columnar import SessionColumns, normalize_columns
+from src.data.rollups import (
+    CHANNELS, RESOLUTIONS, ROLLUP_SCHEMA, aggregate_columns, choose_resolution, combine_series,
+    edge_ranges, has_rollups, query_buckets, rebuild_rollups, split_series, summarize,
+    summarize_series, summarize_span, update_rollups
+)
+from src.engine.clock import as_epoch_ns
+from src.unified_logger import get_logger
+
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS instruments (
+        instrument_key INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE
+    );
+    CREATE TABLE IF NOT EXISTS sessions (
+        session_key INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE,
+        start_ns INTEGER,
+        end_ns INTEGER,
+        total_points INTEGER NOT NULL DEFAULT 0,
+        last_seq INTEGER NOT NULL DEFAULT 0,  -- 已寫入的最大序號 (高水位)
+        description TEXT,
+        metadata TEXT  -- 會話級配置 (JSON)，每個會話只存一次
+    );
+    CREATE TABLE IF NOT EXISTS samples (
+        session_key INTEGER NOT NULL,
+        ts INTEGER NOT NULL,  -- Unix epoch ns
+        instrument_key INTEGER NOT NULL,
+        seq INTEGER NOT NULL DEFAULT 0,
+        voltage REAL,
+        current REAL,
+        resistance REAL,
+        power REAL,
+        temperature REAL,
+        PRIMARY KEY (session_key, ts, instrument_key, seq)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS sample_metadata (
+        session_key INTEGER NOT NULL,
+        ts INTEGER NOT NULL,
+        instrument_key INTEGER NOT NULL,
+        seq INTEGER NOT NULL DEFAULT 0,
+        metadata TEXT NOT NULL,
+        PRIMARY KEY (session_key, ts, instrument_key, seq)
+    ) WITHOUT ROWID;
+''' + ROLLUP_SCHEMA
+
+# 樣本列: (session_key, ts, instrument_key, seq, voltage, current, resistance, power, temperature, metadata)
+SampleRow = Tuple[int, int, int, int, Optional[float], Optional[float],
+                  Optional[float], Optional[float], Optional[float], Optional[str]]
+
+INSERT_SAMPLE_SQL = 'INSERT OR IGNORE INTO samples VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)'
+INSERT_METADATA_SQL = 'INSERT OR IGNORE INTO sample_metadata VALUES (?, ?, ?, ?, ?)'
+
+
+def write_samples(conn: sqlite3.Connection, rows: Sequence[SampleRow]):
+    """在目前交易中寫入樣本列並更新彙總 (附加資訊只為有資料的列另存)
+    
+    有樣本因已存在而被忽略時，受影響會話的時間範圍改由樣本表重新計算彙總，
+    重複寫入不會被重複計入。
+    """
+    before = conn.total_changes
+    conn.executemany(INSERT_SAMPLE_SQL, (row[:9] for row in rows))
+    inserted = conn.total_changes - before
+    conn.executemany(INSERT_METADATA_SQL, (row[:4] + (row[9],) for row in rows if row[9]))
+    if inserted == len(rows):
+        update_rollups(conn, rows)
+    elif inserted:
+        timestamps = [row[1] for row in rows]
+        rebuild_rollups(conn, {row[0] for row in rows}, min(timestamps), max(timestamps))
+
+
+class SQLiteWriter:
+    """SQLite 寫入執行緒 (write-behind)
+    
+    單一長連接 (WAL 模式)，數據列先進入佇列，累積到 batch_size 或最舊一列
+    等待超過 flush_interval_s 後，以 write_batch 在同一個交易中寫入；
+    每批只需一次 fsync，而不是每點一次。
+    """
+    
+    def __init__(self, db_path: Path,
+                 write_batch: Callable[[sqlite3.Connection, List[Any]], None] = write_samples,
+                 synchronous: str = "NORMAL", batch_size: int = 1000,
+                 flush_interval_s: float = 0.2, max_pending: int = 100000):
+        """初始化寫入器
+        
+        Args:
+            db_path: 數據庫檔案
+            write_batch: 在交易中寫入一批數據列的函數
+            synchronous: PRAGMA synchronous (WAL 下 NORMAL 只在檢查點時 fsync)
+            batch_size: 每批寫入的列數
+            flush_interval_s: 數據列最長等待時間
+            max_pending: 佇列上限，超過時提交端等待 (背壓)
+        """
+        self.db_path = db_path
+        self.write_batch = write_batch
+        self.synchronous = synchronous
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.max_pending = max_pending
+        self.logger = get_logger("SQLiteWriter")
+        
+        self._pending: deque = deque()
+        self._cond = threading.Condition()
+        self._submitted = 0
+        self._done = 0  # 已寫入或寫入失敗的列數
+        self._first_pending_at: Optional[float] = None
+        self._flush_requested = False
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        
+        # 統計
+        self.rows_written = 0
+        self.flushes = 0
+        self.high_watermark = 0
+        self.backpressure_waits = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._flush_ns_total = 0
+        
+    def submit(self, rows: List[Any]):
+        """提交數據列 (可從任意執行緒呼叫)"""
+        if not rows:
+            return
+        with self._cond:
+            while len(self._pending) >= self.max_pending and self._thread is not None:
+                self.backpressure_waits += 1
+                self._cond.wait(0.1)
+            if not self._pending:
+                self._first_pending_at = time.monotonic()
+            self._pending.extend(rows)
+            self._submitted += len(rows)
+            self.high_watermark = max(self.high_watermark, len(self._pending))
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="SQLiteWriter", daemon=True)
+                self._thread.start()
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+                
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """立即寫入佇列中的數據並等待完成
+        
+        Returns:
+            bool: 是否在時限內完成
+        """
+        with self._cond:
+            target = self._submitted
+            if self._done >= target:
+                return True
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._done >= target, timeout)
+            
+    def close(self, timeout: Optional[float] = 10.0):
+        """寫入剩餘數據後關閉連接"""
+        self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+            
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        return conn
+        
+    def _next_batch(self) -> Optional[List[Any]]:
+        """等待直到達到批量/時間閾值，取出一批；停止且佇列為空時返回 None"""
+        with self._cond:
+            while True:
+                if self._pending and (self._flush_requested or self._stopping
+                                      or len(self._pending) >= self.batch_size):
+                    break
+                if self._stopping:
+                    return None
+                if self._pending:
+                    remaining = self._first_pending_at + self.flush_interval_s - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                else:
+                    self._cond.wait()
+                    
+            count = min(len(self._pending), self.batch_size)
+            batch = [self._pending.popleft() for _ in range(count)]
+            if self._pending:
+                self._first_pending_at = time.monotonic()
+            else:
+                self._flush_requested = False
+            self._cond.notify_all()  # 喚醒因背壓等待的提交端
+            return batch
+            
+    def _run(self):
+        try:
+            conn = self._connect()
+        except Exception as e:
+            self.logger.error(f"開啟數據庫失敗: {e}")
+            with self._cond:
+                self.errors += 1
+                self.last_error = str(e)
+                self._done += len(self._pending)
+                self._pending.clear()
+                self._thread = None
+                self._cond.notify_all()
+            return
+            
+        try:
+            while True:
+                batch = self._next_batch()
+                if batch is None:
+                    break
+                self._write(conn, batch)
+        finally:
+            conn.close()
+            
+    def _write(self, conn: sqlite3.Connection, batch: List[Any]):
+        started = time.perf_counter_ns()
+        try:
+            with conn:
+                self.write_batch(conn, batch)
+            written = len(batch)
+        except Exception as e:
+            written = 0
+            self.logger.error(f"SQLite批量寫入失敗 ({len(batch)} 列): {e}")
+            
+        elapsed = time.perf_counter_ns() - started
+        with self._cond:
+            if written:
+                self.rows_written += written
+                self.flushes += 1
+                self._flush_ns_total += elapsed
+                self.last_flush_ms = elapsed / 1e6
+                self.max_flush_ms = max(self.max_flush_ms, self.last_flush_ms)
+            else:
+                self.errors += 1
+                self.last_error = f"寫入 {len(batch)} 列失敗"
+            self._done += len(batch)
+            self._cond.notify_all()
+            
+    def stats(self) -> Dict[str, Any]:
+        """佇列深度、批量與寫入延遲"""
+        with self._cond:
+            write_s = self._flush_ns_total / 1e9
+            return {
+                'queue_depth': len(self._pending),
+                'high_watermark': self.high_watermark,
+                'rows_written': self.rows_written,
+                'flushes': self.flushes,
+                'avg_batch_size': self.rows_written / self.flushes if self.flushes else 0.0,
+                'last_flush_ms': self.last_flush_ms,
+                'avg_flush_ms': self._flush_ns_total / 1e6 / self.flushes if self.flushes else 0.0,
+                'max_flush_ms': self.max_flush_ms,
+                'rows_per_second': self.rows_written / write_s if write_s else 0.0,
+                'backpressure_waits': self.backpressure_waits,
+                'errors': self.errors,
+                'last_error': self.last_error
+            }
+
+
+class MeasurementStore:
+    """共用測量數據存儲
+    
+    會話/儀器名稱在第一次使用時取得整數鍵並快取；樣本列只含整數鍵、
+    epoch ns 與數值欄位。背景寫入 (submit) 經由 SQLiteWriter 批量提交，
+    需要與會話高水位同一交易的寫入 (write) 則同步執行。
+    數據存於檔案後端的會話可只寫入彙總 (submit_rollups)，作為長時間範圍查詢的索引。
+    同一檔案應透過 get_measurement_store() 共用一個實例。
+    """
+    
+    FILENAME = "measurements.db"
+    
+    # 不屬於任何會話的即時數據 (SQLiteStorage.save_point)
+    REALTIME_SESSION = "__realtime__"
+    
+    SAMPLE_FIELDS = ('voltage', 'current', 'resistance', 'power', 'temperature')
+    
+    def __init__(self, db_path: Union[str, Path], synchronous: str = "NORMAL",
+                 batch_size: int = 1000, flush_interval_s: float = 0.2,
+                 max_pending: int = 100000):
+        """初始化存儲
+        
+        Args:
+            db_path: 數據庫檔案
+            synchronous: PRAGMA synchronous
+            batch_size: 背景寫入每批的列數
+            flush_interval_s: 背景寫入的最長等待時間
+            max_pending: 背景寫入佇列上限
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.logger = get_logger("MeasurementStore")
+        
+        self._lock = threading.RLock()
+        self._session_keys: Dict[str, int] = {}
+        self._instrument_keys: Dict[str, int] = {}
+        
+        # 控制連接：鍵解析、會話記錄與同步寫入 (以 _lock 保護)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={synchronous}")
+        created_rollups = not has_rollups(self._conn)
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+        if created_rollups:
+            self._build_rollups()
+        self._check_legacy_table()
+        
+        writer_options = {
+            'synchronous': synchronous,
+            'batch_size': batch_size,
+            'flush_interval_s': flush_interval_s,
+            'max_pending': max_pending
+        }
+        self.writer = SQLiteWriter(self.db_path, write_samples, **writer_options)
+        # 只寫入彙總的會話 (數據在檔案後端)
+        self.rollup_writer = SQLiteWriter(self.db_path, update_rollups, **writer_options)
+        # 程式結束時寫完剩餘數據
+        self._finalizer = weakref.finalize(
+            self, MeasurementStore._shutdown, (self.writer, self.rollup_writer), self._conn
+        )
+        
+    @staticmethod
+    def _shutdown(writers: Tuple[SQLiteWriter, ...], conn: sqlite3.Connection):
+        for writer in writers:
+            writer.close()
+        conn.close()
+        
+    # ---- 維度表 ----
+    
+    def session_key(self, name: Optional[str]) -> int:
+        """會話名稱對應的整數鍵 (不存在時建立)"""
+        name = name or self.REALTIME_SESSION
+        key = self._session_keys.get(name)
+        if key is None:
+            with self._lock:
+                key = self._resolve_key(self._session_keys, 'sessions', 'session_key', name)
+        return key
+        
+    def instrument_key(self, name: Optional[str]) -> int:
+        """儀器名稱對應的整數鍵 (不存在時建立)"""
+        name = name or 'unknown'
+        key = self._instrument_keys.get(name)
+        if key is None:
+            with self._lock:
+                key = self._resolve_key(self._instrument_keys, 'instruments', 'instrument_key', name)
+        return key
+        
+    def _resolve_key(self, cache: Dict[str, int], table: str, column: str, name: str) -> int:
+        if name in cache:
+            return cache[name]
+        with self._conn:
+            self._conn.execute(f"INSERT OR IGNORE INTO {table} (name) VALUES (?)", (name,))
+            key = self._conn.execute(f"SELECT {column} FROM {table} WHERE name = ?", (name,)).fetchone()[0]
+        cache[name] = key
+        return key
+        
+    def open_session(self, name: str, start_ns: Optional[int] = None,
+                     description: Optional[str] = None,
+                     metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """建立或更新會話記錄；同名會話保留原有的開始時間與高水位
+        
+        Returns:
+            Dict: 會話記錄 (見 get_session)
+        """
+        key = self.session_key(name)
+        with self._lock, self._conn:
+            self._conn.execute('''
+                UPDATE sessions SET
+                    start_ns = COALESCE(start_ns, ?),
+                    description = COALESCE(?, description),
+                    metadata = COALESCE(?, metadata)
+                WHERE session_key = ?
+            ''', (
+                start_ns if start_ns is not None else as_epoch_ns(None),
+                description,
+                json.dumps(metadata) if metadata else None,
+                key
+            ))
+        return self.get_session(name)
+        
+    def update_session(self, name: str, **fields: Any):
+        """更新會話欄位 (end_ns、total_points、last_seq、description、metadata)"""
+        allowed = ('end_ns', 'total_points', 'last_seq', 'description', 'metadata')
+        values = {column: value for column, value in fields.items() if column in allowed}
+        if not values:
+            return
+        if isinstance(values.get('metadata'), dict):
+            values['metadata'] = json.dumps(values['metadata'])
+        assignments = ', '.join(f"{column} = ?" for column in values)
+        key = self.session_key(name)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE sessions SET {assignments} WHERE session_key = ?",
+                tuple(values.values()) + (key,)
+            )
+            
+    def get_session(self, name: str) -> Optional[Dict[str, Any]]:
+        """會話記錄，不存在時為 None"""
+        with self._lock:
+            row = self._conn.execute('''
+                SELECT session_key, name, start_ns, end_ns, total_points, last_seq, description, metadata
+                FROM sessions WHERE name = ?
+            ''', (name,)).fetchone()
+        if row is None:
+            return None
+        return {
+            'session_key': row[0],
+            'name': row[1],
+            'start_ns': row[2],
+            'end_ns': row[3],
+            'total_points': row[4],
+            'last_seq': row[5],
+            'description': row[6],
+            'metadata': json.loads(row[7]) if row[7] else None
+        }
+        
+    def list_sessions(self) -> List[str]:
+        """所有會話名稱 (不含即時數據)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name FROM sessions WHERE name != ? ORDER BY session_key",
+                (self.REALTIME_SESSION,)
+            ).fetchall()
+        return [row[0] for row in rows]
+        
+    # ---- 寫入 ----
+    
+    def row(self, session_key: int, instrument_key: int, timestamp: Any,
+            voltage: Optional[float] = None, current: Optional[float] = None,
+            resistance: Optional[float] = None, power: Optional[float] = None,
+            temperature: Optional[float] = None, seq: Optional[int] = None,
+            metadata: Optional[Dict[str, Any]] = None) -> SampleRow:
+        """組成一個樣本列"""
+        return (
+            session_key, as_epoch_ns(timestamp), instrument_key, seq or 0,
+            voltage, current, resistance, power, temperature,
+            json.dumps(metadata) if metadata else None
+        )
+        
+    def submit(self, rows: List[SampleRow]):
+        """背景寫入 (由寫入執行緒批量提交)"""
+        self.writer.submit(rows)
+        
+    def submit_rollups(self, rows: List[SampleRow]):
+        """只更新彙總、不保存樣本 (數據存於檔案後端的會話)，由寫入執行緒批量提交"""
+        self.rollup_writer.submit(rows)
+        
+    def write(self, rows: List[SampleRow], session: Optional[str] = None,
+              last_seq: Optional[int] = None) -> int:
+        """同步寫入；提供 session 與 last_seq 時在同一交易中推進會話高水位
+        
+        已存在的樣本 (相同會話、時間、儀器與序號) 會被忽略。
+        
+        Returns:
+            int: 寫入的列數
+        """
+        session_key = self.session_key(session) if session is not None else None
+        with self._lock, self._conn:
+            write_samples(self._conn, rows)
+            if session_key is not None and last_seq is not None:
+                self._conn.execute(
+                    "UPDATE sessions SET last_seq = ?, total_points = ? WHERE session_key = ?",
+                    (last_seq, last_seq, session_key)
+                )
+        return len(rows)
+        
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待背景寫入佇列清空"""
+        return self.writer.flush(timeout) and self.rollup_writer.flush(timeout)
+        
+    def close(self):
+        """寫入剩餘數據並關閉連接 (之後須重新以 get_measurement_store 取得)"""
+        with _stores_lock:
+            if _stores.get(str(self.db_path.resolve())) is self:
+                del _stores[str(self.db_path.resolve())]
+        self._finalizer()
+        
+    # ---- 查詢 ----
+    
+    def _conditions(self, session: Optional[str], instrument: Optional[str],
+                    start_ns: Optional[int], end_ns: Optional[int]):
+        """查詢條件；沒有符合的會話或儀器時返回 None
+        
+        Returns:
+            (條件, 參數, 會話鍵->名稱, 儀器鍵->名稱)
+        """
+        self.flush()
+        with self._lock:
+            sessions = dict(self._conn.execute("SELECT session_key, name FROM sessions"))
+            instruments = dict(self._conn.execute("SELECT instrument_key, name FROM instruments"))
+            
+        if session is not None:
+            keys = [key for key, name in sessions.items() if name == session]
+        else:
+            keys = list(sessions)
+        if not keys:
+            return None
+            
+        conditions = [f"s.session_key IN ({', '.join('?' * len(keys))})"]
+        params: List[Any] = list(keys)
+        if start_ns is not None:
+            conditions.append("s.ts >= ?")
+            params.append(int(start_ns))
+        if end_ns is not None:
+            conditions.append("s.ts <= ?")
+            params.append(int(end_ns))
+        if instrument is not None:
+            instrument_keys = [key for key, name in instruments.items() if name == instrument]
+            if not instrument_keys:
+                return None
+            conditions.append("s.instrument_key = ?")
+            params.append(instrument_keys[0])
+        return conditions, params, sessions, instruments
+        
+    @staticmethod
+    def _select_sql(expressions: str, conditions: List[str], include_metadata: bool) -> str:
+        """樣本查詢 (需要附加資訊時關聯稀疏表)，按主鍵順序返回"""
+        join = '''
+                LEFT JOIN sample_metadata m
+                    ON m.session_key = s.session_key AND m.ts = s.ts
+                    AND m.instrument_key = s.instrument_key AND m.seq = s.seq''' if include_metadata else ''
+        return f'''
+            SELECT {expressions}
+            FROM samples s{join}
+            WHERE {' AND '.join(conditions)}
+            ORDER BY s.ts, s.instrument_key, s.seq
+        '''
+        
+    def query(self, session: Optional[str] = None, instrument: Optional[str] = None,
+              start_ns: Optional[int] = None, end_ns: Optional[int] = None,
+              include_metadata: bool = True) -> List[Dict[str, Any]]:
+        """依會話/儀器/時間範圍查詢樣本 (按時間排序)
+        
+        樣本表以 (會話, 時間) 聚簇，範圍查詢只讀取相關的頁面；
+        單一會話時結果順序即主鍵順序，無需另外排序。
+        
+        Args:
+            session: 會話名稱，None表示所有會話 (含即時數據)
+            instrument: 儀器名稱，None表示全部
+            start_ns: 開始時間 (含)
+            end_ns: 結束時間 (含)
+            include_metadata: 是否讀取逐點附加資訊
+            
+        Returns:
+            List[Dict]: timestamp、instrument_id、session_name、seq 與數值欄位
+        """
+        plan = self._conditions(session, instrument, start_ns, end_ns)
+        if plan is None:
+            return []
+        conditions, params, sessions, instruments = plan
+        
+        sql = self._select_sql(
+            "s.session_key, s.ts, s.instrument_key, s.seq, s.voltage, s.current, "
+            "s.resistance, s.power, s.temperature, " + ("m.metadata" if include_metadata else "NULL"),
+            conditions, include_metadata
+        )
+        with sqlite3.connect(str(self.db_path), timeout=30) as conn:
+            rows = conn.execute(sql, params).fetchall()
+            
+        return [
+            {
+                'timestamp': row[1],
+                'instrument_id': instruments.get(row[2]),
+                'session_name': sessions.get(row[0]),
+                'seq': row[3],
+                'voltage': row[4],
+                'current': row[5],
+                'resistance': row[6],
+                'power': row[7],
+                'temperature': row[8],
+                'metadata': json.loads(row[9]) if row[9] else None
+            }
+            for row in rows
+        ]
+        
+    def iter_columns(self, session: Optional[str] = None, instrument: Optional[str] = None,
+                     start_ns: Optional[int] = None, end_ns: Optional[int] = None,
+                     columns: Optional[Iterable[str]] = None,
+                     chunk_size: Optional[int] = 65536) -> Iterator[SessionColumns]:
+        """依會話/儀器/時間範圍分段讀取為列式陣列 (按時間排序)
+        
+        只查詢需要的欄位；每段以 fetchmany 取得後按欄轉為陣列，
+        儀器名稱以鍵查表取得，附加資訊保持 JSON 字串 (延遲解析)。
+        
+        Args:
+            session: 會話名稱，None表示所有會話 (含即時數據)
+            instrument: 儀器名稱，None表示全部
+            start_ns: 開始時間 (含)
+            end_ns: 結束時間 (含)
+            columns: 需要的欄位，None表示全部
+            chunk_size: 每段最多的列數，None表示一次讀取
+            
+        Yields:
+            SessionColumns: 數據段
+        """
+        projection = normalize_columns(columns)
+        plan = self._conditions(session, instrument, start_ns, end_ns)
+        if plan is None or not projection:
+            return
+        conditions, params, _, instruments = plan
+        
+        expressions = {'timestamp': 's.ts', 'instrument_id': 's.instrument_key', 'metadata': 'm.metadata'}
+        sql = self._select_sql(
+            ', '.join(expressions.get(name, f"s.{name}") for name in projection),
+            conditions, 'metadata' in projection
+        )
+        names = np.full(max(instruments, default=-1) + 1, None, dtype=object)
+        for key, name in instruments.items():
+            names[key] = name
+            
+        with closing(sqlite3.connect(str(self.db_path), timeout=30)) as conn:
+            cursor = conn.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size) if chunk_size else cursor.fetchall()
+                if not rows:
+                    return
+                data = dict(zip(projection, zip(*rows)))
+                if 'instrument_id' in data:
+                    data['instrument_id'] = names[np.asarray(data['instrument_id'], dtype=np.intp)]
+                yield SessionColumns(data)
+                if not chunk_size:
+                    return
+                    
+    # ---- 彙總 ----
+    
+    def _rollup_keys(self, session: Optional[str], instrument: Optional[str]):
+        """彙總查詢的會話鍵與儀器鍵；沒有符合的會話或儀器時返回 None
+        
+        Returns:
+            (會話鍵列表, 儀器鍵或 None, 儀器鍵->名稱)
+        """
+        self.flush()
+        with self._lock:
+            sessions = dict(self._conn.execute("SELECT session_key, name FROM sessions"))
+            instruments = dict(self._conn.execute("SELECT instrument_key, name FROM instruments"))
+        keys = [key for key, name in sessions.items() if session is None or name == session]
+        if not keys:
+            return None
+        instrument_key = None
+        if instrument is not None:
+            matches = [key for key, name in instruments.items() if name == instrument]
+            if not matches:
+                return None
+            instrument_key = matches[0]
+        return keys, instrument_key, instruments
+        
+    def rollups(self, session: Optional[str] = None, instrument: Optional[str] = None,
+                resolution: str = '1m', start_ns: Optional[int] = None,
+                end_ns: Optional[int] = None, channels: Optional[Iterable[str]] = None,
+                step_ns: Optional[int] = None) -> Dict[str, Dict[str, np.ndarray]]:
+        """讀取一個解析度的彙總桶 (按時間排序)
+        
+        Args:
+            session: 會話名稱，None表示所有會話 (含即時數據，同一個桶合併)
+            instrument: 儀器名稱，None表示全部
+            resolution: '1s'、'1m' 或 '1h'
+            start_ns: 開始時間 (含，包括此時間所在的桶)
+            end_ns: 結束時間 (含)
+            channels: 需要的數值欄位，None表示全部
+            step_ns: 在數據庫中把相鄰的桶合併為此寬度 (解析度的倍數)，None表示不合併
+            
+        Returns:
+            Dict: 儀器名稱 -> {timestamp (桶開始)、rows、first_ts、last_ts、
+                  <欄位>_count/min/max/sum/last/mean}
+        """
+        channels = self._rollup_channels(channels)
+        plan = self._rollup_keys(session, instrument)
+        if plan is None:
+            return {}
+        keys, instrument_key, instruments = plan
+        with closing(sqlite3.connect(str(self.db_path), timeout=30)) as conn:
+            result = query_buckets(conn, resolution, keys, instrument_key, channels,
+                                   start_ns, end_ns, step_ns)
+        return split_series(result, channels, instruments)
+        
+    def summary(self, session: Optional[str] = None, instrument: Optional[str] = None,
+                start_ns: Optional[int] = None, end_ns: Optional[int] = None,
+                channels: Optional[Iterable[str]] = None,
+                edge_reader: Optional[Callable[[int, int], SessionColumns]] = None) -> Dict[str, Dict[str, Any]]:
+        """時間範圍的摘要 (每台儀器的 count/min/max/mean/last)
+        
+        範圍中完整的 1 秒桶只讀取彙總 (中間使用 1 小時桶，兩端使用較細的桶)；
+        兩端不足一個桶的部分 (各最多 1 秒) 讀取原始數據，結果與直接統計原始數據相同。
+        
+        Args:
+            edge_reader: 讀取 [開始, 結束] 原始數據 (timestamp、instrument_id 與數值欄位) 的函數，
+                None表示讀取本數據庫的樣本 (文件會話需由調用者提供)
+            
+        Returns:
+            Dict: 儀器名稱 -> {rows、first_ts、last_ts、<欄位>: {count, min, max, mean, last}}
+        """
+        channels = self._rollup_channels(channels)
+        plan = self._rollup_keys(session, instrument)
+        if plan is None:
+            return {}
+        keys, instrument_key, instruments = plan
+        with closing(sqlite3.connect(str(self.db_path), timeout=30)) as conn:
+            result = summarize(conn, keys, instrument_key, channels, start_ns, end_ns)
+            
+        if edge_reader is None:
+            columns = ['timestamp', 'instrument_id', *channels]
+            edge_reader = lambda low, high: SessionColumns.concat(
+                self.iter_columns(session, instrument, low, high, columns), columns
+            )
+        parts = [split_series(result, channels, instruments)]
+        for low, high in edge_ranges(start_ns, end_ns):
+            # 桶寬大於任何時間戳：每台儀器一組
+            parts.append(aggregate_columns(edge_reader(low, high), channels, np.iinfo(np.int64).max))
+        return summarize_series(combine_series(parts, channels), channels)
+        
+    def rollup_span(self, session: Optional[str] = None,
+                    instrument: Optional[str] = None) -> Optional[Tuple[int, int]]:
+        """彙總涵蓋的時間範圍 (第一個與最後一個樣本的時間)，沒有數據時為 None"""
+        plan = self._rollup_keys(session, instrument)
+        if plan is None:
+            return None
+        keys, instrument_key, _ = plan
+        with closing(sqlite3.connect(str(self.db_path), timeout=30)) as conn:
+            return summarize_span(conn, keys, instrument_key)
+            
+    def overview(self, session: Optional[str] = None, instrument: Optional[str] = None,
+                 start_ns: Optional[int] = None, end_ns: Optional[int] = None,
+                 pixels: int = 1000, channels: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        """圖表用的概覽：選擇每個像素至少一個桶的最粗解析度
+        
+        相鄰的桶在數據庫中合併到約每像素一個 (寬度為解析度的倍數)，
+        返回的列數與圖表寬度相當，與時間範圍內的數據量無關。
+        
+        Args:
+            session: 會話名稱
+            instrument: 儀器名稱，None表示全部
+            start_ns: 開始時間，None表示數據的開始
+            end_ns: 結束時間，None表示數據的結束
+            pixels: 圖表寬度 (像素數)
+            channels: 需要的數值欄位，None表示全部
+            
+        Returns:
+            Optional[Dict]: resolution、bucket_ns (合併後的桶寬) 與 series (見 rollups)；
+                範圍太短 (應使用原始數據) 或沒有彙總時為 None
+        """
+        if start_ns is None or end_ns is None:
+            span = self.rollup_span(session, instrument)
+            if span is None:
+                return None
+            start_ns = span[0] if start_ns is None else start_ns
+            end_ns = span[1] if end_ns is None else end_ns
+        resolution = choose_resolution(start_ns, end_ns, pixels)
+        if resolution is None:
+            return None
+        width = RESOLUTIONS[resolution]
+        step_ns = max(width, (end_ns - start_ns) // max(1, pixels) // width * width)
+        series = self.rollups(session, instrument, resolution, start_ns, end_ns, channels, step_ns)
+        if not series:
+            return None
+        return {
+            'resolution': resolution,
+            'bucket_ns': step_ns,
+            'start_ns': start_ns,
+            'end_ns': end_ns,
+            'series': series
+        }
+        
+    @staticmethod
+    def _rollup_channels(channels: Optional[Iterable[str]]) -> tuple:
+        if channels is None:
+            return CHANNELS
+        channels = tuple(channels)
+        unknown = set(channels) - set(CHANNELS)
+        if unknown:
+            raise ValueError(f"未知的欄位: {', '.join(sorted(unknown))}")
+        return channels
+        
+    def rebuild_rollups(self, session: Optional[str] = None) -> int:
+        """由樣本表重新計算彙總
+        
+        Args:
+            session: 會話名稱，None表示所有有樣本的會話
+            
+        Returns:
+            int: 讀取的樣本數
+        """
+        self.writer.flush()
+        keys = None if session is None else [self.session_key(session)]
+        with self._lock, self._conn:
+            return rebuild_rollups(self._conn, keys)
+            
+    def _build_rollups(self):
+        """彙總表新建立時，為已有的樣本計算彙總 (只執行一次)"""
+        started = time.perf_counter()
+        with self._conn:
+            count = rebuild_rollups(self._conn)
+        if count:
+            self.logger.info(
+                f"已為現有數據建立彙總 ({count} 列, {time.perf_counter() - started:.1f}s)"
+            )
+            
+    # ---- 舊版轉換 ----
+    
+    LEGACY_TABLES = ('measurements', 'measurements_text_ts')
+    
+    def _tables(self) -> set:
+        return {row[0] for row in self._conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        
+    def _check_legacy_table(self):
+        """開啟時只提示舊版 measurements 表，不自動轉換或刪除"""
+        if 'measurements' in self._tables():
+            self.logger.warning(
+                f"{self.db_path} 含舊版 measurements 表，尚未轉換；"
+                f"請執行 python -m src.data.measurement_store migrate {self.db_path}"
+            )
+            
+    def migrate_legacy_table(self, instrument: str = 'default', drop_legacy: bool = False) -> int:
+        """將同一檔案中的舊版 measurements 表 (SQLiteStorage) 轉入新結構
+        
+        轉換可重複執行 (已存在的樣本會被忽略)。轉換完成後舊表預設改名為
+        <表名>_migrated 保留；drop_legacy 為 True 時才刪除並 VACUUM。
+        
+        Args:
+            instrument: EnhancedDataLogger 數據所屬的儀器名稱
+            drop_legacy: 是否刪除舊表
+            
+        Returns:
+            int: 轉換的數據列數 (沒有舊表時為 0)
+        """
+        tables = self._tables()
+        if 'measurements' not in tables:
+            return 0
+        count = import_legacy(self, self._conn, instrument)
+        legacy = [table for table in self.LEGACY_TABLES if table in tables]
+        with self._lock, self._conn:
+            for table in legacy:
+                if drop_legacy:
+                    self._conn.execute(f"DROP TABLE {table}")
+                else:
+                    self._conn.execute(f"ALTER TABLE {table} RENAME TO {table}_migrated")
+        if drop_legacy:
+            with self._lock:
+                self._conn.execute("VACUUM")
+        self.logger.info(
+            f"已轉換舊版 measurements 表 ({count} 列)"
+            + ("，舊表已刪除" if drop_legacy else "，舊表保留為 measurements_migrated")
+        )
+        return count
+
+
+def _legacy_kind(conn: sqlite3.Connection) -> Optional[str]:
+    """判斷舊版 measurements 表的來源: 'storage' (SQLiteStorage)、'logger' (EnhancedDataLogger)"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(measurements)")}
+    if 'voltage_v' in columns:
+        return 'logger'
+    if 'session_name' in columns:
+        return 'storage'
+    return None
+
+
+def _dedupe_sql(session: str, instrument: Optional[str], values: Sequence[str]) -> str:
+    """讀取舊版數據並合併重複寫入的列 (依 id 順序)
+    
+    SQLite 中與 MIN() 一起選取的其他欄位取自 id 最小的列；分組中 NULL 視為相同。
+    """
+    key = ', '.join((session, *([instrument] if instrument else []), 'timestamp', *values))
+    return f'''
+        SELECT MIN(id), {session}, {instrument or 'NULL'}, timestamp, {', '.join(values)}, metadata, NULL
+        FROM measurements GROUP BY {key} ORDER BY 1
+    '''
+
+
+def import_legacy(store: MeasurementStore, source: sqlite3.Connection,
+                  instrument: str = 'default', chunk_size: int = 10000) -> int:
+    """將舊版 measurements (與 sessions) 表的數據寫入存儲
+    
+    ISO字串時間戳轉為 epoch ns；無序號的舊數據以原 id 作為序號，相同時間
+    但數值不同的數據點不會互相覆蓋。無序號時 (會話、儀器、時間戳、數值) 完全
+    相同的列視為重複寫入，只保留 id 最小的一列 (含其附加資訊)。
+    
+    Args:
+        store: 目標存儲
+        source: 舊版數據庫連接 (可與目標相同)
+        instrument: EnhancedDataLogger 數據所屬的儀器名稱 (舊結構中沒有記錄)
+        chunk_size: 每個交易寫入的列數
+        
+    Returns:
+        int: 寫入的數據列數 (去除重複後)
+    """
+    kind = _legacy_kind(source)
+    if kind is None:
+        raise ValueError("無法識別的舊版數據庫結構")
+        
+    if kind == 'logger':
+        columns = {row[1] for row in source.execute("PRAGMA table_info(sessions)")}
+        if columns:
+            last_seq = 'last_seq' if 'last_seq' in columns else '0'
+            sessions = source.execute(f'''
+                SELECT session_id, start_time, end_time, total_points, {last_seq},
+                       description, instrument_config
+                FROM sessions
+            ''').fetchall()
+            for name, start, end, total, seq, description, config in sessions:
+                store.open_session(
+                    name, start_ns=as_epoch_ns(start) if start else None,
+                    description=description or None,
+                    metadata=json.loads(config) if config else None
+                )
+                store.update_session(
+                    name, end_ns=as_epoch_ns(end) if end else None,
+                    total_points=total or 0, last_seq=seq or 0
+                )
+        has_seq = 'seq' in {row[1] for row in source.execute("PRAGMA table_info(measurements)")}
+        if has_seq:
+            cursor = source.execute('''
+                SELECT id, session_id, NULL, timestamp, voltage_v, current_a, resistance_ohm,
+                       power_w, temperature_c, metadata, seq
+                FROM measurements ORDER BY id
+            ''')
+        else:
+            cursor = source.execute(_dedupe_sql(
+                'session_id', None, ('voltage_v', 'current_a', 'resistance_ohm', 'power_w', 'temperature_c')
+            ))
+    else:
+        cursor = source.execute(_dedupe_sql(
+            'session_name', 'instrument_id', ('voltage', 'current', 'resistance', 'power', 'temperature')
+        ))
+        
+    instrument_key = store.instrument_key(instrument)
+    total = 0
+    while True:
+        chunk = cursor.fetchmany(chunk_size)
+        if not chunk:
+            break
+        rows = [
+            (
+                store.session_key(session),
+                as_epoch_ns(timestamp),
+                store.instrument_key(instrument_id) if instrument_id else instrument_key,
+                seq if seq is not None else row_id,
+                voltage, current, resistance, power, temperature,
+                metadata or None
+            )
+            for (row_id, session, instrument_id, timestamp, voltage, current,
+                 resistance, power, temperature, metadata, seq) in chunk
+        ]
+        store.write(rows)
+        total += len(rows)
+        
+    # 會話統計以轉換後的數據為準
+    with store._lock, store._conn:
+        store._conn.execute('''
+            UPDATE sessions SET
+                total_points = MAX(total_points, (SELECT COUNT(*) FROM samples s
+                                                  WHERE s.session_key = sessions.session_key)),
+                start_ns = COALESCE(start_ns, (SELECT MIN(ts) FROM samples s
+                                               WHERE s.session_key = sessions.session_key))
+        ''')
+    return total
+
+
+def migrate_database(source: Union[str, Path], target: Optional[Union[str, Path]] = None,
+                     instrument: str = 'default', keep_source: bool = False,
+                     drop_legacy: bool = False) -> Dict[str, Any]:
+    """轉換舊版數據庫 (measurements.db 或 measurement_data.db)
+    
+    Args:
+        source: 舊版數據庫檔案
+        target: 目標數據庫，None表示同目錄下的 measurements.db
+        instrument: EnhancedDataLogger 數據所屬的儀器名稱
+        keep_source: 是否保留來源檔案 (否則改名為 *.migrated)
+        drop_legacy: 來源與目標為同一檔案時，是否刪除舊表 (否則改名保留)
+        
+    Returns:
+        Dict: 轉換的列數與前後檔案大小
+    """
+    source = Path(source)
+    target = Path(target) if target else source.parent / MeasurementStore.FILENAME
+    if not source.exists():
+        raise FileNotFoundError(f"找不到數據庫: {source}")
+        
+    source_bytes = _database_bytes(source)
+    if source.resolve() == target.resolve():
+        # 同一檔案：轉入新結構，舊表改名保留或 (drop_legacy) 刪除
+        store = get_measurement_store(target)
+        rows = store.migrate_legacy_table(instrument, drop_legacy)
+        return {
+            'source': str(source),
+            'target': str(target),
+            'source_bytes': source_bytes,
+            'target_bytes': _database_bytes(target),
+            'rows': rows
+        }
+        
+    store = get_measurement_store(target)
+    with sqlite3.connect(str(source)) as conn:
+        rows = import_legacy(store, conn, instrument)
+    with store._lock:
+        store._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        
+    result = {
+        'source': str(source),
+        'target': str(target),
+        'source_bytes': source_bytes,
+        'target_bytes': _database_bytes(target),
+        'rows': rows
+    }
+    if not keep_source:
+        migrated = source.with_name(source.name + '.migrated')
+        os.replace(source, migrated)
+        result['source'] = str(migrated)
+    return result
+
+
+def _database_bytes(path: Path) -> int:
+    """數據庫檔案大小 (含 WAL)"""
+    total = 0
+    for candidate in (path, path.with_name(path.name + '-wal')):
+        if candidate.exists():
+            total += candidate.stat().st_size
+    return total
+
+
+# 每個數據庫檔案一個存儲實例
+_stores: Dict[str, MeasurementStore] = {}
+_stores_lock = threading.Lock()
+
+def get_measurement_store(db_path: Optional[Union[str, Path]] = None) -> MeasurementStore:
+    """獲取數據庫檔案對應的共用存儲實例
+    
+    Args:
+        db_path: 數據庫檔案，None表示 data.storage.base_path 下的 measurements.db
+        
+    Returns:
+        MeasurementStore: 存儲實例
+    """
+    config = get_config()
+    if db_path is None:
+        db_path = Path(config.get('data.storage.base_path', 'data')) / MeasurementStore.FILENAME
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    key = str(db_path.resolve())
+    
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            sqlite_config = config.get('data.storage.sqlite', {}) or {}
+            store = MeasurementStore(
+                db_path,
+                synchronous=sqlite_config.get('synchronous', 'NORMAL'),
+                batch_size=sqlite_config.get('batch_size', 1000),
+                flush_interval_s=sqlite_config.get('flush_interval_ms', 200) / 1000.0,
+                max_pending=sqlite_config.get('max_pending_rows', 100000)
+            )
+            _stores[key] = store
+        return store
+
+
+def main():
+    """命令行介面"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='測量數據庫工具')
+    subparsers = parser.add_subparsers(dest='command', help='命令')
+    
+    migrate_parser = subparsers.add_parser('migrate', help='轉換舊版數據庫')
+    migrate_parser.add_argument('source', help='舊版數據庫 (measurements.db 或 measurement_data.db)')
+    migrate_parser.add_argument('--target', help='目標數據庫 (預設為同目錄的 measurements.db)')
+    migrate_parser.add_argument('--instrument', default='default', help='EnhancedDataLogger 數據的儀器名稱')
+    migrate_parser.add_argument('--keep', action='store_true', help='保留來源檔案')
+    migrate_parser.add_argument('--drop-legacy', action='store_true',
+                                help='來源即目標時，轉換後刪除舊表並 VACUUM (預設改名保留)')
+    
+    info_parser = subparsers.add_parser('info', help='顯示會話摘要')
+    info_parser.add_argument('--db', default='data/measurements.db', help='數據庫路徑')
+    
+    rollup_parser = subparsers.add_parser('rollups', help='由樣本重新計算彙總')
+    rollup_parser.add_argument('--db', default='data/measurements.db', help='數據庫路徑')
+    rollup_parser.add_argument('--session', help='只處理此會話')
+    
+    args = parser.parse_args()
+    
+    if args.command == 'migrate':
+        result = migrate_database(args.source, args.target, args.instrument, args.keep,
+                                  args.drop_legacy)
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        
+    elif args.command == 'info':
+        store = get_measurement_store(args.db)
+        sessions = [store.get_session(name) for name in store.list_sessions()]
+        print(json.dumps({
+            'path': args.db,
+            'size_bytes': _database_bytes(Path(args.db)),
+            'sessions': sessions
+        }, indent=2, ensure_ascii=False))
+        
+    elif args.command == 'rollups':
+        store = get_measurement_store(args.db)
+        print(json.dumps({'rows': store.rebuild_rollups(args.session)}, ensure_ascii=False))
+        
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+"""
+內存預算管理
+以增量記帳 (每次變動 O(1)) 追蹤所有已註冊的數據容器，
+超出 data.buffer.memory_limit_mb 或 performance.memory.max_memory_usage_mb 時
+依各容器的策略回收：寫出到磁碟 (spill)、抽稀 (decimate) 或移除最舊數據 (drop_oldest)
+"""
+
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import weakref
+from itertools import chain
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.config import get_config
+from src.unified_logger import get_logger
+
+
+POLICIES = ('spill', 'decimate', 'drop_oldest')
+
+MB = 1024 * 1024
+
+
+def estimate_size(item: Any) -> int:
+    """估算單個數據項的內存大小 (物件本身加一層內容)
+    
+    Args:
+        item: 元組、列表、字典或一般物件 (如 MeasurementPoint)
+        
+    Returns:
+        int: 估算字節數
+    """
+    size = sys.getsizeof(item)
+    if isinstance(item, (tuple, list)):
+        return size + sum(sys.getsizeof(value) for value in item)
+    if isinstance(item, dict):
+        return size + sum(sys.getsizeof(value) for value in item.values())
+    attributes = getattr(item, '__dict__', None)
+    if attributes is not None:
+        size += sys.getsizeof(attributes) + sum(sys.getsizeof(v) for v in attributes.values())
+    return size
+
+
+class MemoryConsumer:
+    """受內存預算管理的容器
+    
+    子類維護 nbytes，變動時以 governor.charge() 回報差額，
+    並實作 reclaim() 釋放指定的字節數。thread_safe 為 True 的容器
+    可由任意執行緒立即回收；否則在容器自身下一次變動時回收 (在擁有者執行緒中)。
+    """
+    
+    name = 'consumer'
+    thread_safe = False
+    
+    nbytes = 0
+    _quota: Optional[int] = None
+    
+    def set_quota(self, quota: Optional[int]):
+        """設定回收目標 (None 表示無壓力)"""
+        self._quota = quota
+        
+    def _check_quota(self):
+        quota = self._quota
+        if quota is not None and self.nbytes > quota:
+            self._quota = None
+            self.reclaim(self.nbytes - quota)
+            
+    def reclaim(self, nbytes: int) -> int:
+        """釋放至少 nbytes 字節 (盡力而為)
+        
+        Returns:
+            int: 實際釋放的字節數
+        """
+        return 0
+
+
+class SpillFile:
+    """溢出檔案 - 依序追加的 pickle 區塊，按寫入順序讀回"""
+    
+    def __init__(self, directory: str, prefix: str):
+        self.directory = directory
+        self.prefix = "".join(c if c.isalnum() or c in '._-' else '_' for c in prefix)
+        self.path: Optional[str] = None
+        self.count = 0
+        self.first: Any = None
+        self._finalizer = None
+        
+    def write(self, items: List[Any]):
+        """追加一批數據項"""
+        if not items:
+            return
+        if self.path is None:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, self.path = tempfile.mkstemp(prefix=f"{self.prefix}_", suffix='.spill',
+                                             dir=self.directory)
+            os.close(fd)
+            # 容器被回收時一併刪除檔案
+            self._finalizer = weakref.finalize(self, _remove_file, self.path)
+            self.first = items[0]
+        with open(self.path, 'ab') as f:
+            pickle.dump(items, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.count += len(items)
+        
+    def __iter__(self) -> Iterator[Any]:
+        return self.read()
+        
+    def read(self, limit: Optional[int] = None) -> Iterator[Any]:
+        """依寫入順序讀回，最多 limit 項 (只讀取已完整寫入的區塊)"""
+        path = self.path
+        if path is None:
+            return
+        remaining = self.count if limit is None else limit
+        with open(path, 'rb') as f:
+            while remaining > 0:
+                try:
+                    chunk = pickle.load(f)
+                except EOFError:
+                    return
+                yield from chunk[:remaining]
+                remaining -= len(chunk)
+                
+    def delete(self):
+        """刪除檔案並重置"""
+        if self._finalizer is not None:
+            self._finalizer()
+        self.path = None
+        self.count = 0
+        self.first = None
+        self._finalizer = None
+
+
+def _remove_file(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class BudgetedList(list, MemoryConsumer):
+    """受內存預算管理的列表
+    
+    可直接替換原本的 list (append/extend/insert/切片/迭代不變)；
+    以首個數據項估算每項大小，記帳只依長度變化計算，O(1)。
+    超過 max_items 時一次回收到 max_items × low_watermark，避免每次追加都回收。
+    defer_spill 為 True 時 spill 的數據先暫存，由擁有者在鎖外呼叫 flush_spill() 寫出。
+    """
+    
+    def __init__(self, name: str, policy: Optional[str] = None, group: str = 'ui',
+                 max_items: Optional[int] = None, min_items: int = 100,
+                 governor: Optional['MemoryGovernor'] = None,
+                 spill_path: Optional[str] = None, defer_spill: bool = False):
+        """初始化列表
+        
+        Args:
+            name: 容器名稱 (日誌與 performance.memory.policies 中的鍵)
+            policy: 回收策略，None 使用配置，配置缺省為 drop_oldest
+            group: 預算群組 ('data' 另受 data.buffer.memory_limit_mb 限制)
+            max_items: 最大項數 (超過時按策略回收)，None 表示只受內存預算限制
+            min_items: 回收時至少保留的項數
+            governor: 內存預算管理器，None 使用全局實例
+            spill_path: spill 策略的檔案目錄，None 使用預算管理器的設定
+            defer_spill: 是否延後到 flush_spill() 才寫出 spill 的數據
+        """
+        super().__init__()
+        self.name = name
+        self.governor = governor or get_memory_governor()
+        self.policy = policy or self.governor.policy_for(name)
+        if self.policy not in POLICIES:
+            raise ValueError(f"未知的內存策略: {self.policy}")
+        self.max_items = max_items
+        self.min_items = min_items
+        self.item_size = 0
+        self.nbytes = 0
+        self._quota = None
+        self.spill = None
+        if self.policy == 'spill':
+            self.spill = SpillFile(spill_path or self.governor.spill_path, name)
+        self.defer_spill = defer_spill
+        self._pending_spill: List[Any] = []  # 已移出內存、尚未寫出的數據項 (較舊的在前)
+        self._spill_lock = threading.Lock()
+        self.governor.register(self, group)
+        
+    def __reduce__(self):
+        # 複製/序列化時視為普通列表
+        return (list, (list(self),))
+        
+    def _sync(self):
+        if not self.item_size:
+            if not len(self):
+                return
+            self.item_size = estimate_size(self[-1]) + 8  # 加上列表中的指標
+        nbytes = len(self) * self.item_size
+        delta = nbytes - self.nbytes
+        if delta:
+            self.nbytes = nbytes
+            self.governor.charge(self, delta)
+        if self.max_items is not None and len(self) > self.max_items:
+            # 回收到低水位，留出餘量
+            target = int(self.max_items * self.governor.low_watermark)
+            self._release(len(self) - max(target, self.min_items))
+        else:
+            self._check_quota()
+            
+    def append(self, item: Any):
+        super().append(item)
+        self._sync()
+        
+    def extend(self, items):
+        super().extend(items)
+        self._sync()
+        
+    def insert(self, index: int, item: Any):
+        super().insert(index, item)
+        self._sync()
+        
+    def pop(self, index: int = -1):
+        item = super().pop(index)
+        self._sync()
+        return item
+        
+    def remove(self, item: Any):
+        super().remove(item)
+        self._sync()
+        
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._sync()
+        
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self._sync()
+        
+    def __iadd__(self, items):
+        self.extend(items)
+        return self
+        
+    def clear(self):
+        super().clear()
+        if self.spill is not None:
+            with self._spill_lock:
+                self.spill.delete()
+                self._pending_spill.clear()
+        self._sync()
+        
+    def reclaim(self, nbytes: int) -> int:
+        if not self.item_size:
+            return 0
+        before = self.nbytes
+        self._release(-(-nbytes // self.item_size))
+        return before - self.nbytes
+        
+    def _release(self, count: int):
+        """按策略釋放約 count 項 (保留至少 min_items 項)"""
+        count = min(count, len(self) - self.min_items)
+        if count <= 0:
+            return
+        if self.policy == 'decimate':
+            # 每次將較舊的一半抽稀為隔點保留 (保留最舊一點)，舊數據逐步變稀疏而時間跨度不變
+            while count > 0 and len(self) > self.min_items:
+                half = min(len(self) // 2, 2 * count + 1)
+                if half < 3:
+                    break
+                removed = len(range(1, half, 2))
+                super().__delitem__(slice(1, half, 2))
+                count -= removed
+        else:
+            if self.spill is not None:
+                self._pending_spill.extend(list.__getitem__(self, slice(0, count)))
+            super().__delitem__(slice(0, count))
+            if self.spill is not None and not self.defer_spill:
+                self.flush_spill()
+        self._sync()
+        
+    def flush_spill(self):
+        """將暫存的 spill 數據一次寫出到磁碟 (不需持有擁有者的鎖)"""
+        with self._spill_lock:
+            count = len(self._pending_spill)
+            if not count:
+                return
+            self.spill.write(self._pending_spill[:count])
+            # 寫出期間可能有新的暫存數據追加在後面，只移除已寫出的部分
+            del self._pending_spill[:count]
+            
+    @property
+    def spill_pending(self) -> int:
+        """已移出內存、尚未寫出的項數"""
+        return len(self._pending_spill)
+        
+    @property
+    def spilled_count(self) -> int:
+        """已移出內存的項數 (包含尚未寫出的部分)"""
+        return self.spill.count + len(self._pending_spill) if self.spill is not None else 0
+        
+    @property
+    def total_count(self) -> int:
+        """總項數 (磁碟加內存)"""
+        return self.spilled_count + len(self)
+        
+    def first(self) -> Any:
+        """最早的數據項 (包含已寫出的部分)"""
+        if self.spill is not None:
+            with self._spill_lock:
+                if self.spill.count:
+                    return self.spill.first
+                if self._pending_spill:
+                    return self._pending_spill[0]
+        return self[0] if len(self) else None
+        
+    def iter_all(self) -> Iterator[Any]:
+        """當前內容的快照迭代器
+        
+        內存與尚未寫出的部分立即複製；已寫出的部分在迭代時才讀取磁碟，
+        因此可在持有鎖時建立、在鎖外迭代。
+        """
+        memory = list(self)
+        if self.spill is None:
+            return iter(memory)
+        with self._spill_lock:
+            spilled = self.spill.count
+            pending = list(self._pending_spill)
+        if spilled:
+            return chain(self.spill.read(spilled), pending, memory)
+        return chain(pending, memory)
+        
+    def to_list(self) -> List[Any]:
+        """所有數據項的普通列表副本"""
+        return list(self.iter_all())
+
+
+class MemoryGovernor:
+    """全局內存預算管理
+    
+    各容器變動時以 charge() 回報差額，總量與群組用量隨之增量更新；
+    超出預算時將相關容器的配額按比例壓到低水位 (預算 × low_watermark)，
+    留出餘量避免每個新數據點都觸發回收。
+    """
+    
+    def __init__(self, total_limit_mb: Optional[float] = None,
+                 group_limits_mb: Optional[Dict[str, float]] = None,
+                 warning_threshold_mb: Optional[float] = None,
+                 low_watermark: Optional[float] = None,
+                 spill_path: Optional[str] = None,
+                 policies: Optional[Dict[str, str]] = None):
+        """初始化預算管理器，未提供的參數從配置讀取
+        
+        Args:
+            total_limit_mb: 所有容器的總預算 (performance.memory.max_memory_usage_mb)
+            group_limits_mb: 群組預算，如 {'data': data.buffer.memory_limit_mb}
+            warning_threshold_mb: 超過時記錄警告 (performance.memory.warning_threshold_mb)
+            low_watermark: 回收目標佔預算的比例
+            spill_path: spill 策略的檔案目錄，None 使用 <data.storage.base_path>/spill
+            policies: {容器名稱: 策略}
+        """
+        config = get_config()
+        memory_config = config.get('performance.memory', {}) or {}
+        self.logger = get_logger("MemoryGovernor")
+        
+        if total_limit_mb is None:
+            total_limit_mb = memory_config.get('max_memory_usage_mb', 500)
+        if group_limits_mb is None:
+            group_limits_mb = {'data': config.get('data.buffer.memory_limit_mb', 100)}
+        if warning_threshold_mb is None:
+            warning_threshold_mb = memory_config.get('warning_threshold_mb')
+            
+        self.total_limit = int(total_limit_mb * MB)
+        self.group_limits = {group: int(mb * MB) for group, mb in group_limits_mb.items()}
+        self.warning_threshold = int(warning_threshold_mb * MB) if warning_threshold_mb else None
+        self.low_watermark = low_watermark or memory_config.get('low_watermark', 0.8)
+        self.spill_path = spill_path or memory_config.get('spill_path') or os.path.join(
+            config.get('data.storage.base_path', 'data'), 'spill'
+        )
+        self.policies = dict(memory_config.get('policies', {}) or {})
+        self.policies.update(policies or {})
+        
+        self._lock = threading.RLock()
+        # 群組 -> {id: 弱參照}；列表不可雜湊，無法放入 WeakSet
+        self._groups: Dict[str, Dict[int, weakref.ref]] = {}
+        self._group_bytes: Dict[str, int] = {}
+        self._charged: Dict[int, int] = {}
+        self._total = 0
+        self._warned = False
+        self.reclaim_count = 0
+        
+    def policy_for(self, name: str, default: str = 'drop_oldest') -> str:
+        """容器的回收策略"""
+        return self.policies.get(name, default)
+        
+    def register(self, consumer: MemoryConsumer, group: str = 'ui'):
+        """註冊容器 (容器被回收時自動註銷)"""
+        with self._lock:
+            key = id(consumer)
+            self._groups.setdefault(group, {})[key] = weakref.ref(consumer)
+            self._group_bytes.setdefault(group, 0)
+            self._charged[key] = 0
+            consumer._governor_group = group
+        weakref.finalize(consumer, self._release, key, group)
+        
+    def _release(self, key: int, group: str):
+        with self._lock:
+            nbytes = self._charged.pop(key, 0)
+            self._groups[group].pop(key, None)
+            self._group_bytes[group] -= nbytes
+            self._total -= nbytes
+            
+    def _members(self, group: Optional[str] = None) -> List[MemoryConsumer]:
+        groups = self._groups.values() if group is None else [self._groups.get(group, {})]
+        return [c for refs in groups for c in (ref() for ref in refs.values()) if c is not None]
+        
+    def _over_budget(self, groups) -> list:
+        scopes = []
+        for group in groups:
+            limit = self.group_limits.get(group)
+            if limit is not None and self._group_bytes.get(group, 0) > limit:
+                scopes.append((self._members(group), self._group_bytes[group], limit))
+        if self._total > self.total_limit:
+            scopes.append((self._members(), self._total, self.total_limit))
+        return scopes
+        
+    def charge(self, consumer: MemoryConsumer, delta: int):
+        """回報容器的用量變化 (O(1))；增加且超出預算時施加回收壓力"""
+        with self._lock:
+            key = id(consumer)
+            if key not in self._charged:
+                return
+            group = consumer._governor_group
+            self._charged[key] += delta
+            self._group_bytes[group] += delta
+            self._total += delta
+            if delta <= 0:
+                return
+            if self.warning_threshold and not self._warned and self._total > self.warning_threshold:
+                self._warned = True
+                self.logger.warning(f"內存使用已達 {self._total / MB:.1f} MB，接近預算上限")
+            if self._total <= self.total_limit and self._group_bytes[group] <= self.group_limits.get(group, self._total):
+                return
+            scopes = self._over_budget([group])
+        # 在鎖外回收，避免與容器自身的鎖形成循環等待
+        if scopes:
+            self._apply_pressure(scopes)
+            
+    def _apply_pressure(self, scopes):
+        """將超出預算範圍內的容器配額按比例壓到低水位"""
+        immediate = []
+        with self._lock:
+            self.reclaim_count += 1
+            for consumers, used, limit in scopes:
+                ratio = limit * self.low_watermark / used
+                for consumer in consumers:
+                    quota = int(consumer.nbytes * ratio)
+                    if consumer._quota is None or quota < consumer._quota:
+                        consumer.set_quota(quota)
+                    if consumer.thread_safe:
+                        immediate.append(consumer)
+            self.logger.debug(f"內存超出預算，開始回收 (總用量 {self._total / MB:.1f} MB)")
+            
+        for consumer in immediate:
+            consumer._check_quota()
+            
+    def enforce(self):
+        """立即檢查預算 (如定期維護時)，超出時施加回收壓力"""
+        with self._lock:
+            scopes = self._over_budget(list(self._groups))
+            if self._total <= (self.warning_threshold or self.total_limit):
+                self._warned = False
+        if scopes:
+            self._apply_pressure(scopes)
+            
+    @property
+    def total_bytes(self) -> int:
+        """當前總用量"""
+        return self._total
+        
+    def usage(self) -> Dict[str, Any]:
+        """各群組與容器的用量"""
+        with self._lock:
+            return {
+                'total_mb': self._total / MB,
+                'total_limit_mb': self.total_limit / MB,
+                'groups': {
+                    group: {
+                        'used_mb': self._group_bytes[group] / MB,
+                        'limit_mb': self.group_limits[group] / MB if group in self.group_limits else None,
+                        'consumers': {c.name: c.nbytes for c in self._members(group)}
+                    }
+                    for group in self._groups
+                },
+                'reclaim_count': self.reclaim_count
+            }
+
+
+# 全局內存預算管理器實例
+_governor = None
+_governor_lock = threading.Lock()
+
+def get_memory_governor() -> MemoryGovernor:
+    """獲取全局內存預算管理器實例
+    
+    Returns:
+        MemoryGovernor: 預算管理器實例
+    """
+    global _governor
+    if _governor is None:
+        with _governor_lock:
+            if _governor is None:
+                _governor = MemoryGovernor()
+    return _governor
\ No newline at end of file
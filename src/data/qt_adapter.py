@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+數據管理器Qt轉接層
+將 UnifiedDataManager 與導出工作服務的純Python信號轉發為 pyqtSignal，
+讓GUI元件在主執行緒中安全接收工作執行緒產生的數據
+"""
+
+from PyQt6.QtCore import QObject, pyqtSignal
+from .unified_data_manager import UnifiedDataManager, get_data_manager
+from .export_jobs import ExportJobService, get_export_service
+
+
+class QtDataManagerAdapter(QObject):
+    """UnifiedDataManager 的Qt信號轉接器
+    
+    信號由呼叫端執行緒發送，跨執行緒連接的槽函數會自動排隊到接收者所在執行緒。
+    """
+    
+    data_point_added = pyqtSignal(dict)  # 新數據點
+    session_started = pyqtSignal(str)    # 會話開始
+    session_ended = pyqtSignal(str, dict)  # 會話結束，統計信息
+    analysis_ready = pyqtSignal(str, dict)  # 分析結果
+    storage_error = pyqtSignal(str)      # 存儲錯誤
+    
+    def __init__(self, manager: UnifiedDataManager = None, parent=None):
+        """初始化轉接器
+        
+        Args:
+            manager: 數據管理器，None使用全局實例
+            parent: Qt父物件
+        """
+        super().__init__(parent)
+        self.manager = manager or get_data_manager()
+        
+        self._connections = []
+        for name in ('data_point_added', 'session_started', 'session_ended',
+                     'analysis_ready', 'storage_error'):
+            source = getattr(self.manager, name)
+            slot = getattr(self, name).emit
+            source.connect(slot)
+            self._connections.append((source, slot))
+            
+    def detach(self):
+        """斷開與數據管理器的連接"""
+        for source, slot in self._connections:
+            source.disconnect(slot)
+        self._connections.clear()
+
+
+class QtExportJobAdapter(QObject):
+    """ExportJobService 的Qt信號轉接器
+    
+    導出工作在工作執行緒中發送進度與結果，經由此轉接器排隊到GUI執行緒。
+    """
+    
+    job_started = pyqtSignal(int)          # 工作ID
+    job_progress = pyqtSignal(int, dict)   # 工作ID，進度
+    job_finished = pyqtSignal(int, str)    # 工作ID，檔案路徑
+    job_failed = pyqtSignal(int, str)      # 工作ID，錯誤訊息
+    job_cancelled = pyqtSignal(int)        # 工作ID
+    
+    def __init__(self, service: ExportJobService = None, parent=None):
+        """初始化轉接器
+        
+        Args:
+            service: 導出工作服務，None使用全局實例
+            parent: Qt父物件
+        """
+        super().__init__(parent)
+        self.service = service or get_export_service()
+        
+        self._connections = []
+        for name in ('job_started', 'job_progress', 'job_finished', 'job_failed', 'job_cancelled'):
+            source = getattr(self.service, name)
+            slot = getattr(self, name).emit
+            source.connect(slot)
+            self._connections.append((source, slot))
+            
+    def detach(self):
+        """斷開與導出工作服務的連接"""
+        for source, slot in self._connections:
+            source.disconnect(slot)
+        self._connections.clear()
\ No newline at end of file
@@ -0,0 +1,574 @@
+#!/usr/bin/env python3
+"""
+多解析度彙總
+樣本寫入時在同一交易中增量更新 1 秒、1 分鐘與 1 小時桶的彙總
+(每個會話/儀器/桶一列，各數值欄位的 count/min/max/sum/last)；
+長時間範圍的概覽圖與摘要只讀取彙總，依像素密度選擇足夠的最粗解析度。
+"""
+
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 解析度名稱 -> 桶寬 (ns)，由細到粗
+RESOLUTIONS = {
+    '1s': 1_000_000_000,
+    '1m': 60_000_000_000,
+    '1h': 3_600_000_000_000
+}
+CHANNELS = ('voltage', 'current', 'resistance', 'power', 'temperature')
+STATS = ('count', 'min', 'max', 'sum', 'last')
+
+_MIN_NS = -(1 << 63)
+_MAX_NS = (1 << 63) - 1
+
+ROLLUP_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS rollups (
+        resolution INTEGER NOT NULL,  -- 桶寬 (ns)
+        session_key INTEGER NOT NULL,
+        instrument_key INTEGER NOT NULL,
+        bucket INTEGER NOT NULL,  -- 桶開始時間 (epoch ns)
+        rows INTEGER NOT NULL,
+        first_ts INTEGER NOT NULL,
+        last_ts INTEGER NOT NULL,
+        {columns},
+        PRIMARY KEY (resolution, session_key, bucket, instrument_key)
+    ) WITHOUT ROWID;
+'''.format(columns=',\n        '.join(
+    f"{channel}_{stat} {'INTEGER NOT NULL' if stat == 'count' else 'REAL'}"
+    for channel in CHANNELS for stat in STATS
+))
+
+# 同一個桶再次寫入時合併 (右側均為更新前的值)
+UPSERT_SQL = '''
+    INSERT INTO rollups VALUES ({placeholders})
+    ON CONFLICT (resolution, session_key, bucket, instrument_key) DO UPDATE SET
+        rows = rows + excluded.rows,
+        first_ts = MIN(first_ts, excluded.first_ts),
+        last_ts = MAX(last_ts, excluded.last_ts),
+        {assignments}
+'''.format(
+    placeholders=', '.join('?' * (7 + len(CHANNELS) * len(STATS))),
+    assignments=',\n        '.join(
+        f"{c}_count = {c}_count + excluded.{c}_count, "
+        f"{c}_min = COALESCE(MIN({c}_min, excluded.{c}_min), {c}_min, excluded.{c}_min), "
+        f"{c}_max = COALESCE(MAX({c}_max, excluded.{c}_max), {c}_max, excluded.{c}_max), "
+        f"{c}_sum = {c}_sum + excluded.{c}_sum, "
+        f"{c}_last = CASE WHEN excluded.last_ts >= last_ts "
+        f"THEN COALESCE(excluded.{c}_last, {c}_last) ELSE COALESCE({c}_last, excluded.{c}_last) END"
+        for c in CHANNELS
+    )
+)
+
+
+def resolution_ns(resolution: str) -> int:
+    """解析度名稱對應的桶寬 (ns)"""
+    try:
+        return RESOLUTIONS[resolution]
+    except KeyError:
+        raise ValueError(f"不支援的解析度: {resolution}")
+
+
+def choose_resolution(start_ns: int, end_ns: int, pixels: int) -> Optional[str]:
+    """滿足像素密度的最粗解析度
+    
+    每個像素至少一個桶；連 1 秒桶都不足時返回 None (應使用原始數據)。
+    
+    Args:
+        start_ns: 開始時間
+        end_ns: 結束時間
+        pixels: 圖表寬度 (像素數)
+        
+    Returns:
+        Optional[str]: '1h'、'1m'、'1s' 或 None
+    """
+    span = end_ns - start_ns
+    for name, width in sorted(RESOLUTIONS.items(), key=lambda item: -item[1]):
+        if span >= width * max(1, pixels):
+            return name
+    return None
+
+
+def aggregate(ts: np.ndarray, values: np.ndarray, keys: Sequence[np.ndarray],
+              width: int) -> Dict[str, Any]:
+    """按 (分組鍵..., 桶) 彙總 (向量化)
+    
+    Args:
+        ts: 時間戳 (int64 ns)
+        values: 數值 (列數 × 欄位數，NaN 表示缺值)
+        keys: 分組鍵陣列 (如會話鍵、儀器鍵)
+        width: 桶寬 (ns)
+        
+    Returns:
+        Dict: keys (各組的鍵)、bucket、rows、first_ts、last_ts，
+              以及 count/min/max/sum/last (組數 × 欄位數)
+    """
+    count = len(ts)
+    bucket = ts - ts % width
+    order = np.lexsort((ts, bucket) + tuple(reversed(keys)))
+    ts, bucket, values = ts[order], bucket[order], values[order]
+    keys = [key[order] for key in keys]
+    
+    change = np.empty(count, dtype=bool)
+    change[0] = True
+    change[1:] = bucket[1:] != bucket[:-1]
+    for key in keys:
+        change[1:] |= key[1:] != key[:-1]
+    starts = np.flatnonzero(change)
+    ends = np.append(starts[1:], count) - 1
+    
+    valid = ~np.isnan(values)
+    # 各組最後一個有效值的位置 (沒有時為 -1)
+    positions = np.where(valid, np.arange(count)[:, None], -1)
+    last_index = np.maximum.reduceat(positions, starts, axis=0)
+    last = np.where(
+        last_index >= 0,
+        np.take_along_axis(values, np.maximum(last_index, 0), axis=0),
+        np.nan
+    )
+    return {
+        'keys': [key[starts] for key in keys],
+        'bucket': bucket[starts],
+        'rows': ends - starts + 1,
+        'first_ts': ts[starts],
+        'last_ts': ts[ends],
+        'count': np.add.reduceat(valid.astype(np.int64), starts, axis=0),
+        'min': np.fmin.reduceat(values, starts, axis=0),
+        'max': np.fmax.reduceat(values, starts, axis=0),
+        'sum': np.add.reduceat(np.where(valid, values, 0.0), starts, axis=0),
+        'last': last
+    }
+
+
+def _bucket_rows(width: int, result: Dict[str, Any]) -> List[tuple]:
+    """彙總結果轉為 rollups 表的數據列 (NaN 轉為 NULL)"""
+    head = np.column_stack(
+        result['keys'] + [result['bucket'], result['rows'], result['first_ts'], result['last_ts']]
+    ).tolist()
+    # 每個欄位依 STATS 順序排列: 組數 × (欄位數 × 統計量數)
+    stats = np.stack([result[stat].astype(np.float64) for stat in STATS], axis=2)
+    stats = stats.reshape(len(head), -1)
+    table = stats.astype(object)
+    table[np.isnan(stats)] = None
+    return [(width, *keys, *values) for keys, values in zip(head, table.tolist())]
+
+
+def upsert_rollups(conn: sqlite3.Connection, session_keys: np.ndarray, instrument_keys: np.ndarray,
+                   ts: np.ndarray, values: np.ndarray):
+    """把一批樣本併入所有解析度的彙總 (在目前交易中)"""
+    if not len(ts):
+        return
+    for width in RESOLUTIONS.values():
+        result = aggregate(ts, values, (session_keys, instrument_keys), width)
+        conn.executemany(UPSERT_SQL, _bucket_rows(width, result))
+
+
+def update_rollups(conn: sqlite3.Connection, rows: Sequence[tuple]):
+    """以樣本列增量更新彙總 (在目前交易中)
+    
+    Args:
+        conn: 數據庫連接
+        rows: 樣本列 (session_key, ts, instrument_key, seq, 五個數值欄位, ...)
+    """
+    if not rows:
+        return
+    count = len(rows)
+    upsert_rollups(
+        conn,
+        np.fromiter((row[0] for row in rows), np.int64, count),
+        np.fromiter((row[2] for row in rows), np.int64, count),
+        np.fromiter((row[1] for row in rows), np.int64, count),
+        np.array([row[4:9] for row in rows], dtype=np.float64).reshape(count, len(CHANNELS))
+    )
+
+
+def has_rollups(conn: sqlite3.Connection) -> bool:
+    """數據庫是否已有彙總表"""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'rollups'"
+    ).fetchone() is not None
+
+
+def sample_sessions(conn: sqlite3.Connection) -> List[int]:
+    """樣本表中有數據的會話鍵 (每個會話一次主鍵查找)"""
+    return [row[0] for row in conn.execute('''
+        SELECT session_key FROM sessions se
+        WHERE EXISTS (SELECT 1 FROM samples s WHERE s.session_key = se.session_key)
+    ''')]
+
+
+def rebuild_rollups(conn: sqlite3.Connection, session_keys: Optional[Iterable[int]] = None,
+                    start_ns: Optional[int] = None, end_ns: Optional[int] = None,
+                    chunk_size: int = 200000) -> int:
+    """由樣本表重新計算彙總 (在目前交易中)
+    
+    範圍向外對齊到最粗的桶，範圍內的彙總先刪除再逐段重算。
+    用於第一次建立彙總表、清理舊數據之後，或寫入時有樣本因重複而被忽略。
+    
+    Args:
+        conn: 數據庫連接
+        session_keys: 會話鍵，None表示樣本表中的所有會話
+            (只有彙總的會話，如檔案後端的會話索引，不受影響)
+        start_ns: 開始時間 (含)，None表示不限
+        end_ns: 結束時間 (含)，None表示不限
+        chunk_size: 每段讀取的樣本數
+        
+    Returns:
+        int: 讀取的樣本數
+    """
+    coarsest = max(RESOLUTIONS.values())
+    low = _MIN_NS if start_ns is None else start_ns - start_ns % coarsest
+    high = _MAX_NS if end_ns is None else end_ns - end_ns % coarsest + coarsest - 1
+    widths = tuple(RESOLUTIONS.values())
+    if session_keys is None:
+        session_keys = sample_sessions(conn)
+        
+    total = 0
+    for session_key in session_keys:
+        conn.execute(
+            f"DELETE FROM rollups WHERE resolution IN ({', '.join('?' * len(widths))}) "
+            f"AND session_key = ? AND bucket BETWEEN ? AND ?",
+            widths + (session_key, low, high)
+        )
+        cursor = conn.execute(f'''
+            SELECT ts, instrument_key, {', '.join(CHANNELS)} FROM samples
+            WHERE session_key = ? AND ts BETWEEN ? AND ?
+        ''', (session_key, low, high))
+        while True:
+            chunk = cursor.fetchmany(chunk_size)
+            if not chunk:
+                break
+            columns = list(zip(*chunk))
+            upsert_rollups(
+                conn,
+                np.full(len(chunk), session_key, dtype=np.int64),
+                np.asarray(columns[1], dtype=np.int64),
+                np.asarray(columns[0], dtype=np.int64),
+                np.array(columns[2:], dtype=np.float64).T
+            )
+            total += len(chunk)
+    return total
+
+
+def _query(conn: sqlite3.Connection, ranges: Sequence[Tuple[int, int, int]],
+           session_keys: Sequence[int], instrument_key: Optional[int],
+           channels: Sequence[str], step: Optional[int]) -> Dict[str, Any]:
+    """在 SQL 中合併桶 (多個會話的同一時段，以及按 step 合併相鄰的桶)
+    
+    只有合併後的列返回 Python，讀取成本與圖表寬度相當而非桶數。
+    
+    Args:
+        ranges: (桶寬, 第一個桶開始, 最後一個桶開始) 列表
+        session_keys: 會話鍵
+        instrument_key: 儀器鍵，None表示全部
+        channels: 數值欄位
+        step: 合併後的桶寬 (ns，桶寬的倍數)，None表示每台儀器合併為一組
+        
+    Returns:
+        Dict: instrument_key、bucket (合併後的開始時間)、rows、first_ts、last_ts，
+              以及 count/min/max/sum/last (組數 × 欄位數)
+    """
+    if not ranges or not session_keys:
+        return {
+            **{name: np.zeros(0, dtype=np.int64)
+               for name in ('instrument_key', 'bucket', 'rows', 'first_ts', 'last_ts')},
+            'count': np.zeros((0, len(channels)), dtype=np.int64),
+            **{stat: np.zeros((0, len(channels))) for stat in ('min', 'max', 'sum', 'last')}
+        }
+    terms = []
+    params: List[Any] = []
+    for width, low, high in ranges:
+        for session_key in session_keys:
+            # 每一項都能以主鍵定位
+            terms.append("(resolution = ? AND session_key = ? AND bucket BETWEEN ? AND ?)")
+            params.extend((width, session_key, low, high))
+    where = f"({' OR '.join(terms)})"
+    if instrument_key is not None:
+        where += " AND instrument_key = ?"
+        params.append(instrument_key)
+    if step is None:
+        select, group, extra = "MIN(bucket)", "instrument_key", ""
+    else:
+        select, group = f"bucket - bucket % {int(step)} AS grp", "instrument_key, grp"
+        extra = f", {select}"
+        
+    aggregates = ', '.join(
+        f"SUM({c}_count), MIN({c}_min), MAX({c}_max), SUM({c}_sum)" for c in channels
+    )
+    lasts = ', '.join(f"{c}_last" for c in channels)
+    rows = conn.execute(f'''
+        SELECT instrument_key, {select}, SUM(rows), MIN(first_ts), MAX(last_ts), {aggregates}
+        FROM rollups WHERE {where}
+        GROUP BY {group} ORDER BY {group}
+    ''', params).fetchall()
+    # 單一 MAX() 聚合時，其他欄位取自最大值所在的列 (最新的桶)
+    last_rows = conn.execute(f'''
+        SELECT MAX(last_ts), {lasts}{extra}
+        FROM rollups WHERE {where}
+        GROUP BY {group} ORDER BY {group}
+    ''', params).fetchall()
+    
+    groups = len(rows)
+    columns = list(zip(*rows))
+    stats = np.array(columns[5:], dtype=np.float64).reshape(len(channels), 4, groups)
+    last = np.array([row[1:1 + len(channels)] for row in last_rows], dtype=np.float64)
+    last = last.reshape(groups, len(channels))
+    count = stats[:, 0].T.astype(np.int64)
+    for index in np.flatnonzero((np.isnan(last) & (count > 0)).any(axis=0)):
+        # 最新的桶沒有此欄位的數據：取最後一個有此欄位數據的桶
+        channel = channels[index]
+        values = conn.execute(f'''
+            SELECT MAX(CASE WHEN {channel}_last IS NOT NULL THEN last_ts END), {channel}_last{extra}
+            FROM rollups WHERE {where}
+            GROUP BY {group} ORDER BY {group}
+        ''', params).fetchall()
+        last[:, index] = np.array([row[1] for row in values], dtype=np.float64)
+        
+    return {
+        'instrument_key': np.asarray(columns[0], dtype=np.int64),
+        'bucket': np.asarray(columns[1], dtype=np.int64),
+        'rows': np.asarray(columns[2], dtype=np.int64),
+        'first_ts': np.asarray(columns[3], dtype=np.int64),
+        'last_ts': np.asarray(columns[4], dtype=np.int64),
+        'count': count,
+        'min': stats[:, 1].T,
+        'max': stats[:, 2].T,
+        'sum': stats[:, 3].T,
+        'last': last
+    }
+
+
+def query_buckets(conn: sqlite3.Connection, resolution: str, session_keys: Sequence[int],
+                  instrument_key: Optional[int] = None, channels: Sequence[str] = CHANNELS,
+                  start_ns: Optional[int] = None, end_ns: Optional[int] = None,
+                  step_ns: Optional[int] = None) -> Dict[str, Any]:
+    """讀取一個解析度與時間範圍相交的桶 (多個會話的同一個桶合併)
+    
+    Args:
+        step_ns: 合併相鄰的桶為此寬度 (向上取為桶寬的倍數)，None表示不合併
+        
+    Returns:
+        Dict: 見 _query
+    """
+    width = resolution_ns(resolution)
+    low = _MIN_NS if start_ns is None else start_ns - start_ns % width
+    high = _MAX_NS if end_ns is None else end_ns
+    step = width if not step_ns else -(-step_ns // width) * width
+    return _query(conn, [(width, low, high)], session_keys, instrument_key, channels, step)
+
+
+def _split_range(start_ns: int, end_ns: int) -> Tuple[Optional[Tuple[int, int]], List[Tuple[int, int]]]:
+    """[start_ns, end_ns] 分為完整的 1 秒桶與兩端不完整的部分
+    
+    Returns:
+        Tuple: (完整桶的半開區間 [low, high)，沒有時為 None；兩端部分 (含兩端) 列表)
+    """
+    finest = min(RESOLUTIONS.values())
+    low = -(-start_ns // finest) * finest
+    high = (end_ns + 1) // finest * finest
+    if high <= low:
+        return None, [(start_ns, end_ns)] if start_ns <= end_ns else []
+    edges = []
+    if start_ns < low:
+        edges.append((start_ns, low - 1))
+    if high <= end_ns:
+        edges.append((high, end_ns))
+    return (low, high), edges
+
+
+def covering_ranges(start_ns: int, end_ns: int) -> List[Tuple[int, int, int]]:
+    """以最少的桶覆蓋 [start_ns, end_ns] 中完整的 1 秒桶 (不向外對齊)
+    
+    中間部分使用最粗的桶，兩端剩餘部分逐級使用較細的桶；
+    兩端不足一個桶的部分見 edge_ranges。
+    
+    Returns:
+        List[Tuple]: (桶寬, 第一個桶開始, 最後一個桶開始)
+    """
+    interior, _ = _split_range(start_ns, end_ns)
+    if interior is None:
+        return []
+    widths = sorted(RESOLUTIONS.values(), reverse=True)
+    finest = widths[-1]
+    # 半開區間 [low, high)
+    pending = [interior]
+    ranges = []
+    for width in widths:
+        remaining = []
+        for low, high in pending:
+            if width == finest:
+                ranges.append((width, low, high - width))
+                continue
+            first = -(-low // width) * width
+            last = high // width * width
+            if last <= first:
+                remaining.append((low, high))
+                continue
+            ranges.append((width, first, last - width))
+            if low < first:
+                remaining.append((low, first))
+            if last < high:
+                remaining.append((last, high))
+        pending = remaining
+    return ranges
+
+
+def edge_ranges(start_ns: Optional[int], end_ns: Optional[int]) -> List[Tuple[int, int]]:
+    """範圍兩端不足一個 1 秒桶、需要讀取原始數據的部分
+    
+    未指定的一端沒有範圍外的數據，整個桶都可使用彙總。
+    
+    Returns:
+        List[Tuple]: (開始, 結束) 列表 (含兩端)
+    """
+    finest = min(RESOLUTIONS.values())
+    start_ns = _MIN_NS - _MIN_NS % finest if start_ns is None else start_ns
+    end_ns = (_MAX_NS + 1) // finest * finest - 1 if end_ns is None else end_ns
+    return _split_range(start_ns, end_ns)[1]
+
+
+def summarize(conn: sqlite3.Connection, session_keys: Sequence[int],
+              instrument_key: Optional[int] = None, channels: Sequence[str] = CHANNELS,
+              start_ns: Optional[int] = None, end_ns: Optional[int] = None) -> Dict[str, Any]:
+    """時間範圍中完整 1 秒桶的摘要 (每台儀器一組)
+    
+    以 covering_ranges 組合各解析度的桶，讀取的列數與數據量無關；
+    兩端不完整的桶 (edge_ranges) 不包含在內，需由原始數據補上 (見 combine_series)。
+    
+    Returns:
+        Dict: 見 _query (每台儀器一組)
+    """
+    if start_ns is None or end_ns is None:
+        span = summarize_span(conn, session_keys, instrument_key)
+        if span is None:
+            return _query(conn, [], session_keys, instrument_key, channels, step=None)
+        finest = min(RESOLUTIONS.values())
+        start_ns = span[0] - span[0] % finest if start_ns is None else start_ns
+        end_ns = span[1] - span[1] % finest + finest - 1 if end_ns is None else end_ns
+    return _query(conn, covering_ranges(start_ns, end_ns), session_keys,
+                  instrument_key, channels, step=None)
+
+
+def summarize_span(conn: sqlite3.Connection, session_keys: Sequence[int],
+                   instrument_key: Optional[int] = None) -> Optional[Tuple[int, int]]:
+    """彙總涵蓋的時間範圍 (第一個與最後一個樣本)，沒有彙總時為 None"""
+    conditions = [
+        "resolution = ?",
+        f"session_key IN ({', '.join('?' * len(session_keys))})"
+    ]
+    params: List[Any] = [max(RESOLUTIONS.values()), *session_keys]
+    if instrument_key is not None:
+        conditions.append("instrument_key = ?")
+        params.append(instrument_key)
+    first, last = conn.execute(
+        f"SELECT MIN(first_ts), MAX(last_ts) FROM rollups WHERE {' AND '.join(conditions)}",
+        params
+    ).fetchone()
+    return None if first is None else (first, last)
+
+
+def split_series(result: Dict[str, Any], channels: Sequence[str],
+                 names: Dict[int, Optional[str]]) -> Dict[Optional[str], Dict[str, np.ndarray]]:
+    """彙總結果按儀器分開，統計量展開為 <欄位>_<統計量>，另加平均值 <欄位>_mean
+    
+    Args:
+        result: _query 或 aggregate 的結果 (含 instrument_key)
+        channels: 數值欄位
+        names: 儀器鍵 -> 儀器名稱
+        
+    Returns:
+        Dict: 儀器名稱 -> {timestamp (桶開始)、rows、first_ts、last_ts、<欄位>_<統計量>}
+    """
+    series = {}
+    for key in np.unique(result['instrument_key']).tolist():
+        mask = result['instrument_key'] == key
+        entry = {
+            'timestamp': result['bucket'][mask],
+            'rows': result['rows'][mask],
+            'first_ts': result['first_ts'][mask],
+            'last_ts': result['last_ts'][mask]
+        }
+        for index, channel in enumerate(channels):
+            for stat in STATS:
+                entry[f"{channel}_{stat}"] = result[stat][mask, index]
+            count = entry[f"{channel}_count"]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                entry[f"{channel}_mean"] = np.where(count > 0, entry[f"{channel}_sum"] / count, np.nan)
+        series[names.get(key)] = entry
+    return series
+
+
+def aggregate_columns(data, channels: Sequence[str], width: int) -> Dict[Optional[str], Dict[str, np.ndarray]]:
+    """原始數據 (含 timestamp、instrument_id 與數值欄位的列式數據) 按桶寬彙總
+    
+    Returns:
+        Dict: 見 split_series
+    """
+    if not len(data):
+        return {}
+    names, instrument_keys = np.unique(data['instrument_id'].astype(str), return_inverse=True)
+    result = aggregate(
+        data['timestamp'],
+        np.column_stack([data[channel] for channel in channels]),
+        [instrument_keys.astype(np.int64)],
+        width
+    )
+    result['instrument_key'] = result['keys'][0]
+    return split_series(result, channels, dict(enumerate(names.tolist())))
+
+
+def combine_series(parts: Iterable[Dict[Optional[str], Dict[str, np.ndarray]]],
+                   channels: Sequence[str]) -> Dict[Optional[str], Dict[str, np.ndarray]]:
+    """合併每台儀器只有一組的多個 split_series 結果 (如彙總桶與兩端的原始數據)
+    
+    各部分的時間不重疊；last 取自最晚一個有此欄位數據的部分。
+    
+    Returns:
+        Dict: 見 split_series (每台儀器一組)
+    """
+    grouped: Dict[Optional[str], List[Dict[str, np.ndarray]]] = {}
+    for part in parts:
+        for name, entry in part.items():
+            grouped.setdefault(name, []).append(entry)
+            
+    series = {}
+    for name, entries in grouped.items():
+        entries.sort(key=lambda entry: int(entry['last_ts'][0]))
+        combined = {
+            'timestamp': np.array([min(int(entry['timestamp'][0]) for entry in entries)]),
+            'rows': np.array([sum(int(entry['rows'][0]) for entry in entries)]),
+            'first_ts': np.array([min(int(entry['first_ts'][0]) for entry in entries)]),
+            'last_ts': np.array([int(entries[-1]['last_ts'][0])])
+        }
+        for channel in channels:
+            count = sum(int(entry[f"{channel}_count"][0]) for entry in entries)
+            total = sum(float(entry[f"{channel}_sum"][0]) for entry in entries)
+            lasts = [entry[f"{channel}_last"][0] for entry in entries]
+            lasts = [value for value in lasts if not np.isnan(value)]
+            combined[f"{channel}_count"] = np.array([count])
+            combined[f"{channel}_min"] = np.array([np.fmin.reduce([entry[f"{channel}_min"][0] for entry in entries])])
+            combined[f"{channel}_max"] = np.array([np.fmax.reduce([entry[f"{channel}_max"][0] for entry in entries])])
+            combined[f"{channel}_sum"] = np.array([total])
+            combined[f"{channel}_last"] = np.array([lasts[-1] if lasts else np.nan])
+            combined[f"{channel}_mean"] = np.array([total / count if count else np.nan])
+        series[name] = combined
+    return series
+
+
+def summarize_series(series: Dict[Optional[str], Dict[str, np.ndarray]],
+                     channels: Sequence[str]) -> Dict[Optional[str], Dict[str, Any]]:
+    """每台儀器只有一組的 split_series 結果轉為摘要 (缺值為 None)
+    
+    Returns:
+        Dict: 儀器名稱 -> {rows、first_ts、last_ts、<欄位>: {count, min, max, mean, last}}
+    """
+    summaries = {}
+    for name, entry in series.items():
+        summary = {column: int(entry[column][0]) for column in ('rows', 'first_ts', 'last_ts')}
+        for channel in channels:
+            values = {stat: entry[f"{channel}_{stat}"][0].item()
+                      for stat in ('count', 'min', 'max', 'mean', 'last')}
+            summary[channel] = {stat: None if value != value else value for stat, value in values.items()}
+        summaries[name] = summary
+    return summaries
\ No newline at end of file
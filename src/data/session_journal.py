@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+會話日誌
+不支援增量寫入的存儲後端 (如 SQLite) 在會話結束時才一次保存整個會話；
+採集期間每批數據點追加寫入日誌，檢查點只寫出上次之後的新數據列並更新清單，
+程式崩潰後由日誌重播未保存的會話。
+"""
+
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from src.data.binary_session import BinarySession, BinarySessionWriter
+from src.data.columnar import SessionColumns
+from src.data.stream_writer import existing_parts, fsync_directory
+from src.engine.clock import now_epoch_ns
+
+
+class SessionJournal:
+    """只追加的會話日誌
+    
+    每個會話一個目錄 <path>/<會話名稱>/：journal.msb (二進制會話格式，
+    崩潰後未寫完的結尾自動略過) 與 manifest.json (原子地覆寫)。
+    checkpoint() 對每個會話只 flush/fsync 新追加的數據列並寫入清單，
+    成本與上次檢查點之後的數據量成正比；commit() 在會話保存成功後刪除日誌。
+    """
+    
+    DATA_FILE = 'journal.msb'
+    MANIFEST = 'manifest.json'
+    
+    def __init__(self, path: Path, fsync: bool = True, buffer_size: int = 1 << 20,
+                 block_size: int = 4096):
+        """初始化日誌
+        
+        Args:
+            path: 日誌目錄
+            fsync: 檢查點是否 fsync
+            buffer_size: 寫入緩衝大小 (bytes)
+            block_size: 時間索引每組涵蓋的列數
+        """
+        self.path = Path(path)
+        self.fsync = fsync
+        self.buffer_size = buffer_size
+        self.block_size = block_size
+        
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        
+        # 統計
+        self.checkpoints = 0
+        self.last_checkpoint_records = 0
+        self.last_checkpoint_ms = 0.0
+        
+    def _session_dir(self, session_name: str) -> Path:
+        return self.path / session_name
+        
+    def _write_manifest(self, session_name: str, entry: Dict[str, Any]):
+        """原子地覆寫清單 (暫存檔 + 改名)"""
+        directory = self._session_dir(session_name)
+        manifest = {
+            'session': session_name,
+            'created_ns': entry['created_ns'],
+            'checkpoint_ns': entry['checkpoint_ns'],
+            'checkpoints': entry['checkpoints'],
+            'records': entry['committed']
+        }
+        temp = directory / (self.MANIFEST + '.tmp')
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(temp, directory / self.MANIFEST)
+        if self.fsync:
+            fsync_directory(directory)
+            
+    def begin(self, session_name: str):
+        """開始記錄會話 (之前未完成的同名日誌會被接續，不覆蓋)"""
+        with self._lock:
+            if session_name in self._sessions:
+                return
+            directory = self._session_dir(session_name)
+            directory.mkdir(parents=True, exist_ok=True)
+            entry = self._sessions[session_name] = {
+                'writer': BinarySessionWriter(directory / self.DATA_FILE, self.block_size,
+                                              self.buffer_size, fsync=self.fsync),
+                'created_ns': now_epoch_ns(),
+                'checkpoint_ns': None,
+                'checkpoints': 0,
+                'committed': 0
+            }
+            self._write_manifest(session_name, entry)
+            
+    def append(self, session_name: str, points: Iterable):
+        """追加數據點 (未 begin() 或已 commit() 的會話略過)"""
+        with self._lock:
+            entry = self._sessions.get(session_name)
+            if entry is not None:
+                entry['writer'].write_points(points)
+                
+    def checkpoint(self) -> int:
+        """檢查點：寫出所有會話的新數據列並更新清單
+        
+        Returns:
+            int: 本次檢查點寫出的新數據列數
+        """
+        started = now_epoch_ns()
+        written = 0
+        with self._lock:
+            for session_name, entry in self._sessions.items():
+                writer = entry['writer']
+                new_records = writer.records - entry['committed']
+                if new_records == 0 and entry['checkpoints']:
+                    continue
+                writer.flush()
+                entry['committed'] = writer.records
+                entry['checkpoint_ns'] = now_epoch_ns()
+                entry['checkpoints'] += 1
+                self._write_manifest(session_name, entry)
+                written += new_records
+            self.checkpoints += 1
+            self.last_checkpoint_records = written
+            self.last_checkpoint_ms = (now_epoch_ns() - started) / 1e6
+        return written
+        
+    def commit(self, session_name: str):
+        """會話已完整保存：關閉並刪除日誌"""
+        with self._lock:
+            entry = self._sessions.pop(session_name, None)
+            if entry is not None:
+                entry['writer'].close()
+        self.discard(session_name)
+        
+    def discard(self, session_name: str):
+        """刪除會話的日誌檔案 (如恢復完成後)"""
+        directory = self._session_dir(session_name)
+        if directory.exists():
+            shutil.rmtree(directory, ignore_errors=True)
+            
+    def pending(self) -> List[Dict[str, Any]]:
+        """前次執行遺留 (未保存) 的會話日誌
+        
+        Returns:
+            List[Dict]: 各會話的清單 (含 session 與最後檢查點的 records)
+        """
+        found = []
+        if not self.path.exists():
+            return found
+        with self._lock:
+            active = set(self._sessions)
+        for directory in sorted(self.path.iterdir()):
+            if not directory.is_dir() or directory.name in active:
+                continue
+            if not existing_parts(directory / self.DATA_FILE):
+                continue
+            manifest = {'session': directory.name, 'records': 0}
+            try:
+                with open(directory / self.MANIFEST, 'r', encoding='utf-8') as f:
+                    manifest.update(json.load(f))
+            except (OSError, ValueError):
+                pass  # 第一個檢查點之前崩潰：只有數據檔案
+            found.append(manifest)
+        return found
+        
+    def replay(self, session_name: str, chunk_size: Optional[int] = 65536,
+               ordered: bool = True) -> Iterator[SessionColumns]:
+        """重播會話日誌
+        
+        最後檢查點之前的數據保證完整；之後已寫入磁碟的完整數據列也會一併重播，
+        儀器名稱尚未寫入的結尾數據列略過。
+        
+        Args:
+            session_name: 會話名稱
+            chunk_size: 每段最多的列數，None表示不分段
+            ordered: 是否按時間排序；False 時按寫入順序逐段讀取，內存用量只與段大小有關
+            
+        Yields:
+            SessionColumns: 數據段
+        """
+        for part in existing_parts(self._session_dir(session_name) / self.DATA_FILE):
+            session = BinarySession(part)
+            chunks = session.to_columns().chunks(chunk_size) if ordered else session.chunks(chunk_size)
+            for data in chunks:
+                known = np.array([name is not None for name in data['instrument_id']], dtype=bool)
+                yield data if known.all() else data.select(known)
+            
+    def stats(self) -> Dict[str, Any]:
+        """日誌統計"""
+        with self._lock:
+            return {
+                'path': str(self.path),
+                'sessions': {
+                    name: {
+                        'records': entry['writer'].records,
+                        'committed': entry['committed'],
+                        'checkpoints': entry['checkpoints']
+                    }
+                    for name, entry in self._sessions.items()
+                },
+                'checkpoints': self.checkpoints,
+                'last_checkpoint_records': self.last_checkpoint_records,
+                'last_checkpoint_ms': self.last_checkpoint_ms
+            }
\ No newline at end of file
@@ -1,23 +1,40 @@
 #!/usr/bin/env python3
 """
 存儲後端實現
-支援CSV、JSON、SQLite等多種數據存儲格式
+支援CSV、JSON Lines、Parquet、二進制 (.msb)、SQLite等多種數據存儲格式
 """
 
 import csv
+import heapq
 import json
-import sqlite3
-import pandas as pd
+import os
+import shutil
+import threading
 from abc import ABC, abstractmethod
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from itertools import islice
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from src.config import get_config
+from src.data.binary_session import BinarySession, BinarySessionWriter
+from src.data.columnar import SessionColumns, normalize_columns, required_columns
+from src.data.compression import compression_options, open_input
+from src.engine.clock import as_epoch_ns
+from src.data.measurement_store import MeasurementStore, get_measurement_store
+from src.data.stream_writer import (
+    ParquetStreamWriter, RotatingFileWriter, existing_parts, fsync_directory, iter_jsonl,
+    iter_jsonl_chunks
+)
 from src.unified_logger import get_logger
 
 
 class StorageBackend(ABC):
     """存儲後端抽象基類"""
     
+    # 支援在採集期間增量寫入會話 (append_session/finalize_session) 的後端設為 True
+    supports_append = False
+    
     def __init__(self, base_path: str = "data"):
         self.base_path = Path(base_path)
         self.base_path.mkdir(parents=True, exist_ok=True)
@@ -37,191 +54,691 @@ class StorageBackend(ABC):
     def load_session(self, session_name: str) -> List:
         """載入會話數據"""
         pass
+        
+    def iter_columns(self, session_name: str, columns: Optional[Iterable[str]] = None,
+                     start_ns: Optional[int] = None, end_ns: Optional[int] = None,
+                     chunk_size: Optional[int] = 65536) -> Iterator[SessionColumns]:
+        """分段讀取會話數據為列式陣列
+        
+        預設由 load_session() 轉換；各後端以向量化讀取覆寫。
+        
+        Args:
+            session_name: 會話名稱
+            columns: 需要的欄位，None表示全部
+            start_ns: 開始時間 (含)
+            end_ns: 結束時間 (含)
+            chunk_size: 每段最多的列數，None表示不分段
+            
+        Yields:
+            SessionColumns: 按時間順序的數據段
+        """
+        data = SessionColumns.from_records(self.load_session(session_name))
+        yield from data.between(start_ns, end_ns).project(columns).chunks(chunk_size)
+        
+    def load_columns(self, session_name: str, columns: Optional[Iterable[str]] = None,
+                     start_ns: Optional[int] = None, end_ns: Optional[int] = None) -> SessionColumns:
+        """讀取會話數據為列式陣列 (參數同 iter_columns)"""
+        columns = normalize_columns(columns)
+        return SessionColumns.concat(
+            self.iter_columns(session_name, columns, start_ns, end_ns, chunk_size=None), columns
+        )
+        
+    def save_session_chunks(self, session_name: str, chunks: Iterable[List]) -> str:
+        """分段保存整個會話 (如由日誌恢復)
+        
+        支援增量寫入的後端逐段追加後完成檔案；其他後端預設合併後以
+        save_session() 一次保存 (可覆寫為逐段寫入)。
+        
+        Args:
+            session_name: 會話名稱
+            chunks: 數據點列表的序列 (各段之間不必按時間排序)
+            
+        Returns:
+            str: 檔案路徑
+        """
+        if self.supports_append:
+            for points in chunks:
+                self.append_session(session_name, points)
+            return self.finalize_session(session_name)
+        points = sorted((point for points in chunks for point in points), key=lambda point: point.timestamp)
+        return self.save_session(session_name, points)
+        
+    def append_session(self, session_name: str, points: List):
+        """增量寫入會話數據點 (supports_append 為 True 的後端)"""
+        raise NotImplementedError(f"{self.__class__.__name__} 不支援增量寫入會話")
+        
+    def finalize_session(self, session_name: str) -> str:
+        """完成增量寫入的會話，返回檔案路徑"""
+        raise NotImplementedError(f"{self.__class__.__name__} 不支援增量寫入會話")
+        
+    def flush(self):
+        """將緩衝中的數據寫入存儲 (預設無緩衝)"""
+        pass
+        
+    def close(self):
+        """釋放存儲資源"""
+        pass
 
 
-class CSVStorage(StorageBackend):
-    """CSV存儲後端"""
+class SessionOrder:
+    """增量寫入會話的時間順序追蹤
+    
+    同一台儀器的數據來自同一採集執行緒，寫入時已按時間排列；整個會話只在
+    多台儀器交錯時亂序。每台儀器記錄已寫入筆數與有序段的起點 (同一儀器內
+    時間戳倒退時另起一段)，完成會話時各段即為 k 路合併的有序輸入。
+    """
+    
+    def __init__(self):
+        self.ordered = True
+        self._last: Optional[int] = None
+        # 儀器ID -> [最後時間戳, 已寫入筆數, 各段起始序號]
+        self._instruments: Dict[Any, list] = {}
+        
+    def track(self, points: Iterable):
+        """記錄一批按寫入順序的數據點"""
+        instruments = self._instruments
+        for point in points:
+            if isinstance(point, dict):
+                timestamp, instrument = point['timestamp'], point.get('instrument_id')
+            else:
+                timestamp, instrument = point.timestamp, point.instrument_id
+            if self._last is not None and timestamp < self._last:
+                self.ordered = False
+            self._last = timestamp
+            
+            state = instruments.get(instrument)
+            if state is None:
+                state = instruments[instrument] = [timestamp, 0, [0]]
+            elif timestamp < state[0]:
+                state[2].append(state[1])
+            state[0] = timestamp
+            state[1] += 1
+            
+    def runs(self) -> List[Tuple[Any, int, int]]:
+        """各有序段 (儀器ID, 起始序號, 結束序號)，序號為該儀器內的寫入順序"""
+        runs = []
+        for instrument, (_, count, starts) in self._instruments.items():
+            ends = starts[1:] + [count]
+            runs.extend((instrument, start, end) for start, end in zip(starts, ends))
+        return runs
+
+
+class StreamingStorage(StorageBackend):
+    """串流檔案存儲後端基類 - 追加寫入
+    
+    數據經由大緩衝追加寫入並定期 flush/fsync，超過大小或時間上限時輪替到
+    新檔案 (<名稱>_partN<副檔名>)。寫入中的檔案帶 .partial 後綴，完成後
+    原子地改名。即時數據寫入 measurements_<時間><副檔名>，會話數據在採集期間
+    寫入 <會話名稱><副檔名>；flush() 即為檢查點，成本只與上次之後的新數據點有關。
+    文字格式可在配置中設定 compression (zstd/gzip)，檔案加上 .zst/.gz 副檔名，
+    由背景執行緒壓縮，讀取時自動解壓縮。
+    會話數據按持久化順序追加 (多台儀器的數據可能交錯)，完成會話時若
+    曾寫入亂序數據，以各儀器的有序段逐段 k 路合併重寫會話檔案，
+    讀取時即為時間順序 (不一次載入整個會話)。
+    子類別提供副檔名、配置鍵與數據點的編碼方式 (_point_writer)，
+    或以 _open_stream 提供自己的寫入器。
+    """
+    
+    SUFFIX = ''
+    CONFIG_KEY = ''
+    FORMAT_NAME = ''
+    
+    supports_append = True
+    # 讀取時本身會按時間排序的格式 (如二進制檔案) 設為 False
+    SORT_ON_FINALIZE = True
+    # 排序重寫時每個有序段一次讀入的列數
+    MERGE_CHUNK_ROWS = 8192
     
     def __init__(self, base_path: str = "data"):
         super().__init__(base_path)
-        self.current_file = None
-        self.current_writer = None
+        stream_config = get_config().get(self.CONFIG_KEY, {}) or {}
+        self._options = {
+            'header': self._header(),
+            'buffer_size': int(stream_config.get('buffer_kb', 1024) * 1024),
+            'flush_interval_s': stream_config.get('flush_interval_s', 1.0),
+            'fsync': stream_config.get('fsync', True),
+            'max_bytes': int(stream_config.get('rotate_mb', 256) * 1024 * 1024) or None,
+            'max_age_s': stream_config.get('rotate_minutes', 0) * 60 or None,
+            **compression_options(stream_config.get('compression'))
+        }
+        self._lock = threading.Lock()
+        self._realtime: Optional[Tuple[Any, Callable]] = None
+        self._sessions: Dict[str, Tuple[Any, Callable]] = {}
+        # 會話名稱 -> 寫入順序追蹤
+        self._session_order: Dict[str, SessionOrder] = {}
+        
+    def _header(self) -> str:
+        """每個檔案開頭的表頭"""
+        return ''
+        
+    def _point_writer(self, stream: RotatingFileWriter) -> Callable[[Iterable], None]:
+        """返回將數據點寫入串流的函數 (每個數據點一次 write)"""
+        raise NotImplementedError
+        
+    def _open_stream(self, filename: Path) -> Tuple[Any, Callable]:
+        """開啟寫入器，返回 (寫入器, 寫入數據點的函數)
+        
+        寫入器須提供 flush(fsync)、close() -> List[Path] 與 stats()。
+        """
+        stream = RotatingFileWriter(filename, **self._options)
+        return stream, self._point_writer(stream)
+        
+    def session_files(self, session_name: str, include_partial: bool = False) -> List[Path]:
+        """會話的所有輪替檔案 (按順序)"""
+        return existing_parts(self.base_path / f"{session_name}{self.SUFFIX}", include_partial)
         
     def save_point(self, point) -> bool:
-        """保存數據點到CSV"""
+        """保存數據點到即時檔案 (追加寫入)"""
         try:
-            # 確保有當前檔案
-            if self.current_file is None:
-                self._create_new_file()
-                
-            # 寫入數據
-            if self.current_writer:
-                row = point.to_dict()
-                self.current_writer.writerow(row)
-                return True
-                
+            with self._lock:
+                if self._realtime is None:
+                    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                    self._realtime = self._open_stream(
+                        self.base_path / f"measurements_{timestamp}{self.SUFFIX}"
+                    )
+                self._realtime[1]((point,))
+            return True
+            
         except Exception as e:
-            self.logger.error(f"CSV保存失敗: {e}")
+            self.logger.error(f"{self.FORMAT_NAME}保存失敗: {e}")
             return False
             
-    def save_session(self, session_name: str, points: List) -> str:
-        """保存會話到CSV檔案"""
-        filename = self.base_path / f"{session_name}.csv"
+    def append_session(self, session_name: str, points: List):
+        """追加會話數據點到 <會話名稱><副檔名>"""
+        with self._lock:
+            entry = self._sessions.get(session_name)
+            if entry is None:
+                entry = self._sessions[session_name] = self._open_stream(
+                    self.base_path / f"{session_name}{self.SUFFIX}"
+                )
+            entry[1](points)
+            
+            order = self._session_order.get(session_name)
+            if order is None:
+                order = self._session_order[session_name] = SessionOrder()
+            order.track(points)
+                
+    def finalize_session(self, session_name: str) -> str:
+        """完成會話檔案 (寫入剩餘數據並改為正式名稱，亂序時按時間排序重寫)"""
+        with self._lock:
+            entry = self._sessions.pop(session_name, None)
+            order = self._session_order.pop(session_name, None)
+            if entry is None:
+                return str(self.base_path / f"{session_name}{self.SUFFIX}")
+            parts = entry[0].close()
+            
+        if order is not None and not order.ordered and self.SORT_ON_FINALIZE:
+            try:
+                parts = self._rewrite_sorted(session_name, order.runs())
+            except Exception as e:
+                self.logger.error(f"會話 {session_name} 排序重寫失敗，保留寫入順序: {e}")
+            
+        self.logger.info(
+            f"會話已保存到{self.FORMAT_NAME}: {parts[0]}"
+            + (f" (共 {len(parts)} 個檔案)" if len(parts) > 1 else "")
+        )
+        return str(parts[0])
+        
+    def _rewrite_sorted(self, session_name: str, runs: List[Tuple[Any, int, int]]) -> List[Path]:
+        """以 k 路合併按時間排序重寫會話檔案
         
+        每個有序段各自逐段讀取 (每段 MERGE_CHUNK_ROWS 列)，以 heapq.merge
+        合併後分段寫入暫存目錄，再逐一替換原檔案；記憶體只與段數成正比，
+        與會話大小無關。
+        
+        Args:
+            session_name: 會話名稱
+            runs: SessionOrder.runs() 返回的有序段
+            
+        Returns:
+            List[Path]: 重寫後的檔案
+        """
+        merged = heapq.merge(
+            *(self._run_records(session_name, *run) for run in runs), key=itemgetter('timestamp')
+        )
+        expected = sum(end - start for _, start, end in runs)
+        staging = self.base_path / f".sorting_{session_name}"
+        shutil.rmtree(staging, ignore_errors=True)
+        total = 0
         try:
-            with open(filename, 'w', newline='', encoding='utf-8') as f:
-                if points:
-                    writer = csv.DictWriter(f, fieldnames=points[0].to_dict().keys())
-                    writer.writeheader()
-                    
-                    for point in points:
-                        writer.writerow(point.to_dict())
-                        
-            self.logger.info(f"會話已保存到CSV: {filename}")
-            return str(filename)
+            stream, write = self._open_stream(staging / f"{session_name}{self.SUFFIX}")
+            while True:
+                chunk = list(islice(merged, self.MERGE_CHUNK_ROWS))
+                if not chunk:
+                    break
+                write(chunk)
+                total += len(chunk)
+            sorted_parts = stream.close()
+            if total != expected:
+                raise IOError(f"合併後 {total} 筆與寫入的 {expected} 筆不一致")
+                
+            old_parts = self.session_files(session_name)
+            parts = []
+            for part in sorted_parts:
+                target = self.base_path / part.name
+                os.replace(part, target)
+                parts.append(target)
+            for part in old_parts:
+                if part not in parts:
+                    part.unlink()
+            fsync_directory(self.base_path)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+            
+        self.logger.info(
+            f"會話 {session_name} 含亂序數據，已按時間合併重寫 ({total} 筆，{len(runs)} 個有序段)"
+        )
+        return parts
+        
+    def _run_records(self, session_name: str, instrument: Any,
+                     start: int, end: int) -> Iterator[Dict[str, Any]]:
+        """逐段讀取一個有序段：某台儀器寫入序號 [start, end) 的數據"""
+        import numpy as np
+        
+        ordinal = 0
+        for chunk in self.iter_columns(session_name, chunk_size=self.MERGE_CHUNK_ROWS):
+            positions = np.flatnonzero(chunk['instrument_id'] == instrument)
+            first = ordinal
+            ordinal += len(positions)
+            if ordinal <= start:
+                continue
+            positions = positions[max(start - first, 0):end - first]
+            if len(positions):
+                yield from chunk.select(positions).to_dicts()
+            if ordinal >= end:
+                return
+                
+    def save_session(self, session_name: str, points: List) -> str:
+        """一次保存整個會話"""
+        try:
+            self.append_session(session_name, points)
+            return self.finalize_session(session_name)
             
         except Exception as e:
-            self.logger.error(f"保存CSV會話失敗: {e}")
+            self.logger.error(f"保存{self.FORMAT_NAME}會話失敗: {e}")
             raise
             
-    def load_session(self, session_name: str) -> List:
-        """從CSV載入會話數據"""
-        filename = self.base_path / f"{session_name}.csv"
+    def flush(self):
+        """檢查點：將所有寫入中的檔案 flush 並 fsync"""
+        with self._lock:
+            streams = list(self._sessions.values())
+            if self._realtime is not None:
+                streams.append(self._realtime)
+            for stream, _ in streams:
+                stream.flush(fsync=True)
+                
+    def close(self):
+        """完成所有寫入中的檔案"""
+        with self._lock:
+            streams = list(self._sessions.values())
+            self._sessions.clear()
+            if self._realtime is not None:
+                streams.append(self._realtime)
+                self._realtime = None
+            for stream, _ in streams:
+                stream.close()
+                
+    def get_stream_stats(self) -> Dict[str, Any]:
+        """寫入中檔案的統計"""
+        with self._lock:
+            stats = {name: stream.stats() for name, (stream, _) in self._sessions.items()}
+            if self._realtime is not None:
+                stats['realtime'] = self._realtime[0].stats()
+            return stats
+
+
+class CSVStorage(StreamingStorage):
+    """CSV存儲後端 - 每個檔案只寫一次表頭，之後每個數據點追加一列"""
+    
+    SUFFIX = '.csv'
+    CONFIG_KEY = 'data.storage.csv'
+    FORMAT_NAME = 'CSV'
+    
+    FIELDS = ('timestamp', 'instrument_id', 'voltage', 'current',
+              'resistance', 'power', 'temperature', 'metadata')
+    
+    def _header(self) -> str:
+        return ','.join(self.FIELDS) + '\n'
+        
+    def _point_writer(self, stream: RotatingFileWriter) -> Callable[[Iterable], None]:
+        writer = csv.writer(stream, lineterminator='\n')
+        return lambda points: writer.writerows(self._row(point) for point in points)
+        
+    @classmethod
+    def _row(cls, point) -> list:
+        """數據點 (物件或字典) 轉為一列"""
+        if isinstance(point, dict):
+            row = [point.get(name) for name in cls.FIELDS]
+        else:
+            row = [getattr(point, name) for name in cls.FIELDS]
+        row[-1] = json.dumps(row[-1]) if row[-1] else None
+        return row
+        
+    DTYPES = {
+        'timestamp': 'int64', 'instrument_id': object, 'voltage': 'float64', 'current': 'float64',
+        'resistance': 'float64', 'power': 'float64', 'temperature': 'float64', 'metadata': object
+    }
+    
+    def iter_columns(self, session_name: str, columns: Optional[Iterable[str]] = None,
+                     start_ns: Optional[int] = None, end_ns: Optional[int] = None,
+                     chunk_size: Optional[int] = 65536) -> Iterator[SessionColumns]:
+        """以 pandas C 解析器分段讀取 CSV (只解析需要的欄位)"""
+        import pandas as pd
         
+        projection = normalize_columns(columns)
+        needed = required_columns(projection, start_ns, end_ns)
+        for part in self.session_files(session_name):
+            dtypes = {name: self.DTYPES[name] for name in needed}
+            legacy = 'timestamp' in needed and self._has_iso_timestamps(part)
+            if legacy:
+                dtypes['timestamp'] = object
+            with open_input(part) as f:
+                reader = pd.read_csv(f, usecols=list(needed), dtype=dtypes, chunksize=chunk_size)
+                for frame in (reader if chunk_size else (reader,)):
+                    if legacy:
+                        frame['timestamp'] = [as_epoch_ns(value) for value in frame['timestamp']]
+                    data = SessionColumns.from_frame(frame, needed).between(start_ns, end_ns)
+                    if len(data):
+                        yield data.project(projection)
+                        
+    @staticmethod
+    def _has_iso_timestamps(part: Path) -> bool:
+        """舊版CSV檔案的時間戳為ISO字串 (以第一列判斷)"""
+        with open_input(part) as f:
+            rows = csv.reader(line.decode('utf-8') for line in islice(f, 2))
+            header = next(rows, None)
+            row = next(rows, None)
+        if not header or not row or 'timestamp' not in header:
+            return False
+        return not row[header.index('timestamp')].strip().lstrip('-').isdigit()
+                    
+    def load_session(self, session_name: str) -> List:
+        """從CSV載入會話數據 (含所有輪替檔案)"""
         try:
-            if not filename.exists():
+            parts = self.session_files(session_name)
+            if not parts:
                 return []
                 
-            df = pd.read_csv(filename)
-            points = []
-            
-            for _, row in df.iterrows():
-                # 轉換回MeasurementPoint格式
-                points.append(row.to_dict())
-                
+            import pandas as pd
+            frames = []
+            for part in parts:
+                with open_input(part) as f:
+                    frames.append(pd.read_csv(f))
+            df = pd.concat(frames, ignore_index=True)
+            df = df.astype(object).where(df.notna(), None)
+            points = df.to_dict('records')
+            for point in points:
+                if isinstance(point.get('metadata'), str):
+                    point['metadata'] = json.loads(point['metadata'])
             return points
             
         except Exception as e:
             self.logger.error(f"載入CSV會話失敗: {e}")
             return []
-            
-    def _create_new_file(self):
-        """創建新的CSV檔案"""
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = self.base_path / f"measurements_{timestamp}.csv"
-        
-        self.current_file = open(filename, 'w', newline='', encoding='utf-8')
-        # 稍後在第一個數據點時創建writer
 
 
-class JSONStorage(StorageBackend):
-    """JSON存儲後端"""
+class JSONStorage(StreamingStorage):
+    """JSON Lines (NDJSON) 存儲後端
     
-    def save_point(self, point) -> bool:
-        """保存數據點到JSON（實時模式）"""
-        # 對於實時保存，我們使用緩存並定期寫入
-        return True  # 簡化實現
+    每個數據點追加一行緊湊的 JSON 記錄。寫入中的 .partial 檔案可由其他程序
+    以 JSONLTail 追蹤；讀取時逐行解析，大型會話不必一次載入為單一物件。
+    """
+    
+    SUFFIX = '.jsonl'
+    CONFIG_KEY = 'data.storage.jsonl'
+    FORMAT_NAME = 'JSON Lines'
+    
+    def _point_writer(self, stream: RotatingFileWriter) -> Callable[[Iterable], None]:
+        encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
         
-    def save_session(self, session_name: str, points: List) -> str:
-        """保存會話到JSON檔案"""
-        filename = self.base_path / f"{session_name}.json"
+        def write(points: Iterable):
+            for point in points:
+                record = point if isinstance(point, dict) else point.to_dict()
+                stream.write(encode(record) + '\n')
+        return write
         
-        try:
-            data = {
-                'session_name': session_name,
-                'created_at': datetime.now().isoformat(),
-                'measurement_count': len(points),
-                'measurements': [point.to_dict() for point in points]
-            }
+    def iter_session(self, session_name: str, chunk_size: Optional[int] = None,
+                     include_partial: bool = False) -> Iterator:
+        """逐行讀取會話數據
+        
+        Args:
+            session_name: 會話名稱
+            chunk_size: 每次返回的記錄數，None表示逐筆返回
+            include_partial: 是否包含寫入中 (或崩潰後遺留) 的檔案
             
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-                
-            self.logger.info(f"會話已保存到JSON: {filename}")
-            return str(filename)
+        Yields:
+            Dict 或 List[Dict]: 單筆記錄，或 chunk_size 筆記錄的列表
+        """
+        records = (
+            record
+            for part in self.session_files(session_name, include_partial)
+            for record in iter_jsonl(part)
+        )
+        if chunk_size is None:
+            yield from records
+            return
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                return
+            yield chunk
             
-        except Exception as e:
-            self.logger.error(f"保存JSON會話失敗: {e}")
-            raise
+    def iter_columns(self, session_name: str, columns: Optional[Iterable[str]] = None,
+                     start_ns: Optional[int] = None, end_ns: Optional[int] = None,
+                     chunk_size: Optional[int] = 65536) -> Iterator[SessionColumns]:
+        """分段讀取，每段的所有行一次解析後按欄轉為陣列 (舊版 .json 逐筆轉換)"""
+        parts = self.session_files(session_name)
+        if not parts:
+            yield from super().iter_columns(session_name, columns, start_ns, end_ns, chunk_size)
+            return
             
+        projection = normalize_columns(columns)
+        needed = required_columns(projection, start_ns, end_ns)
+        for part in parts:
+            for records in iter_jsonl_chunks(part, chunk_size):
+                data = SessionColumns.from_records(records, needed).between(start_ns, end_ns)
+                if len(data):
+                    yield data.project(projection)
+                    
     def load_session(self, session_name: str) -> List:
-        """從JSON載入會話數據"""
-        filename = self.base_path / f"{session_name}.json"
-        
+        """從JSON Lines載入會話數據 (舊版 <會話名稱>.json 亦可讀取)"""
         try:
-            if not filename.exists():
-                return []
+            if self.session_files(session_name):
+                return list(self.iter_session(session_name))
                 
-            with open(filename, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                
-            return data.get('measurements', [])
+            legacy = self.base_path / f"{session_name}.json"
+            if legacy.exists():
+                with open(legacy, 'r', encoding='utf-8') as f:
+                    return json.load(f).get('measurements', [])
+            return []
             
         except Exception as e:
             self.logger.error(f"載入JSON會話失敗: {e}")
             return []
 
 
-class SQLiteStorage(StorageBackend):
-    """SQLite存儲後端 - 用於大量數據和複雜查詢"""
+class ParquetStorage(StreamingStorage):
+    """Parquet 存儲後端 - 列式、型別化、壓縮 (需要 pyarrow)
+    
+    採集期間數據點以 Arrow 批次寫成列組 (預設 zstd 壓縮、儀器ID字典編碼)；
+    檢查點會把累積的數據點寫成一個列組，檔案尾在會話完成時寫入。
+    讀取時只讀取需要的欄位，並依列組的時間戳統計略過範圍外的列組。
+    """
+    
+    SUFFIX = '.parquet'
+    CONFIG_KEY = 'data.storage.parquet'
+    FORMAT_NAME = 'Parquet'
     
     def __init__(self, base_path: str = "data"):
         super().__init__(base_path)
-        self.db_path = self.base_path / "measurements.db"
-        self._init_database()
+        parquet_config = get_config().get(self.CONFIG_KEY, {}) or {}
+        self._parquet_options = {
+            'row_group_rows': parquet_config.get('row_group_rows', 65536),
+            'compression': parquet_config.get('compression', 'zstd'),
+            'compression_level': parquet_config.get('compression_level', 3),
+            'buffer_size': self._options['buffer_size'],
+            'fsync': self._options['fsync']
+        }
+        # 缺少 pyarrow 時在建立後端時即報錯
+        ParquetStreamWriter.require()
         
-    def _init_database(self):
-        """初始化數據庫表結構"""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute('''
-                    CREATE TABLE IF NOT EXISTS measurements (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        timestamp TEXT NOT NULL,
-                        instrument_id TEXT NOT NULL,
-                        session_name TEXT,
-                        voltage REAL NOT NULL,
-                        current REAL NOT NULL,
-                        resistance REAL,
-                        power REAL,
-                        temperature REAL,
-                        metadata TEXT,
-                        created_at TEXT DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-                
-                conn.execute('''
-                    CREATE INDEX IF NOT EXISTS idx_timestamp 
-                    ON measurements(timestamp)
-                ''')
-                
-                conn.execute('''
-                    CREATE INDEX IF NOT EXISTS idx_instrument_session 
-                    ON measurements(instrument_id, session_name)
-                ''')
+    def _open_stream(self, filename: Path) -> Tuple[Any, Callable]:
+        stream = ParquetStreamWriter(filename, **self._parquet_options)
+        return stream, stream.write_points
+        
+    def read_table(self, session_name: str, columns: Optional[List[str]] = None,
+                   start_ns: Optional[int] = None, end_ns: Optional[int] = None):
+        """讀取會話數據為 Arrow Table
+        
+        Args:
+            session_name: 會話名稱
+            columns: 需要的欄位，None表示全部
+            start_ns: 開始時間 (含)
+            end_ns: 結束時間 (含)
+            
+        Returns:
+            pyarrow.Table: 會話數據 (無數據時為空表)
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        filters = []
+        if start_ns is not None:
+            filters.append(('timestamp', '>=', int(start_ns)))
+        if end_ns is not None:
+            filters.append(('timestamp', '<=', int(end_ns)))
+            
+        # 過濾條件由列組統計 (min/max) 判斷，範圍外的列組不會被讀取
+        tables = [
+            pq.read_table(part, columns=columns, filters=filters or None)
+            for part in self.session_files(session_name)
+        ]
+        if not tables:
+            schema = ParquetStreamWriter.schema()
+            if columns is not None:
+                schema = pa.schema([schema.field(name) for name in columns])
+            return schema.empty_table()
+        return pa.concat_tables(tables)
+        
+    def iter_columns(self, session_name: str, columns: Optional[Iterable[str]] = None,
+                     start_ns: Optional[int] = None, end_ns: Optional[int] = None,
+                     chunk_size: Optional[int] = 65536) -> Iterator[SessionColumns]:
+        """逐列組讀取 (只讀取需要的欄位，依時間戳統計略過範圍外的列組)"""
+        import pyarrow.parquet as pq
+        
+        projection = normalize_columns(columns)
+        needed = required_columns(projection, start_ns, end_ns)
+        for part in self.session_files(session_name):
+            parquet = pq.ParquetFile(part)
+            schema = parquet.schema_arrow
+            names = [name for name in needed if name in schema.names]
+            timestamp_index = schema.get_field_index('timestamp')
+            for group in range(parquet.num_row_groups):
+                stats = parquet.metadata.row_group(group).column(timestamp_index).statistics
+                if stats is not None and stats.has_min_max and (
+                        (start_ns is not None and stats.max < start_ns)
+                        or (end_ns is not None and stats.min > end_ns)):
+                    continue
+                table = parquet.read_row_group(group, columns=names)
+                data = SessionColumns.from_arrow(table, needed).between(start_ns, end_ns)
+                yield from data.project(projection).chunks(chunk_size)
                 
+    def load_session(self, session_name: str) -> List:
+        """從Parquet載入會話數據"""
+        try:
+            points = self.read_table(session_name).to_pylist()
+            for point in points:
+                if point.get('metadata'):
+                    point['metadata'] = json.loads(point['metadata'])
+            return points
+            
         except Exception as e:
-            self.logger.error(f"初始化數據庫失敗: {e}")
+            self.logger.error(f"載入Parquet會話失敗: {e}")
+            return []
+
+
+class BinaryStorage(StreamingStorage):
+    """二進制會話存儲後端 (.msb)
+    
+    固定寬度的數據列只追加寫入，任何時刻都可讀取；分析時以 open_session()
+    取得記憶體映射的 BinarySession，打開數GB的會話也不需讀取數據。
+    記憶體映射需要原始的固定寬度數據列，因此不支援串流壓縮。
+    """
+    
+    SUFFIX = '.msb'
+    CONFIG_KEY = 'data.storage.binary'
+    FORMAT_NAME = '二進制檔案'
+    # 亂序寫入時記錄於中繼資料，讀取時按時間排序
+    SORT_ON_FINALIZE = False
+    
+    def __init__(self, base_path: str = "data"):
+        super().__init__(base_path)
+        binary_config = get_config().get(self.CONFIG_KEY, {}) or {}
+        self._binary_options = {
+            'block_size': binary_config.get('index_block_rows', 4096),
+            'buffer_size': self._options['buffer_size'],
+            'fsync': self._options['fsync']
+        }
+        
+    def _open_stream(self, filename: Path) -> Tuple[Any, Callable]:
+        stream = BinarySessionWriter(filename, **self._binary_options)
+        return stream, stream.write_points
+        
+    def open_session(self, session_name: str) -> List[BinarySession]:
+        """以記憶體映射打開會話的所有檔案 (不讀取數據列)"""
+        return [BinarySession(part) for part in self.session_files(session_name)]
+        
+    def iter_columns(self, session_name: str, columns: Optional[Iterable[str]] = None,
+                     start_ns: Optional[int] = None, end_ns: Optional[int] = None,
+                     chunk_size: Optional[int] = 65536) -> Iterator[SessionColumns]:
+        """由記憶體映射直接取出欄位 (有序數據的數值欄位為映射視圖，不複製)"""
+        for session in self.open_session(session_name):
+            yield from session.to_columns(start_ns, end_ns, columns).chunks(chunk_size)
+            
+    def load_session(self, session_name: str) -> List:
+        """從二進制檔案載入會話數據"""
+        try:
+            points = []
+            for session in self.open_session(session_name):
+                points.extend(session.to_dicts())
+            return points
             
+        except Exception as e:
+            self.logger.error(f"載入二進制會話失敗: {e}")
+            return []
+
+
+class SQLiteStorage(StorageBackend):
+    """SQLite存儲後端 - 用於大量數據和複雜查詢
+    
+    數據寫入共用的 MeasurementStore (與 EnhancedDataLogger 同一檔案與結構)，
+    經由背景寫入執行緒批量提交；save_point() 只入列，
+    save_session()/load_session() 會先等待佇列寫完。
+    """
+    
+    def __init__(self, base_path: str = "data"):
+        super().__init__(base_path)
+        self.db_path = self.base_path / MeasurementStore.FILENAME
+        self.store = get_measurement_store(self.db_path)
+        self._writer = self.store.writer
+        
+    def _row(self, point, session_name: Optional[str] = None) -> tuple:
+        return self.store.row(
+            self.store.session_key(session_name),
+            self.store.instrument_key(point.instrument_id),
+            point.timestamp,
+            voltage=point.voltage,
+            current=point.current,
+            resistance=point.resistance,
+            power=point.power,
+            temperature=point.temperature,
+            metadata=point.metadata
+        )
+        
     def save_point(self, point) -> bool:
-        """保存數據點到SQLite"""
+        """保存數據點到SQLite (入列，由寫入執行緒批量提交)"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute('''
-                    INSERT INTO measurements 
-                    (timestamp, instrument_id, voltage, current, resistance, power, temperature, metadata)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    point.timestamp.isoformat(),
-                    point.instrument_id,
-                    point.voltage,
-                    point.current,
-                    point.resistance,
-                    point.power,
-                    point.temperature,
-                    json.dumps(point.metadata) if point.metadata else None
-                ))
-                
+            self.store.submit([self._row(point)])
             return True
             
         except Exception as e:
@@ -229,60 +746,69 @@ class SQLiteStorage(StorageBackend):
             return False
             
     def save_session(self, session_name: str, points: List) -> str:
-        """保存會話到SQLite"""
+        """保存會話到SQLite (批量寫入並等待完成)"""
+        return self.save_session_chunks(session_name, [points])
+        
+    def save_session_chunks(self, session_name: str, chunks: Iterable[List]) -> str:
+        """分段保存會話到SQLite (逐段批量寫入，寫入佇列已滿時等待)，等待全部完成"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                for point in points:
-                    conn.execute('''
-                        INSERT INTO measurements 
-                        (timestamp, instrument_id, session_name, voltage, current, resistance, power, temperature, metadata)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        point.timestamp.isoformat(),
-                        point.instrument_id,
-                        session_name,
-                        point.voltage,
-                        point.current,
-                        point.resistance,
-                        point.power,
-                        point.temperature,
-                        json.dumps(point.metadata) if point.metadata else None
-                    ))
-                    
-            self.logger.info(f"會話已保存到SQLite: {session_name} ({len(points)} 個點)")
+            errors = self._writer.errors
+            batch_size = self._writer.batch_size
+            total, first, last = 0, None, None
+            for points in chunks:
+                if not points:
+                    continue
+                for start in range(0, len(points), batch_size):
+                    self.store.submit([
+                        self._row(point, session_name) for point in points[start:start + batch_size]
+                    ])
+                timestamps = [point.timestamp for point in points]
+                first = min(timestamps) if first is None else min(first, min(timestamps))
+                last = max(timestamps) if last is None else max(last, max(timestamps))
+                total += len(points)
+            self.store.flush()
+            if self._writer.errors > errors:
+                raise RuntimeError(self._writer.last_error)
+            if total:
+                self.store.open_session(session_name, start_ns=first)
+                self.store.update_session(session_name, end_ns=last, total_points=total)
+                
+            self.logger.info(f"會話已保存到SQLite: {session_name} ({total} 個點)")
             return str(self.db_path)
             
         except Exception as e:
             self.logger.error(f"保存SQLite會話失敗: {e}")
             raise
             
+    def flush(self):
+        """等待寫入佇列清空"""
+        self.store.flush()
+        
+    def close(self):
+        """寫入剩餘數據 (存儲由同一檔案的使用者共用，程式結束時關閉)"""
+        self.store.flush()
+        
+    def get_writer_stats(self) -> Dict[str, Any]:
+        """寫入執行緒統計：佇列深度、批量大小與寫入延遲"""
+        return self._writer.stats()
+        
+    def iter_columns(self, session_name: str, columns: Optional[Iterable[str]] = None,
+                     start_ns: Optional[int] = None, end_ns: Optional[int] = None,
+                     chunk_size: Optional[int] = 65536) -> Iterator[SessionColumns]:
+        """以游標分段讀取 (只查詢需要的欄位，附加資訊保持 JSON 字串)"""
+        yield from self.store.iter_columns(
+            session=session_name, start_ns=start_ns, end_ns=end_ns,
+            columns=columns, chunk_size=chunk_size
+        )
+        
     def load_session(self, session_name: str) -> List:
         """從SQLite載入會話數據"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute('''
-                    SELECT timestamp, instrument_id, voltage, current, resistance, power, temperature, metadata
-                    FROM measurements 
-                    WHERE session_name = ?
-                    ORDER BY timestamp
-                ''', (session_name,))
-                
-                points = []
-                for row in cursor.fetchall():
-                    point_dict = {
-                        'timestamp': row[0],
-                        'instrument_id': row[1], 
-                        'voltage': row[2],
-                        'current': row[3],
-                        'resistance': row[4],
-                        'power': row[5],
-                        'temperature': row[6],
-                        'metadata': json.loads(row[7]) if row[7] else None
-                    }
-                    points.append(point_dict)
-                    
-                return points
-                
+            points = self.store.query(session=session_name)
+            for point in points:
+                del point['session_name'], point['seq']
+            return points
+            
         except Exception as e:
             self.logger.error(f"載入SQLite會話失敗: {e}")
             return []
\ No newline at end of file
@@ -0,0 +1,526 @@
+#!/usr/bin/env python3
+"""
+串流檔案讀寫
+追加寫入的文字檔案：大緩衝寫入、定期 flush/fsync、按大小或時間輪替，
+寫入中的檔案帶 .partial 後綴，完成後原子地改為正式名稱；
+文字檔案可經由背景壓縮寫入 (<名稱>.csv.zst 等)，讀取時自動解壓縮；
+JSON Lines 檔案可逐行讀取，或在寫入期間持續追蹤；
+Parquet 檔案以列組 (row group) 串流寫入
+"""
+
+import importlib.util
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from src.data.compression import CODEC_SUFFIXES, codec_of, compressed_path, open_input, open_output
+
+PARTIAL_SUFFIX = '.partial'
+
+
+def part_path(path: Path, index: int) -> Path:
+    """第 index 個輪替檔案的正式路徑 (第一個即 path 本身)"""
+    path = Path(path)
+    if index <= 1:
+        return path
+    return path.with_name(f"{path.stem}_part{index}{path.suffix}")
+
+
+def existing_parts(path: Path, include_partial: bool = False) -> List[Path]:
+    """已完成的輪替檔案 (按順序，包含壓縮的檔案)
+    
+    Args:
+        path: 第一個檔案的正式路徑
+        include_partial: 是否包含仍在寫入中 (或崩潰後遺留) 的 .partial 檔案
+        
+    Returns:
+        List[Path]: 檔案路徑
+    """
+    path = Path(path)
+    codecs = '|'.join(re.escape(suffix) for suffix in CODEC_SUFFIXES.values())
+    pattern = re.compile(
+        rf"^{re.escape(path.stem)}(?:_part(\d+))?{re.escape(path.suffix)}(?:{codecs})?"
+        rf"({re.escape(PARTIAL_SUFFIX)})?$"
+    )
+    found = []
+    if path.parent.exists():
+        for candidate in path.parent.iterdir():
+            match = pattern.match(candidate.name)
+            if match and (include_partial or not match.group(2)):
+                found.append((int(match.group(1) or 1), candidate))
+    return [candidate for _, candidate in sorted(found)]
+
+
+def fsync_directory(directory: Path):
+    """確保目錄項 (改名) 已寫入磁碟；不支援的平台略過"""
+    try:
+        fd = os.open(str(directory), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class RotatingFileWriter:
+    """追加寫入的輪替文字檔案 (非執行緒安全，由呼叫端加鎖)
+    
+    每次 write() 應為完整的記錄 (如一列CSV)，輪替只發生在記錄之間；
+    每個檔案開頭寫入相同的表頭，因此每個輪替檔案都可以單獨讀取。
+    距上次 flush 超過 flush_interval_s 時在寫入後 flush (並 fsync)，
+    flush() 可隨時作為檢查點呼叫，成本只與尚未寫入的數據量有關。
+    設定 compression 時檔案名加上壓縮副檔名，數據由背景執行緒壓縮，
+    每次 flush 寫入同步點，崩潰後保留的檔案可解壓到最後一個檢查點。
+    """
+    
+    def __init__(self, path: Path, header: str = '', buffer_size: int = 1 << 20,
+                 flush_interval_s: float = 1.0, fsync: bool = True,
+                 max_bytes: Optional[int] = None, max_age_s: Optional[float] = None,
+                 encoding: str = 'utf-8', compression: Optional[str] = None,
+                 compression_level: int = 3, compression_block_size: int = 1 << 20):
+        """初始化寫入器 (第一次寫入時才建立檔案)
+        
+        Args:
+            path: 第一個檔案的正式路徑，之後的檔案為 <stem>_partN<suffix>
+            header: 每個檔案開頭的表頭
+            buffer_size: 寫入緩衝大小 (bytes)
+            flush_interval_s: 定期 flush 的間隔
+            fsync: flush 時是否 fsync
+            max_bytes: 單一檔案的未壓縮大小上限，None表示不限制
+            max_age_s: 單一檔案的時間上限，None表示不限制
+            encoding: 文字編碼
+            compression: 壓縮方式 ('zstd'/'gzip')，None表示不壓縮
+            compression_level: 壓縮等級
+            compression_block_size: 交給壓縮執行緒的區塊大小 (bytes)
+        """
+        self.path = Path(path)
+        self.header = header
+        self.buffer_size = buffer_size
+        self.flush_interval_s = flush_interval_s
+        self.fsync = fsync
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.encoding = encoding
+        self.compression = compression
+        self.compression_level = compression_level
+        self.compression_block_size = compression_block_size
+        
+        self.parts: List[Path] = []  # 已完成的檔案
+        self._file = None
+        self._index = 0
+        self._bytes = 0
+        self._opened_at = 0.0
+        self._last_flush = 0.0
+        
+        # 統計
+        self.records = 0
+        self.bytes_written = 0
+        self.flushes = 0
+        self.rotations = 0
+        
+    @property
+    def current_path(self) -> Optional[Path]:
+        """寫入中的 .partial 檔案"""
+        if self._file is None:
+            return None
+        final = self._final_path(self._index)
+        return final.with_name(final.name + PARTIAL_SUFFIX)
+        
+    def _final_path(self, index: int) -> Path:
+        return compressed_path(part_path(self.path, index), self.compression)
+        
+    def _taken(self, index: int) -> bool:
+        final = part_path(self.path, index)
+        return any(
+            final.with_name(final.name + codec_suffix + partial_suffix).exists()
+            for codec_suffix in ('',) + tuple(CODEC_SUFFIXES.values())
+            for partial_suffix in ('', PARTIAL_SUFFIX)
+        )
+        
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # 同名檔案已存在 (如重複使用會話名稱，壓縮與否皆算) 時接續編號，不覆蓋
+        self._index += 1
+        while self._taken(self._index):
+            self._index += 1
+        final = self._final_path(self._index)
+        partial = final.with_name(final.name + PARTIAL_SUFFIX)
+        self._file = open_output(partial, self.compression, self.compression_level,
+                                 self.compression_block_size, encoding=self.encoding,
+                                 buffer_size=self.buffer_size)
+        self._bytes = 0
+        self._opened_at = self._last_flush = time.monotonic()
+        if self.header:
+            self._file.write(self.header)
+            self._bytes += self._encoded_size(self.header)
+            
+    def _encoded_size(self, text: str) -> int:
+        """編碼後的位元組數 (ASCII 文字免編碼)"""
+        return len(text) if text.isascii() else len(text.encode(self.encoding))
+            
+    def _rotation_due(self) -> bool:
+        if self.max_bytes and self._bytes >= self.max_bytes:
+            return True
+        return bool(self.max_age_s) and time.monotonic() - self._opened_at >= self.max_age_s
+        
+    def write(self, text: str):
+        """寫入一筆完整的記錄"""
+        if self._file is None:
+            self._open()
+        elif self._rotation_due():
+            self._finalize_current()
+            self.rotations += 1
+            self._open()
+            
+        self._file.write(text)
+        size = self._encoded_size(text)
+        self._bytes += size
+        self.bytes_written += size
+        self.records += 1
+        if time.monotonic() - self._last_flush >= self.flush_interval_s:
+            self.flush()
+            
+    def flush(self, fsync: Optional[bool] = None):
+        """將緩衝寫入檔案 (檢查點)
+        
+        Args:
+            fsync: 是否 fsync，None使用初始化時的設定
+        """
+        if self._file is None:
+            return
+        self._file.flush()
+        if self.fsync if fsync is None else fsync:
+            os.fsync(self._file.fileno())
+        self._last_flush = time.monotonic()
+        self.flushes += 1
+        
+    def _finalize_current(self):
+        partial = self.current_path
+        self.flush(fsync=True)
+        self._file.close()
+        self._file = None
+        final = self._final_path(self._index)
+        os.replace(partial, final)
+        fsync_directory(final.parent)
+        self.parts.append(final)
+        
+    def close(self) -> List[Path]:
+        """寫入剩餘數據並完成目前的檔案
+        
+        Returns:
+            List[Path]: 本寫入器完成的所有檔案
+        """
+        if self._file is not None:
+            self._finalize_current()
+        return list(self.parts)
+        
+    def stats(self) -> Dict[str, Any]:
+        """寫入統計"""
+        return {
+            'path': str(self.path),
+            'current_file': str(self.current_path) if self._file is not None else None,
+            'files': len(self.parts) + (1 if self._file is not None else 0),
+            'records': self.records,
+            'bytes_written': self.bytes_written,  # 未壓縮
+            'compression': self.compression,
+            'flushes': self.flushes,
+            'rotations': self.rotations
+        }
+
+
+def iter_jsonl(path: Path) -> Iterator[Dict[str, Any]]:
+    """逐行讀取 JSON Lines 檔案 (略過空行與未寫完的最後一行，壓縮檔案自動解壓縮)"""
+    with open_input(path) as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_jsonl_chunks(path: Path, chunk_size: Optional[int] = 65536) -> Iterator[List[Dict[str, Any]]]:
+    """分段讀取 JSON Lines 檔案，每段的所有行以一次 json.loads 解析
+    
+    Args:
+        path: 檔案路徑
+        chunk_size: 每段最多的記錄數，None表示整個檔案一段
+        
+    Yields:
+        List[Dict]: 記錄列表
+    """
+    with open_input(path) as f:
+        lines = []
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            if line.strip():
+                lines.append(line)
+                if chunk_size and len(lines) >= chunk_size:
+                    yield json.loads(b'[' + b','.join(lines) + b']')
+                    lines = []
+        if lines:
+            yield json.loads(b'[' + b','.join(lines) + b']')
+
+
+class JSONLTail:
+    """追蹤寫入中的 JSON Lines 檔案 (可在其他程序中使用)
+    
+    每次 poll() 返回上次之後新增的完整記錄；寫入中的 .partial 檔案完成改名
+    或輪替到下一個檔案時自動接續。壓縮的檔案只能從頭解壓縮，
+    每次 poll() 的成本與檔案大小成正比，可見的數據停在寫入端最後一個檢查點。
+    """
+    
+    def __init__(self, path: Path):
+        """初始化
+        
+        Args:
+            path: 第一個檔案的正式路徑 (如 data/session.jsonl)
+        """
+        self.path = Path(path)
+        self._index = 1
+        self._offset = 0
+        
+    def _locate(self, index: int) -> Optional[Path]:
+        base = part_path(self.path, index)
+        for codec_suffix in ('',) + tuple(CODEC_SUFFIXES.values()):
+            final = base.with_name(base.name + codec_suffix)
+            partial = final.with_name(final.name + PARTIAL_SUFFIX)
+            if partial.exists():
+                return partial
+            if final.exists():
+                return final
+        return None
+        
+    @staticmethod
+    def _skip(f, count: int):
+        while count > 0:
+            data = f.read(min(count, 1 << 20))
+            if not data:
+                return
+            count -= len(data)
+        
+    def poll(self, max_records: Optional[int] = None) -> List[Dict[str, Any]]:
+        """讀取新增的完整記錄
+        
+        Args:
+            max_records: 最多返回的記錄數，None表示全部
+            
+        Returns:
+            List[Dict]: 新記錄 (沒有新數據時為空列表)
+        """
+        records: List[Dict[str, Any]] = []
+        while max_records is None or len(records) < max_records:
+            current = self._locate(self._index)
+            if current is None:
+                break
+            try:
+                with open_input(current) as f:
+                    if codec_of(current):
+                        self._skip(f, self._offset)
+                    else:
+                        f.seek(self._offset)
+                    for line in f:
+                        if not line.endswith(b'\n'):
+                            break
+                        self._offset += len(line)
+                        if line.strip():
+                            records.append(json.loads(line))
+                            if max_records is not None and len(records) >= max_records:
+                                return records
+            except FileNotFoundError:
+                continue  # 讀取前剛好完成改名，重新定位
+                
+            # 已完成的檔案讀完且下一個檔案已出現時接續
+            if current.name.endswith(PARTIAL_SUFFIX) or self._locate(self._index + 1) is None:
+                break
+            self._index += 1
+            self._offset = 0
+        return records
+
+
+class ParquetStreamWriter:
+    """Parquet 串流寫入 (非執行緒安全，由呼叫端加鎖；需要 pyarrow)
+    
+    數據點先累積在各欄位的列表中，達到 row_group_rows 或呼叫 flush() 時
+    轉為型別化的 Arrow 批次並寫成一個列組；儀器ID以字典編碼，數值欄位為
+    float64，時間戳為 int64 epoch ns，每個列組都帶有統計 (min/max)，
+    讀取時可依時間範圍略過整個列組。檔案尾 (footer) 在 close() 時寫入，
+    此前檔案帶 .partial 後綴且不可讀取。
+    """
+    
+    FIELDS = ('timestamp', 'instrument_id', 'voltage', 'current',
+              'resistance', 'power', 'temperature', 'metadata')
+    FLOAT_FIELDS = ('voltage', 'current', 'resistance', 'power', 'temperature')
+    
+    def __init__(self, path: Path, row_group_rows: int = 65536,
+                 compression: str = 'zstd', compression_level: Optional[int] = 3,
+                 buffer_size: int = 1 << 20, fsync: bool = True):
+        """初始化寫入器 (第一次寫入時才建立檔案)
+        
+        Args:
+            path: 檔案的正式路徑，已存在時改用 <stem>_partN<suffix>
+            row_group_rows: 每個列組的數據點數
+            compression: 壓縮方式 (zstd/snappy/gzip/none)
+            compression_level: 壓縮等級，None使用預設
+            buffer_size: 檔案寫入緩衝大小 (bytes)
+            fsync: flush 時是否 fsync
+        """
+        self.require()
+        self.path = Path(path)
+        self.row_group_rows = row_group_rows
+        self.compression = compression
+        self.compression_level = compression_level
+        self.buffer_size = buffer_size
+        self.fsync = fsync
+        
+        self.parts: List[Path] = []
+        self._columns: Dict[str, list] = {name: [] for name in self.FIELDS}
+        self._file = None
+        self._writer = None
+        self._final: Optional[Path] = None
+        
+        # 統計
+        self.records = 0
+        self.row_groups = 0
+        self.flushes = 0
+        
+    @staticmethod
+    def require():
+        """確認 pyarrow 可用 (不載入模組)"""
+        if importlib.util.find_spec('pyarrow') is None:
+            raise ImportError("需要安裝 pyarrow 來支援Parquet存儲")
+            
+    @classmethod
+    def schema(cls):
+        """Arrow schema：儀器ID字典編碼，其餘為固定型別"""
+        import pyarrow as pa
+        return pa.schema(
+            [
+                pa.field('timestamp', pa.int64(), nullable=False),  # Unix epoch ns
+                pa.field('instrument_id', pa.dictionary(pa.int32(), pa.string()))
+            ]
+            + [pa.field(name, pa.float64()) for name in cls.FLOAT_FIELDS]
+            + [pa.field('metadata', pa.string())]  # JSON，僅少數數據點有值
+        )
+        
+    @classmethod
+    def record_batch(cls, columns: Dict[str, list]):
+        """由各欄位的列表建立型別化的 Arrow 批次"""
+        import pyarrow as pa
+        schema = cls.schema()
+        arrays = [
+            pa.array(columns['timestamp'], pa.int64()),
+            pa.array(columns['instrument_id'], pa.string()).dictionary_encode()
+        ]
+        arrays += [pa.array(columns[name], pa.float64()) for name in cls.FLOAT_FIELDS]
+        arrays.append(pa.array(columns['metadata'], pa.string()))
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+        
+    @classmethod
+    def columns_from(cls, points: Iterable) -> Dict[str, list]:
+        """數據點 (物件或字典) 轉為各欄位的列表"""
+        columns: Dict[str, list] = {name: [] for name in cls.FIELDS}
+        cls._extend(columns, points)
+        return columns
+        
+    @classmethod
+    def _extend(cls, columns: Dict[str, list], points: Iterable):
+        targets = [columns[name] for name in cls.FIELDS]
+        for point in points:
+            if isinstance(point, dict):
+                values = [point.get(name) for name in cls.FIELDS]
+            else:
+                values = [getattr(point, name, None) for name in cls.FIELDS]
+            metadata = values[-1]
+            if metadata is not None and not isinstance(metadata, str):
+                values[-1] = json.dumps(metadata)
+            for target, value in zip(targets, values):
+                target.append(value)
+            
+    def _open(self):
+        import pyarrow.parquet as pq
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        index = 0
+        while True:
+            index += 1
+            final = part_path(self.path, index)
+            partial = final.with_name(final.name + PARTIAL_SUFFIX)
+            if not (final.exists() or partial.exists()):
+                break
+        self._final = final
+        self._file = open(partial, 'wb', buffering=self.buffer_size)
+        self._writer = pq.ParquetWriter(
+            self._file, self.schema(),
+            compression=self.compression,
+            compression_level=self.compression_level,
+            use_dictionary=['instrument_id'],
+            write_statistics=True
+        )
+        
+    def write_points(self, points: Iterable):
+        """追加數據點；累積滿一個列組時寫入"""
+        self._extend(self._columns, points)
+        while len(self._columns['timestamp']) >= self.row_group_rows:
+            self._write_row_group(self.row_group_rows)
+            
+    def _write_row_group(self, count: int):
+        import pyarrow as pa
+        if self._writer is None:
+            self._open()
+        rows = {name: values[:count] for name, values in self._columns.items()}
+        for values in self._columns.values():
+            del values[:count]
+        table = pa.Table.from_batches([self.record_batch(rows)])
+        self._writer.write_table(table, row_group_size=count)
+        self.records += count
+        self.row_groups += 1
+        
+    def flush(self, fsync: Optional[bool] = None):
+        """將累積的數據點寫成列組並寫入檔案 (檢查點)"""
+        pending = len(self._columns['timestamp'])
+        if pending:
+            self._write_row_group(pending)
+        if self._file is None:
+            return
+        self._file.flush()
+        if self.fsync if fsync is None else fsync:
+            os.fsync(self._file.fileno())
+        self.flushes += 1
+        
+    def close(self) -> List[Path]:
+        """寫入剩餘數據與檔案尾，並改為正式名稱
+        
+        Returns:
+            List[Path]: 完成的檔案
+        """
+        pending = len(self._columns['timestamp'])
+        if pending:
+            self._write_row_group(pending)
+        if self._writer is not None:
+            self._writer.close()
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            partial = self._final.with_name(self._final.name + PARTIAL_SUFFIX)
+            os.replace(partial, self._final)
+            fsync_directory(self._final.parent)
+            self.parts.append(self._final)
+            self._writer = None
+            self._file = None
+        return list(self.parts)
+        
+    def stats(self) -> Dict[str, Any]:
+        """寫入統計"""
+        return {
+            'path': str(self._final or self.path),
+            'records': self.records,
+            'pending': len(self._columns['timestamp']),
+            'row_groups': self.row_groups,
+            'flushes': self.flushes
+        }
\ No newline at end of file
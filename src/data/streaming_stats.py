@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+串流統計
+每個樣本只更新一次的 O(1) 統計：滑動窗口的 Welford 平均/方差、
+單調佇列的最大/最小值、有序窗口的中位數，以及整個會話的累計統計
+"""
+
+import math
+import threading
+from bisect import bisect_left, insort
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class RollingStats:
+    """滑動窗口統計
+    
+    - 平均/方差：Welford 演算法，值進出窗口時各更新一次 (O(1))
+    - 最大/最小：單調佇列，均攤 O(1)
+    - 中位數：有序窗口，二分定位 (窗口大小為數百時插入/刪除的搬移可忽略)
+    """
+    
+    # 每移出 RESYNC_INTERVAL × 窗口大小 個值後重算一次平均/方差
+    RESYNC_INTERVAL = 64
+    
+    def __init__(self, window_size: int = 100):
+        if window_size <= 0:
+            raise ValueError("窗口大小必須大於0")
+        self.window_size = window_size
+        self.reset()
+        
+    def reset(self):
+        """清空窗口"""
+        self._values: deque = deque()
+        self._sorted: List[float] = []
+        self._max: deque = deque()  # (序號, 值)，值遞減
+        self._min: deque = deque()  # (序號, 值)，值遞增
+        self._index = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._evictions = 0
+        
+    def _resync(self):
+        n = len(self._values)
+        self._mean = math.fsum(self._values) / n
+        self._m2 = math.fsum((x - self._mean) ** 2 for x in self._values)
+        self._evictions = 0
+        
+    def update(self, value: float):
+        """加入一個值；窗口已滿時移出最舊的值"""
+        n = len(self._values)
+        if n == self.window_size:
+            old = self._values.popleft()
+            del self._sorted[bisect_left(self._sorted, old)]
+            # 滑動 Welford：以新值替換舊值
+            old_mean = self._mean
+            self._mean += (value - old) / n
+            self._m2 += (value - old) * (value - self._mean + old - old_mean)
+            self._m2 = max(self._m2, 0.0)
+            self._evictions += 1
+        else:
+            n += 1
+            delta = value - self._mean
+            self._mean += delta / n
+            self._m2 += delta * (value - self._mean)
+            
+        self._values.append(value)
+        insort(self._sorted, value)
+        
+        # 長時間滑動累積的浮點誤差：定期以窗口內數據精確重算 (均攤 O(1))
+        if self._evictions >= self.RESYNC_INTERVAL * self.window_size:
+            self._resync()
+        
+        index = self._index
+        self._index += 1
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((index, value))
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((index, value))
+        expired = index - self.window_size
+        if self._max[0][0] <= expired:
+            self._max.popleft()
+        if self._min[0][0] <= expired:
+            self._min.popleft()
+            
+    @property
+    def count(self) -> int:
+        return len(self._values)
+        
+    @property
+    def mean(self) -> float:
+        return self._mean if self._values else 0.0
+        
+    @property
+    def variance(self) -> float:
+        """母體方差 (與 np.var 一致)"""
+        return self._m2 / len(self._values) if self._values else 0.0
+        
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+        
+    @property
+    def min(self) -> float:
+        return self._min[0][1] if self._min else 0.0
+        
+    @property
+    def max(self) -> float:
+        return self._max[0][1] if self._max else 0.0
+        
+    @property
+    def median(self) -> float:
+        n = len(self._sorted)
+        if n == 0:
+            return 0.0
+        mid = n // 2
+        if n % 2:
+            return self._sorted[mid]
+        return (self._sorted[mid - 1] + self._sorted[mid]) / 2
+        
+    def snapshot(self) -> Dict[str, float]:
+        """當前窗口統計"""
+        return {
+            'mean': self.mean,
+            'std': self.std,
+            'min': self.min,
+            'max': self.max,
+            'median': self.median,
+            'count': self.count
+        }
+
+
+class CumulativeStats:
+    """累計統計 (整個會話)，Welford 平均/方差與極值"""
+    
+    def __init__(self):
+        self.reset()
+        
+    def reset(self):
+        """重新開始累計"""
+        self.count = 0
+        self.total = 0.0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        
+    def update(self, value: float):
+        """加入一個值"""
+        self.count += 1
+        self.total += value
+        delta = value - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (value - self._mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        
+    @property
+    def mean(self) -> float:
+        return self._mean if self.count else 0.0
+        
+    @property
+    def std(self) -> float:
+        return math.sqrt(self._m2 / self.count) if self.count else 0.0
+        
+    def snapshot(self) -> Dict[str, float]:
+        """累計統計"""
+        return {
+            'mean': self.mean,
+            'std': self.std,
+            'min': self.min if self.min is not None else 0.0,
+            'max': self.max if self.max is not None else 0.0,
+            'sum': self.total,
+            'count': self.count
+        }
+
+
+class ChannelStatistics:
+    """單一通道 (如電壓) 的滑動窗口與會話累計統計"""
+    
+    def __init__(self, window_size: int = 100):
+        self.rolling = RollingStats(window_size)
+        self.session = CumulativeStats()
+        
+    def update(self, value: Optional[float]):
+        """加入一個值，None/NaN/inf 略過"""
+        if value is None or not math.isfinite(value):
+            return
+        self.rolling.update(value)
+        self.session.update(value)
+        
+    def zscore(self, value: float) -> Optional[float]:
+        """相對於當前窗口的 Z-score，標準差為0時為 None"""
+        std = self.rolling.std
+        if std <= 0:
+            return None
+        return abs(value - self.rolling.mean) / std
+        
+    def reset(self):
+        """清空窗口與累計"""
+        self.rolling.reset()
+        self.session.reset()
+
+
+class StreamingStatistics:
+    """多通道串流統計 (每台儀器一個)
+    
+    每個樣本呼叫一次 update()，之後GUI、異常檢測與會話摘要
+    直接讀取結果，無需重新掃描歷史數據。實例由接收數據的元件擁有
+    (數據管理器每台儀器一個；GUI建立後傳給數據記錄器)，讀取者共用同一實例。
+    update() 與讀取可在不同執行緒，以內部鎖保護。
+    """
+    
+    DEFAULT_CHANNELS = ('voltage', 'current', 'power', 'resistance')
+    
+    def __init__(self, window_size: int = 100, channels: Iterable[str] = DEFAULT_CHANNELS):
+        """初始化串流統計
+        
+        Args:
+            window_size: 滑動窗口大小
+            channels: 通道名稱 (數據點屬性名)
+        """
+        self.window_size = window_size
+        self.channels: Dict[str, ChannelStatistics] = {
+            name: ChannelStatistics(window_size) for name in channels
+        }
+        self.first_timestamp: Optional[int] = None
+        self.last_timestamp: Optional[int] = None
+        self._lock = threading.RLock()
+        
+    def update(self, point: Any = None, **values: Optional[float]):
+        """以數據點或關鍵字參數更新各通道
+        
+        Args:
+            point: 具有通道同名屬性的數據點 (如 MeasurementPoint)
+            **values: 直接提供的通道值，覆蓋數據點屬性
+        """
+        timestamp = getattr(point, 'timestamp', None)
+        with self._lock:
+            for name, channel in self.channels.items():
+                value = values[name] if name in values else getattr(point, name, None)
+                channel.update(value)
+                
+            if isinstance(timestamp, int):
+                if self.first_timestamp is None:
+                    self.first_timestamp = timestamp
+                self.last_timestamp = timestamp
+            
+    @property
+    def count(self) -> int:
+        """滑動窗口中的樣本數 (以第一個通道為準)"""
+        return next(iter(self.channels.values())).rolling.count if self.channels else 0
+        
+    def __getitem__(self, name: str) -> ChannelStatistics:
+        return self.channels[name]
+        
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """各通道的滑動窗口統計 (無數據的通道略過)"""
+        with self._lock:
+            return {
+                name: channel.rolling.snapshot()
+                for name, channel in self.channels.items() if channel.rolling.count
+            }
+        
+    def session_snapshot(self) -> Dict[str, Dict[str, float]]:
+        """各通道的會話累計統計 (無數據的通道略過)"""
+        with self._lock:
+            return {
+                name: channel.session.snapshot()
+                for name, channel in self.channels.items() if channel.session.count
+            }
+        
+    def detect_anomalies(self, point: Any = None, threshold: float = 3.0,
+                         min_count: int = 10,
+                         channels: Optional[Iterable[str]] = None,
+                         **values: Optional[float]) -> List[str]:
+        """以當前窗口的 Z-score 檢測異常
+        
+        Args:
+            point: 數據點
+            threshold: 標準差倍數
+            min_count: 窗口中最少樣本數
+            channels: 檢查的通道，None表示全部
+            **values: 直接提供的通道值
+            
+        Returns:
+            List[str]: 異常標記，如 "voltage_anomaly"
+        """
+        anomalies = []
+        with self._lock:
+            for name in channels or self.channels:
+                channel = self.channels[name]
+                value = values[name] if name in values else getattr(point, name, None)
+                if value is None or channel.rolling.count < min_count:
+                    continue
+                z = channel.zscore(value)
+                if z is not None and z > threshold:
+                    anomalies.append(f"{name}_anomaly")
+        return anomalies
+        
+    def reset_session(self):
+        """清空累計統計，保留滑動窗口"""
+        with self._lock:
+            for channel in self.channels.values():
+                channel.session.reset()
+            self.first_timestamp = None
+            self.last_timestamp = None
+        
+    def reset(self):
+        """清空所有統計 (新會話開始時呼叫)"""
+        with self._lock:
+            for channel in self.channels.values():
+                channel.reset()
+            self.first_timestamp = None
+            self.last_timestamp = None
\ No newline at end of file
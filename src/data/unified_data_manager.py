@@ -5,24 +5,47 @@
 提供高性能、統一的數據管理介面
 """
 
+import heapq
 import threading
+from bisect import bisect_left, bisect_right, insort
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Callable, Tuple
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Callable, Iterator, Tuple
 from dataclasses import dataclass, asdict
-from collections import defaultdict
-from PyQt6.QtCore import QObject, pyqtSignal, QTimer
+
+import numpy as np
 
 from .buffer_manager import BufferManager
-from .storage_backends import StorageBackend, CSVStorage, JSONStorage, SQLiteStorage
+from .storage_backends import (
+    CSVStorage, JSONStorage, ParquetStorage, BinaryStorage, SQLiteStorage
+)
 from .export_manager import ExportManager, ExportFormat
+from .export_jobs import ExportJob, get_export_service
+from .columnar import SessionColumns, chunk_points
+from .rollups import CHANNELS, aggregate_columns, summarize_series
+from .session_journal import SessionJournal
+from .streaming_stats import StreamingStatistics
+from .memory_governor import BudgetedList, get_memory_governor
+from .ingest import IngestStage, InstrumentedLock
 from src.config import get_config
+from src.engine.clock import as_epoch_ns, epoch_ns_to_datetime, now_epoch_ns
+from src.engine.signals import Signal
+from src.engine.timer import PeriodicTimer
 from src.unified_logger import get_logger
 
 
+def _timestamp_key(point) -> int:
+    return point.timestamp
+
+
 @dataclass
 class MeasurementPoint:
-    """標準化測量數據點"""
-    timestamp: datetime
+    """標準化測量數據點
+    
+    timestamp 為 Unix epoch 奈秒整數 (int64)，從採集、緩存到存儲都保持此形式，
+    僅在顯示/導出時轉換為可讀時間；傳入 datetime 或ISO字串時自動轉換。
+    """
+    timestamp: int
     instrument_id: str
     voltage: float
     current: float
@@ -33,33 +56,54 @@ class MeasurementPoint:
     
     def __post_init__(self):
         """計算衍生值"""
+        if type(self.timestamp) is not int:
+            self.timestamp = as_epoch_ns(self.timestamp)
         if self.resistance is None and self.current != 0:
             self.resistance = self.voltage / self.current
         if self.power is None:
             self.power = self.voltage * self.current
             
     def to_dict(self) -> Dict[str, Any]:
-        """轉換為字典格式"""
-        result = asdict(self)
-        result['timestamp'] = self.timestamp.isoformat()
-        return result
+        """轉換為字典格式 (timestamp 保持 epoch ns)"""
+        return asdict(self)
+        
+    def to_datetime(self) -> datetime:
+        """採集時間 (本地時間，顯示用)"""
+        return epoch_ns_to_datetime(self.timestamp)
 
 
 class DataAnalytics:
-    """實時數據分析器"""
+    """實時數據分析器
+    
+    每台儀器一個 StreamingStatistics (屬於此管理器)，每個數據點只更新
+    一次；統計、異常檢測與會話摘要直接讀取同一串流，不重新掃描歷史窗口。
+    """
     
     def __init__(self, window_size: int = 100):
         self.window_size = window_size
         self.analysis_functions: List[Callable] = []
         self.anomaly_threshold = 3.0  # 標準差倍數
+        self.streams: Dict[str, StreamingStatistics] = {}
         
     def add_analysis_function(self, func: Callable):
-        """添加分析函數"""
+        """添加分析函數 func(point, historical_data)，historical_data 為列式窗口"""
         self.analysis_functions.append(func)
         
+    def get_stream(self, instrument_id: str) -> StreamingStatistics:
+        """獲取 (必要時建立) 儀器的串流統計"""
+        stream = self.streams.get(instrument_id)
+        if stream is None:
+            stream = self.streams[instrument_id] = StreamingStatistics(self.window_size)
+        return stream
+        
     def analyze_point(self, point: MeasurementPoint, 
-                     historical_data: List[MeasurementPoint]) -> Dict[str, Any]:
-        """分析數據點"""
+                     historical_data=None) -> Dict[str, Any]:
+        """更新串流統計並分析數據點
+        
+        Args:
+            point: 新數據點
+            historical_data: 列式歷史窗口，僅傳給自定義分析函數
+        """
         analysis_result = {
             'timestamp': point.timestamp,
             'anomalies': [],
@@ -67,10 +111,15 @@ class DataAnalytics:
             'alerts': []
         }
         
+        stream = self.get_stream(point.instrument_id)
+        stream.update(point)
+        
         # 基本統計分析
-        if len(historical_data) >= 10:
-            analysis_result['statistics'] = self._calculate_statistics(historical_data)
-            analysis_result['anomalies'] = self._detect_anomalies(point, historical_data)
+        if stream.count >= 10:
+            analysis_result['statistics'] = stream.snapshot()
+            analysis_result['anomalies'] = stream.detect_anomalies(
+                point, self.anomaly_threshold, channels=('voltage', 'current', 'power')
+            )
             
         # 執行自定義分析函數
         for func in self.analysis_functions:
@@ -83,57 +132,64 @@ class DataAnalytics:
                 
         return analysis_result
         
-    def _calculate_statistics(self, data: List[MeasurementPoint]) -> Dict[str, Dict[str, float]]:
+    def reset_session(self):
+        """開始新會話時清空各儀器的滑動窗口與累計統計，不沿用前一會話的狀態"""
+        for stream in self.streams.values():
+            stream.reset()
+            
+    def reset(self, instrument_id: Optional[str] = None):
+        """清空串流統計"""
+        if instrument_id is None:
+            streams = list(self.streams.values())
+        else:
+            streams = [self.streams[instrument_id]] if instrument_id in self.streams else []
+        # 原地清空，已取得實例的讀取者看到一致的結果
+        for stream in streams:
+            stream.reset()
+            
+    @staticmethod
+    def _as_columns(data) -> Dict[str, Any]:
+        """將 MeasurementPoint 列表轉為列式窗口；已是列式時原樣返回"""
+        import numpy as np
+        
+        if isinstance(data, dict):
+            return data
+        return {
+            'timestamp': np.array([p.timestamp for p in data], dtype=np.int64),
+            **{
+                param: np.array([np.nan if getattr(p, param) is None else getattr(p, param)
+                                 for p in data], dtype=float)
+                for param in ('voltage', 'current', 'power', 'resistance')
+            }
+        }
+        
+    def _calculate_statistics(self, data) -> Dict[str, Dict[str, float]]:
         """計算統計數據"""
         import numpy as np
         
+        data = self._as_columns(data)
         stats = {}
-        recent_data = data[-self.window_size:]
         
         for param in ['voltage', 'current', 'power', 'resistance']:
-            values = [getattr(point, param) for point in recent_data 
-                     if getattr(point, param) is not None]
+            if param not in data:
+                continue
+            values_array = data[param][-self.window_size:]
+            values_array = values_array[~np.isnan(values_array)]
             
-            if values:
-                values_array = np.array(values)
+            if values_array.size:
                 stats[param] = {
                     'mean': float(np.mean(values_array)),
                     'std': float(np.std(values_array)),
                     'min': float(np.min(values_array)),
                     'max': float(np.max(values_array)),
                     'median': float(np.median(values_array)),
-                    'count': len(values)
+                    'count': int(values_array.size)
                 }
                 
         return stats
-        
-    def _detect_anomalies(self, point: MeasurementPoint, 
-                         data: List[MeasurementPoint]) -> List[str]:
-        """檢測異常值"""
-        import numpy as np
-        
-        anomalies = []
-        recent_data = data[-self.window_size:]
-        
-        for param in ['voltage', 'current', 'power']:
-            current_value = getattr(point, param)
-            if current_value is None:
-                continue
-                
-            historical_values = [getattr(p, param) for p in recent_data 
-                                if getattr(p, param) is not None]
-            
-            if len(historical_values) >= 10:
-                mean = np.mean(historical_values)
-                std = np.std(historical_values)
-                
-                if std > 0 and abs(current_value - mean) > self.anomaly_threshold * std:
-                    anomalies.append(f"{param}_anomaly")
-                    
-        return anomalies
 
 
-class UnifiedDataManager(QObject):
+class UnifiedDataManager:
     """統一數據管理器
     
     整合了原有的 DataLogger 和 EnhancedDataLogger 功能：
@@ -141,20 +197,40 @@ class UnifiedDataManager(QObject):
     - 持久化存儲
     - 數據分析
     - 靈活導出
+    
+    add_measurement() 只把數據點放入該儀器/執行緒專用的 SPSC 佇列；
+    接收執行緒批量完成緩存與分析，再交給持久化執行緒寫入存儲。
+    共用鎖內不做I/O也不發送信號；讀取會話/導出前先 flush() 等待佇列清空。
+    
+    不依賴Qt；data_point_added/analysis_ready 在接收執行緒中發送，
+    GUI請透過 src.data.qt_adapter.QtDataManagerAdapter 接收。
     """
     
     # 信號
-    data_point_added = pyqtSignal(dict)  # 新數據點
-    session_started = pyqtSignal(str)    # 會話開始
-    session_ended = pyqtSignal(str, dict)  # 會話結束，統計信息
-    analysis_ready = pyqtSignal(str, dict)  # 分析結果
-    storage_error = pyqtSignal(str)      # 存儲錯誤
+    data_point_added = Signal(dict)  # 新數據點
+    session_started = Signal(str)    # 會話開始
+    session_ended = Signal(str, dict)  # 會話結束，統計信息
+    analysis_ready = Signal(str, dict)  # 分析結果
+    storage_error = Signal(str)      # 存儲錯誤
     
-    def __init__(self):
-        super().__init__()
+    def __init__(self, base_path: Optional[str] = None,
+                 default_format: Optional[str] = None,
+                 auto_save: Optional[bool] = None):
+        """初始化數據管理器
+        
+        Args:
+            base_path: 存儲目錄，None使用配置值
+            default_format: 預設存儲格式 ("csv"/"json"/"parquet"/"binary"/"sqlite")，None使用配置值
+            auto_save: 是否即時保存數據點及定時備份，None使用配置值
+        """
         self.config = get_config()
         self.logger = get_logger("UnifiedDataManager")
         
+        data_config = self.config.get_data_config('storage')
+        self.base_path = base_path or data_config['base_path']
+        self.default_format = default_format or data_config['default_format']
+        self.auto_save = data_config['auto_save'] if auto_save is None else auto_save
+        
         # 緩存管理
         self.buffer_manager = BufferManager()
         
@@ -169,36 +245,143 @@ class UnifiedDataManager(QObject):
         
         # 會話管理
         self.current_session: Optional[str] = None
-        self.session_data: Dict[str, List[MeasurementPoint]] = defaultdict(list)
+        # 內存中保留最新的 persistent_buffer_size 點，較舊的按策略 (預設 spill) 寫出到磁碟
+        self.session_data: Dict[str, BudgetedList] = {}
+        
+        # 線程安全 (可統計競爭情況)
+        self._lock = InstrumentedLock()
+        
+        # 接收管線：生產者只入列，緩存/分析與持久化各自在階段執行緒中完成
+        ingest_config = self.config.get('data.ingest', {}) or {}
+        stage_options = {
+            'queue_size': ingest_config.get('queue_size', 65536),
+            'batch_size': ingest_config.get('batch_size', 256),
+            'put_timeout_s': ingest_config.get('put_timeout_ms', 100) / 1000.0
+        }
+        self._ingest = IngestStage("DataIngest", self._process_batch, **stage_options)
+        # 持久化階段不丟棄數據：佇列已滿時接收階段等待 (背壓)
+        self._persist = IngestStage(
+            "DataPersist", self._persist_batch, **dict(stage_options, put_timeout_s=None)
+        )
+        
+        # 會話日誌 (非增量寫入的後端)，並在背景恢復前次崩潰遺留的會話
+        self._setup_journal()
         
         # 自動保存定時器
-        self.auto_save_timer = QTimer()
+        self.auto_save_timer = PeriodicTimer("DataManagerAutoSave")
         self.auto_save_timer.timeout.connect(self._auto_save)
         self._setup_auto_save()
         
-        # 線程安全
-        self._lock = threading.RLock()
-        
     def _setup_storage_backends(self):
         """設置存儲後端"""
-        data_config = self.config.get_data_config('storage')
-        
         self.storage_backends = {
-            'csv': CSVStorage(base_path=data_config['base_path']),
-            'json': JSONStorage(base_path=data_config['base_path']),
-            'sqlite': SQLiteStorage(base_path=data_config['base_path'])
+            'csv': CSVStorage(base_path=self.base_path),
+            'json': JSONStorage(base_path=self.base_path),
+            'binary': BinaryStorage(base_path=self.base_path),
+            'sqlite': SQLiteStorage(base_path=self.base_path)
         }
+        try:
+            self.storage_backends['parquet'] = ParquetStorage(base_path=self.base_path)
+        except ImportError as e:
+            self.logger.debug(f"Parquet存儲不可用: {e}")
+            
+        self.default_storage = self.storage_backends[self.default_format]
+        # 支援增量寫入的後端在採集期間直接寫入會話檔案，結束時只需完成檔案
+        self._stream_sessions = self.default_storage.supports_append
         
-        self.default_storage = self.storage_backends[data_config['default_format']]
+        # 多解析度彙總存於 SQLite 存儲：SQLite 會話寫入樣本時自動更新，
+        # 檔案後端的會話在持久化階段另外寫入彙總 (作為長時間範圍查詢的索引)
+        self.rollup_store = self.storage_backends['sqlite'].store
+        self._index_sessions = (
+            self._stream_sessions
+            and self.config.get('data.storage.rollups.file_sessions', True)
+        )
+        
+    def _setup_journal(self):
+        """設置會話日誌
+        
+        不支援增量寫入的後端 (如 SQLite) 在會話結束時才保存會話，
+        採集期間數據點追加寫入日誌，定時檢查點只寫出新數據。
+        前次遺留的會話預設在背景執行緒中恢復 (recover_on_start)，不阻塞啟動。
+        """
+        journal_config = self.config.get('data.storage.journal', {}) or {}
+        self.journal: Optional[SessionJournal] = None
+        self._recovery_lock = threading.Lock()
+        self._recovery_thread: Optional[threading.Thread] = None
+        if not self.auto_save or self._stream_sessions or not journal_config.get('enabled', True):
+            return
+        self.journal = SessionJournal(
+            Path(self.base_path) / journal_config.get('path', 'journal'),
+            fsync=journal_config.get('fsync', True)
+        )
+        if journal_config.get('recover_on_start', True) and self.journal.pending():
+            self._recovery_thread = threading.Thread(
+                target=self.recover_sessions, name="DataJournalRecovery", daemon=True
+            )
+            self._recovery_thread.start()
         
     def _setup_auto_save(self):
-        """設置自動保存"""
+        """設置自動保存 (會話日誌使用自己的檢查點間隔)"""
         data_config = self.config.get_data_config('storage')
         
-        if data_config['auto_save']:
-            interval_ms = data_config['auto_save_interval'] * 1000
-            self.auto_save_timer.start(interval_ms)
-            self.logger.info(f"自動保存已啟用，間隔: {data_config['auto_save_interval']}秒")
+        if self.auto_save:
+            interval_s = data_config['auto_save_interval']
+            if self.journal is not None:
+                interval_s = self.config.get('data.storage.journal.checkpoint_interval_s', 10)
+            self.auto_save_timer.start(int(interval_s * 1000))
+            self.logger.info(f"自動保存已啟用，間隔: {interval_s}秒")
+            
+    def recover_sessions(self, chunk_size: int = 65536) -> List[str]:
+        """由會話日誌恢復前次執行未保存的會話 (分段寫入預設存儲後刪除日誌)
+        
+        日誌按寫入順序逐段重播，內存中最多保留 chunk_size 個點；
+        可直接呼叫，或由啟動時的背景執行緒呼叫 (見 wait_for_recovery)。
+        
+        Args:
+            chunk_size: 每段的數據點數
+            
+        Returns:
+            List[str]: 已恢復的會話名稱
+        """
+        recovered = []
+        if self.journal is None:
+            return recovered
+        with self._recovery_lock:
+            for manifest in self.journal.pending():
+                session_name = manifest['session']
+                replayed = 0
+                
+                def chunks():
+                    nonlocal replayed
+                    for chunk in self.journal.replay(session_name, chunk_size, ordered=False):
+                        points = [MeasurementPoint(**record) for record in chunk.to_dicts()]
+                        replayed += len(points)
+                        yield points
+                        
+                try:
+                    self.default_storage.save_session_chunks(session_name, chunks())
+                    self.journal.discard(session_name)
+                    recovered.append(session_name)
+                    self.logger.warning(
+                        f"已從日誌恢復會話: {session_name} ({replayed} 個點，"
+                        f"最後檢查點 {manifest.get('records', 0)} 個點)"
+                    )
+                except Exception as e:
+                    self.logger.error(f"恢復會話失敗: {session_name}: {e}")
+                    self.storage_error.emit(str(e))
+        return recovered
+        
+    def wait_for_recovery(self, timeout: Optional[float] = None) -> bool:
+        """等待啟動時的背景恢復完成
+        
+        Returns:
+            bool: 是否已完成 (沒有進行中的恢復時為 True)
+        """
+        thread = self._recovery_thread
+        if thread is not None:
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
             
     def register_instrument(self, instrument_id: str, 
                           buffer_size: Optional[int] = None) -> bool:
@@ -225,46 +408,134 @@ class UnifiedDataManager(QObject):
             return False
             
     def add_measurement(self, point: MeasurementPoint) -> bool:
-        """添加測量數據點
+        """添加測量數據點 (只入列，不取得共用鎖)
         
         Args:
             point: 測量數據點
             
         Returns:
-            bool: 添加是否成功
+            bool: 是否已放入接收佇列 (佇列持續已滿時為 False)
         """
-        try:
-            with self._lock:
-                # 添加到緩存
-                self.buffer_manager.add_point(point.instrument_id, point)
-                
-                # 添加到會話數據
-                if self.current_session:
-                    self.session_data[point.instrument_id].append(point)
+        if self._ingest.put(point.instrument_id, point):
+            return True
+        self.logger.warning(f"接收佇列已滿，丟棄數據點: {point.instrument_id}")
+        return False
+        
+    def _process_batch(self, points: List[MeasurementPoint]):
+        """接收階段：緩存、會話數據與實時分析 (鎖內)，信號與持久化 (鎖外)"""
+        results = []
+        errors = []
+        with self._lock:
+            session = self.current_session
+            for point in points:
+                try:
+                    # 添加到緩存
+                    self.buffer_manager.add_point(point.instrument_id, point)
                     
-                # 執行實時分析
-                historical_data = self.buffer_manager.get_recent_points(
-                    point.instrument_id, 100
-                )
-                analysis_result = self.analytics.analyze_point(point, historical_data)
+                    # 添加到會話數據
+                    if self.current_session:
+                        series = self._session_series(point.instrument_id)
+                        if series and point.timestamp < series[-1].timestamp:
+                            # 亂序到達時按時間插入，保持會話數據有序
+                            insort(series, point, key=_timestamp_key)
+                        else:
+                            series.append(point)
+                            
+                    # 執行實時分析 (串流統計每點只更新一次；歷史窗口僅供自定義分析函數)
+                    historical_data = None
+                    if self.analytics.analysis_functions:
+                        historical_data = self.buffer_manager.get_window(
+                            point.instrument_id, self.analytics.window_size
+                        )
+                    results.append((point, self.analytics.analyze_point(point, historical_data)))
+                    
+                except Exception as e:
+                    errors.append(f"添加數據點失敗: {e}")
+            spilling = [series for series in self.session_data.values() if series.spill_pending]
+            
+        # 溢出數據在鎖外寫出到磁碟，不阻塞讀取端
+        for series in spilling:
+            try:
+                series.flush_spill()
+            except Exception as e:
+                errors.append(f"寫出溢出數據失敗: {e}")
                 
-                # 發送信號
-                self.data_point_added.emit(point.to_dict())
+        # 發送信號
+        for point, analysis_result in results:
+            self.data_point_added.emit(point.to_dict())
+            if analysis_result.get('anomalies') or analysis_result.get('alerts'):
+                self.analysis_ready.emit(point.instrument_id, analysis_result)
                 
-                if analysis_result.get('anomalies') or analysis_result.get('alerts'):
-                    self.analysis_ready.emit(point.instrument_id, analysis_result)
-                    
-                # 持久化存儲（如果啟用）
-                if self.config.get('data.storage.auto_save', True):
+        # 持久化存儲（如果啟用）與會話檔案/日誌的增量寫入交給持久化階段
+        session = session if self._stream_sessions or self.journal is not None else None
+        if self.auto_save or session:
+            for point, _ in results:
+                if not self._persist.put(point.instrument_id, (point, session)):
+                    errors.append(f"持久化佇列已滿，數據點未保存: {point.instrument_id} @ {point.timestamp}")
+                
+        for message in errors:
+            self.logger.error(message)
+            self.storage_error.emit(message)
+            
+    def _persist_batch(self, items: List[Tuple[MeasurementPoint, Optional[str]]]):
+        """持久化階段：寫入即時存儲並追加會話檔案或會話日誌 (不持有共用鎖)"""
+        session_points: Dict[str, List[MeasurementPoint]] = {}
+        for point, session in items:
+            if self.auto_save:
+                try:
                     self.default_storage.save_point(point)
-                    
-                return True
+                except Exception as e:
+                    self.logger.error(f"保存數據點失敗: {e}")
+                    self.storage_error.emit(str(e))
+            if session:
+                session_points.setdefault(session, []).append(point)
                 
-        except Exception as e:
-            self.logger.error(f"添加數據點失敗: {e}")
-            self.storage_error.emit(str(e))
-            return False
+        for session, points in session_points.items():
+            try:
+                if self._stream_sessions:
+                    self.default_storage.append_session(session, points)
+                    if self._index_sessions:
+                        self.rollup_store.submit_rollups(self._rollup_rows(session, points))
+                else:
+                    self.journal.append(session, points)
+            except Exception as e:
+                self.logger.error(f"寫入會話數據失敗: {e}")
+                self.storage_error.emit(str(e))
+                
+    def _rollup_rows(self, session: str, points: List[MeasurementPoint]) -> list:
+        """檔案後端會話的數據點轉為彙總用的樣本列"""
+        store = self.rollup_store
+        session_key = store.session_key(session)
+        return [
+            store.row(
+                session_key, store.instrument_key(point.instrument_id), point.timestamp,
+                voltage=point.voltage, current=point.current, resistance=point.resistance,
+                power=point.power, temperature=point.temperature
+            )
+            for point in points
+        ]
+        
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待已入列的數據點完成緩存、分析與持久化
+        
+        不可在持有數據管理器鎖時呼叫。
+        
+        Args:
+            timeout: 每個階段的最長等待秒數，None表示無限等待
             
+        Returns:
+            bool: 是否已全部處理
+        """
+        return self._ingest.flush(timeout) and self._persist.flush(timeout)
+        
+    def get_ingest_stats(self) -> Dict[str, Any]:
+        """接收管線統計：佇列深度/丟棄、各階段耗時與共用鎖競爭"""
+        return {
+            'ingest': self._ingest.stats(),
+            'persist': self._persist.stats(),
+            'lock': self._lock.stats()
+        }
+        
     def start_session(self, session_name: Optional[str] = None) -> str:
         """開始新的數據會話
         
@@ -274,17 +545,30 @@ class UnifiedDataManager(QObject):
         Returns:
             str: 會話ID
         """
+        # 已入列的數據點仍屬於前一個會話
+        self.flush()
+        
         with self._lock:
             if session_name is None:
                 session_name = f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
                 
+            previous = self.current_session
+            snapshots = None if self._stream_sessions or not previous else self._session_snapshots()
             self.current_session = session_name
-            self.session_data.clear()
-            
-            self.session_started.emit(session_name)
-            self.logger.info(f"會話已開始: {session_name}")
-            
-            return session_name
+            detached = self._detach_session_data()
+            self.analytics.reset_session()
+            if self.journal is not None:
+                self.journal.begin(session_name)
+                
+        # 未結束的前一個會話：完成其檔案
+        if previous:
+            self._complete_session(previous, snapshots)
+        for points in detached:
+            points.clear()
+        self.session_started.emit(session_name)
+        self.logger.info(f"會話已開始: {session_name}")
+        
+        return session_name
             
     def end_session(self) -> Optional[Dict[str, Any]]:
         """結束當前會話
@@ -295,28 +579,65 @@ class UnifiedDataManager(QObject):
         if not self.current_session:
             return None
             
+        self.flush()
+        
         with self._lock:
+            if not self.current_session:
+                return None
             session_name = self.current_session
             session_stats = self._calculate_session_statistics()
+            snapshots = None if self._stream_sessions else self._session_snapshots()
             
-            # 保存會話數據
-            self._save_session_data(session_name)
-            
-            # 清理
+            # 之後的數據點不再屬於此會話
             self.current_session = None
-            self.session_data.clear()
+            detached = self._detach_session_data()
             
-            self.session_ended.emit(session_name, session_stats)
-            self.logger.info(f"會話已結束: {session_name}")
+        # 鎖外保存會話數據並清理 (增量寫入的會話只需完成檔案)
+        self._complete_session(session_name, snapshots)
+        for points in detached:
+            points.clear()
             
-            return session_stats
+        self.session_ended.emit(session_name, session_stats)
+        self.logger.info(f"會話已結束: {session_name}")
+        
+        return session_stats
             
+    def _session_series(self, instrument_id: str) -> BudgetedList:
+        """獲取 (必要時建立) 儀器的會話數據列表"""
+        points = self.session_data.get(instrument_id)
+        if points is None:
+            points = BudgetedList(
+                f"session_data.{instrument_id}",
+                policy=get_memory_governor().policy_for('session_data', 'spill'),
+                group='data',
+                max_items=self.config.get('data.buffer.persistent_buffer_size', 10000),
+                spill_path=self.config.get('performance.memory.spill_path') or str(Path(self.base_path) / 'spill'),
+                defer_spill=True  # 溢出檔案在接收階段釋放鎖後寫出
+            )
+            self.session_data[instrument_id] = points
+        return points
+        
+    def _detach_session_data(self, instrument_id: Optional[str] = None) -> List[BudgetedList]:
+        """從會話中移除數據列表 (持有鎖時呼叫)；返回的列表在鎖外 clear() 以刪除溢出檔案"""
+        ids = list(self.session_data) if instrument_id is None else [instrument_id]
+        return [
+            points for points in (self.session_data.pop(key, None) for key in ids)
+            if points is not None
+        ]
+        
+    def _session_snapshots(self, instrument_id: Optional[str] = None) -> list:
+        """各儀器會話數據的快照 (持有鎖時呼叫，可在鎖外迭代)"""
+        if instrument_id:
+            points = self.session_data.get(instrument_id)
+            return [points.iter_all()] if points is not None else []
+        return [points.iter_all() for points in self.session_data.values()]
+                
     def _calculate_session_statistics(self) -> Dict[str, Any]:
         """計算會話統計信息"""
         stats = {
             'session_name': self.current_session,
             'start_time': None,
-            'end_time': datetime.now(),
+            'end_time': now_epoch_ns(),
             'instruments': {},
             'total_measurements': 0
         }
@@ -325,42 +646,73 @@ class UnifiedDataManager(QObject):
             if not points:
                 continue
                 
-            if stats['start_time'] is None or points[0].timestamp < stats['start_time']:
-                stats['start_time'] = points[0].timestamp
+            first = points.first()
+            if stats['start_time'] is None or first.timestamp < stats['start_time']:
+                stats['start_time'] = first.timestamp
                 
+            # 平均/極值/總和取自會話累計統計，無需再掃描所有數據點
+            session = self.analytics.get_stream(instrument_id).session_snapshot()
+            voltage = session.get('voltage', {})
+            current = session.get('current', {})
+            power = session.get('power', {})
             instrument_stats = {
-                'measurement_count': len(points),
-                'duration': (points[-1].timestamp - points[0].timestamp).total_seconds(),
-                'avg_voltage': sum(p.voltage for p in points) / len(points),
-                'avg_current': sum(p.current for p in points) / len(points),
-                'max_power': max(p.power for p in points if p.power),
-                'total_energy': sum(p.power for p in points if p.power) * len(points) / 3600  # Wh估算
+                'measurement_count': points.total_count,
+                'duration': (points[-1].timestamp - first.timestamp) / 1e9,
+                'avg_voltage': voltage.get('mean', 0.0),
+                'avg_current': current.get('mean', 0.0),
+                'max_power': power.get('max', 0.0),
+                'total_energy': power.get('sum', 0.0) * points.total_count / 3600,  # Wh估算
+                'voltage': voltage,
+                'current': current,
+                'power': power
             }
             
             stats['instruments'][instrument_id] = instrument_stats
-            stats['total_measurements'] += len(points)
+            stats['total_measurements'] += points.total_count
             
         return stats
         
-    def _save_session_data(self, session_name: str):
-        """保存會話數據"""
+    def _complete_session(self, session_name: str, snapshots: Optional[list]):
+        """保存結束的會話 (在鎖外呼叫)：完成增量寫入的檔案，或保存快照後刪除其日誌"""
+        if self._stream_sessions:
+            self._finalize_session_file(session_name)
+        elif self._save_session_data(session_name, snapshots) and self.journal is not None:
+            self.journal.commit(session_name)
+            
+    def _finalize_session_file(self, session_name: str):
+        """完成增量寫入的會話檔案 (在鎖外呼叫，會話數據須已全部入列)"""
         try:
-            # 合併所有儀器的數據
-            all_points = []
-            for points in self.session_data.values():
-                all_points.extend(points)
+            self._persist.flush()
+            filename = self.default_storage.finalize_session(session_name)
+            self.logger.info(f"會話數據已保存: {filename}")
+        except Exception as e:
+            self.logger.error(f"保存會話數據失敗: {e}")
+            self.storage_error.emit(str(e))
+            
+    def _save_session_data(self, session_name: str, snapshots: list) -> bool:
+        """保存會話數據 (在鎖外呼叫)
+        
+        Args:
+            session_name: 會話名稱
+            snapshots: _session_snapshots() 返回的各儀器快照
+            
+        Returns:
+            bool: 是否保存成功 (失敗時會話日誌保留，下次啟動時恢復)
+        """
+        try:
+            # 各儀器數據已按時間排序 (含已寫出到磁碟的部分)，k 路合併為單一時間序列
+            all_points = list(heapq.merge(*snapshots, key=_timestamp_key))
                 
             if all_points:
-                # 按時間排序
-                all_points.sort(key=lambda p: p.timestamp)
-                
                 # 保存到預設格式
                 filename = self.default_storage.save_session(session_name, all_points)
                 self.logger.info(f"會話數據已保存: {filename}")
+            return True
                 
         except Exception as e:
             self.logger.error(f"保存會話數據失敗: {e}")
             self.storage_error.emit(str(e))
+            return False
             
     def get_real_time_data(self, instrument_id: str, 
                           count: int = 100) -> List[MeasurementPoint]:
@@ -375,6 +727,41 @@ class UnifiedDataManager(QObject):
         """
         return self.buffer_manager.get_recent_points(instrument_id, count)
         
+    def get_aligned_data(self, reference_id: str,
+                         instrument_ids: Optional[List[str]] = None,
+                         count: int = 1000,
+                         max_gap_s: Optional[float] = None) -> List[Dict[str, Any]]:
+        """將多台儀器的最近數據對齊到參考儀器的採集時刻
+        
+        Args:
+            reference_id: 參考儀器ID
+            instrument_ids: 需要對齊的儀器，None表示全部已註冊儀器
+            count: 每台儀器取用的最近數據點數量
+            max_gap_s: 允許插值的最大樣本間隔(秒)，None表示不限制
+            
+        Returns:
+            List[Dict]: 每列包含 acquired_ns 與 "儀器ID.欄位" 的插值結果
+        """
+        from src.engine.clock import StreamAligner
+        
+        if instrument_ids is None:
+            instrument_ids = list(self.buffer_manager.buffers)
+        if reference_id not in instrument_ids:
+            instrument_ids = [reference_id] + list(instrument_ids)
+            
+        aligner = StreamAligner(None if max_gap_s is None else int(max_gap_s * 1e9))
+        for instrument_id in instrument_ids:
+            for point in self.buffer_manager.get_recent_points(instrument_id, count):
+                aligner.add_sample(instrument_id, point.timestamp, {
+                    'voltage': point.voltage,
+                    'current': point.current,
+                    'power': point.power
+                })
+                
+        if reference_id not in aligner.streams:
+            return []
+        return aligner.align(reference_id)
+        
     def get_session_data(self, instrument_id: Optional[str] = None) -> List[MeasurementPoint]:
         """獲取會話數據
         
@@ -384,67 +771,269 @@ class UnifiedDataManager(QObject):
         Returns:
             List[MeasurementPoint]: 會話數據
         """
+        self.flush()
         with self._lock:
-            if instrument_id:
-                return self.session_data.get(instrument_id, []).copy()
-            else:
-                all_data = []
-                for points in self.session_data.values():
-                    all_data.extend(points)
-                return sorted(all_data, key=lambda p: p.timestamp)
+            snapshots = self._session_snapshots(instrument_id)
+        return list(heapq.merge(*snapshots, key=_timestamp_key))
+        
+    def load_session_columns(self, session_name: str, columns: Optional[List[str]] = None,
+                             time_range: Optional[Tuple[Any, Any]] = None,
+                             format: Optional[str] = None) -> SessionColumns:
+        """從存儲讀取已保存的會話為列式陣列
+        
+        Args:
+            session_name: 會話名稱
+            columns: 需要的欄位，None表示全部
+            time_range: 時間範圍過濾 (epoch ns 或 datetime)
+            format: 存儲格式，None使用預設格式
+            
+        Returns:
+            SessionColumns: 按時間排序的會話數據
+        """
+        if session_name == self.current_session:
+            self._persist.flush()
+        backend = self.storage_backends[format] if format else self.default_storage
+        backend.flush()
+        start_ns = end_ns = None
+        if time_range:
+            start_ns, end_ns = (as_epoch_ns(t) for t in time_range)
+        return backend.load_columns(session_name, columns, start_ns, end_ns)
+                
+    def _iter_session_range(self, instrument_id: Optional[str], start_ns: Optional[int],
+                            end_ns: Optional[int]) -> Iterator[MeasurementPoint]:
+        """會話數據的時間範圍 (每台儀器二分定位後 k 路合併，逐點產生)"""
+        def in_range(points):
+            lo = 0 if start_ns is None else bisect_left(points, start_ns, key=_timestamp_key)
+            hi = len(points) if end_ns is None else bisect_right(points, end_ns, key=_timestamp_key)
+            return points[lo:hi]
+            
+        def filtered(points):
+            # 已寫出到磁碟的部分逐點讀取，不整批載入
+            for point in points:
+                if end_ns is not None and point.timestamp > end_ns:
+                    return
+                if start_ns is None or point.timestamp >= start_ns:
+                    yield point
+                    
+        with self._lock:
+            ids = [instrument_id] if instrument_id else list(self.session_data)
+            streams = []
+            spilled = []
+            for key in ids:
+                points = self.session_data.get(key)
+                if points is None:
+                    continue
+                if points.spilled_count:
+                    spilled.append(points.iter_all())  # 含磁碟部分，在鎖外讀取
+                else:
+                    streams.append(in_range(points))
+        streams.extend(filtered(snapshot) for snapshot in spilled)
+        return heapq.merge(*streams, key=_timestamp_key)
+        
+    def _stored_chunks(self, session_name: str, instrument_id: Optional[str],
+                       start_ns: Optional[int], end_ns: Optional[int]) -> Iterator[SessionColumns]:
+        """從存儲分段讀取已保存的會話"""
+        self.default_storage.flush()
+        chunks = self.default_storage.iter_columns(
+            session_name, start_ns=start_ns, end_ns=end_ns, chunk_size=self.export_manager.chunk_rows
+        )
+        for chunk in chunks:
+            if instrument_id is not None:
+                chunk = chunk.select(chunk['instrument_id'] == instrument_id)
+            if len(chunk):
+                yield chunk
                 
+    def _export(self, format: ExportFormat, instrument_id: Optional[str],
+                time_range: Optional[Tuple[Any, Any]], filename: Optional[str],
+                session_name: Optional[str], job: Optional[ExportJob] = None) -> str:
+        """分段讀取並導出 (錯誤直接拋出)"""
+        start_ns = end_ns = None
+        if time_range:
+            start_ns, end_ns = (as_epoch_ns(t) for t in time_range)
+            
+        # 數據來源 (均已按時間排序，時間過濾以二分定位)，逐段轉為列式數據
+        chunk_rows = self.export_manager.chunk_rows
+        if session_name is not None and session_name != self.current_session:
+            chunks = self._stored_chunks(session_name, instrument_id, start_ns, end_ns)
+        elif self.current_session:
+            chunks = chunk_points(self._iter_session_range(instrument_id, start_ns, end_ns), chunk_rows)
+        else:
+            ids = [instrument_id] if instrument_id else None
+            chunks = chunk_points(self.buffer_manager.merge_points(ids, start_ns, end_ns), chunk_rows)
+        if job is not None:
+            chunks = job.track(chunks)
+            
+        # 執行導出
+        return self.export_manager.export_columns(chunks, format, filename)
+        
     def export_data(self, format: ExportFormat, 
                    instrument_id: Optional[str] = None,
-                   time_range: Optional[Tuple[datetime, datetime]] = None,
-                   filename: Optional[str] = None) -> Optional[str]:
-        """導出數據
+                   time_range: Optional[Tuple[Any, Any]] = None,
+                   filename: Optional[str] = None,
+                   session_name: Optional[str] = None) -> Optional[str]:
+        """導出數據 (分段串流寫入，記憶體用量與數據量無關)
         
         Args:
             format: 導出格式
             instrument_id: 儀器ID過濾
-            time_range: 時間範圍過濾
+            time_range: 時間範圍過濾 (epoch ns 或 datetime)
             filename: 自定義檔案名
+            session_name: 已保存的會話名稱 (從存儲讀取)，None導出當前會話或緩存數據
             
         Returns:
             str: 導出檔案路徑
         """
         try:
-            # 獲取要導出的數據
-            if self.current_session:
-                data = self.get_session_data(instrument_id)
-            else:
-                data = self.get_real_time_data(instrument_id or 'all', 10000)
-                
-            # 時間過濾
-            if time_range:
-                start_time, end_time = time_range
-                data = [p for p in data if start_time <= p.timestamp <= end_time]
-                
-            # 執行導出
-            return self.export_manager.export_data(data, format, filename)
+            self.flush()
+            return self._export(format, instrument_id, time_range, filename, session_name)
             
         except Exception as e:
             self.logger.error(f"導出數據失敗: {e}")
             self.storage_error.emit(str(e))
             return None
             
+    def export_data_async(self, format: ExportFormat,
+                          instrument_id: Optional[str] = None,
+                          time_range: Optional[Tuple[Any, Any]] = None,
+                          filename: Optional[str] = None,
+                          session_name: Optional[str] = None) -> ExportJob:
+        """在背景導出工作中導出數據 (參數同 export_data)
+        
+        Returns:
+            ExportJob: 導出工作 (進度與結果經由 get_export_service() 的信號發送)
+        """
+        self.flush()
+        total = None
+        if session_name is None and self.current_session and not time_range:
+            with self._lock:
+                ids = [instrument_id] if instrument_id else list(self.session_data)
+                total = sum(len(self.session_data[key]) for key in ids if key in self.session_data)
+        return get_export_service().submit(
+            lambda job: self._export(format, instrument_id, time_range, filename, session_name, job),
+            description=filename or f"{session_name or self.current_session or 'buffer'}.{format.value}",
+            total_rows=total
+        )
+        
+    def _overview_columns(self, session_name: str, instrument_id: Optional[str],
+                          channels: tuple, start_ns: Optional[int],
+                          end_ns: Optional[int]) -> SessionColumns:
+        """概覽沒有彙總可用時讀取的原始數據 (當前會話尚未保存時取自內存)"""
+        columns = ['timestamp', 'instrument_id', *channels]
+        if session_name == self.current_session and not self._stream_sessions:
+            chunks = chunk_points(
+                self._iter_session_range(instrument_id, start_ns, end_ns),
+                self.export_manager.chunk_rows, columns
+            )
+            return SessionColumns.concat(chunks, columns)
+        time_range = (start_ns, end_ns) if start_ns is not None and end_ns is not None else None
+        data = self.load_session_columns(session_name, columns, time_range).between(start_ns, end_ns)
+        if instrument_id is not None:
+            data = data.select(data['instrument_id'] == instrument_id)
+        return data
+        
+    def get_overview(self, session_name: Optional[str] = None,
+                     instrument_id: Optional[str] = None,
+                     channels: Optional[List[str]] = None,
+                     time_range: Optional[Tuple[Any, Any]] = None,
+                     pixels: int = 1000) -> Dict[str, Any]:
+        """圖表用的會話概覽 (每個像素約一個桶的 count/min/max/mean/last)
+        
+        長時間範圍只讀取多解析度彙總，選擇每像素至少一個桶的最粗解析度；
+        範圍太短或會話沒有彙總時讀取原始數據並在內存中按像素寬度彙總，格式相同。
+        
+        Args:
+            session_name: 會話名稱，None表示當前會話
+            instrument_id: 儀器ID，None表示全部
+            channels: 數值欄位，None表示全部
+            time_range: 時間範圍 (epoch ns 或 datetime)，None表示整個會話
+            pixels: 圖表寬度 (像素數)
+            
+        Returns:
+            Dict: resolution ('1s'/'1m'/'1h'，原始數據為 'raw')、bucket_ns 與
+                  series (儀器ID -> timestamp 與 <欄位>_count/min/max/mean/last 等陣列)
+        """
+        session_name = session_name or self.current_session
+        channels = tuple(channels) if channels else CHANNELS
+        start_ns = end_ns = None
+        if time_range:
+            start_ns, end_ns = (as_epoch_ns(t) for t in time_range)
+        if session_name == self.current_session:
+            self._persist.flush()
+            
+        overview = self.rollup_store.overview(
+            session_name, instrument_id, start_ns, end_ns, pixels, channels
+        )
+        if overview is not None:
+            return overview
+            
+        data = self._overview_columns(session_name, instrument_id, channels, start_ns, end_ns)
+        if len(data):
+            start_ns = int(data['timestamp'].min()) if start_ns is None else start_ns
+            end_ns = int(data['timestamp'].max()) if end_ns is None else end_ns
+        width = max(1, ((end_ns or 0) - (start_ns or 0)) // max(1, pixels))
+        return {
+            'resolution': 'raw',
+            'bucket_ns': width,
+            'start_ns': start_ns,
+            'end_ns': end_ns,
+            'series': aggregate_columns(data, channels, width)
+        }
+        
+    def get_summary(self, session_name: Optional[str] = None,
+                    instrument_id: Optional[str] = None,
+                    channels: Optional[List[str]] = None,
+                    time_range: Optional[Tuple[Any, Any]] = None) -> Dict[str, Dict[str, Any]]:
+        """會話 (或時間範圍) 的摘要
+        
+        有彙總時完整的 1 秒桶只讀取彙總，兩端不足一個桶的部分讀取原始數據；
+        沒有彙總時 (如當前 SQLite 會話尚未保存) 讀取原始數據。
+        
+        Args:
+            session_name: 會話名稱，None表示當前會話
+            instrument_id: 儀器ID，None表示全部
+            channels: 數值欄位，None表示全部
+            time_range: 時間範圍 (epoch ns 或 datetime)，None表示整個會話
+            
+        Returns:
+            Dict: 儀器ID -> {rows、first_ts、last_ts、<欄位>: {count, min, max, mean, last}}
+        """
+        session_name = session_name or self.current_session
+        channels = tuple(channels) if channels else CHANNELS
+        start_ns = end_ns = None
+        if time_range:
+            start_ns, end_ns = (as_epoch_ns(t) for t in time_range)
+        if session_name == self.current_session:
+            self._persist.flush()
+            
+        summary = self.rollup_store.summary(
+            session_name, instrument_id, start_ns, end_ns, channels,
+            edge_reader=lambda low, high: self._overview_columns(session_name, instrument_id, channels, low, high)
+        )
+        if summary:
+            return summary
+        data = self._overview_columns(session_name, instrument_id, channels, start_ns, end_ns)
+        # 桶寬大於任何時間戳：每台儀器一組
+        series = aggregate_columns(data, channels, np.iinfo(np.int64).max)
+        return summarize_series(series, channels)
+        
     def get_statistics(self, instrument_id: str, 
                       time_range: Optional[timedelta] = None) -> Dict[str, Any]:
         """獲取統計信息
         
         Args:
             instrument_id: 儀器ID
-            time_range: 統計時間範圍
+            time_range: 統計時間範圍，None返回最近窗口的串流統計
             
         Returns:
             Dict: 統計信息
         """
         with self._lock:
-            data = self.get_real_time_data(instrument_id, 1000)
-            
-            if time_range:
-                cutoff_time = datetime.now() - time_range
-                data = [p for p in data if p.timestamp >= cutoff_time]
+            # 無時間範圍時直接讀取串流統計 (滑動窗口)
+            if not time_range:
+                return self.analytics.get_stream(instrument_id).snapshot()
+                
+            cutoff_ns = now_epoch_ns() - int(time_range.total_seconds() * 1e9)
+            data = self.buffer_manager.get_window_in_range(instrument_id, cutoff_ns)
                 
             return self.analytics._calculate_statistics(data)
             
@@ -454,26 +1043,46 @@ class UnifiedDataManager(QObject):
         Args:
             instrument_id: 儀器ID，None清除所有數據
         """
+        self.flush()
         with self._lock:
             if instrument_id:
                 self.buffer_manager.clear_buffer(instrument_id)
-                if instrument_id in self.session_data:
-                    del self.session_data[instrument_id]
+                self.analytics.reset(instrument_id)
+                detached = self._detach_session_data(instrument_id)
             else:
                 self.buffer_manager.clear_all_buffers()
-                self.session_data.clear()
+                self.analytics.reset()
+                detached = self._detach_session_data()
                 
-            self.logger.info(f"數據已清除: {instrument_id or '全部'}")
-            
+        for points in detached:
+            points.clear()
+        self.logger.info(f"數據已清除: {instrument_id or '全部'}")
+        
     def _auto_save(self):
-        """自動保存處理"""
-        if self.current_session and self.session_data:
-            try:
-                # 創建備份點
-                backup_name = f"{self.current_session}_backup_{datetime.now().strftime('%H%M%S')}"
-                self._save_session_data(backup_name)
-            except Exception as e:
-                self.logger.error(f"自動保存失敗: {e}")
+        """自動保存處理 - 在定時器執行緒中執行
+        
+        檢查點只寫出上次之後的新數據：增量寫入的後端 flush 會話檔案，
+        其他後端 flush 會話日誌並更新清單。
+        """
+        try:
+            self._persist.flush()
+            if self._stream_sessions:
+                self.default_storage.flush()
+            elif self.journal is not None:
+                self.journal.checkpoint()
+        except Exception as e:
+            self.logger.error(f"自動保存失敗: {e}")
+            
+    def shutdown(self):
+        """停止自動保存，結束進行中的會話並停止接收管線"""
+        self.auto_save_timer.stop()
+        self.wait_for_recovery()
+        if self.current_session:
+            self.end_session()
+        self._ingest.stop()
+        self._persist.stop()
+        for storage in self.storage_backends.values():
+            storage.close()
                 
     def get_memory_usage(self) -> Dict[str, int]:
         """獲取內存使用情況
@@ -481,22 +1090,18 @@ class UnifiedDataManager(QObject):
         Returns:
             Dict: 內存使用統計
         """
-        return self.buffer_manager.get_memory_usage()
+        usage = self.buffer_manager.get_memory_usage()
+        usage['governor'] = get_memory_governor().usage()
+        return usage
         
     def optimize_memory(self):
-        """優化內存使用"""
-        with self._lock:
-            self.buffer_manager.optimize_memory()
-            
-            # 清理過期的會話數據
-            if self.current_session:
-                max_session_points = self.config.get('data.buffer.persistent_buffer_size', 10000)
-                for instrument_id in self.session_data:
-                    if len(self.session_data[instrument_id]) > max_session_points:
-                        # 保留最新的數據點
-                        self.session_data[instrument_id] = self.session_data[instrument_id][-max_session_points:]
-                        
-            self.logger.info("內存優化完成")
+        """優化內存使用
+        
+        會話數據由內存預算管理器按策略回收 (預設寫出到磁碟，不會丟失)，
+        這裡只清理空緩存並立即檢查預算。
+        """
+        self.buffer_manager.optimize_memory()
+        self.logger.info("內存優化完成")
 
 
 # 全局數據管理器實例
@@ -13,6 +13,9 @@ from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 import pandas as pd
+from src.data.compression import compressed_path, compression_options, open_output
+from src.data.rollups import RESOLUTIONS, has_rollups, rebuild_rollups, sample_sessions
+from src.engine.clock import as_epoch_ns, format_epoch_ns
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -21,7 +24,7 @@ logger = logging.getLogger(__name__)
 class DatabaseMaintenance:
     """資料庫維護管理器"""
     
-    def __init__(self, db_path: str = "data/measurement_data.db"):
+    def __init__(self, db_path: str = "data/measurements.db"):
         """
         初始化資料庫維護工具
         
@@ -40,11 +43,15 @@ class DatabaseMaintenance:
             'cleanup_batch_size': 10000,      # 清理批次大小
             'vacuum_threshold_mb': 50,        # 觸發VACUUM的閾值 (MB)
             'auto_backup': True,              # 自動備份
-            'compression': True               # 歸檔壓縮
+            'compression': True               # 歸檔壓縮 (True/"zstd"/"gzip")
         }
         
     def get_database_info(self) -> Dict:
-        """獲取資料庫信息"""
+        """獲取資料庫信息
+        
+        樣本數、時間範圍與每日分布取自 1 小時彙總，不掃描樣本表；
+        沒有彙總表的舊資料庫才逐列統計。
+        """
         if not self.db_path.exists():
             return {'exists': False, 'message': '資料庫文件不存在'}
             
@@ -65,28 +72,52 @@ class DatabaseMaintenance:
         }
         
         try:
+            rollups = has_rollups(conn)
+            if rollups:
+                # 只統計有樣本的會話 (檔案後端會話的彙總不算在樣本表內)
+                sessions = sample_sessions(conn)
+                hourly = f"""
+                    FROM rollups
+                    WHERE resolution = {RESOLUTIONS['1h']}
+                    AND session_key IN ({', '.join(str(key) for key in sessions) or 'NULL'})
+                """
+                
             # 獲取所有表
             cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
             tables = cursor.fetchall()
             
             for table_name in tables:
                 table_name = table_name[0]
-                
-                # 獲取記錄數
+                if table_name == 'rollups':
+                    continue  # 彙總表不逐列計數
+                    
+                # 獲取記錄數與最早和最新記錄時間
+                time_info = {}
+                if table_name == 'samples' and rollups:
+                    cursor.execute(f"SELECT COALESCE(SUM(rows), 0), MIN(first_ts), MAX(last_ts) {hourly}")
+                    row_count, min_time, max_time = cursor.fetchone()
+                    time_info = {
+                        'earliest': format_epoch_ns(min_time),
+                        'latest': format_epoch_ns(max_time)
+                    }
+                    info['tables'][table_name] = {
+                        'row_count': row_count,
+                        **time_info
+                    }
+                    continue
+                    
                 cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
                 row_count = cursor.fetchone()[0]
                 
-                # 獲取最早和最新記錄時間
-                time_info = {}
-                if table_name == 'measurements':
+                if table_name == 'samples':
                     cursor.execute(f"""
-                        SELECT MIN(timestamp), MAX(timestamp) 
+                        SELECT MIN(ts), MAX(ts) 
                         FROM {table_name}
                     """)
                     min_time, max_time = cursor.fetchone()
                     time_info = {
-                        'earliest': min_time,
-                        'latest': max_time
+                        'earliest': format_epoch_ns(min_time),
+                        'latest': format_epoch_ns(max_time)
                     }
                 
                 info['tables'][table_name] = {
@@ -95,16 +126,28 @@ class DatabaseMaintenance:
                 }
                 
             # 分析資料分布
-            if 'measurements' in info['tables'] and info['tables']['measurements']['row_count'] > 0:
-                cursor.execute("""
-                    SELECT 
-                        DATE(timestamp) as date,
-                        COUNT(*) as count
-                    FROM measurements
-                    GROUP BY DATE(timestamp)
-                    ORDER BY date DESC
-                    LIMIT 30
-                """)
+            if 'samples' in info['tables'] and info['tables']['samples']['row_count'] > 0:
+                if rollups:
+                    # 1 小時桶在本地時區的日期內 (UTC 偏移為整數小時時)
+                    cursor.execute(f"""
+                        SELECT 
+                            DATE(bucket / 1000000000, 'unixepoch', 'localtime') as date,
+                            SUM(rows) as count
+                        {hourly}
+                        GROUP BY date
+                        ORDER BY date DESC
+                        LIMIT 30
+                    """)
+                else:
+                    cursor.execute("""
+                        SELECT 
+                            DATE(ts / 1000000000, 'unixepoch', 'localtime') as date,
+                            COUNT(*) as count
+                        FROM samples
+                        GROUP BY date
+                        ORDER BY date DESC
+                        LIMIT 30
+                    """)
                 daily_counts = cursor.fetchall()
                 info['daily_distribution'] = [
                     {'date': date, 'count': count} for date, count in daily_counts
@@ -132,6 +175,7 @@ class DatabaseMaintenance:
         """
         retention_days = days or self.config['retention_days']
         cutoff_date = datetime.now() - timedelta(days=retention_days)
+        cutoff_ns = as_epoch_ns(cutoff_date)
         
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
@@ -147,9 +191,9 @@ class DatabaseMaintenance:
         try:
             # 計算將要刪除的記錄數
             cursor.execute("""
-                SELECT COUNT(*) FROM measurements 
-                WHERE timestamp < ?
-            """, (cutoff_date.isoformat(),))
+                SELECT COUNT(*) FROM samples 
+                WHERE ts < ?
+            """, (cutoff_ns,))
             
             delete_count = cursor.fetchone()[0]
             result['deleted_count'] = delete_count
@@ -159,11 +203,22 @@ class DatabaseMaintenance:
                 return result
                 
             if not dry_run:
+                # 刪除前有樣本的會話 (刪除後重新計算其彙總)
+                rollups = has_rollups(conn)
+                sessions = sample_sessions(conn) if rollups else []
+                
                 # 執行刪除
                 cursor.execute("""
-                    DELETE FROM measurements 
-                    WHERE timestamp < ?
-                """, (cutoff_date.isoformat(),))
+                    DELETE FROM samples 
+                    WHERE ts < ?
+                """, (cutoff_ns,))
+                cursor.execute("""
+                    DELETE FROM sample_metadata 
+                    WHERE ts < ?
+                """, (cutoff_ns,))
+                if rollups:
+                    # 截止時間之前的彙總刪除，跨越截止時間的桶由剩餘樣本重新計算
+                    rebuild_rollups(conn, sessions, end_ns=cutoff_ns)
                 
                 conn.commit()
                 
@@ -176,7 +231,7 @@ class DatabaseMaintenance:
                 result['message'] = f'成功刪除 {delete_count} 條記錄，釋放 {result["space_freed_mb"]} MB 空間'
             else:
                 # 估算空間
-                avg_record_size = self.db_path.stat().st_size / max(cursor.execute("SELECT COUNT(*) FROM measurements").fetchone()[0], 1)
+                avg_record_size = self.db_path.stat().st_size / max(cursor.execute("SELECT COUNT(*) FROM samples").fetchone()[0], 1)
                 estimated_freed = (delete_count * avg_record_size) / (1024 * 1024)
                 result['estimated_space_freed_mb'] = round(estimated_freed, 2)
                 result['message'] = f'預覽模式：將刪除 {delete_count} 條記錄，預計釋放 {result["estimated_space_freed_mb"]} MB 空間'
@@ -216,41 +271,40 @@ class DatabaseMaintenance:
             conn = sqlite3.connect(self.db_path)
             
             query = """
-                SELECT * FROM measurements 
-                WHERE timestamp < ?
-                ORDER BY timestamp
+                SELECT s.ts AS timestamp, se.name AS session_name, i.name AS instrument_id,
+                       s.seq, s.voltage, s.current, s.resistance, s.power, s.temperature,
+                       m.metadata
+                FROM samples s
+                JOIN sessions se ON se.session_key = s.session_key
+                JOIN instruments i ON i.instrument_key = s.instrument_key
+                LEFT JOIN sample_metadata m
+                    ON m.session_key = s.session_key AND m.ts = s.ts
+                    AND m.instrument_key = s.instrument_key AND m.seq = s.seq
+                WHERE s.ts < ?
+                ORDER BY s.ts
             """
             
-            df = pd.read_sql_query(query, conn, params=[cutoff_date.isoformat()])
+            df = pd.read_sql_query(query, conn, params=[as_epoch_ns(cutoff_date)])
+            df['timestamp'] = df['timestamp'].map(format_epoch_ns)
             
             if df.empty:
                 result['message'] = '沒有需要歸檔的數據'
                 return result
                 
-            # 生成歸檔文件名
+            # 生成歸檔文件名 (壓縮時為 .csv.zst，缺少 zstandard 時為 .csv.gz)
             archive_filename = f"archive_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            archive_path = self.archive_dir / f"{archive_filename}.csv"
-            
-            # 保存到CSV
-            df.to_csv(archive_path, index=False)
+            options = compression_options(compress and self.config['compression'])
+            codec = options['compression']
+            archive_path = compressed_path(self.archive_dir / f"{archive_filename}.csv", codec)
+            
+            # 直接經由串流壓縮寫入，不產生未壓縮的中間檔案
+            with open_output(archive_path, codec, options['compression_level'],
+                             options['compression_block_size']) as f:
+                df.to_csv(f, index=False)
             result['archived_count'] = len(df)
-            
-            # 壓縮
-            if compress:
-                import gzip
-                compressed_path = self.archive_dir / f"{archive_filename}.csv.gz"
-                
-                with open(archive_path, 'rb') as f_in:
-                    with gzip.open(compressed_path, 'wb') as f_out:
-                        shutil.copyfileobj(f_in, f_out)
-                        
-                # 刪除原始CSV
-                archive_path.unlink()
-                result['archive_file'] = str(compressed_path)
-                result['compressed'] = True
-            else:
-                result['archive_file'] = str(archive_path)
-                result['compressed'] = False
+            result['archive_file'] = str(archive_path)
+            result['compressed'] = codec is not None
+            result['compression'] = codec
                 
             result['message'] = f'成功歸檔 {result["archived_count"]} 條記錄到 {result["archive_file"]}'
             
@@ -406,7 +460,7 @@ def main():
     import argparse
     
     parser = argparse.ArgumentParser(description='資料庫維護工具')
-    parser.add_argument('--db', default='data/measurement_data.db', help='資料庫路徑')
+    parser.add_argument('--db', default='data/measurements.db', help='資料庫路徑')
     
     subparsers = parser.add_subparsers(dest='command', help='維護命令')
     
@@ -0,0 +1,46 @@
+"""
+無GUI測量引擎
+純Python的工作執行緒、測量策略和任務執行器，不依賴Qt；
+GUI透過 src.workers 與 src.data.qt_adapter 的Qt轉接層使用相同的核心
+"""
+
+from .signals import Signal
+from .cancellation import CancellationToken, OperationCancelled
+from .lifecycle import PauseControl, WorkerLifecycle, WorkerState
+from .worker import EngineWorker
+from .timer import PeriodicTimer
+from .clock import ClockService, SampleTiming, StreamAligner, get_clock
+from .strategies import (
+    MeasurementStrategy, ContinuousMeasurementStrategy, SweepMeasurementStrategy,
+    AdaptiveSweepStrategy, NestedSweepStrategy
+)
+from .measurement import MeasurementLoop, HeadlessMeasurementWorker
+from .health import HeadlessHealthMonitor, compute_backoff_delay
+from .runner import MeasurementJob, JobRunner, JobConfigError
+
+__all__ = [
+    'Signal',
+    'CancellationToken',
+    'OperationCancelled',
+    'PauseControl',
+    'WorkerLifecycle',
+    'WorkerState',
+    'EngineWorker',
+    'PeriodicTimer',
+    'ClockService',
+    'SampleTiming',
+    'StreamAligner',
+    'get_clock',
+    'MeasurementStrategy',
+    'ContinuousMeasurementStrategy',
+    'SweepMeasurementStrategy',
+    'AdaptiveSweepStrategy',
+    'NestedSweepStrategy',
+    'MeasurementLoop',
+    'HeadlessMeasurementWorker',
+    'HeadlessHealthMonitor',
+    'compute_backoff_delay',
+    'MeasurementJob',
+    'JobRunner',
+    'JobConfigError'
+]
\ No newline at end of file
@@ -0,0 +1,9 @@
+#!/usr/bin/env python3
+"""
+python -m src.engine 入口
+"""
+
+import sys
+from .cli import main
+
+sys.exit(main())
\ No newline at end of file
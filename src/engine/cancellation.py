@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+取消令牌
+提供可中斷的等待，讓停止請求能立即喚醒休眠中的工作執行緒
+"""
+
+import threading
+import time
+from typing import Callable, List, Optional
+
+
+class OperationCancelled(Exception):
+    """操作已被取消"""
+    pass
+
+
+class CancellationToken:
+    """取消令牌
+    
+    工作執行緒以 token.sleep()/token.wait() 取代 time.sleep()/msleep()，
+    cancel() 會立即喚醒所有等待並執行已註冊的回調。
+    """
+    
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+        self.cancelled_at: Optional[float] = None  # time.monotonic()
+        
+    @property
+    def is_cancelled(self) -> bool:
+        """是否已取消"""
+        return self._event.is_set()
+        
+    def cancel(self):
+        """取消並喚醒所有等待中的執行緒"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.cancelled_at = time.monotonic()
+            self._event.set()
+            callbacks = list(self._callbacks)
+            self._callbacks.clear()
+            
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass  # 回調錯誤不影響取消流程
+                
+    def register(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """註冊取消回調，用於中斷無法直接等待令牌的阻塞操作
+        
+        Args:
+            callback: 取消時執行的回調 (已取消則立即執行)
+            
+        Returns:
+            Callable: 解除註冊的函數
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                
+                def unregister():
+                    with self._lock:
+                        if callback in self._callbacks:
+                            self._callbacks.remove(callback)
+                return unregister
+                
+        callback()
+        return lambda: None
+        
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待取消
+        
+        Args:
+            timeout: 最長等待秒數，None表示無限等待
+            
+        Returns:
+            bool: True 表示已取消
+        """
+        return self._event.wait(timeout)
+        
+    def sleep(self, seconds: float) -> bool:
+        """可中斷的休眠
+        
+        Args:
+            seconds: 休眠秒數
+            
+        Returns:
+            bool: True 表示完整休眠，False 表示被取消打斷
+        """
+        if seconds <= 0:
+            return not self.is_cancelled
+        return not self._event.wait(seconds)
+        
+    def raise_if_cancelled(self):
+        """已取消時拋出 OperationCancelled"""
+        if self._event.is_set():
+            raise OperationCancelled()
\ No newline at end of file
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+無GUI測量命令列工具
+從JSON任務配置執行掃描或連續測量並保存結果
+
+使用範例:
+    python -m src.engine example --mode sweep > job.json
+    python -m src.engine run job.json
+    python -m src.engine run job.json --format sqlite --output results --duration 60
+"""
+
+import argparse
+import json
+import sys
+from typing import Optional, List
+from .runner import (
+    MeasurementJob, JobRunner, JobConfigError, MEASUREMENT_STRATEGIES, STORAGE_FORMATS
+)
+
+
+# 退出碼
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_CONFIG_ERROR = 2
+EXIT_INTERRUPTED = 130
+
+EXAMPLE_JOBS = {
+    'sweep': {
+        'instrument': {
+            'type': 'keithley_2461',
+            'connection': {'ip_address': '192.168.0.100', 'port': 5025, 'timeout': 10.0}
+        },
+        'measurement': {
+            'mode': 'sweep',
+            'params': {'start': 0.0, 'stop': 5.0, 'step': 0.1, 'delay': 50, 'current_limit': 0.01}
+        },
+        'output': {'path': 'data', 'format': 'csv', 'session_name': None}
+    },
+    'adaptive_sweep': {
+        'instrument': {
+            'type': 'keithley_2461',
+            'connection': {'ip_address': '192.168.0.100', 'port': 5025, 'timeout': 10.0}
+        },
+        'measurement': {
+            'mode': 'adaptive_sweep',
+            'params': {
+                'start': 0.0, 'stop': 10.0, 'step': 0.5, 'min_step': 0.01, 'max_points': 120,
+                'delay': 50, 'current_limit': 0.01, 'scale': 'log'
+            }
+        },
+        'output': {'path': 'data', 'format': 'csv', 'session_name': None}
+    },
+    'nested_sweep': {
+        'instrument': {
+            'type': 'keithley_2461',
+            'connection': {'ip_address': '192.168.0.100', 'port': 5025, 'timeout': 10.0}
+        },
+        'outer_instrument': {
+            'type': 'rigol_dp711',
+            'connection': {'port': 'COM3', 'baudrate': 9600}
+        },
+        'measurement': {
+            'mode': 'nested_sweep',
+            'params': {
+                'start': 0.0, 'stop': 5.0, 'step': 0.1, 'delay': 5, 'current_limit': 0.1,
+                'outer_start': 0.0, 'outer_stop': 3.0, 'outer_step': 0.5,
+                'outer_source': 'voltage', 'outer_limit': 0.01, 'outer_settle': 200
+            }
+        },
+        'output': {'path': 'data', 'format': 'csv', 'session_name': None}
+    },
+    'continuous': {
+        'instrument': {
+            'type': 'keithley_2461',
+            'connection': {'ip_address': '192.168.0.100', 'port': 5025, 'timeout': 10.0}
+        },
+        'measurement': {
+            'mode': 'continuous',
+            'params': {'interval_ms': 500, 'max_measurements': 100}
+        },
+        'output': {'path': 'data', 'format': 'csv', 'session_name': None},
+        'duration_s': None
+    }
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """建立命令列解析器"""
+    parser = argparse.ArgumentParser(
+        prog='python -m src.engine',
+        description='無GUI測量引擎 - 從JSON任務配置執行掃描或連續測量'
+    )
+    subparsers = parser.add_subparsers(dest='command', help='可用命令')
+    
+    run_parser = subparsers.add_parser('run', help='執行測量任務')
+    run_parser.add_argument('job', help='JSON任務配置檔案')
+    run_parser.add_argument('--output', help='輸出目錄 (覆蓋配置檔案)')
+    run_parser.add_argument('--format', choices=STORAGE_FORMATS, help='輸出格式 (覆蓋配置檔案)')
+    run_parser.add_argument('--session', help='會話名稱 (覆蓋配置檔案)')
+    run_parser.add_argument('--duration', type=float, help='最長執行秒數 (覆蓋配置檔案)')
+    run_parser.add_argument('--quiet', action='store_true', help='不輸出逐點進度')
+    
+    example_parser = subparsers.add_parser('example', help='輸出範例任務配置')
+    example_parser.add_argument('--mode', choices=list(MEASUREMENT_STRATEGIES), default='sweep',
+                                help='測量模式')
+                                
+    return parser
+
+
+def _print_progress(progress: int, data: dict):
+    """逐點輸出進度到stderr，stdout保留給最終摘要"""
+    prefix = f"[{progress:3d}%]" if progress >= 0 else f"[#{data.get('sequence_number', 0)}]"
+    print(
+        f"{prefix} V={data.get('voltage', 0.0):.6g} V  I={data.get('current', 0.0):.6g} A",
+        file=sys.stderr, flush=True
+    )
+
+
+def cmd_run(args) -> int:
+    """執行測量任務"""
+    try:
+        job = MeasurementJob.load(args.job)
+        if args.output:
+            job.output_path = args.output
+        if args.format:
+            job.output_format = args.format
+        if args.session:
+            job.session_name = args.session
+        if args.duration is not None:
+            job.duration_s = args.duration
+        job.validate()
+    except JobConfigError as e:
+        print(f"❌ 任務配置錯誤: {e}", file=sys.stderr)
+        return EXIT_CONFIG_ERROR
+        
+    runner = JobRunner(job, progress_callback=None if args.quiet else _print_progress)
+    try:
+        summary = runner.run()
+    except Exception as e:
+        print(f"❌ 任務執行失敗: {e}", file=sys.stderr)
+        return EXIT_FAILED
+        
+    print(json.dumps(summary, indent=2, ensure_ascii=False, default=str))
+    
+    if summary['status'] == 'interrupted':
+        return EXIT_INTERRUPTED
+    if summary['status'] == 'failed':
+        return EXIT_FAILED
+    return EXIT_OK
+
+
+def cmd_example(args) -> int:
+    """輸出範例任務配置"""
+    print(json.dumps(EXAMPLE_JOBS[args.mode], indent=2, ensure_ascii=False))
+    return EXIT_OK
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令列入口"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    
+    if args.command == 'run':
+        return cmd_run(args)
+    if args.command == 'example':
+        return cmd_example(args)
+        
+    parser.print_help()
+    return EXIT_CONFIG_ERROR
+
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
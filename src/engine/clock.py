@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+時鐘服務
+以 time.monotonic_ns() 為共同時基，記錄查詢的發送/接收時間，
+估計每個樣本的實際採集時刻，並將多台儀器的數據流對齊到同一時間軸
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+
+def epoch_ns_to_datetime(epoch_ns: int) -> datetime:
+    """Unix epoch ns 轉換為本地時間 datetime (微秒精度，不經浮點運算)"""
+    seconds, remainder = divmod(int(epoch_ns), 1_000_000_000)
+    return datetime.fromtimestamp(seconds).replace(microsecond=remainder // 1000)
+
+
+def format_epoch_ns(epoch_ns: Optional[int]) -> Optional[str]:
+    """Unix epoch ns 轉換為ISO字串，僅用於顯示/導出"""
+    if epoch_ns is None:
+        return None
+    return epoch_ns_to_datetime(epoch_ns).isoformat()
+
+
+def as_epoch_ns(value: Union[int, float, str, datetime, None]) -> int:
+    """將各種時間表示統一為 Unix epoch ns
+    
+    整數視為已是 epoch ns；datetime與ISO字串 (舊數據/外部輸入) 依本地時間換算；
+    None 表示當前時間。
+    
+    Args:
+        value: epoch ns、datetime、ISO字串或None
+        
+    Returns:
+        int: Unix epoch ns
+    """
+    if value is None:
+        return now_epoch_ns()
+    if isinstance(value, datetime):
+        seconds = int(value.replace(microsecond=0).timestamp())
+        return seconds * 1_000_000_000 + value.microsecond * 1000
+    if isinstance(value, str):
+        text = value.strip()
+        try:
+            return int(text)
+        except ValueError:
+            return as_epoch_ns(datetime.fromisoformat(text))
+    return int(value)
+
+
+def now_epoch_ns() -> int:
+    """以全局時鐘服務取得當前 Unix epoch ns"""
+    clock = get_clock()
+    return clock.to_epoch_ns(clock.now_ns())
+
+
+@dataclass(frozen=True)
+class SampleTiming:
+    """單次查詢的時間記錄 (monotonic ns)
+    
+    儀器在發送與接收之間的某一刻完成採樣；未校正時取往返中點，
+    誤差上限為半個往返時間。
+    """
+    send_ns: int
+    recv_ns: int
+    offset_ns: int = 0  # 採樣點相對往返中點的校正 (如積分時間造成的偏移)
+    
+    @property
+    def rtt_ns(self) -> int:
+        """往返時間"""
+        return self.recv_ns - self.send_ns
+        
+    @property
+    def acquired_ns(self) -> int:
+        """估計的採集時刻 (monotonic ns)"""
+        return self.send_ns + self.rtt_ns // 2 + self.offset_ns
+        
+    @property
+    def uncertainty_ns(self) -> int:
+        """採集時刻的誤差上限"""
+        return self.rtt_ns // 2
+
+
+class ClockService:
+    """時鐘服務
+    
+    所有樣本先以 monotonic_ns 記錄，再透過啟動時錨定的偏移換算為
+    Unix epoch 奈秒；系統時間被NTP調整時，樣本順序與間隔不受影響。
+    """
+    
+    def __init__(self, anchor_samples: int = 7):
+        """初始化時鐘服務
+        
+        Args:
+            anchor_samples: 錨定 epoch 偏移時的取樣次數，取區間最窄的一次
+        """
+        self._lock = threading.Lock()
+        self._acquisition_offsets: Dict[str, int] = {}
+        self._epoch_offset_ns = 0
+        self.anchor_uncertainty_ns = 0
+        self.anchor(anchor_samples)
+        
+    def anchor(self, samples: int = 7):
+        """重新錨定 monotonic -> epoch 的偏移"""
+        best = None
+        for _ in range(max(1, samples)):
+            before = time.monotonic_ns()
+            wall = time.time_ns()
+            after = time.monotonic_ns()
+            if best is None or after - before < best[1] - best[0]:
+                best = (before, after, wall)
+        before, after, wall = best
+        with self._lock:
+            self._epoch_offset_ns = wall - (before + after) // 2
+            self.anchor_uncertainty_ns = (after - before) // 2
+            
+    @staticmethod
+    def now_ns() -> int:
+        """當前 monotonic 時間 (ns)"""
+        return time.monotonic_ns()
+        
+    def to_epoch_ns(self, monotonic_ns: int) -> int:
+        """monotonic ns 轉換為 Unix epoch ns"""
+        return monotonic_ns + self._epoch_offset_ns
+        
+    def to_monotonic_ns(self, epoch_ns: int) -> int:
+        """Unix epoch ns 轉換為 monotonic ns"""
+        return epoch_ns - self._epoch_offset_ns
+        
+    def to_datetime(self, monotonic_ns: int) -> datetime:
+        """monotonic ns 轉換為本地時間 datetime (顯示/導出用)"""
+        return epoch_ns_to_datetime(self.to_epoch_ns(monotonic_ns))
+        
+    def set_acquisition_offset(self, instrument_name: str, offset_ns: int):
+        """設定儀器採樣點相對往返中點的校正
+        
+        Args:
+            instrument_name: 儀器名稱
+            offset_ns: 正值表示採樣晚於中點
+        """
+        with self._lock:
+            self._acquisition_offsets[instrument_name] = int(offset_ns)
+            
+    def get_acquisition_offset(self, instrument_name: Optional[str]) -> int:
+        """獲取儀器的採樣校正 (ns)"""
+        with self._lock:
+            return self._acquisition_offsets.get(instrument_name, 0)
+            
+    def timing(self, send_ns: int, recv_ns: int,
+               instrument_name: Optional[str] = None) -> SampleTiming:
+        """建立套用儀器校正的時間記錄"""
+        return SampleTiming(send_ns, recv_ns, self.get_acquisition_offset(instrument_name))
+        
+    def timed(self, func: Callable[..., Any], *args,
+              instrument_name: Optional[str] = None, **kwargs) -> Tuple[Any, SampleTiming]:
+        """執行查詢並記錄其發送/接收時間
+        
+        Returns:
+            Tuple: (查詢結果, SampleTiming)
+        """
+        send_ns = time.monotonic_ns()
+        result = func(*args, **kwargs)
+        recv_ns = time.monotonic_ns()
+        return result, self.timing(send_ns, recv_ns, instrument_name)
+        
+    def timed_query(self, instrument, func: Callable[..., Any], *args,
+                    **kwargs) -> Tuple[Any, SampleTiming]:
+        """執行儀器查詢並記錄採集時間
+        
+        儀器記錄了本次查詢的發送/接收時間 (last_round_trip) 且落在呼叫範圍內時
+        以其為準，否則以整個呼叫的前後時間為界；套用儀器的採樣校正。
+        
+        Args:
+            instrument: 儀器 (提供 name，可選 last_round_trip)
+            func: 查詢函數，如 instrument.measure_all
+            
+        Returns:
+            Tuple: (查詢結果, SampleTiming)
+        """
+        send_ns = time.monotonic_ns()
+        result = func(*args, **kwargs)
+        recv_ns = time.monotonic_ns()
+        
+        round_trip = getattr(instrument, 'last_round_trip', None)
+        if round_trip is not None and send_ns <= round_trip[0] and round_trip[1] <= recv_ns:
+            send_ns, recv_ns = round_trip
+        return result, self.timing(send_ns, recv_ns, getattr(instrument, 'name', None))
+        
+    def acquired_epoch_ns(self, timing: SampleTiming) -> int:
+        """估計的採集時刻 (Unix epoch ns)"""
+        return self.to_epoch_ns(timing.acquired_ns)
+        
+    def stamp(self, data: Dict[str, Any], timing: Optional[SampleTiming] = None) -> Dict[str, Any]:
+        """將採集時刻寫入數據字典
+        
+        寫入 acquired_ns (epoch ns)、latency_ns、uncertainty_ns；
+        已有 acquired_ns 的數據不會被覆蓋。未提供 timing 時以當前時間為準。
+        """
+        if 'acquired_ns' in data:
+            return data
+        if timing is None:
+            now = time.monotonic_ns()
+            timing = SampleTiming(now, now)
+        data['acquired_ns'] = self.to_epoch_ns(timing.acquired_ns)
+        data['latency_ns'] = timing.rtt_ns
+        data['uncertainty_ns'] = timing.uncertainty_ns
+        return data
+
+
+class StreamAligner:
+    """多儀器數據流對齊
+    
+    各數據流以採集時刻 (epoch ns) 記錄樣本，對齊時在參考流的每個時刻
+    對其他數據流做線性插值；超出數據範圍或相鄰樣本間隔大於 max_gap_ns 時為 None。
+    """
+    
+    def __init__(self, max_gap_ns: Optional[int] = None):
+        """初始化對齊器
+        
+        Args:
+            max_gap_ns: 允許插值的最大樣本間隔，None表示不限制
+        """
+        self.max_gap_ns = max_gap_ns
+        self._times: Dict[str, List[int]] = {}
+        self._values: Dict[str, List[Dict[str, float]]] = {}
+        
+    def add_sample(self, stream_id: str, acquired_ns: int, values: Dict[str, float]):
+        """加入一個樣本 (允許亂序)"""
+        times = self._times.setdefault(stream_id, [])
+        samples = self._values.setdefault(stream_id, [])
+        if not times or acquired_ns >= times[-1]:
+            times.append(acquired_ns)
+            samples.append(values)
+        else:
+            index = bisect_left(times, acquired_ns)
+            times.insert(index, acquired_ns)
+            samples.insert(index, values)
+            
+    def add_samples(self, stream_id: str, samples: Iterable[Dict[str, Any]],
+                    fields: Iterable[str] = ('voltage', 'current', 'power')):
+        """批量加入含 acquired_ns 的數據字典"""
+        fields = tuple(fields)
+        for sample in samples:
+            self.add_sample(
+                stream_id, sample['acquired_ns'],
+                {name: sample[name] for name in fields if sample.get(name) is not None}
+            )
+            
+    @property
+    def streams(self) -> List[str]:
+        """已加入的數據流"""
+        return list(self._times)
+        
+    def value_at(self, stream_id: str, field: str, t_ns: int) -> Optional[float]:
+        """數據流在指定時刻的插值
+        
+        Returns:
+            Optional[float]: 插值結果，無法插值時為 None
+        """
+        times = self._times.get(stream_id)
+        if not times or t_ns < times[0] or t_ns > times[-1]:
+            return None
+            
+        samples = self._values[stream_id]
+        index = bisect_left(times, t_ns)
+        if times[index] == t_ns:
+            return samples[index].get(field)
+            
+        t0, t1 = times[index - 1], times[index]
+        if self.max_gap_ns is not None and t1 - t0 > self.max_gap_ns:
+            return None
+        v0, v1 = samples[index - 1].get(field), samples[index].get(field)
+        if v0 is None or v1 is None:
+            return None
+        return v0 + (v1 - v0) * (t_ns - t0) / (t1 - t0)
+        
+    def align(self, reference: str,
+              fields: Optional[Dict[str, Iterable[str]]] = None) -> List[Dict[str, Any]]:
+        """以參考流的採集時刻對齊所有數據流
+        
+        Args:
+            reference: 參考數據流
+            fields: {stream_id: [欄位]}，None使用各流第一個樣本的全部欄位
+            
+        Returns:
+            List[Dict]: 每列包含 acquired_ns 與 "stream.field" 欄位
+        """
+        if reference not in self._times:
+            raise KeyError(f"未知的數據流: {reference}")
+        return self._align_at(self._times[reference], fields)
+        
+    def align_grid(self, period_ns: int, start_ns: Optional[int] = None,
+                   end_ns: Optional[int] = None,
+                   fields: Optional[Dict[str, Iterable[str]]] = None) -> List[Dict[str, Any]]:
+        """在等間隔時間網格上對齊所有數據流 (預設為各流的共同時間範圍)"""
+        if period_ns <= 0:
+            raise ValueError("網格間隔必須大於0")
+        if not self._times:
+            return []
+        if start_ns is None:
+            start_ns = max(times[0] for times in self._times.values())
+        if end_ns is None:
+            end_ns = min(times[-1] for times in self._times.values())
+        grid = range(start_ns, end_ns + 1, period_ns) if end_ns >= start_ns else []
+        return self._align_at(grid, fields)
+        
+    def _align_at(self, grid: Iterable[int],
+                  fields: Optional[Dict[str, Iterable[str]]]) -> List[Dict[str, Any]]:
+        if fields is None:
+            fields = {
+                stream_id: list(samples[0]) if samples else []
+                for stream_id, samples in self._values.items()
+            }
+        rows = []
+        for t_ns in grid:
+            row = {'acquired_ns': t_ns}
+            for stream_id, names in fields.items():
+                for name in names:
+                    row[f"{stream_id}.{name}"] = self.value_at(stream_id, name, t_ns)
+            rows.append(row)
+        return rows
+
+
+# 全局時鐘服務實例
+_clock = None
+_clock_lock = threading.Lock()
+
+def get_clock() -> ClockService:
+    """獲取全局時鐘服務實例 - 所有儀器共用同一時基
+    
+    Returns:
+        ClockService: 時鐘服務實例
+    """
+    global _clock
+    if _clock is None:
+        with _clock_lock:
+            if _clock is None:
+                _clock = ClockService()
+    return _clock
\ No newline at end of file
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+連接健康監控
+鏈路閒置時發送心跳、偵測斷線，並以指數退避自動恢復連接
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Dict, Any, List, Optional
+from src.config import get_config
+from .lifecycle import WorkerState
+from .signals import Signal
+from .worker import EngineWorker
+
+
+def compute_backoff_delay(attempt: int, initial: float, maximum: float,
+                          jitter: float = 0.0) -> float:
+    """計算指數退避延遲
+    
+    Args:
+        attempt: 第幾次嘗試 (從1開始)
+        initial: 初始延遲(秒)
+        maximum: 最大延遲(秒)
+        jitter: 隨機擾動比例，0.2 表示 ±20%
+        
+    Returns:
+        float: 延遲秒數
+    """
+    delay = min(maximum, initial * (2 ** max(0, attempt - 1)))
+    if jitter > 0:
+        delay *= 1.0 + random.uniform(-jitter, jitter)
+    return max(0.0, delay)
+
+
+class LinkState(Enum):
+    """鏈路狀態"""
+    HEALTHY = "healthy"
+    LOST = "lost"
+    FAILED = "failed"  # 已放棄自動恢復
+
+
+@dataclass
+class MonitoredLink:
+    """單一儀器鏈路的監控狀態與指標"""
+    instrument: Any
+    connection_params: Dict[str, Any]
+    workers: List[Any] = field(default_factory=list)
+    paused_workers: List[Any] = field(default_factory=list)
+    state: LinkState = LinkState.HEALTHY
+    missed_heartbeats: int = 0
+    failure_reported: bool = False
+    lost_at: Optional[float] = None
+    recovery_attempt: int = 0
+    next_attempt_at: float = 0.0
+    
+    # 指標
+    heartbeats_sent: int = 0
+    heartbeat_failures: int = 0
+    last_heartbeat_rtt: Optional[float] = None
+    outages: int = 0
+    detect_times: deque = field(default_factory=lambda: deque(maxlen=100))
+    recover_times: deque = field(default_factory=lambda: deque(maxlen=100))
+
+
+class HealthMonitorLogic:
+    """連接健康監控邏輯混入類
+    
+    - 只在鏈路閒置超過 health_check_interval 時發送 *OPC? 心跳，
+      測量進行中不產生額外I/O
+    - 連續 max_missed_heartbeats 次失敗即判定斷線，偵測時間有上限：
+      閒置間隔 + 失敗次數 × (心跳超時 + 輪詢間隔)
+    - 斷線後暫停關聯的測量Worker，以帶擾動的指數退避重連，
+      恢復後自動繼續測量
+    - 記錄每次斷線的偵測時間與恢復時間
+    
+    需與 WorkerLifecycle 實作類一起使用，實作類需提供信號 connection_lost、
+    connection_recovered、recovery_attempted、recovery_abandoned。
+    """
+    
+    def _init_health(self, poll_interval_ms: int = 500):
+        """初始化健康監控狀態
+        
+        Args:
+            poll_interval_ms: 監控輪詢間隔(毫秒)
+        """
+        self.poll_interval_ms = poll_interval_ms
+        
+        config = get_config()
+        self.heartbeat_interval = config.get('safety.monitoring.health_check_interval', 30)
+        self.heartbeat_timeout = config.get('safety.monitoring.heartbeat_timeout', 2.0)
+        self.max_missed_heartbeats = config.get('safety.monitoring.max_missed_heartbeats', 2)
+        self.auto_recovery = config.get('safety.monitoring.auto_recovery', True)
+        self.reconnect_initial_delay = config.get('safety.monitoring.reconnect_initial_delay', 1.0)
+        self.reconnect_max_delay = config.get('safety.monitoring.reconnect_max_delay', 60.0)
+        self.reconnect_jitter = config.get('safety.monitoring.reconnect_jitter', 0.2)
+        self.max_recovery_attempts = config.get('safety.monitoring.max_recovery_attempts', 0)
+        
+        self.links: Dict[int, MonitoredLink] = {}
+        self._links_lock = threading.Lock()
+        
+    # =================
+    # 註冊管理
+    # =================
+    
+    def add_instrument(self, instrument, connection_params: Dict[str, Any],
+                       workers: Optional[List[Any]] = None):
+        """開始監控儀器鏈路
+        
+        Args:
+            instrument: 儀器實例
+            connection_params: 重連時使用的連接參數
+            workers: 斷線時需要暫停的測量Worker
+        """
+        with self._links_lock:
+            link = MonitoredLink(instrument, dict(connection_params or {}))
+            link.workers.extend(workers or [])
+            self.links[id(instrument)] = link
+        self.logger.info(f"開始監控 {instrument.name} 連接健康")
+        
+    def remove_instrument(self, instrument):
+        """停止監控儀器鏈路 - 主動斷線前調用，避免被判定為異常斷線"""
+        with self._links_lock:
+            link = self.links.pop(id(instrument), None)
+        if link:
+            self.logger.info(f"停止監控 {instrument.name}")
+            
+    def attach_worker(self, instrument, worker):
+        """關聯測量Worker，斷線時暫停、恢復後繼續"""
+        link = self._get_link(instrument)
+        if link and worker not in link.workers:
+            link.workers.append(worker)
+            
+    def detach_worker(self, instrument, worker):
+        """解除測量Worker關聯"""
+        link = self._get_link(instrument)
+        if link:
+            if worker in link.workers:
+                link.workers.remove(worker)
+            if worker in link.paused_workers:
+                link.paused_workers.remove(worker)
+                
+    def report_failure(self, instrument, worker=None) -> bool:
+        """回報I/O失敗 - 不等待閒置間隔，立即探測鏈路
+        
+        Args:
+            instrument: 發生失敗的儀器
+            worker: 回報的Worker，將被暫停直到鏈路確認正常
+            
+        Returns:
+            bool: 鏈路是否受監控 (False 表示呼叫端需自行處理錯誤)
+        """
+        link = self._get_link(instrument)
+        if not link or not self.is_running():
+            return False
+        link.failure_reported = True
+        if worker is not None:
+            self._pause_worker(link, worker)
+        return True
+        
+    def _get_link(self, instrument) -> Optional[MonitoredLink]:
+        with self._links_lock:
+            return self.links.get(id(instrument))
+            
+    # =================
+    # Worker 生命週期
+    # =================
+    
+    def setup(self) -> bool:
+        """設置健康監控"""
+        self.logger.info(
+            f"健康監控啟動: 閒置 {self.heartbeat_interval}s 發送心跳, "
+            f"超時 {self.heartbeat_timeout}s, 允許失敗 {self.max_missed_heartbeats} 次"
+        )
+        return True
+        
+    def execute_operation(self) -> bool:
+        """檢查一輪所有鏈路"""
+        with self._links_lock:
+            links = list(self.links.values())
+            
+        for link in links:
+            if self._should_stop:
+                break
+            try:
+                self._check_link(link)
+            except Exception as e:
+                self.logger.error(f"檢查 {link.instrument.name} 鏈路時發生錯誤: {e}")
+                
+        self.sleep(self.poll_interval_ms / 1000.0)
+        return True
+        
+    def cleanup(self) -> None:
+        """清理健康監控"""
+        pass
+        
+    # =================
+    # 偵測與恢復
+    # =================
+    
+    def _check_link(self, link: MonitoredLink):
+        """檢查單一鏈路"""
+        now = time.monotonic()
+        instrument = link.instrument
+        
+        if link.state == LinkState.HEALTHY:
+            if not instrument.is_connected():
+                self._declare_lost(link)
+                return
+                
+            if not link.failure_reported and instrument.idle_seconds() < self.heartbeat_interval:
+                return
+                
+            # 鏈路正在被測量執行緒使用，代表並非閒置
+            if not instrument.io_lock.acquire(blocking=False):
+                return
+            try:
+                started = time.monotonic()
+                alive = instrument.heartbeat(self.heartbeat_timeout)
+                link.last_heartbeat_rtt = time.monotonic() - started
+            finally:
+                instrument.io_lock.release()
+                
+            link.heartbeats_sent += 1
+            if alive:
+                link.missed_heartbeats = 0
+                link.failure_reported = False
+                self._resume_paused_workers(link)
+            else:
+                link.missed_heartbeats += 1
+                link.heartbeat_failures += 1
+                self.logger.warning(
+                    f"{instrument.name} 心跳失敗 ({link.missed_heartbeats}/{self.max_missed_heartbeats})"
+                )
+                if link.missed_heartbeats >= self.max_missed_heartbeats:
+                    self._declare_lost(link)
+                    
+        elif link.state == LinkState.LOST and self.auto_recovery and now >= link.next_attempt_at:
+            self._attempt_recovery(link)
+            
+    def _declare_lost(self, link: MonitoredLink):
+        """判定鏈路斷線"""
+        instrument = link.instrument
+        
+        # 偵測時間: 從最後一次成功通訊到判定斷線
+        time_to_detect = instrument.idle_seconds()
+        link.state = LinkState.LOST
+        link.lost_at = time.monotonic()
+        link.recovery_attempt = 0
+        link.next_attempt_at = link.lost_at
+        link.outages += 1
+        link.detect_times.append(time_to_detect)
+        
+        for worker in list(link.workers):
+            self._pause_worker(link, worker)
+            
+        self.logger.warning(f"{instrument.name} 連接中斷，偵測耗時 {time_to_detect:.2f}s")
+        self.connection_lost.emit(instrument.name, time_to_detect)
+        
+    def _attempt_recovery(self, link: MonitoredLink):
+        """執行一次重連嘗試"""
+        instrument = link.instrument
+        link.recovery_attempt += 1
+        
+        if self.max_recovery_attempts and link.recovery_attempt > self.max_recovery_attempts:
+            link.state = LinkState.FAILED
+            self.logger.error(f"{instrument.name} 自動恢復失敗: 已達到最大嘗試次數 ({self.max_recovery_attempts})")
+            self.recovery_abandoned.emit(instrument.name)
+            return
+            
+        self.logger.info(f"{instrument.name} 重連嘗試 {link.recovery_attempt}")
+        
+        success = False
+        try:
+            with instrument.io_lock:
+                if instrument.is_connected():
+                    instrument.disconnect()
+                success = instrument.connect(link.connection_params)
+        except Exception as e:
+            self.logger.error(f"{instrument.name} 重連嘗試 {link.recovery_attempt} 錯誤: {e}")
+            
+        if success:
+            time_to_recover = time.monotonic() - link.lost_at
+            link.state = LinkState.HEALTHY
+            link.missed_heartbeats = 0
+            link.failure_reported = False
+            link.recover_times.append(time_to_recover)
+            
+            self._resume_paused_workers(link)
+            
+            self.logger.info(f"{instrument.name} 連接已恢復，恢復耗時 {time_to_recover:.2f}s")
+            self.connection_recovered.emit(instrument.name, time_to_recover)
+        else:
+            delay = compute_backoff_delay(
+                link.recovery_attempt,
+                self.reconnect_initial_delay,
+                self.reconnect_max_delay,
+                self.reconnect_jitter
+            )
+            link.next_attempt_at = time.monotonic() + delay
+            self.recovery_attempted.emit(instrument.name, link.recovery_attempt, delay)
+            
+    def _pause_worker(self, link: MonitoredLink, worker):
+        """暫停Worker並記錄，只恢復由監控暫停的Worker"""
+        if worker.state == WorkerState.RUNNING:
+            worker.pause_work()
+            if worker not in link.paused_workers:
+                link.paused_workers.append(worker)
+                
+    def _resume_paused_workers(self, link: MonitoredLink):
+        """恢復由監控暫停的Worker"""
+        for worker in link.paused_workers:
+            if worker.is_running() and worker.state == WorkerState.PAUSED:
+                worker.resume_work()
+        link.paused_workers.clear()
+        
+    # =================
+    # 指標
+    # =================
+    
+    def get_health_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """獲取各鏈路健康指標
+        
+        Returns:
+            Dict: {instrument_name: 指標}，時間單位為秒
+        """
+        def summarize(values) -> Dict[str, Optional[float]]:
+            if not values:
+                return {'last': None, 'mean': None, 'max': None}
+            return {
+                'last': values[-1],
+                'mean': sum(values) / len(values),
+                'max': max(values)
+            }
+            
+        with self._links_lock:
+            links = list(self.links.values())
+            
+        metrics = {}
+        for link in links:
+            metrics[link.instrument.name] = {
+                'state': link.state.value,
+                'idle_seconds': link.instrument.idle_seconds(),
+                'heartbeats_sent': link.heartbeats_sent,
+                'heartbeat_failures': link.heartbeat_failures,
+                'last_heartbeat_rtt': link.last_heartbeat_rtt,
+                'outages': link.outages,
+                'recovery_attempt': link.recovery_attempt,
+                'time_to_detect': summarize(link.detect_times),
+                'time_to_recover': summarize(link.recover_times)
+            }
+        return metrics
+
+
+class HeadlessHealthMonitor(HealthMonitorLogic, EngineWorker):
+    """無GUI連接健康監控工作執行緒"""
+    
+    connection_lost = Signal(str, float)          # instrument_name, time_to_detect (秒)
+    connection_recovered = Signal(str, float)     # instrument_name, time_to_recover (秒)
+    recovery_attempted = Signal(str, int, float)  # instrument_name, attempt, next_delay (秒)
+    recovery_abandoned = Signal(str)              # instrument_name
+    
+    def __init__(self, poll_interval_ms: int = 500):
+        """初始化健康監控
+        
+        Args:
+            poll_interval_ms: 監控輪詢間隔(毫秒)
+        """
+        EngineWorker.__init__(self, "HealthMonitor")
+        self._init_health(poll_interval_ms)
\ No newline at end of file
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+工作執行緒生命週期
+與執行緒實作無關的狀態管理、暫停/停止控制和模板方法主循環，
+由純Python EngineWorker 與Qt UnifiedWorkerBase 共用
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from enum import Enum
+from typing import Any, Optional, Dict
+from src.config import get_config
+from src.unified_logger import get_logger
+from .cancellation import CancellationToken
+from .clock import get_clock
+
+
+class WorkerState(Enum):
+    """工作執行緒狀態"""
+    IDLE = "idle"
+    RUNNING = "running"
+    PAUSED = "paused"
+    STOPPING = "stopping"
+    ERROR = "error"
+    COMPLETED = "completed"
+
+
+class PauseControl:
+    """簡單工作執行緒的暫停控制
+    
+    供未使用 WorkerLifecycle 的執行緒 (如Widget內的QThread) 接受連接健康監控的
+    暫停/恢復：提供 state、pause_work() 與 resume_work()。執行緒在每次儀器操作前
+    呼叫 wait_if_paused()，I/O失敗時呼叫 pause_on_failure() 交由監控探測鏈路。
+    子類需實現 is_running()。
+    """
+    
+    max_consecutive_failures = 3
+    
+    def _init_pause(self, instrument=None):
+        """初始化暫停狀態
+        
+        Args:
+            instrument: 受監控的儀器 (回報失敗時使用)
+        """
+        self.state = WorkerState.IDLE
+        self.health_monitor = None  # 由Widget在關聯監控時設置
+        self._monitored_instrument = instrument
+        self._consecutive_failures = 0
+        self._resumed = threading.Event()
+        self._resumed.set()
+        
+    def _mark_running(self):
+        """執行緒開始執行"""
+        self._consecutive_failures = 0
+        self._resumed.set()
+        self.state = WorkerState.RUNNING
+        
+    def _mark_stopped(self):
+        """執行緒結束"""
+        self.state = WorkerState.IDLE
+        self._resumed.set()
+        
+    def pause_work(self):
+        """暫停工作 (下一次儀器操作前生效)"""
+        if self.state == WorkerState.RUNNING:
+            self._resumed.clear()
+            self.state = WorkerState.PAUSED
+            
+    def resume_work(self):
+        """恢復工作"""
+        if self.state == WorkerState.PAUSED:
+            self.state = WorkerState.RUNNING
+            self._resumed.set()
+            
+    def wait_if_paused(self, cancel_token: CancellationToken) -> bool:
+        """暫停期間阻塞，恢復或停止時被喚醒
+        
+        Returns:
+            bool: True 表示可繼續，False 表示已請求停止
+        """
+        if not self._resumed.is_set():
+            unregister = cancel_token.register(self._resumed.set)
+            try:
+                self._resumed.wait()
+            finally:
+                unregister()
+        return not cancel_token.is_cancelled
+        
+    def pause_on_failure(self) -> bool:
+        """I/O失敗時呼叫 - 交由健康監控探測鏈路並暫停等待恢復
+        
+        Returns:
+            bool: True 表示已暫停 (恢復後重試)，False 表示呼叫端需自行處理錯誤
+        """
+        self._consecutive_failures += 1
+        return (self.health_monitor is not None
+                and self._consecutive_failures <= self.max_consecutive_failures
+                and self.health_monitor.report_failure(self._monitored_instrument, self))
+                
+    def _operation_succeeded(self):
+        """儀器操作成功，重置連續失敗計數"""
+        self._consecutive_failures = 0
+
+
+class WorkerLifecycle(ABC):
+    """工作執行緒生命週期混入類
+    
+    提供所有Worker的標準功能：
+    - 狀態管理
+    - 錯誤處理
+    - 資源清理
+    - 事件驅動的暫停/停止：暫停時阻塞在條件變量上不佔用CPU，
+      停止請求透過取消令牌立即喚醒 sleep() 中的等待
+      
+    子類需提供信號屬性 state_changed、progress_updated、error_occurred、
+    operation_completed、data_ready，並實現執行緒鉤子
+    _start_thread()、_join_thread()、_in_worker_thread() 和 is_running()。
+    """
+    
+    def _init_lifecycle(self, worker_name: str, instrument=None):
+        """初始化生命週期狀態
+        
+        Args:
+            worker_name: Worker識別名稱
+            instrument: 關聯的儀器實例 (可選)
+        """
+        self.worker_name = worker_name
+        self.instrument = instrument
+        self.state = WorkerState.IDLE
+        self.logger = get_logger(f"Worker.{worker_name}")
+        
+        # 控制變量
+        self._cancel_token = CancellationToken()
+        self._is_paused = False
+        self._pause_condition = threading.Condition()
+        self.stop_timeout_ms = get_config().get('performance.worker_threads.stop_timeout_ms', 1000)
+        
+        # 統計信息
+        self.start_time = None
+        self.operation_count = 0
+        self.error_count = 0
+        self.last_stop_latency_ms: Optional[float] = None
+        
+    # =================
+    # 執行緒鉤子
+    # =================
+    
+    @abstractmethod
+    def _start_thread(self) -> None:
+        """啟動執行緒，新執行緒中需呼叫 _run_loop()"""
+        pass
+        
+    @abstractmethod
+    def _join_thread(self, timeout_ms: int) -> bool:
+        """等待執行緒結束
+        
+        Returns:
+            bool: 是否已在時限內結束
+        """
+        pass
+        
+    @abstractmethod
+    def _in_worker_thread(self) -> bool:
+        """當前是否在Worker自身的執行緒中"""
+        pass
+        
+    @abstractmethod
+    def is_running(self) -> bool:
+        """執行緒是否正在執行"""
+        pass
+        
+    # =================
+    # 主循環
+    # =================
+    
+    @property
+    def _should_stop(self) -> bool:
+        """是否已請求停止"""
+        return self._cancel_token.is_cancelled
+        
+    @property
+    def cancel_token(self) -> CancellationToken:
+        """當前執行的取消令牌"""
+        return self._cancel_token
+        
+    def _run_loop(self):
+        """主執行方法 - 模板方法模式"""
+        try:
+            self._change_state(WorkerState.RUNNING)
+            self.logger.info(f"Worker {self.worker_name} 開始執行")
+            
+            # 執行初始化
+            if not self.setup():
+                self._change_state(WorkerState.ERROR)
+                return
+                
+            # 主要工作循環
+            while not self._should_stop:
+                if self._is_paused:
+                    self._wait_while_paused()
+                    continue
+                    
+                if not self.execute_operation():
+                    break
+                    
+                self.operation_count += 1
+                
+            # 清理工作
+            self.cleanup()
+            
+            if not self._should_stop:
+                self._change_state(WorkerState.COMPLETED)
+                self.operation_completed.emit({
+                    'worker_name': self.worker_name,
+                    'operation_count': self.operation_count,
+                    'error_count': self.error_count
+                })
+            else:
+                self._change_state(WorkerState.IDLE)
+                
+        except Exception as e:
+            self.logger.error(f"Worker執行錯誤: {e}")
+            self.error_occurred.emit("execution_error", str(e))
+            self._change_state(WorkerState.ERROR)
+        finally:
+            self.cleanup()
+            self._record_stop_latency()
+            
+    def _wait_while_paused(self):
+        """暫停期間阻塞在條件變量上，恢復或停止時被喚醒"""
+        with self._pause_condition:
+            while self._is_paused and not self._should_stop:
+                self._pause_condition.wait()
+                
+    def _wake(self):
+        """喚醒暫停中的執行緒"""
+        with self._pause_condition:
+            self._pause_condition.notify_all()
+            
+    def _record_stop_latency(self):
+        """記錄從停止請求到執行緒結束的延遲"""
+        requested_at = self._cancel_token.cancelled_at
+        if requested_at is not None:
+            self.last_stop_latency_ms = (time.monotonic() - requested_at) * 1000
+            self.logger.debug(f"停止延遲: {self.last_stop_latency_ms:.1f} ms")
+            
+    @abstractmethod
+    def setup(self) -> bool:
+        """初始化設置 - 子類必須實現
+        
+        Returns:
+            bool: 設置是否成功
+        """
+        pass
+        
+    @abstractmethod
+    def execute_operation(self) -> bool:
+        """執行一次操作 - 子類必須實現
+        
+        Returns:
+            bool: 是否繼續執行
+        """
+        pass
+        
+    @abstractmethod
+    def cleanup(self) -> None:
+        """清理資源 - 子類必須實現"""
+        pass
+        
+    # =================
+    # 控制
+    # =================
+    
+    def sleep(self, seconds: float) -> bool:
+        """可中斷的休眠 - 子類應以此取代 msleep()/time.sleep()
+        
+        Args:
+            seconds: 休眠秒數
+            
+        Returns:
+            bool: True 表示完整休眠，False 表示被停止請求打斷
+        """
+        return self._cancel_token.sleep(seconds)
+        
+    def start_work(self):
+        """開始工作"""
+        if self.state == WorkerState.PAUSED:
+            self.resume_work()
+        elif not self.is_running():
+            # 每次執行使用新的取消令牌
+            self._cancel_token = CancellationToken()
+            self._is_paused = False
+            self._start_thread()
+            
+    def request_stop(self):
+        """請求停止 (不等待) - 喚醒所有可中斷的等待"""
+        if self._should_stop:
+            return
+        self._change_state(WorkerState.STOPPING)
+        self._cancel_token.cancel()
+        self._wake()
+        
+    def stop_work(self, timeout_ms: Optional[int] = None) -> bool:
+        """停止工作並等待執行緒結束
+        
+        等待時間有上限；正在進行的儀器I/O仍需在其通訊超時內返回。
+        
+        Args:
+            timeout_ms: 最長等待毫秒數，None使用配置值
+            
+        Returns:
+            bool: 執行緒是否已在時限內結束
+        """
+        self.request_stop()
+        
+        if self._in_worker_thread() or not self.is_running():
+            return not self.is_running()
+            
+        timeout_ms = self.stop_timeout_ms if timeout_ms is None else timeout_ms
+        finished = self._join_thread(timeout_ms)
+        if not finished:
+            self.logger.warning(f"Worker {self.worker_name} 未在 {timeout_ms} ms 內停止")
+        return finished
+        
+    def pause_work(self):
+        """暫停工作"""
+        if self.state == WorkerState.RUNNING:
+            self._is_paused = True
+            self._change_state(WorkerState.PAUSED)
+            
+    def resume_work(self):
+        """恢復工作"""
+        if self.state == WorkerState.PAUSED:
+            with self._pause_condition:
+                self._is_paused = False
+                self._pause_condition.notify_all()
+            self._change_state(WorkerState.RUNNING)
+            
+    # =================
+    # 信號輔助
+    # =================
+    
+    def _change_state(self, new_state: WorkerState):
+        """改變Worker狀態"""
+        old_state = self.state
+        self.state = new_state
+        self.state_changed.emit(new_state.value)
+        self.logger.debug(f"狀態變更: {old_state.value} -> {new_state.value}")
+        
+    def _emit_progress(self, progress: int):
+        """發送進度更新"""
+        self.progress_updated.emit(max(0, min(100, progress)))
+        
+    def _emit_data(self, data: Dict[str, Any]):
+        """發送數據"""
+        data['worker_name'] = self.worker_name
+        # 時間戳以採集時刻為準 (epoch ns)，而非查詢返回後的時間
+        get_clock().stamp(data)
+        data['timestamp'] = data['acquired_ns']
+        self.data_ready.emit(data)
+        
+    def _emit_error(self, error_type: str, error_message: str):
+        """發送錯誤信息"""
+        self.error_count += 1
+        self.error_occurred.emit(error_type, error_message)
+        self.logger.error(f"{error_type}: {error_message}")
+        
+    def get_current_timestamp(self) -> str:
+        """獲取當前時間戳"""
+        return datetime.now().isoformat()
+        
+    def get_worker_info(self) -> Dict[str, Any]:
+        """獲取Worker信息"""
+        return {
+            'name': self.worker_name,
+            'state': self.state.value,
+            'operation_count': self.operation_count,
+            'error_count': self.error_count,
+            'last_stop_latency_ms': self.last_stop_latency_ms,
+            'has_instrument': self.instrument is not None
+        }
\ No newline at end of file
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+測量工作循環
+策略驅動的測量流程，由無GUI的 HeadlessMeasurementWorker 與Qt MeasurementWorker 共用
+"""
+
+from typing import Dict, Any
+from .strategies import MeasurementStrategy, ContinuousMeasurementStrategy
+from .worker import EngineWorker
+
+
+class MeasurementLoop:
+    """策略驅動的測量循環混入類
+    
+    使用策略模式支援不同的測量類型：
+    - 連續測量
+    - 掃描測量
+    - 單次測量
+    
+    需與 WorkerLifecycle 實作類一起使用，混入類須列在基類之前。
+    """
+    
+    def _init_measurement(self, strategy: MeasurementStrategy, params: Dict[str, Any]):
+        """初始化測量狀態
+        
+        Args:
+            strategy: 測量策略
+            params: 測量參數
+        """
+        self.strategy = strategy
+        self.params = params
+        
+        # 連接健康監控 (可選)，設置後I/O失敗會暫停等待恢復而非結束測量
+        self.health_monitor = None
+        self.max_consecutive_failures = 3
+        self._consecutive_failures = 0
+        
+    def setup(self) -> bool:
+        """設置測量Worker"""
+        try:
+            if not self.instrument or not self.instrument.is_connected():
+                self._emit_error("instrument_error", "儀器未連接")
+                return False
+                
+            self.strategy.cancel_token = self.cancel_token
+            return self.strategy.setup(self.instrument, self.params)
+            
+        except Exception as e:
+            self._emit_error("setup_error", str(e))
+            return False
+            
+    def execute_operation(self) -> bool:
+        """執行測量操作"""
+        try:
+            if not self.strategy.should_continue():
+                return False
+                
+            # 執行測量
+            measurement_data = self.strategy.execute_single_measurement(self.instrument)
+            
+            if measurement_data:
+                self._consecutive_failures = 0
+                
+                # 發送數據
+                self._emit_data(measurement_data)
+                
+                # 更新進度
+                progress = self.strategy.get_progress()
+                if progress >= 0:
+                    self._emit_progress(progress)
+                    
+                # 檢查延遲
+                if isinstance(self.strategy, ContinuousMeasurementStrategy):
+                    self.sleep(self.strategy.interval_ms / 1000.0)
+                    
+            return True
+            
+        except Exception as e:
+            self._consecutive_failures += 1
+            
+            # 交由健康監控探測鏈路，恢復後從失敗的測量點繼續；
+            # 鏈路正常但仍連續失敗時視為測量錯誤
+            if (self.health_monitor is not None
+                    and self._consecutive_failures <= self.max_consecutive_failures
+                    and self.health_monitor.report_failure(self.instrument, self)):
+                self.logger.warning(f"測量失敗，等待連接恢復: {e}")
+                return True
+                
+            self._emit_error("measurement_error", str(e))
+            return False
+            
+    def cleanup(self) -> None:
+        """清理測量資源"""
+        try:
+            if self.strategy and self.instrument:
+                self.strategy.cleanup(self.instrument)
+        except Exception as e:
+            self.logger.error(f"清理失敗: {e}")
+            
+    def pause_measurement(self):
+        """暫停測量"""
+        self.pause_work()
+        
+    def resume_measurement(self):
+        """恢復測量"""
+        self.resume_work()
+        
+    def stop_measurement(self):
+        """停止測量"""
+        self.stop_work()
+
+
+class HeadlessMeasurementWorker(MeasurementLoop, EngineWorker):
+    """無GUI測量工作執行緒 - 供CLI、腳本和自動化測試站使用"""
+    
+    def __init__(self, instrument, strategy: MeasurementStrategy, params: Dict[str, Any]):
+        """初始化測量Worker
+        
+        Args:
+            instrument: 儀器實例
+            strategy: 測量策略
+            params: 測量參數
+        """
+        EngineWorker.__init__(self, f"Measurement_{strategy.__class__.__name__}", instrument)
+        self._init_measurement(strategy, params)
\ No newline at end of file
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+測量任務執行器
+從任務配置建立儀器、策略和數據管理器，在無GUI環境下執行掃描或連續測量
+"""
+
+import importlib
+import json
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Any, Optional, Callable, List
+from src.unified_logger import get_logger
+from .clock import as_epoch_ns
+from .measurement import HeadlessMeasurementWorker
+from .strategies import (
+    ContinuousMeasurementStrategy, SweepMeasurementStrategy, AdaptiveSweepStrategy,
+    NestedSweepStrategy
+)
+
+
+# 儀器類型 -> (模組, 類名)，延遲導入以免無關的驅動依賴 (如pyvisa) 拖慢啟動
+INSTRUMENT_TYPES = {
+    'keithley_2461': ('src.keithley_2461', 'Keithley2461'),
+    'rigol_dp711': ('src.rigol_dp711', 'RigolDP711'),
+}
+
+# 測量模式 -> 策略類
+MEASUREMENT_STRATEGIES = {
+    'continuous': ContinuousMeasurementStrategy,
+    'sweep': SweepMeasurementStrategy,
+    'adaptive_sweep': AdaptiveSweepStrategy,
+    'nested_sweep': NestedSweepStrategy,
+}
+
+STORAGE_FORMATS = ('csv', 'json', 'sqlite')
+
+# 數據點的核心欄位，其餘欄位存入 metadata
+_POINT_FIELDS = ('timestamp', 'acquired_ns', 'voltage', 'current', 'resistance', 'power', 'temperature')
+
+
+class JobConfigError(ValueError):
+    """任務配置錯誤"""
+    pass
+
+
+@dataclass
+class MeasurementJob:
+    """測量任務配置
+    
+    JSON格式：
+        {
+            "instrument": {"type": "keithley_2461", "connection": {"ip_address": "192.168.0.100"}},
+            "measurement": {"mode": "sweep", "params": {"start": 0, "stop": 5, "step": 0.1}},
+            "output": {"path": "data", "format": "csv", "session_name": "iv_sweep"},
+            "duration_s": null
+        }
+        
+    nested_sweep 模式另需 "outer_instrument" (格式同 "instrument") 作為步進軸。
+    """
+    instrument_type: str
+    mode: str
+    params: Dict[str, Any] = field(default_factory=dict)
+    connection: Dict[str, Any] = field(default_factory=dict)
+    instrument_id: Optional[str] = None
+    outer_instrument_type: Optional[str] = None
+    outer_connection: Dict[str, Any] = field(default_factory=dict)
+    output_path: Optional[str] = None
+    output_format: Optional[str] = None
+    session_name: Optional[str] = None
+    duration_s: Optional[float] = None
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'MeasurementJob':
+        """從字典建立並驗證任務配置
+        
+        Raises:
+            JobConfigError: 配置不完整或數值無效
+        """
+        if not isinstance(data, dict):
+            raise JobConfigError("任務配置必須是JSON物件")
+            
+        instrument = data.get('instrument') or {}
+        outer_instrument = data.get('outer_instrument') or {}
+        measurement = data.get('measurement') or {}
+        output = data.get('output') or {}
+        
+        job = cls(
+            instrument_type=instrument.get('type', ''),
+            connection=dict(instrument.get('connection') or {}),
+            instrument_id=instrument.get('id'),
+            outer_instrument_type=outer_instrument.get('type'),
+            outer_connection=dict(outer_instrument.get('connection') or {}),
+            mode=measurement.get('mode', ''),
+            params=dict(measurement.get('params') or {}),
+            output_path=output.get('path'),
+            output_format=output.get('format'),
+            session_name=output.get('session_name'),
+            duration_s=data.get('duration_s'),
+        )
+        job.validate()
+        return job
+        
+    @classmethod
+    def load(cls, path: str) -> 'MeasurementJob':
+        """從JSON檔案載入任務配置"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except OSError as e:
+            raise JobConfigError(f"無法讀取任務配置 {path}: {e}")
+        except json.JSONDecodeError as e:
+            raise JobConfigError(f"任務配置不是有效的JSON: {e}")
+        return cls.from_dict(data)
+        
+    def validate(self):
+        """驗證配置
+        
+        Raises:
+            JobConfigError: 配置無效
+        """
+        if self.instrument_type not in INSTRUMENT_TYPES:
+            raise JobConfigError(
+                f"不支援的儀器類型: '{self.instrument_type}' "
+                f"(可用: {', '.join(INSTRUMENT_TYPES)})"
+            )
+        if self.mode not in MEASUREMENT_STRATEGIES:
+            raise JobConfigError(
+                f"不支援的測量模式: '{self.mode}' "
+                f"(可用: {', '.join(MEASUREMENT_STRATEGIES)})"
+            )
+        if self.mode in ('sweep', 'adaptive_sweep', 'nested_sweep'):
+            missing = [key for key in ('start', 'stop', 'step') if key not in self.params]
+            if missing:
+                raise JobConfigError(f"掃描測量缺少參數: {', '.join(missing)}")
+            if self.params['step'] == 0:
+                raise JobConfigError("掃描步進不可為0")
+        if self.mode == 'nested_sweep':
+            if self.outer_instrument_type not in INSTRUMENT_TYPES:
+                raise JobConfigError(
+                    f"巢狀掃描需要有效的外層儀器類型 (可用: {', '.join(INSTRUMENT_TYPES)})"
+                )
+            outer_keys = ('outer_start', 'outer_stop', 'outer_step')
+            if 'outer_values' not in self.params and not all(key in self.params for key in outer_keys):
+                raise JobConfigError("巢狀掃描需要 outer_values 或 outer_start/outer_stop/outer_step")
+            if 'outer_values' not in self.params and self.params['outer_step'] == 0:
+                raise JobConfigError("外層步進不可為0")
+        if self.output_format is not None and self.output_format not in STORAGE_FORMATS:
+            raise JobConfigError(
+                f"不支援的輸出格式: '{self.output_format}' (可用: {', '.join(STORAGE_FORMATS)})"
+            )
+        if self.duration_s is not None and self.duration_s <= 0:
+            raise JobConfigError("duration_s 必須大於0")
+
+
+def create_instrument(instrument_type: str, connection: Optional[Dict[str, Any]] = None):
+    """依類型建立儀器實例 (不連接)
+    
+    Args:
+        instrument_type: INSTRUMENT_TYPES 中的儀器類型
+        connection: 連接參數，作為建構參數的預設值
+        
+    Returns:
+        InstrumentBase: 儀器實例
+    """
+    if instrument_type not in INSTRUMENT_TYPES:
+        raise JobConfigError(f"不支援的儀器類型: '{instrument_type}'")
+        
+    module_name, class_name = INSTRUMENT_TYPES[instrument_type]
+    instrument_class = getattr(importlib.import_module(module_name), class_name)
+    connection = connection or {}
+    
+    if instrument_type == 'keithley_2461':
+        kwargs = {key: connection[key] for key in ('ip_address', 'port', 'timeout') if key in connection}
+    else:
+        kwargs = {key: connection[key] for key in ('port', 'baudrate') if key in connection}
+    return instrument_class(**kwargs)
+
+
+def point_from_measurement(instrument_id: str, data: Dict[str, Any]):
+    """將Worker發送的測量數據轉換為 MeasurementPoint"""
+    from src.data.unified_data_manager import MeasurementPoint
+    
+    return MeasurementPoint(
+        timestamp=as_epoch_ns(data.get('timestamp')),
+        instrument_id=instrument_id,
+        voltage=data.get('voltage', 0.0),
+        current=data.get('current', 0.0),
+        resistance=data.get('resistance'),
+        power=data.get('power'),
+        temperature=data.get('temperature'),
+        metadata={key: value for key, value in data.items() if key not in _POINT_FIELDS} or None
+    )
+
+
+class JobRunner:
+    """無GUI測量任務執行器
+    
+    在呼叫執行緒中阻塞直到測量完成、達到 duration_s 或收到中斷；
+    測量在 HeadlessMeasurementWorker 執行緒中進行，結果經 UnifiedDataManager 存儲。
+    """
+    
+    def __init__(self, job: MeasurementJob, instrument=None, outer_instrument=None,
+                 progress_callback: Optional[Callable[[int, Dict[str, Any]], None]] = None):
+        """初始化任務執行器
+        
+        Args:
+            job: 任務配置
+            instrument: 已建立的儀器實例 (可選，用於模擬器或共用連接)
+            outer_instrument: 巢狀掃描的外層儀器實例 (可選)
+            progress_callback: 每個數據點的回調 (progress, data)，progress為-1表示無限測量，
+                在Worker執行緒中執行
+        """
+        self.job = job
+        self.instrument = instrument
+        self.outer_instrument = outer_instrument
+        self.progress_callback = progress_callback
+        self.logger = get_logger("JobRunner")
+        
+        self.worker: Optional[HeadlessMeasurementWorker] = None
+        self.points_recorded = 0
+        self.errors: List[str] = []
+        
+    def run(self) -> Dict[str, Any]:
+        """執行任務
+        
+        Returns:
+            Dict: 任務摘要 (狀態、數據點數、耗時、輸出位置、會話統計)
+            
+        Raises:
+            RuntimeError: 儀器連接失敗
+        """
+        from src.data.unified_data_manager import UnifiedDataManager
+        
+        job = self.job
+        owns_instrument = self.instrument is None
+        if owns_instrument:
+            self.instrument = create_instrument(job.instrument_type, job.connection)
+            
+        if not self.instrument.is_connected() and not self.instrument.connect(job.connection or None):
+            raise RuntimeError(f"無法連接儀器 {job.instrument_type}")
+            
+        owns_outer = False
+        if job.mode == 'nested_sweep':
+            owns_outer = self.outer_instrument is None
+            if owns_outer:
+                self.outer_instrument = create_instrument(job.outer_instrument_type, job.outer_connection)
+            if (not self.outer_instrument.is_connected()
+                    and not self.outer_instrument.connect(job.outer_connection or None)):
+                if owns_instrument:
+                    self.instrument.disconnect()
+                raise RuntimeError(f"無法連接外層儀器 {job.outer_instrument_type}")
+            strategy = NestedSweepStrategy(self.outer_instrument)
+        else:
+            strategy = MEASUREMENT_STRATEGIES[job.mode]()
+            
+        instrument_id = job.instrument_id or job.instrument_type
+        manager = UnifiedDataManager(
+            base_path=job.output_path,
+            default_format=job.output_format,
+            auto_save=False
+        )
+        manager.register_instrument(instrument_id)
+        session_name = manager.start_session(job.session_name)
+        
+        self.worker = HeadlessMeasurementWorker(self.instrument, strategy, job.params)
+        self.worker.data_ready.connect(lambda data: self._on_data(manager, instrument_id, data))
+        self.worker.error_occurred.connect(self._on_error)
+        
+        status = 'completed'
+        started = time.monotonic()
+        deadline = started + job.duration_s if job.duration_s else None
+        
+        try:
+            self.worker.start_work()
+            while not self.worker.wait(200):
+                if deadline is not None and time.monotonic() >= deadline:
+                    self.worker.request_stop()
+                    status = 'duration_reached'
+        except KeyboardInterrupt:
+            status = 'interrupted'
+        finally:
+            self.worker.stop_work()
+            session_stats = manager.end_session()
+            manager.shutdown()
+            family_file = self._save_family(strategy, manager.base_path, session_name)
+            
+            owned = [self.instrument] if owns_instrument else []
+            if owns_outer:
+                owned.append(self.outer_instrument)
+            for instrument in owned:
+                try:
+                    instrument.disconnect()
+                except Exception as e:
+                    self.logger.error(f"斷開儀器失敗: {e}")
+                    
+        if self.errors and status == 'completed':
+            status = 'failed'
+            
+        return {
+            'status': status,
+            'session_name': session_name,
+            'instrument_id': instrument_id,
+            'mode': job.mode,
+            'points': self.points_recorded,
+            'elapsed_s': round(time.monotonic() - started, 3),
+            'output_path': str(Path(manager.base_path).resolve()),
+            'output_format': manager.default_format,
+            'family_file': family_file,
+            'errors': self.errors,
+            'statistics': session_stats,
+        }
+        
+    def _save_family(self, strategy, base_path: str, session_name: str) -> Optional[str]:
+        """將曲線族的二維陣列保存為 .npz (僅適用於提供 get_family() 的策略)"""
+        if not hasattr(strategy, 'get_family') or strategy.inner_source is None:
+            return None
+        try:
+            import numpy as np
+            filename = Path(base_path) / f"{session_name}_family.npz"
+            np.savez(filename, **strategy.get_family())
+            self.logger.info(f"曲線族已保存: {filename}")
+            return str(filename)
+        except Exception as e:
+            self.logger.error(f"保存曲線族失敗: {e}")
+            return None
+            
+    def request_stop(self):
+        """請求停止任務 (可從其他執行緒呼叫)"""
+        if self.worker is not None:
+            self.worker.request_stop()
+            
+    def _on_data(self, manager, instrument_id: str, data: Dict[str, Any]):
+        if manager.add_measurement(point_from_measurement(instrument_id, data)):
+            self.points_recorded += 1
+        if self.progress_callback:
+            self.progress_callback(self.worker.strategy.get_progress(), data)
+            
+    def _on_error(self, error_type: str, message: str):
+        self.errors.append(f"{error_type}: {message}")
\ No newline at end of file
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+純Python信號
+提供與 pyqtSignal 相同的 connect/disconnect/emit 介面，供無GUI環境使用
+"""
+
+import threading
+from typing import Any, Callable, List
+
+
+class Signal:
+    """輕量信號
+    
+    槽函數在 emit() 的呼叫執行緒中同步執行；需要切換到GUI執行緒時
+    由Qt轉接層負責 (見 src/data/qt_adapter.py)。
+    
+    作為類屬性宣告時，每個實例自動取得獨立的綁定信號，用法與 pyqtSignal 一致：
+    
+        class Worker:
+            data_ready = Signal(dict)
+            
+        worker.data_ready.connect(handler)
+    """
+    
+    def __init__(self, *types):
+        self.types = types
+        self._name = None
+        
+    def __set_name__(self, owner, name):
+        self._name = name
+        
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        bound = instance.__dict__.get(self._name)
+        if bound is None:
+            bound = instance.__dict__.setdefault(self._name, BoundSignal(self.types))
+        return bound
+
+
+class BoundSignal:
+    """綁定到實例的信號"""
+    
+    def __init__(self, types=()):
+        self.types = types
+        self._slots: List[Callable[..., Any]] = []
+        self._lock = threading.Lock()
+        
+    def connect(self, slot: Callable[..., Any]):
+        """連接槽函數"""
+        with self._lock:
+            self._slots.append(slot)
+            
+    def disconnect(self, slot: Callable[..., Any] = None):
+        """斷開槽函數，未指定時斷開全部"""
+        with self._lock:
+            if slot is None:
+                self._slots.clear()
+            elif slot in self._slots:
+                self._slots.remove(slot)
+            else:
+                raise TypeError("信號未連接此槽函數")
+                
+    def emit(self, *args):
+        """依連接順序呼叫所有槽函數"""
+        with self._lock:
+            slots = list(self._slots)
+        for slot in slots:
+            slot(*args)
+            
+    def receivers(self) -> int:
+        """已連接的槽函數數量"""
+        with self._lock:
+            return len(self._slots)
\ No newline at end of file
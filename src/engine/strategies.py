@@ -0,0 +1,760 @@
+#!/usr/bin/env python3
+"""
+測量策略
+連續測量、掃描測量等測量模式的純Python實現，與執行緒和GUI框架無關
+"""
+
+import math
+import time
+from bisect import bisect_left
+from collections import deque
+from abc import ABC, abstractmethod
+from typing import Dict, Any, List, Optional, Tuple
+from .cancellation import CancellationToken
+from .clock import SampleTiming, get_clock
+
+
+def _linear_points(start: float, stop: float, step: float) -> List[float]:
+    """等分範圍並精確包含兩端點的掃描點"""
+    intervals = max(1, math.ceil(abs(stop - start) / abs(step) - 1e-9))
+    return [start + (stop - start) * k / intervals for k in range(intervals + 1)]
+
+
+class MeasurementStrategy(ABC):
+    """測量策略抽象基類"""
+    
+    # 由MeasurementWorker在setup時注入，停止請求會打斷策略內的等待
+    cancel_token: Optional[CancellationToken] = None
+    
+    def _wait(self, seconds: float) -> bool:
+        """可中斷的等待 (如穩定延遲)
+        
+        Returns:
+            bool: True 表示完整等待，False 表示已請求停止
+        """
+        if self.cancel_token is None:
+            time.sleep(seconds)
+            return True
+        return self.cancel_token.sleep(seconds)
+        
+    # 最近一次 _measure_point 的時間記錄
+    last_timing: Optional[SampleTiming] = None
+    
+    def _measure_point(self, instrument) -> Tuple[float, float, float, float]:
+        """測量電壓、電流、電阻、功率，並記錄採集時間於 last_timing
+        
+        儀器記錄了本次查詢的發送/接收時間時以其為準，否則以整個呼叫的
+        前後時間為界。
+        
+        Returns:
+            Tuple: (voltage, current, resistance, power)
+        """
+        if hasattr(instrument, 'measure_all'):
+            query = instrument.measure_all
+        else:
+            query = lambda: (instrument.measure_voltage(), instrument.measure_current())
+        values, self.last_timing = get_clock().timed_query(instrument, query)
+        
+        if len(values) >= 4:
+            return tuple(values[:4])
+        # Rigol DP711 返回 (電壓, 電流[, 功率])
+        v, i = values[0], values[1]
+        p = values[2] if len(values) >= 3 else v * i
+        r = v / i if i != 0 else float('inf')
+        return v, i, r, p
+        
+    def _stamp(self, result: Dict[str, Any],
+               timing: Optional[SampleTiming] = None) -> Dict[str, Any]:
+        """寫入採集時刻 (acquired_ns/latency_ns/uncertainty_ns)"""
+        return get_clock().stamp(result, timing or self.last_timing)
+        
+    @abstractmethod
+    def setup(self, instrument, params: Dict[str, Any]) -> bool:
+        """設置測量參數"""
+        pass
+        
+    @abstractmethod
+    def execute_single_measurement(self, instrument) -> Optional[Dict[str, Any]]:
+        """執行單次測量"""
+        pass
+        
+    @abstractmethod
+    def should_continue(self) -> bool:
+        """是否應該繼續測量"""
+        pass
+        
+    @abstractmethod
+    def get_progress(self) -> int:
+        """獲取當前進度 (0-100)"""
+        pass
+        
+    @abstractmethod
+    def cleanup(self, instrument) -> None:
+        """清理資源"""
+        pass
+
+
+class ContinuousMeasurementStrategy(MeasurementStrategy):
+    """連續測量策略"""
+    
+    def __init__(self):
+        self.interval_ms = 1000
+        self.max_measurements = None  # 無限制
+        self.current_count = 0
+        
+    def setup(self, instrument, params: Dict[str, Any]) -> bool:
+        """設置連續測量參數"""
+        self.interval_ms = params.get('interval_ms', 1000)
+        self.max_measurements = params.get('max_measurements', None)
+        self.current_count = 0
+        return True
+        
+    def execute_single_measurement(self, instrument) -> Optional[Dict[str, Any]]:
+        """執行單次測量"""
+        try:
+            v, i, r, p = self._measure_point(instrument)
+        except Exception as e:
+            raise Exception(f"測量失敗: {e}")
+            
+        # 只計入成功的測量，max_measurements 以此判斷是否完成
+        self.current_count += 1
+        return self._stamp({
+            'voltage': v,
+            'current': i, 
+            'resistance': r,
+            'power': p,
+            'measurement_type': 'continuous',
+            'sequence_number': self.current_count
+        })
+            
+    def should_continue(self) -> bool:
+        """檢查是否應該繼續測量"""
+        if self.max_measurements is None:
+            return True
+        return self.current_count < self.max_measurements
+        
+    def get_progress(self) -> int:
+        """獲取測量進度"""
+        if self.max_measurements is None:
+            return -1  # 無限測量
+        return min(100, int(self.current_count * 100 / self.max_measurements))
+        
+    def cleanup(self, instrument) -> None:
+        """清理連續測量"""
+        pass  # 連續測量不需要特殊清理
+
+
+class SweepMeasurementStrategy(MeasurementStrategy):
+    """掃描測量策略"""
+    
+    def __init__(self):
+        self.start_value = 0
+        self.stop_value = 0
+        self.step_value = 0
+        self.delay_ms = 100
+        self.current_limit = 0.1
+        self.voltage_points = []
+        self.current_index = 0
+        
+    def setup(self, instrument, params: Dict[str, Any]) -> bool:
+        """設置掃描測量參數"""
+        try:
+            self.start_value = params['start']
+            self.stop_value = params['stop'] 
+            self.step_value = params['step']
+            self.delay_ms = params.get('delay', 100)
+            self.current_limit = params.get('current_limit', 0.1)
+            
+            # 生成掃描點
+            import numpy as np
+            self.voltage_points = np.arange(
+                self.start_value, 
+                self.stop_value + self.step_value, 
+                self.step_value
+            ).tolist()
+            self.current_index = 0
+            
+            # 設置儀器為電壓源模式
+            if hasattr(instrument, 'set_source_function'):
+                instrument.set_source_function("VOLT")
+                
+            return True
+            
+        except Exception as e:
+            raise Exception(f"掃描參數設置失敗: {e}")
+            
+    def execute_single_measurement(self, instrument) -> Optional[Dict[str, Any]]:
+        """執行掃描中的單次測量"""
+        if self.current_index >= len(self.voltage_points):
+            return None
+            
+        try:
+            # 設置電壓
+            voltage = self.voltage_points[self.current_index]
+            if hasattr(instrument, 'set_voltage'):
+                instrument.set_voltage(voltage, current_limit=self.current_limit)
+                
+            # 等待穩定 (停止請求會立即打斷)
+            if not self._wait(self.delay_ms / 1000.0):
+                return None
+                
+            # 測量
+            v, i, r, p = self._measure_point(instrument)
+            
+            result = self._stamp({
+                'voltage': v,
+                'current': i,
+                'resistance': r, 
+                'power': p,
+                'measurement_type': 'sweep',
+                'set_voltage': voltage,
+                'point_number': self.current_index + 1,
+                'total_points': len(self.voltage_points)
+            })
+            
+            self.current_index += 1
+            return result
+            
+        except Exception as e:
+            raise Exception(f"掃描測量失敗: {e}")
+            
+    def should_continue(self) -> bool:
+        """檢查掃描是否應該繼續"""
+        return self.current_index < len(self.voltage_points)
+        
+    def get_progress(self) -> int:
+        """獲取掃描進度"""
+        if len(self.voltage_points) == 0:
+            return 100
+        return int(self.current_index * 100 / len(self.voltage_points))
+        
+    def cleanup(self, instrument) -> None:
+        """清理掃描測量"""
+        try:
+            if hasattr(instrument, 'output_off'):
+                instrument.output_off()
+        except:
+            pass
+
+class AdaptiveSweepStrategy(MeasurementStrategy):
+    """自適應解析度掃描策略
+    
+    先以粗步進掃完整個範圍，再反覆在曲線變化最劇烈的區間插入中點：
+    - 區間電流變化 |ΔI| 超過全曲線電流跨度的 delta_threshold 比例
+    - 或相鄰區間斜率 dI/dV 的變化 (曲率) 超過最大斜率的 curvature_threshold 比例
+    細分以輪次進行：每輪找出所有超過閾值的區間 (預算不足時取得分最高者)，
+    依掃描方向單調施加其中點，再重新評估，直到所有區間都足夠平滑、
+    區間寬度達到 min_step 或點數達到 max_points 預算，讓 snapback、
+    崩潰轉折等關鍵區域以細步進解析，平坦區域維持粗步進。
+    
+    refine_order="score" 時改為每次只細分得分最高的區間 (設定點不依電壓順序，
+    收斂較快)；具遲滯特性的元件需留意掃描歷史的影響，預設不使用。
+    """
+    
+    def __init__(self):
+        self.start_value = 0
+        self.stop_value = 0
+        self.coarse_step = 0
+        self.min_step = 0
+        self.max_points = 200
+        self.delay_ms = 100
+        self.current_limit = 0.1
+        self.delta_threshold = 0.05
+        self.curvature_threshold = 0.2
+        self.compliance_fraction = 0.98
+        self.stop_at_compliance = True
+        self.log_current = False
+        self.current_floor = 1e-12
+        self.refine_order = 'monotonic'
+        
+        self.coarse_points: List[float] = []
+        self.coarse_index = 0
+        self.phase = 'coarse'
+        self._refine_queue = deque()
+        
+        # 已測量的曲線 (依電壓排序)
+        self.voltages: List[float] = []
+        self.currents: List[float] = []
+        self.in_compliance: List[bool] = []
+        self.points_measured = 0
+        self._finished = False
+        
+    def setup(self, instrument, params: Dict[str, Any]) -> bool:
+        """設置自適應掃描參數
+        
+        Args:
+            params: start, stop, step (粗步進) 為必要參數；可選 min_step、max_points、
+                delay (ms)、current_limit、delta_threshold、curvature_threshold、
+                compliance_fraction、stop_at_compliance、scale ("linear"/"log")、
+                refine_order ("monotonic"/"score")
+        """
+        try:
+            self.start_value = params['start']
+            self.stop_value = params['stop']
+            self.coarse_step = abs(params['step'])
+            self.min_step = abs(params.get('min_step', self.coarse_step / 64))
+            self.max_points = int(params.get('max_points', 200))
+            self.delay_ms = params.get('delay', 100)
+            self.current_limit = params.get('current_limit', 0.1)
+            self.delta_threshold = params.get('delta_threshold', 0.05)
+            self.curvature_threshold = params.get('curvature_threshold', 0.2)
+            self.compliance_fraction = params.get('compliance_fraction', 0.98)
+            self.stop_at_compliance = params.get('stop_at_compliance', True)
+            self.log_current = params.get('scale', 'linear') == 'log'
+            self.refine_order = params.get('refine_order', 'monotonic')
+            
+            if self.refine_order not in ('monotonic', 'score'):
+                raise ValueError(f"不支援的細分順序: {self.refine_order}")
+            if self.coarse_step <= 0 or self.min_step <= 0:
+                raise ValueError("步進必須大於0")
+            if self.delta_threshold <= 0 or self.curvature_threshold <= 0:
+                raise ValueError("細分閾值必須大於0")
+                
+            self.coarse_points = _linear_points(self.start_value, self.stop_value, self.coarse_step)
+            if len(self.coarse_points) > self.max_points:
+                raise ValueError(
+                    f"粗掃描需要 {len(self.coarse_points)} 點，超過點數預算 {self.max_points}"
+                )
+                
+            self.coarse_index = 0
+            self.phase = 'coarse'
+            self._refine_queue.clear()
+            self.voltages = []
+            self.currents = []
+            self.in_compliance = []
+            self.points_measured = 0
+            self._finished = False
+            
+            # 設置儀器為電壓源模式
+            if hasattr(instrument, 'set_source_function'):
+                instrument.set_source_function("VOLT")
+                
+            return True
+            
+        except Exception as e:
+            raise Exception(f"自適應掃描參數設置失敗: {e}")
+            
+    def execute_single_measurement(self, instrument) -> Optional[Dict[str, Any]]:
+        """測量下一個粗掃描點或細分點"""
+        voltage = self._next_setpoint()
+        if voltage is None:
+            self._finished = True
+            return None
+            
+        try:
+            if hasattr(instrument, 'set_voltage'):
+                instrument.set_voltage(voltage, current_limit=self.current_limit)
+                
+            # 等待穩定 (停止請求會立即打斷)
+            if not self._wait(self.delay_ms / 1000.0):
+                return None
+                
+            v, i, r, p = self._measure_point(instrument)
+            compliance = abs(i) >= self.compliance_fraction * abs(self.current_limit)
+            self._record(voltage, i, compliance)
+            
+            # 達到電流限制後，更高偏壓的粗掃描點只會停在限流狀態
+            if compliance and self.phase == 'coarse' and self.stop_at_compliance:
+                self.coarse_index = len(self.coarse_points)
+                
+            return self._stamp({
+                'voltage': v,
+                'current': i,
+                'resistance': r,
+                'power': p,
+                'measurement_type': 'adaptive_sweep',
+                'set_voltage': voltage,
+                'phase': self.phase,
+                'in_compliance': compliance,
+                'point_number': self.points_measured,
+                'total_points': self.max_points
+            })
+            
+        except Exception as e:
+            raise Exception(f"自適應掃描測量失敗: {e}")
+            
+    def _next_setpoint(self) -> Optional[float]:
+        """選擇下一個設定點，None表示掃描完成"""
+        if self.points_measured >= self.max_points:
+            return None
+            
+        if self.phase == 'coarse':
+            if self.coarse_index < len(self.coarse_points):
+                voltage = self.coarse_points[self.coarse_index]
+                self.coarse_index += 1
+                return voltage
+            self.phase = 'refine'
+            
+        if self.refine_order == 'score':
+            return self._select_refinement()
+        if not self._refine_queue:
+            self._refine_queue.extend(self._plan_refinement_pass())
+        return self._refine_queue.popleft() if self._refine_queue else None
+        
+    def _record(self, voltage: float, current: float, compliance: bool):
+        """依電壓順序插入測量結果"""
+        index = bisect_left(self.voltages, voltage)
+        self.voltages.insert(index, voltage)
+        self.currents.insert(index, current)
+        self.in_compliance.insert(index, compliance)
+        self.points_measured += 1
+        
+    def _response(self) -> List[float]:
+        """細分判斷使用的電流響應 (線性或對數)"""
+        if not self.log_current:
+            return self.currents
+        return [math.log10(max(abs(i), self.current_floor)) for i in self.currents]
+        
+    def _score_intervals(self) -> List[Tuple[float, int]]:
+        """超過閾值的區間 (得分, 區間索引)；得分 > 1 表示超過閾值"""
+        voltages = self.voltages
+        n = len(voltages)
+        if n < 2:
+            return []
+            
+        response = self._response()
+        span = max(response) - min(response)
+        if span <= 0:
+            return []
+            
+        slopes = [
+            (response[k + 1] - response[k]) / (voltages[k + 1] - voltages[k])
+            for k in range(n - 1)
+        ]
+        max_slope = max(abs(s) for s in slopes)
+        
+        candidates = []
+        for k in range(n - 1):
+            if voltages[k + 1] - voltages[k] < 2 * self.min_step:
+                continue
+            # 兩端都在限流狀態的區間沒有可解析的特徵
+            if self.in_compliance[k] and self.in_compliance[k + 1]:
+                continue
+                
+            score = abs(response[k + 1] - response[k]) / span / self.delta_threshold
+            if max_slope > 0:
+                for j in (k - 1, k + 1):
+                    if 0 <= j < n - 1:
+                        bend = abs(slopes[j] - slopes[k]) / max_slope
+                        score = max(score, bend / self.curvature_threshold)
+                        
+            if score > 1.0:
+                candidates.append((score, k))
+        return candidates
+        
+    def _midpoint(self, k: int) -> float:
+        return (self.voltages[k] + self.voltages[k + 1]) / 2
+        
+    def _select_refinement(self) -> Optional[float]:
+        """找出得分最高且超過閾值的區間，返回其中點"""
+        candidates = self._score_intervals()
+        if not candidates:
+            return None
+        return self._midpoint(max(candidates, key=lambda candidate: candidate[0])[1])
+        
+    def _plan_refinement_pass(self) -> List[float]:
+        """一輪細分的設定點 (依掃描方向排序)
+        
+        剩餘預算不足時保留得分最高的區間。
+        """
+        candidates = self._score_intervals()
+        budget = self.max_points - self.points_measured
+        if len(candidates) > budget:
+            candidates = sorted(candidates, reverse=True)[:budget]
+        points = sorted(self._midpoint(k) for _, k in candidates)
+        if self.stop_value < self.start_value:
+            points.reverse()
+        return points
+        
+    def should_continue(self) -> bool:
+        """檢查掃描是否應該繼續"""
+        return not self._finished
+        
+    def get_progress(self) -> int:
+        """獲取掃描進度 (以點數預算估算，細分提前收斂時直接完成)"""
+        if self._finished:
+            return 100
+        return min(99, int(self.points_measured * 100 / max(1, self.max_points)))
+        
+    def get_curve(self) -> Tuple[List[float], List[float]]:
+        """獲取依電壓排序的 I-V 曲線
+        
+        Returns:
+            Tuple: (設定電壓列表, 電流列表)
+        """
+        return list(self.voltages), list(self.currents)
+        
+    def cleanup(self, instrument) -> None:
+        """清理掃描測量"""
+        try:
+            if hasattr(instrument, 'output_off'):
+                instrument.output_off()
+        except:
+            pass
+
+
+class NestedSweepStrategy(MeasurementStrategy):
+    """巢狀雙儀器掃描策略 (曲線族)
+    
+    外層儀器 (如 DP711 提供閘極偏壓或基極電流) 逐步設定，每一步在內層儀器
+    (Worker的儀器，如 2461) 上執行一次完整掃描，得到 Id-Vds @ Vgs、
+    Ic-Vce @ Ib 等曲線族。
+    
+    - 內層儀器支援硬體掃描 (configure_voltage_sweep) 時整條曲線由儀器的
+      觸發模型執行，主機只負責啟動與讀回緩衝區
+    - 內層緩衝區讀回後才設定下一個外層設定點，換點瞬態不會影響尚未讀回的
+      曲線；整組曲線耗時約為各內層掃描、讀回與外層穩定時間之和
+    - 外層 outer_source="current" 需要可作為電流源的儀器 (如 2461)；DP711 等
+      電源的 set_current 只設定限流，不能作為電流步進軸
+    - 結果保存為 (外層點數, 內層點數) 的二維陣列，見 get_family()
+    
+    外層換點時內層源維持在掃描終點電壓；對換點瞬態敏感的元件應將
+    內層終點設在安全偏壓。
+    """
+    
+    def __init__(self, outer_instrument):
+        """初始化巢狀掃描
+        
+        Args:
+            outer_instrument: 外層 (步進軸) 儀器
+        """
+        self.outer_instrument = outer_instrument
+        self.outer_values: List[float] = []
+        self.outer_source = 'voltage'
+        self.outer_limit = None
+        self.outer_settle_ms = 100
+        self.outer_output_off = True
+        
+        self.inner_points: List[float] = []
+        self.delay_ms = 0
+        self.current_limit = 0.1
+        self.poll_interval_ms = 20
+        self.hardware_sweep = False
+        
+        self.outer_index = 0
+        self.points_emitted = 0
+        self._outer_set_at = 0.0
+        self._pending = deque()
+        
+        # 結果陣列 (setup時建立)
+        self.inner_source = None
+        self.inner_reading = None
+        
+    def setup(self, instrument, params: Dict[str, Any]) -> bool:
+        """設置巢狀掃描參數
+        
+        Args:
+            params: 內層 start, stop, step (delay 為每點延遲ms, current_limit)；
+                外層 outer_values 或 outer_start, outer_stop, outer_step，
+                outer_source ("voltage"/"current"，電流源需外層儀器支援 set_source_function)、
+                outer_limit (電壓源的限流或電流源的限壓)、outer_settle (ms)；
+                hardware_sweep ("auto"/True/False)
+        """
+        try:
+            import numpy as np
+            
+            if 'outer_values' in params:
+                self.outer_values = [float(v) for v in params['outer_values']]
+            else:
+                self.outer_values = _linear_points(
+                    params['outer_start'], params['outer_stop'], params['outer_step']
+                )
+            if not self.outer_values:
+                raise ValueError("外層設定點不可為空")
+                
+            self.outer_source = params.get('outer_source', 'voltage')
+            if self.outer_source not in ('voltage', 'current'):
+                raise ValueError(f"不支援的外層源類型: {self.outer_source}")
+            if self.outer_source == 'current' and not hasattr(self.outer_instrument, 'set_source_function'):
+                # 如 DP711：set_current 只設定電壓源的限流，輸出電流由負載決定
+                raise ValueError("外層儀器不支援電流源模式，不能以電流作為外層步進")
+            self.outer_limit = params.get('outer_limit')
+            self.outer_settle_ms = params.get('outer_settle', 100)
+            self.outer_output_off = params.get('outer_output_off', True)
+            
+            self.inner_points = _linear_points(params['start'], params['stop'], params['step'])
+            self.delay_ms = params.get('delay', 0)
+            self.current_limit = params.get('current_limit', 0.1)
+            self.poll_interval_ms = params.get('poll_interval', 20)
+            
+            hardware = params.get('hardware_sweep', 'auto')
+            supported = hasattr(instrument, 'configure_voltage_sweep')
+            if hardware is True and not supported:
+                raise ValueError("內層儀器不支援硬體掃描")
+            self.hardware_sweep = supported and hardware is not False
+            
+            shape = (len(self.outer_values), len(self.inner_points))
+            self.inner_source = np.full(shape, np.nan)
+            self.inner_reading = np.full(shape, np.nan)
+            self.outer_index = 0
+            self.points_emitted = 0
+            self._pending.clear()
+            
+            # 內層儀器
+            if self.hardware_sweep:
+                instrument.configure_voltage_sweep(
+                    self.inner_points[0], self.inner_points[-1], len(self.inner_points),
+                    delay=self.delay_ms / 1000.0, current_limit=self.current_limit
+                )
+            elif hasattr(instrument, 'set_source_function'):
+                instrument.set_source_function("VOLT")
+                
+            # 外層儀器: 設定第一個外層點並開始穩定
+            self._apply_outer(self.outer_values[0])
+            if hasattr(self.outer_instrument, 'output_on'):
+                self.outer_instrument.output_on()
+            if hasattr(instrument, 'output_on'):
+                instrument.output_on()
+                
+            return True
+            
+        except Exception as e:
+            raise Exception(f"巢狀掃描參數設置失敗: {e}")
+            
+    def _apply_outer(self, value: float):
+        """設定外層設定點並記錄穩定起點"""
+        outer = self.outer_instrument
+        if self.outer_source == 'current' and self.outer_limit is not None:
+            outer.set_current(value, voltage_limit=self.outer_limit)
+        elif self.outer_source == 'current':
+            outer.set_current(value)
+        elif self.outer_limit is not None and hasattr(outer, 'apply_settings'):
+            outer.apply_settings(value, self.outer_limit)
+        elif self.outer_limit is not None:
+            outer.set_voltage(value, current_limit=self.outer_limit)
+        else:
+            outer.set_voltage(value)
+        self._outer_set_at = time.monotonic()
+        
+    def _advance_outer(self):
+        """前進到下一個外層點並立即開始其穩定"""
+        self.outer_index += 1
+        if self.outer_index < len(self.outer_values):
+            self._apply_outer(self.outer_values[self.outer_index])
+            
+    def execute_single_measurement(self, instrument) -> Optional[Dict[str, Any]]:
+        """返回下一個數據點；當前曲線已全部發送時執行下一條內層掃描"""
+        if not self._pending:
+            if self.outer_index >= len(self.outer_values):
+                return None
+            try:
+                if not self._run_inner_sweep(instrument):
+                    return None
+            except Exception as e:
+                raise Exception(f"巢狀掃描測量失敗: {e}")
+                
+        self.points_emitted += 1
+        return self._pending.popleft()
+        
+    def _run_inner_sweep(self, instrument) -> bool:
+        """在當前外層點執行一條內層掃描
+        
+        Returns:
+            bool: False 表示已請求停止
+        """
+        # 等待外層剩餘的穩定時間
+        remaining = self.outer_settle_ms / 1000.0 - (time.monotonic() - self._outer_set_at)
+        if remaining > 0 and not self._wait(remaining):
+            return False
+            
+        row = self.outer_index
+        outer_value = self.outer_values[row]
+        
+        clock = get_clock()
+        if self.hardware_sweep:
+            sweep_start_ns = clock.now_ns()
+            instrument.start_sweep()
+            
+            # 掃描至少需要 點數 × 每點延遲，先整段等待再輪詢
+            if not self._wait(len(self.inner_points) * self.delay_ms / 1000.0):
+                instrument.abort_sweep()
+                return False
+            while instrument.is_sweep_running():
+                if not self._wait(self.poll_interval_ms / 1000.0):
+                    instrument.abort_sweep()
+                    return False
+            sweep_end_ns = clock.now_ns()
+            
+            # 儀器按固定節拍採集，將掃描區間均分給各點；誤差上限為半個點的時長
+            span_ns = (sweep_end_ns - sweep_start_ns) // max(1, len(self.inner_points))
+            timings = [
+                SampleTiming(sweep_start_ns + k * span_ns, sweep_start_ns + (k + 1) * span_ns)
+                for k in range(len(self.inner_points))
+            ]
+            
+            # 先讀回緩衝區，再前進到下一個外層點
+            sources, readings = instrument.read_sweep_buffer(len(self.inner_points))
+            self._advance_outer()
+        else:
+            sources, readings, timings = [], [], []
+            for voltage in self.inner_points:
+                instrument.set_voltage(voltage, current_limit=self.current_limit)
+                if not self._wait(self.delay_ms / 1000.0):
+                    return False
+                v, i, r, p = self._measure_point(instrument)
+                sources.append(v)
+                readings.append(i)
+                timings.append(self.last_timing)
+            self._advance_outer()
+            
+        count = min(len(sources), len(self.inner_points))
+        self.inner_source[row, :count] = sources[:count]
+        self.inner_reading[row, :count] = readings[:count]
+        
+        total = len(self.outer_values) * len(self.inner_points)
+        for k in range(count):
+            v, i = sources[k], readings[k]
+            self._pending.append(self._stamp({
+                'voltage': v,
+                'current': i,
+                'resistance': v / i if i != 0 else float('inf'),
+                'power': v * i,
+                'measurement_type': 'nested_sweep',
+                'set_voltage': self.inner_points[k],
+                'outer_value': outer_value,
+                'outer_index': row,
+                'inner_index': k,
+                'point_number': row * len(self.inner_points) + k + 1,
+                'total_points': total
+            }, timings[k]))
+        return True
+        
+    def should_continue(self) -> bool:
+        """檢查掃描是否應該繼續"""
+        return bool(self._pending) or self.outer_index < len(self.outer_values)
+        
+    def get_progress(self) -> int:
+        """獲取掃描進度"""
+        total = len(self.outer_values) * len(self.inner_points)
+        if total == 0:
+            return 100
+        return int(self.points_emitted * 100 / total)
+        
+    def get_family(self) -> Dict[str, Any]:
+        """獲取曲線族
+        
+        Returns:
+            Dict: outer_values (外層點數,)、inner_setpoints (內層點數,)、
+                source/reading (外層點數, 內層點數) 的 numpy 陣列，未完成的點為 NaN
+        """
+        import numpy as np
+        return {
+            'outer_values': np.asarray(self.outer_values),
+            'inner_setpoints': np.asarray(self.inner_points),
+            'source': self.inner_source,
+            'reading': self.inner_reading
+        }
+        
+    def cleanup(self, instrument) -> None:
+        """關閉內層輸出，並依設定關閉外層輸出"""
+        try:
+            if hasattr(instrument, 'output_off'):
+                instrument.output_off()
+        except:
+            pass
+        if self.outer_output_off:
+            try:
+                if hasattr(self.outer_instrument, 'output_off'):
+                    self.outer_instrument.output_off()
+            except:
+                pass
\ No newline at end of file
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+週期定時器
+以背景執行緒實現的 QTimer 替代品，無需事件循環
+"""
+
+import threading
+from typing import Optional
+from .signals import Signal
+
+
+class PeriodicTimer:
+    """週期定時器
+    
+    介面與 QTimer 相同 (start(ms)/stop()/isActive()/timeout)，
+    timeout 信號在定時器自身的守護執行緒中發送。
+    """
+    
+    timeout = Signal()
+    
+    def __init__(self, name: str = "PeriodicTimer"):
+        self.name = name
+        self._interval_ms = 0
+        self._stop_event: Optional[threading.Event] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        
+    def start(self, interval_ms: Optional[int] = None):
+        """啟動定時器，已啟動時以新間隔重新開始
+        
+        Args:
+            interval_ms: 觸發間隔(毫秒)，None沿用上次設定
+        """
+        if interval_ms is not None:
+            self._interval_ms = interval_ms
+        if self._interval_ms <= 0:
+            raise ValueError("定時器間隔必須大於0")
+            
+        with self._lock:
+            self._cancel_locked()
+            stop_event = threading.Event()
+            self._stop_event = stop_event
+            self._thread = threading.Thread(
+                target=self._run, args=(stop_event, self._interval_ms / 1000.0),
+                name=self.name, daemon=True
+            )
+            self._thread.start()
+            
+    def stop(self):
+        """停止定時器"""
+        with self._lock:
+            self._cancel_locked()
+            
+    def isActive(self) -> bool:
+        """定時器是否正在執行"""
+        with self._lock:
+            return self._stop_event is not None and not self._stop_event.is_set()
+            
+    def interval(self) -> int:
+        """觸發間隔(毫秒)"""
+        return self._interval_ms
+        
+    def _cancel_locked(self):
+        if self._stop_event is not None:
+            self._stop_event.set()
+            self._stop_event = None
+            self._thread = None
+            
+    def _run(self, stop_event: threading.Event, interval: float):
+        while not stop_event.wait(interval):
+            try:
+                self.timeout.emit()
+            except Exception:
+                pass  # 回調錯誤不應終止定時器
\ No newline at end of file
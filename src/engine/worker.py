@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+純Python工作執行緒
+以 threading.Thread 執行 WorkerLifecycle 主循環，無需Qt事件循環
+"""
+
+import threading
+from typing import Optional
+from .lifecycle import WorkerLifecycle
+from .signals import Signal
+
+
+class EngineWorker(WorkerLifecycle):
+    """純Python工作執行緒基類
+    
+    與Qt版 UnifiedWorkerBase 共用相同的生命週期與信號名稱，
+    槽函數在工作執行緒中同步執行。
+    """
+    
+    # 標準信號
+    state_changed = Signal(str)  # WorkerState
+    progress_updated = Signal(int)  # 0-100 進度百分比
+    error_occurred = Signal(str, str)  # error_type, error_message
+    operation_completed = Signal(dict)  # 完成信息
+    data_ready = Signal(dict)  # 數據準備就緒
+    
+    def __init__(self, worker_name: str, instrument=None):
+        """初始化Worker
+        
+        Args:
+            worker_name: Worker識別名稱
+            instrument: 關聯的儀器實例 (可選)
+        """
+        self._init_lifecycle(worker_name, instrument)
+        self._thread: Optional[threading.Thread] = None
+        
+    def _start_thread(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run_loop, name=f"Worker.{self.worker_name}", daemon=True
+        )
+        self._thread.start()
+        
+    def _join_thread(self, timeout_ms: int) -> bool:
+        if self._thread is None:
+            return True
+        self._thread.join(timeout_ms / 1000.0)
+        return not self._thread.is_alive()
+        
+    def _in_worker_thread(self) -> bool:
+        return self._thread is not None and threading.current_thread() is self._thread
+        
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+        
+    def wait(self, timeout_ms: Optional[int] = None) -> bool:
+        """等待執行緒結束
+        
+        Args:
+            timeout_ms: 最長等待毫秒數，None表示無限等待
+            
+        Returns:
+            bool: 是否已結束
+        """
+        if self._thread is None:
+            return True
+        self._thread.join(None if timeout_ms is None else timeout_ms / 1000.0)
+        return not self._thread.is_alive()
\ No newline at end of file
@@ -6,11 +6,10 @@
 
 import csv
 import json
-import sqlite3
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Iterator, Optional, Tuple
 from collections import deque
 import os
 import logging
@@ -18,6 +17,13 @@ import threading
 from dataclasses import dataclass
 from PyQt6.QtCore import QObject, pyqtSignal, QTimer
 from pathlib import Path
+from src.config import get_config
+from src.data.compression import compressed_path, compression_options, open_output
+from src.data.export_jobs import ExportJob, get_export_service
+from src.data.measurement_store import MeasurementStore, get_measurement_store, migrate_database
+from src.data.stream_writer import PARTIAL_SUFFIX
+from src.data.streaming_stats import StreamingStatistics
+from src.engine.clock import as_epoch_ns, epoch_ns_to_datetime
 
 
 @dataclass
@@ -30,6 +36,7 @@ class MeasurementPoint:
     power: float
     temperature: Optional[float] = None
     metadata: Optional[Dict[str, Any]] = None
+    seq: Optional[int] = None  # 會話內的序號，寫入數據庫時用於去重
     
     def to_dict(self) -> Dict[str, Any]:
         """轉換為字典格式"""
@@ -48,80 +55,58 @@ class MeasurementPoint:
 
 
 class DataAnalyzer:
-    """數據分析器"""
+    """數據分析器 - 基於串流統計，每個數據點只更新一次"""
     
-    def __init__(self, window_size: int = 100):
-        self.window_size = window_size
-        self.voltage_buffer = deque(maxlen=window_size)
-        self.current_buffer = deque(maxlen=window_size)
-        self.power_buffer = deque(maxlen=window_size)
-        self.resistance_buffer = deque(maxlen=window_size)
+    def __init__(self, window_size: int = 100, stream: Optional[StreamingStatistics] = None):
+        """初始化數據分析器
+        
+        Args:
+            window_size: 滑動窗口大小 (未提供 stream 時使用)
+            stream: 與其他讀取者 (如GUI) 共用的串流統計，其窗口大小優先
+        """
+        self.stream = stream if stream is not None else StreamingStatistics(window_size)
+        self.window_size = self.stream.window_size
+        
+    def reset(self):
+        """開始新會話：清空滑動窗口與累計統計"""
+        self.stream.reset()
         
     def add_point(self, point: MeasurementPoint):
         """添加數據點到分析緩存"""
-        self.voltage_buffer.append(point.voltage)
-        self.current_buffer.append(point.current)
-        self.power_buffer.append(point.power)
-        self.resistance_buffer.append(point.resistance)
+        self.stream.update(point)
         
     def get_statistics(self) -> Dict[str, Dict[str, float]]:
-        """計算統計數據"""
-        stats = {}
-        
-        for name, buffer in [
-            ('voltage', self.voltage_buffer),
-            ('current', self.current_buffer), 
-            ('power', self.power_buffer),
-            ('resistance', self.resistance_buffer)
-        ]:
-            if len(buffer) > 0:
-                data = np.array(buffer)
-                stats[name] = {
-                    'mean': np.mean(data),
-                    'std': np.std(data),
-                    'min': np.min(data),
-                    'max': np.max(data),
-                    'median': np.median(data),
-                    'count': len(data)
-                }
-            else:
-                stats[name] = {
-                    'mean': 0, 'std': 0, 'min': 0, 
-                    'max': 0, 'median': 0, 'count': 0
-                }
-                
+        """獲取統計數據"""
+        stats = self.stream.snapshot()
+        for name in self.stream.channels:
+            stats.setdefault(name, {
+                'mean': 0, 'std': 0, 'min': 0, 
+                'max': 0, 'median': 0, 'count': 0
+            })
         return stats
         
     def detect_anomalies(self, point: MeasurementPoint, 
                         std_threshold: float = 3.0) -> List[str]:
         """檢測異常值"""
-        anomalies = []
-        
-        if len(self.voltage_buffer) < 10:  # 需要足夠的數據點
-            return anomalies
+        if self.stream['voltage'].rolling.count < 10:  # 需要足夠的數據點
+            return []
             
         # Z-score 異常檢測
-        for name, value, buffer in [
-            ('voltage', point.voltage, self.voltage_buffer),
-            ('current', point.current, self.current_buffer),
-            ('power', point.power, self.power_buffer),
-            ('resistance', point.resistance, self.resistance_buffer)
-        ]:
-            if len(buffer) > 5:
-                data = np.array(buffer)
-                mean = np.mean(data)
-                std = np.std(data)
-                
-                if std > 0:  # 避免除零錯誤
-                    z_score = abs(value - mean) / std
-                    if z_score > std_threshold:
-                        anomalies.append(f"{name}_anomaly")
-                        
-        return anomalies
+        return self.stream.detect_anomalies(point, std_threshold, min_count=6)
 
 
 class EnhancedDataLogger(QObject):
-    """增強型數據記錄器"""
+    """增強型數據記錄器
+    
+    數據寫入與 SQLiteStorage 共用的 MeasurementStore (measurements.db)。
+    每個數據點帶有會話內遞增的序號，只寫入數據庫一次：待寫入的點另行排隊，
+    寫入時在同一交易中推進 sessions.last_seq (持久化的高水位)。
+    memory_buffer 只作為顯示緩存；程式崩潰後以同名會話恢復時從高水位繼續編號，
+    樣本主鍵 (會話, 時間, 儀器, 序號) 確保重放的數據不會重複計入。
+    """
+    
+    # 累積多少個待寫入數據點後寫入數據庫
+    FLUSH_THRESHOLD = 100
     
     # 信號定義
     data_saved = pyqtSignal(str)  # 數據保存完成
@@ -131,7 +116,9 @@ class EnhancedDataLogger(QObject):
     
     def __init__(self, base_path: str = "data", 
                  auto_save_interval: int = 900,  # 15分鐘自動保存
-                 max_memory_points: int = 10000):  # 內存最大數據點
+                 max_memory_points: int = 10000,  # 內存最大數據點
+                 instrument_id: str = "default",
+                 stream: Optional[StreamingStatistics] = None):  # 與GUI共用的串流統計
         super().__init__()
         
         self.base_path = Path(base_path)
@@ -139,14 +126,17 @@ class EnhancedDataLogger(QObject):
         
         self.auto_save_interval = auto_save_interval
         self.max_memory_points = max_memory_points
+        self.instrument_id = instrument_id
         
         # 當前會話
         self.current_session = None
         self.session_start_time = None
         
-        # 數據存儲
+        # 數據存儲 (memory_buffer 僅供顯示；_pending 為尚未寫入數據庫的數據點)
         self.memory_buffer = deque(maxlen=max_memory_points)
         self.total_points = 0
+        self._pending: List[MeasurementPoint] = []
+        self.persisted_seq = 0  # 已寫入數據庫的最大序號 (高水位)
         
         # 日誌 (必須先初始化，因為其他方法會使用)
         self.logger = logging.getLogger(__name__)
@@ -155,10 +145,10 @@ class EnhancedDataLogger(QObject):
         self.data_lock = threading.RLock()
         
         # 數據分析
-        self.analyzer = DataAnalyzer()
+        self.analyzer = DataAnalyzer(stream=stream)
         
-        # 數據庫連接
-        self.db_connection = None
+        # 數據庫 (共用存儲)
+        self.store: Optional[MeasurementStore] = None
         self.init_database()
         
         # 自動保存定時器
@@ -166,58 +156,24 @@ class EnhancedDataLogger(QObject):
         self.auto_save_timer.timeout.connect(self.auto_save_data)
         
     def init_database(self):
-        """初始化SQLite數據庫"""
-        db_path = self.base_path / "measurement_data.db"
-        
+        """開啟共用的測量數據存儲，並轉換舊版 measurement_data.db"""
         try:
-            self.db_connection = sqlite3.connect(
-                str(db_path), 
-                check_same_thread=False,
-                timeout=30.0
-            )
-            
-            # 創建表
-            cursor = self.db_connection.cursor()
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS measurements (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    session_id TEXT NOT NULL,
-                    timestamp TEXT NOT NULL,
-                    voltage_v REAL NOT NULL,
-                    current_a REAL NOT NULL,
-                    resistance_ohm REAL,
-                    power_w REAL,
-                    temperature_c REAL,
-                    metadata TEXT,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
+            self.store = get_measurement_store(self.base_path / MeasurementStore.FILENAME)
+            self._instrument_key = self.store.instrument_key(self.instrument_id)
             
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS sessions (
-                    session_id TEXT PRIMARY KEY,
-                    start_time TEXT NOT NULL,
-                    end_time TEXT,
-                    total_points INTEGER DEFAULT 0,
-                    description TEXT,
-                    instrument_config TEXT,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            legacy_path = self.base_path / "measurement_data.db"
+            if legacy_path.exists():
+                result = migrate_database(legacy_path, self.store.db_path, self.instrument_id)
+                self.logger.info(
+                    f"已轉換舊版數據庫 {legacy_path} ({result['rows']} 列)，原檔案保留為 {result['source']}"
                 )
-            ''')
-            
-            # 創建索引
-            cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_session_timestamp 
-                ON measurements(session_id, timestamp)
-            ''')
-            
-            self.db_connection.commit()
+                
             self.logger.info("數據庫初始化完成")
             
         except Exception as e:
             self.logger.error(f"數據庫初始化失敗: {e}")
-            self.db_connection = None
-    
+            self.store = None
+            
     def start_session(self, session_name: str = None, 
                      description: str = "", 
                      instrument_config: Dict[str, Any] = None) -> str:
@@ -226,31 +182,36 @@ class EnhancedDataLogger(QObject):
         if session_name is None:
             session_name = f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
             
+        # 前一個會話尚未寫入的數據
+        if self.current_session and self.current_session != session_name:
+            self.save_buffer_to_db()
+            
         self.current_session = session_name
         self.session_start_time = datetime.now()
         
         # 清空緩存
         with self.data_lock:
             self.memory_buffer.clear()
+            self._pending = []
             self.total_points = 0
+            self.persisted_seq = 0
+            self.analyzer.reset()
             
-        # 記錄到數據庫
-        if self.db_connection:
-            try:
-                cursor = self.db_connection.cursor()
-                cursor.execute('''
-                    INSERT OR REPLACE INTO sessions 
-                    (session_id, start_time, description, instrument_config)
-                    VALUES (?, ?, ?, ?)
-                ''', (
-                    session_name,
-                    self.session_start_time.isoformat(),
-                    description,
-                    json.dumps(instrument_config) if instrument_config else None
-                ))
-                self.db_connection.commit()
-            except Exception as e:
-                self.logger.error(f"會話記錄失敗: {e}")
+            # 記錄到數據庫；同名會話 (如崩潰後恢復) 保留已寫入的高水位
+            if self.store:
+                try:
+                    record = self.store.open_session(
+                        session_name,
+                        start_ns=as_epoch_ns(self.session_start_time),
+                        description=description,
+                        metadata=instrument_config
+                    )
+                    self.persisted_seq = record['last_seq'] or 0
+                    self.total_points = self.persisted_seq
+                    if self.persisted_seq:
+                        self.logger.info(f"恢復會話 {session_name}，從序號 {self.persisted_seq + 1} 繼續")
+                except Exception as e:
+                    self.logger.error(f"會話記錄失敗: {e}")
         
         # 啟動自動保存
         if self.auto_save_interval > 0:
@@ -262,8 +223,13 @@ class EnhancedDataLogger(QObject):
     def log_measurement(self, voltage: float, current: float, 
                        resistance: float = None, power: float = None,
                        temperature: float = None,
-                       metadata: Dict[str, Any] = None) -> MeasurementPoint:
-        """記錄測量數據"""
+                       metadata: Dict[str, Any] = None,
+                       timestamp: Optional[int] = None) -> MeasurementPoint:
+        """記錄測量數據
+        
+        Args:
+            timestamp: 採集時刻 (epoch ns，由時鐘服務估計)，None表示當前時間
+        """
         
         # 計算缺失值
         if resistance is None and current != 0:
@@ -273,7 +239,7 @@ class EnhancedDataLogger(QObject):
             
         # 創建數據點
         point = MeasurementPoint(
-            timestamp=datetime.now(),
+            timestamp=datetime.now() if timestamp is None else epoch_ns_to_datetime(timestamp),
             voltage=voltage,
             current=current,
             resistance=resistance,
@@ -283,9 +249,12 @@ class EnhancedDataLogger(QObject):
         )
         
         with self.data_lock:
-            # 添加到內存緩存
-            self.memory_buffer.append(point)
+            # 編號並加入待寫入佇列；內存緩存只供顯示
             self.total_points += 1
+            point.seq = self.total_points
+            self._pending.append(point)
+            self.memory_buffer.append(point)
+            pending = len(self._pending)
             
             # 數據分析
             self.analyzer.add_point(point)
@@ -298,8 +267,8 @@ class EnhancedDataLogger(QObject):
                     point.to_dict()
                 )
         
-        # 定期保存到數據庫
-        if self.total_points % 100 == 0:  # 每100個點保存一次
+        # 累積足夠的新數據點後增量寫入數據庫
+        if pending >= self.FLUSH_THRESHOLD:
             self.save_buffer_to_db()
             
         # 定期更新統計
@@ -307,130 +276,201 @@ class EnhancedDataLogger(QObject):
             stats = self.analyzer.get_statistics()
             self.statistics_updated.emit(stats)
         
-        # 內存管理警告
-        if len(self.memory_buffer) >= self.max_memory_points * 0.9:
-            self.storage_warning.emit("內存使用率過高，建議保存數據")
+        # 數據庫持續無法寫入時，待寫入數據會累積
+        if pending >= self.max_memory_points * 0.9:
+            self.storage_warning.emit(f"{pending} 個數據點尚未寫入數據庫，請檢查存儲")
             
         return point
     
-    def save_buffer_to_db(self):
-        """將內存緩存保存到數據庫"""
-        if not self.db_connection or not self.current_session:
-            return
+    def save_buffer_to_db(self) -> int:
+        """將尚未寫入的數據點增量寫入數據庫
+        
+        數據點與高水位 (sessions.last_seq) 在同一交易中提交；失敗時數據保留在佇列中，
+        下次重試。已寫入的序號由唯一索引忽略，不會重複。
+        
+        Returns:
+            int: 本次寫入的數據點數量
+        """
+        if not self.store or not self.current_session:
+            return 0
             
         with self.data_lock:
-            if not self.memory_buffer:
-                return
+            if not self._pending:
+                return 0
                 
+            batch = self._pending
+            last_seq = batch[-1].seq
+            
             try:
-                cursor = self.db_connection.cursor()
-                
-                # 批量插入數據
-                data_to_insert = []
-                for point in self.memory_buffer:
-                    data_to_insert.append((
-                        self.current_session,
-                        point.timestamp.isoformat(),
-                        point.voltage,
-                        point.current,
-                        point.resistance,
-                        point.power,
-                        point.temperature,
-                        json.dumps(point.metadata) if point.metadata else None
-                    ))
-                
-                cursor.executemany('''
-                    INSERT INTO measurements 
-                    (session_id, timestamp, voltage_v, current_a, 
-                     resistance_ohm, power_w, temperature_c, metadata)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', data_to_insert)
-                
-                self.db_connection.commit()
-                self.logger.debug(f"保存 {len(data_to_insert)} 個數據點到數據庫")
+                session_key = self.store.session_key(self.current_session)
+                rows = [
+                    self.store.row(
+                        session_key, self._instrument_key, point.timestamp,
+                        voltage=point.voltage,
+                        current=point.current,
+                        resistance=point.resistance,
+                        power=point.power,
+                        temperature=point.temperature,
+                        seq=point.seq,
+                        metadata=point.metadata
+                    )
+                    for point in batch
+                ]
+                self.store.write(rows, session=self.current_session, last_seq=last_seq)
                 
             except Exception as e:
                 self.logger.error(f"數據庫保存失敗: {e}")
-    
+                return 0
+                
+            self._pending = []
+            self.persisted_seq = last_seq
+            self.logger.debug(f"保存 {len(rows)} 個數據點到數據庫 (高水位 {last_seq})")
+            return len(rows)
+            
     def auto_save_data(self):
         """自動保存數據"""
         try:
+            # 只寫入上次之後的新數據點
             self.save_buffer_to_db()
             
-            # 更新會話統計
-            if self.db_connection and self.current_session:
-                cursor = self.db_connection.cursor()
-                cursor.execute('''
-                    UPDATE sessions SET total_points = ?, end_time = ?
-                    WHERE session_id = ?
-                ''', (
-                    self.total_points,
-                    datetime.now().isoformat(),
-                    self.current_session
-                ))
-                self.db_connection.commit()
-                
+            # 更新會話統計 (以已寫入的高水位為準)
+            if self.store and self.current_session:
+                with self.data_lock:
+                    self.store.update_session(
+                        self.current_session,
+                        total_points=self.persisted_seq,
+                        end_ns=as_epoch_ns(datetime.now())
+                    )
+                    
             self.data_saved.emit(f"自動保存完成 - {self.total_points} 個數據點")
             
         except Exception as e:
             self.logger.error(f"自動保存失敗: {e}")
     
-    def export_session_data(self, format_type: str = "csv", 
-                           session_id: str = None) -> str:
-        """匯出會話數據"""
+    EXPORT_COLUMNS = ['timestamp', 'voltage_v', 'current_a', 'resistance_ohm',
+                      'power_w', 'temperature_c', 'metadata']
+    
+    def _export_frame(self, chunk) -> pd.DataFrame:
+        """數據庫的列式數據段轉為導出表格 (時間轉換為本地ISO字串，向量化)"""
+        local = (pd.to_datetime(chunk['timestamp'], unit='ns', utc=True)
+                 .tz_convert(datetime.now().astimezone().tzinfo)
+                 .tz_localize(None))
+        return pd.DataFrame({
+            'timestamp': np.datetime_as_string(local.to_numpy().astype('datetime64[us]')),
+            'voltage_v': chunk['voltage'],
+            'current_a': chunk['current'],
+            'resistance_ohm': chunk['resistance'],
+            'power_w': chunk['power'],
+            'temperature_c': chunk['temperature'],
+            'metadata': chunk['metadata'].raw  # 數據庫中已是 JSON 字串
+        }, columns=self.EXPORT_COLUMNS)
+        
+    def _prepare_export(self, session_id: Optional[str]) -> Tuple[str, Iterator[pd.DataFrame], Optional[int]]:
+        """在呼叫端執行緒準備匯出：寫入待寫入的數據點並建立逐段讀取的數據來源
+        
+        Returns:
+            (會話ID, 表格段迭代器, 預計列數)
+        """
         if session_id is None:
             session_id = self.current_session
             
         if not session_id:
             raise ValueError("沒有指定的會話")
-        
-        # 從數據庫獲取數據
-        if self.db_connection:
-            query = '''
-                SELECT timestamp, voltage_v, current_a, resistance_ohm, 
-                       power_w, temperature_c, metadata
-                FROM measurements 
-                WHERE session_id = ? 
-                ORDER BY timestamp
-            '''
-            df = pd.read_sql_query(query, self.db_connection, params=[session_id])
-        else:
-            # 使用內存數據
-            data = [point.to_dict() for point in self.memory_buffer]
-            df = pd.DataFrame(data)
-        
-        # 匯出文件
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        if format_type.lower() == "csv":
-            filename = f"{session_id}_{timestamp}.csv"
-            filepath = self.base_path / filename
-            df.to_csv(filepath, index=False)
             
-        elif format_type.lower() == "json":
-            filename = f"{session_id}_{timestamp}.json"
-            filepath = self.base_path / filename
+        # 從數據庫分段讀取 (當前會話先寫入待寫入的數據點)
+        if self.store:
+            if session_id == self.current_session:
+                self.save_buffer_to_db()
+            session = self.store.get_session(session_id)
+            chunks = self.store.iter_columns(session=session_id, instrument=self.instrument_id)
+            frames = (self._export_frame(chunk) for chunk in chunks)
+            return session_id, frames, session['total_points'] if session else None
             
-            export_data = {
-                'session_id': session_id,
-                'export_time': datetime.now().isoformat(),
-                'total_points': len(df),
-                'data': df.to_dict('records')
-            }
+        # 使用內存數據 (在呼叫端執行緒取得快照)
+        with self.data_lock:
+            data = [point.to_dict() for point in self.memory_buffer]
+        return session_id, iter([pd.DataFrame(data)] if data else []), len(data)
+        
+    def _write_export(self, format_type: str, session_id: str,
+                      frames: Iterator[pd.DataFrame], job: Optional[ExportJob] = None) -> str:
+        """逐段寫出匯出檔案 (寫入 .partial 檔案，完成後改名；CSV/JSON 依 data.export.compression 壓縮)"""
+        format_type = format_type.lower()
+        if format_type not in ("csv", "json", "xlsx"):
+            raise ValueError(f"不支援的匯出格式: {format_type}")
+        if job is not None:
+            frames = job.track(frames)
             
-            with open(filepath, 'w') as f:
-                json.dump(export_data, f, indent=2)
+        compression = compression_options(get_config().get('data.export.compression', False))
+        codec = compression['compression'] if format_type in ("csv", "json") else None
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filepath = compressed_path(self.base_path / f"{session_id}_{timestamp}.{format_type}", codec)
+        partial = filepath.with_name(filepath.name + PARTIAL_SUFFIX)
+        try:
+            if format_type == "csv":
+                with open_output(partial, codec, compression['compression_level'],
+                                 compression['compression_block_size']) as f:
+                    count = 0
+                    for frame in frames:
+                        frame.to_csv(f, header=count == 0, index=False)
+                        count += len(frame)
+                    if count == 0:
+                        pd.DataFrame(columns=self.EXPORT_COLUMNS).to_csv(f, index=False)
+                        
+            elif format_type == "json":
+                # 數據逐筆寫出，總數在數據之後寫入
+                with open_output(partial, codec, compression['compression_level'],
+                                 compression['compression_block_size']) as f:
+                    f.write('{\n  "session_id": ' + json.dumps(session_id)
+                            + ',\n  "export_time": ' + json.dumps(datetime.now().isoformat())
+                            + ',\n  "data": [')
+                    count = 0
+                    for frame in frames:
+                        for record in frame.astype(object).where(frame.notna(), None).to_dict('records'):
+                            f.write((',\n    ' if count else '\n    ') + json.dumps(record))
+                            count += 1
+                    f.write(f'\n  ],\n  "total_points": {count}\n}}')
+                    
+            else:
+                frame_list = list(frames)
+                df = pd.concat(frame_list, ignore_index=True) if frame_list else \
+                    pd.DataFrame(columns=self.EXPORT_COLUMNS)
+                df.to_excel(partial, index=False, engine='openpyxl')
                 
-        elif format_type.lower() == "xlsx":
-            filename = f"{session_id}_{timestamp}.xlsx"
-            filepath = self.base_path / filename
-            df.to_excel(filepath, index=False)
+            os.replace(partial, filepath)
+            
+        except BaseException:
+            if partial.exists():
+                partial.unlink()
+            raise
             
-        else:
-            raise ValueError(f"不支援的匯出格式: {format_type}")
-        
         self.logger.info(f"數據已匯出: {filepath}")
         return str(filepath)
+        
+    def export_session_data(self, format_type: str = "csv", 
+                           session_id: str = None) -> str:
+        """匯出會話數據 (在呼叫端執行緒同步執行)"""
+        session_id, frames, _ = self._prepare_export(session_id)
+        return self._write_export(format_type, session_id, frames)
+        
+    def export_session_data_async(self, format_type: str = "csv",
+                                  session_id: str = None) -> ExportJob:
+        """在背景導出工作中匯出會話數據
+        
+        待寫入的數據點在呼叫端執行緒寫入數據庫，讀取與寫檔在導出工作執行緒進行。
+        
+        Args:
+            format_type: 匯出格式 ("csv"/"json"/"xlsx")
+            session_id: 會話ID，None表示當前會話
+            
+        Returns:
+            ExportJob: 導出工作 (進度與結果經由 get_export_service() 的信號發送)
+        """
+        session_id, frames, total = self._prepare_export(session_id)
+        return get_export_service().submit(
+            lambda job: self._write_export(format_type, session_id, frames, job),
+            description=f"{session_id}.{format_type.lower()}",
+            total_rows=total
+        )
     
     def get_session_statistics(self, session_id: str = None) -> Dict[str, Any]:
         """獲取會話統計數據"""
@@ -439,6 +479,9 @@ class EnhancedDataLogger(QObject):
             
         stats = self.analyzer.get_statistics()
         
+        # 整個會話的累計統計 (與滑動窗口統計來自同一串流)
+        stats['session'] = self.analyzer.stream.session_snapshot()
+        
         # 添加會話信息
         stats['session_info'] = {
             'session_id': session_id,
@@ -459,18 +502,14 @@ class EnhancedDataLogger(QObject):
             self.auto_save_timer.stop()
             
             # 更新會話結束時間
-            if self.db_connection:
+            if self.store:
                 try:
-                    cursor = self.db_connection.cursor()
-                    cursor.execute('''
-                        UPDATE sessions SET end_time = ?, total_points = ?
-                        WHERE session_id = ?
-                    ''', (
-                        datetime.now().isoformat(),
-                        self.total_points,
-                        self.current_session
-                    ))
-                    self.db_connection.commit()
+                    with self.data_lock:
+                        self.store.update_session(
+                            self.current_session,
+                            end_ns=as_epoch_ns(datetime.now()),
+                            total_points=self.persisted_seq
+                        )
                 except Exception as e:
                     self.logger.error(f"會話結束記錄失敗: {e}")
             
@@ -481,6 +520,7 @@ class EnhancedDataLogger(QObject):
         """清理資源"""
         self.close_session()
         
-        if self.db_connection:
-            self.db_connection.close()
-            self.db_connection = None
\ No newline at end of file
+        # 存儲由同一檔案的使用者共用，程式結束時才關閉
+        if self.store:
+            self.store.flush()
+            self.store = None
\ No newline at end of file
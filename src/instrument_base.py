@@ -7,6 +7,8 @@
 from abc import ABC, abstractmethod
 from typing import Optional, Tuple, Dict, Any
 import logging
+import threading
+import time
 
 class InstrumentBase(ABC):
     """儀器控制抽象基類"""
@@ -22,6 +24,13 @@ class InstrumentBase(ABC):
         self.connection = None
         self.logger = logging.getLogger(self.__class__.__name__)
         
+        # 通訊鎖 - 序列化測量執行緒與健康監控之間的I/O
+        self.io_lock = threading.RLock()
+        self.last_activity = time.monotonic()
+        
+        # 最近一次查詢的發送/接收時間 (monotonic ns)，供時鐘服務估計採集時刻
+        self.last_round_trip: Optional[Tuple[int, int]] = None
+        
     @abstractmethod
     def connect(self, connection_params: Dict[str, Any]) -> bool:
         """連接到儀器
@@ -54,6 +63,30 @@ class InstrumentBase(ABC):
         """檢查儀器是否已連接"""
         return self.connected
         
+    def heartbeat(self, timeout: Optional[float] = None) -> bool:
+        """發送輕量心跳確認通訊鏈路 - 子類應覆蓋
+        
+        Args:
+            timeout: 心跳超時時間(秒)，None使用儀器預設值
+            
+        Returns:
+            bool: 鏈路是否正常
+        """
+        return self.is_connected()
+        
+    def idle_seconds(self) -> float:
+        """距離上次成功通訊的秒數"""
+        return time.monotonic() - self.last_activity
+        
+    def _mark_activity(self) -> None:
+        """記錄一次成功通訊"""
+        self.last_activity = time.monotonic()
+        
+    def _record_round_trip(self, send_ns: int, recv_ns: int) -> None:
+        """記錄一次成功查詢的發送/接收時間 (monotonic ns)"""
+        self.last_round_trip = (send_ns, recv_ns)
+        self._mark_activity()
+        
     def __enter__(self):
         """進入上下文管理器"""
         return self
@@ -62,7 +95,7 @@ class InstrumentBase(ABC):
         """退出上下文管理器"""
         if self.connected:
             self.disconnect()
-            
+
 
 class PowerSupplyBase(InstrumentBase):
     """電源供應器基類"""
@@ -34,6 +34,10 @@ class Keithley2461(SourceMeterBase):
         self.current_voltage = 0.0
         self.current_current = 0.0
         
+        # 硬體掃描狀態
+        self.sweep_points = 0
+        self.sweep_buffer = "defbuffer1"
+        
         # 使用統一日誌系統
         self.logger = get_logger("Keithley2461")
         
@@ -124,12 +128,14 @@ class Keithley2461(SourceMeterBase):
             raise ConnectionError("儀器未連接")
             
         try:
-            if self.socket:
-                command_bytes = (command + '\n').encode('utf-8')
-                self.socket.send(command_bytes)
-                self.logger.debug(f"發送命令: {command}")
-            else:
-                raise ConnectionError("Socket未連接")
+            with self.io_lock:
+                if self.socket:
+                    command_bytes = (command + '\n').encode('utf-8')
+                    self.socket.send(command_bytes)
+                    self._mark_activity()
+                    self.logger.debug(f"發送命令: {command}")
+                else:
+                    raise ConnectionError("Socket未連接")
                 
         except Exception as e:
             self.logger.error(f"發送命令失敗: {e}")
@@ -149,19 +155,76 @@ class Keithley2461(SourceMeterBase):
             raise ConnectionError("儀器未連接")
             
         try:
-            if self.socket:
-                command_bytes = (command + '\n').encode('utf-8')
-                self.socket.send(command_bytes)
-                response = self.socket.recv(1024).decode('utf-8').strip()
-                self.logger.debug(f"查詢: {command} -> {response}")
-                return response
-            else:
-                raise ConnectionError("Socket未連接")
+            with self.io_lock:
+                if self.socket:
+                    command_bytes = (command + '\n').encode('utf-8')
+                    send_ns = time.monotonic_ns()
+                    self.socket.send(command_bytes)
+                    response = self._read_response()
+                    self._record_round_trip(send_ns, time.monotonic_ns())
+                    self.logger.debug(f"查詢: {command} -> {response}")
+                    return response
+                else:
+                    raise ConnectionError("Socket未連接")
                 
         except Exception as e:
             self.logger.error(f"查詢命令失敗: {e}")
             raise
             
+    def _read_response(self) -> str:
+        """讀取一行回應直到換行符 - 緩衝區讀回等長回應會超過單次 recv 的大小
+        
+        Returns:
+            str: 去除結尾換行的回應
+        """
+        chunks = []
+        while True:
+            chunk = self.socket.recv(4096)
+            if not chunk:
+                raise ConnectionError("儀器已關閉連接")
+            chunks.append(chunk)
+            if chunk.endswith(b'\n'):
+                break
+        return b''.join(chunks).decode('utf-8').strip()
+        
+    def heartbeat(self, timeout: Optional[float] = None) -> bool:
+        """以 *OPC? 檢查鏈路是否存活
+        
+        使用獨立的短超時，避免死掉的Socket佔用完整的通訊超時時間。
+        對端關閉連接時 recv 會返回空字串，同樣視為失敗。
+        
+        Args:
+            timeout: 心跳超時時間(秒)，None使用通訊超時
+            
+        Returns:
+            bool: 鏈路是否正常
+        """
+        if not self.connected or not self.socket:
+            return False
+            
+        with self.io_lock:
+            try:
+                if timeout is not None:
+                    self.socket.settimeout(timeout)
+                self.socket.send(b"*OPC?\n")
+                response = self.socket.recv(64).decode('utf-8').strip()
+            except (OSError, UnicodeDecodeError) as e:
+                self.logger.warning(f"心跳失敗: {e}")
+                return False
+            finally:
+                if timeout is not None and self.socket:
+                    try:
+                        self.socket.settimeout(self.timeout)
+                    except OSError:
+                        pass
+                        
+            if response != "1":
+                self.logger.warning(f"心跳回應異常: {response!r}")
+                return False
+                
+            self._mark_activity()
+            return True
+            
     def reset(self) -> None:
         """重置儀器到預設狀態"""
         self.send_command("*RST")
@@ -327,6 +390,81 @@ class Keithley2461(SourceMeterBase):
         self.send_command(":DISP:WATC:CHAN1:FUNC VOLT")
         self.send_command(":DISP:WATC:CHAN2:FUNC CURR")
         
+    # =================
+    # 硬體掃描
+    # =================
+    
+    def configure_voltage_sweep(self, start: float, stop: float, points: int,
+                                delay: float = 0.0, current_limit: float = 0.1,
+                                buffer_name: str = "defbuffer1") -> None:
+        """配置儀器內建的線性電壓掃描 (觸發模型)，掃描期間無需主機逐點控制
+        
+        Args:
+            start: 起始電壓 (V)
+            stop: 結束電壓 (V)
+            points: 掃描點數
+            delay: 每點源延遲 (秒)
+            current_limit: 電流限制 (A)
+            buffer_name: 存放讀值的緩衝區
+        """
+        if points < 2:
+            raise ValueError("掃描點數至少為2")
+            
+        self.send_command(":SOUR:FUNC VOLT")
+        self.send_command(':SENS:FUNC "CURR"')
+        self.send_command(f":SOUR:VOLT:ILIM {current_limit}")
+        self.send_command(
+            f':SOUR:SWE:VOLT:LIN {start}, {stop}, {points}, {delay}, 1, BEST, OFF, OFF, "{buffer_name}"'
+        )
+        
+        errors = self.check_errors()
+        if errors:
+            self.logger.error(f"配置掃描時發生錯誤: {errors}")
+            raise RuntimeError(f"SCPI錯誤: {errors}")
+            
+        self.sweep_points = points
+        self.sweep_buffer = buffer_name
+        self.logger.info(f"配置硬體掃描: {start}V -> {stop}V, {points} 點, 延遲 {delay}s")
+        
+    def start_sweep(self) -> None:
+        """清空緩衝區並啟動已配置的掃描 (不等待完成)"""
+        self.send_command(f':TRAC:CLE "{self.sweep_buffer}"')
+        self.send_command(":INIT")
+        
+    def is_sweep_running(self) -> bool:
+        """查詢觸發模型是否仍在執行
+        
+        Returns:
+            bool: 掃描是否仍在進行
+        """
+        state = self.query(":TRIG:STAT?").split(';')[0].strip().upper()
+        if state == "FAILED":
+            raise RuntimeError("觸發模型執行失敗")
+        return state in ("RUNNING", "WAITING", "BUILDING", "PAUSED", "ABORTING")
+        
+    def abort_sweep(self) -> None:
+        """中止進行中的掃描"""
+        self.send_command(":ABOR")
+        self.logger.info("掃描已中止")
+        
+    def read_sweep_buffer(self, points: Optional[int] = None) -> Tuple[List[float], List[float]]:
+        """一次讀回掃描緩衝區的源值與讀值
+        
+        Args:
+            points: 讀取點數，None讀取緩衝區中的全部點
+            
+        Returns:
+            Tuple[List[float], List[float]]: (源電壓列表, 測量電流列表)
+        """
+        if points is None:
+            points = int(self.query(f':TRAC:ACT? "{self.sweep_buffer}"'))
+        if points <= 0:
+            return [], []
+            
+        response = self.query(f':TRAC:DATA? 1, {points}, "{self.sweep_buffer}", SOUR, READ')
+        values = [float(x) for x in response.split(',')]
+        return values[0::2], values[1::2]
+        
     # =================
     # 抽象方法實現
     # =================
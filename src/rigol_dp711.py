@@ -154,7 +154,9 @@ class RigolDP711(PowerSupplyBase):
             raise RuntimeError("設備未連接")
             
         try:
-            self.instrument.write(command)
+            with self.io_lock:
+                self.instrument.write(command)
+                self._mark_activity()
             self.logger.debug(f"發送指令: {command}")
             
         except Exception as e:
@@ -187,7 +189,10 @@ class RigolDP711(PowerSupplyBase):
                         pass
                     time.sleep(0.1)  # 短暫延遲
                 
-                response = self.instrument.query(command).strip()
+                with self.io_lock:
+                    send_ns = time.monotonic_ns()
+                    response = self.instrument.query(command).strip()
+                    self._record_round_trip(send_ns, time.monotonic_ns())
                 self.logger.debug(f"查詢指令: {command} -> {response} (第{attempt + 1}次嘗試)")
                 return response
                 
@@ -234,6 +239,42 @@ class RigolDP711(PowerSupplyBase):
             # 如果有緩存，返回緩存；否則返回預設值
             return getattr(self, '_cached_identity', "DP711 Unknown")
             
+    def heartbeat(self, timeout: Optional[float] = None) -> bool:
+        """以 *OPC? 檢查串口鏈路是否存活
+        
+        不經過 _query_command 的重試機制，串口停滯時在一個超時內即可判定。
+        
+        Args:
+            timeout: 心跳超時時間(秒)，None使用VISA超時設定
+            
+        Returns:
+            bool: 鏈路是否正常
+        """
+        if not self.connected or not self.instrument:
+            return False
+            
+        with self.io_lock:
+            original_timeout = self.instrument.timeout
+            try:
+                if timeout is not None:
+                    self.instrument.timeout = int(timeout * 1000)
+                response = self.instrument.query("*OPC?").strip()
+            except Exception as e:
+                self.logger.warning(f"心跳失敗: {e}")
+                return False
+            finally:
+                try:
+                    self.instrument.timeout = original_timeout
+                except Exception:
+                    pass
+                    
+            if response != "1":
+                self.logger.warning(f"心跳回應異常: {response!r}")
+                return False
+                
+            self._mark_activity()
+            return True
+            
     def is_connected(self) -> bool:
         """檢查設備是否已連接
         
@@ -6,11 +6,14 @@
 from .base_worker import UnifiedWorkerBase, WorkerState
 from .measurement_worker import MeasurementWorker, MeasurementStrategy
 from .connection_worker import ConnectionWorker
+from .health_monitor import ConnectionHealthMonitor, get_health_monitor
 
 __all__ = [
     'UnifiedWorkerBase',
     'WorkerState', 
     'MeasurementWorker',
     'MeasurementStrategy',
-    'ConnectionWorker'
+    'ConnectionWorker',
+    'ConnectionHealthMonitor',
+    'get_health_monitor'
 ]
\ No newline at end of file
@@ -4,10 +4,11 @@
 處理所有儀器的非阻塞式連接操作
 """
 
-import time
 from typing import Dict, Any, Optional, List
 from PyQt6.QtCore import pyqtSignal
+from src.config import get_config
 from .base_worker import UnifiedWorkerBase, WorkerState
+from src.engine.health import compute_backoff_delay
 
 
 class ConnectionWorker(UnifiedWorkerBase):
@@ -54,8 +55,7 @@ class ConnectionWorker(UnifiedWorkerBase):
                     
                     if isinstance(self.instrument, RigolDP711):
                         # Rigol DP711: 優先使用緩存避免重複SCPI查詢
-                        import time
-                        time.sleep(0.1)  # 給設備時間完成初始化
+                        self.sleep(0.1)  # 給設備時間完成初始化
                         
                         if hasattr(self.instrument, '_cached_identity') and self.instrument._cached_identity:
                             identity = self.instrument._cached_identity
@@ -200,7 +200,7 @@ class BatchConnectionWorker(UnifiedWorkerBase):
         self._emit_progress(progress)
         
         # 短暫延遲避免過快連接
-        time.sleep(0.5)
+        self.sleep(0.5)
         
         return True
         
@@ -228,7 +228,12 @@ class ReconnectionWorker(UnifiedWorkerBase):
         self.connection_params = connection_params
         self.max_attempts = max_attempts
         self.current_attempt = 0
-        self.retry_delay_ms = 2000  # 2秒重試間隔
+        
+        # 指數退避重試間隔
+        config = get_config()
+        self.initial_delay = config.get('safety.monitoring.reconnect_initial_delay', 1.0)
+        self.max_delay = config.get('safety.monitoring.reconnect_max_delay', 60.0)
+        self.jitter = config.get('safety.monitoring.reconnect_jitter', 0.2)
         
     def setup(self) -> bool:
         """設置重連準備"""
@@ -252,7 +257,7 @@ class ReconnectionWorker(UnifiedWorkerBase):
             # 先斷開現有連接
             if self.instrument.is_connected():
                 self.instrument.disconnect()
-                time.sleep(1.0)
+                self.sleep(1.0)
                 
             # 嘗試重新連接
             if self.instrument.connect(self.connection_params):
@@ -269,8 +274,9 @@ class ReconnectionWorker(UnifiedWorkerBase):
         progress = int(self.current_attempt * 100 / self.max_attempts)
         self._emit_progress(progress)
         
-        # 等待重試間隔
-        self.msleep(self.retry_delay_ms)
+        # 等待重試間隔 (指數退避 + 隨機擾動，避免多台儀器同時重連)
+        delay = compute_backoff_delay(self.current_attempt, self.initial_delay, self.max_delay, self.jitter)
+        self.sleep(delay)
         
         return True
         
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+連接健康監控工作執行緒
+鏈路閒置時發送心跳、偵測斷線，並以指數退避自動恢復連接
+監控邏輯位於 src.engine.health，此處為Qt信號轉接層
+"""
+
+from PyQt6.QtCore import pyqtSignal
+from src.engine.health import HealthMonitorLogic
+from .base_worker import UnifiedWorkerBase
+
+
+class ConnectionHealthMonitor(HealthMonitorLogic, UnifiedWorkerBase):
+    """連接健康監控工作執行緒 (Qt)
+    
+    監控邏輯見 HealthMonitorLogic，信號跨執行緒自動排隊到GUI執行緒。
+    """
+    
+    connection_lost = pyqtSignal(str, float)          # instrument_name, time_to_detect (秒)
+    connection_recovered = pyqtSignal(str, float)     # instrument_name, time_to_recover (秒)
+    recovery_attempted = pyqtSignal(str, int, float)  # instrument_name, attempt, next_delay (秒)
+    recovery_abandoned = pyqtSignal(str)              # instrument_name
+    
+    def __init__(self, poll_interval_ms: int = 500):
+        """初始化健康監控
+        
+        Args:
+            poll_interval_ms: 監控輪詢間隔(毫秒)
+        """
+        UnifiedWorkerBase.__init__(self, "HealthMonitor")
+        self._init_health(poll_interval_ms)
+
+
+# 全局健康監控實例
+_health_monitor = None
+
+def get_health_monitor() -> ConnectionHealthMonitor:
+    """獲取全局連接健康監控實例
+    
+    Returns:
+        ConnectionHealthMonitor: 健康監控實例
+    """
+    global _health_monitor
+    if _health_monitor is None:
+        _health_monitor = ConnectionHealthMonitor()
+    return _health_monitor
\ No newline at end of file
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+測試二進制會話格式 (.msb)
+記憶體映射的零複製讀取、崩潰後未寫完的尾端、亂序數據的區塊索引，以及存儲後端的讀寫
+"""
+
+import numpy as np
+import pytest
+
+from src.data.binary_session import BinarySession, BinarySessionWriter, RECORD_DTYPE
+from src.data.storage_backends import BinaryStorage
+from src.data.unified_data_manager import MeasurementPoint
+
+
+START = 1_700_000_000_000_000_000
+STEP = 1_000_000
+
+
+def points(indices, instrument='A'):
+    return [
+        MeasurementPoint(START + i * STEP, instrument, float(i), 0.5,
+                         metadata={'index': i} if i % 10 == 0 else None)
+        for i in indices
+    ]
+
+
+def write_session(path, *batches, block_size=8, close=True):
+    writer = BinarySessionWriter(path, block_size=block_size, fsync=False)
+    for batch in batches:
+        writer.write_points(batch)
+    if close:
+        writer.close()
+    else:
+        writer.flush()
+    return writer
+
+
+def test_sorted_session_slices_are_mapped_views(tmp_path):
+    """有序數據按時間切片返回映射視圖，附加資訊與儀器名稱稀疏保存"""
+    path = tmp_path / 'run.msb'
+    write_session(path, points(range(0, 20)), points(range(20, 40), 'B'))
+    session = BinarySession(path)
+    
+    assert len(session) == 40 and session.sorted
+    assert session.instrument_names == ['A', 'B']
+    
+    window = session.time_slice(START + 15 * STEP, START + 24 * STEP)
+    assert window['voltage'].tolist() == [float(i) for i in range(15, 25)]
+    assert np.shares_memory(window, session.records)
+    
+    data = session.to_columns(START + 18 * STEP, START + 21 * STEP)
+    assert data['instrument_id'].tolist() == ['A', 'A', 'B', 'B']
+    assert data['metadata'][2] == {'index': 20} and data['metadata'][0] is None
+    assert np.isnan(data['temperature']).all()
+
+
+def test_truncated_tail_after_crash_is_ignored(tmp_path):
+    """崩潰後未寫完的最後一列與附加資訊行被略過，其餘數據可讀取"""
+    path = tmp_path / 'run.msb'
+    write_session(path, points(range(25)), close=False)
+    with open(path, 'ab') as f:
+        f.write(b'\x01' * (RECORD_DTYPE.itemsize // 2))
+    with open(path.with_name(path.name + '.meta'), 'a', encoding='utf-8') as f:
+        f.write('{"row": 25, "meta')
+        
+    session = BinarySession(path)
+    assert len(session) == 25
+    assert session.column('timestamp')[-1] == START + 24 * STEP
+    assert session.metadata(20) == {'index': 20}
+    assert len(session.block_index) == 3
+
+
+def test_unsorted_session_uses_block_index(tmp_path):
+    """亂序寫入後改用區塊索引篩選，切片結果仍按時間排序"""
+    path = tmp_path / 'run.msb'
+    write_session(path, points(range(20, 40)), points(range(0, 20)), points(range(40, 45)))
+    session = BinarySession(path)
+    
+    assert not session.sorted
+    with pytest.raises(ValueError):
+        session.index_range(START, START + STEP)
+        
+    window = session.time_slice(START + 17 * STEP, START + 22 * STEP)
+    assert window['voltage'].tolist() == [17.0, 18.0, 19.0, 20.0, 21.0, 22.0]
+    assert session.to_columns(START + 43 * STEP)['voltage'].tolist() == [43.0, 44.0]
+    
+    chunks = list(session.chunks(16, ['voltage']))
+    assert [len(chunk) for chunk in chunks] == [16, 16, 13]
+    assert chunks[0]['voltage'][0] == 20.0
+
+
+def test_binary_storage_roundtrip(tmp_path):
+    """存儲後端追加會話數據，讀取時投影欄位並按時間範圍過濾"""
+    storage = BinaryStorage(base_path=str(tmp_path))
+    storage.append_session('run', points(range(30)))
+    path = storage.finalize_session('run')
+    
+    assert path.endswith('run.msb')
+    data = storage.load_columns('run', ['voltage'], start_ns=START + 5 * STEP, end_ns=START + 7 * STEP)
+    assert data.names == ['voltage'] and data['voltage'].tolist() == [5.0, 6.0, 7.0]
+    
+    loaded = storage.load_session('run')
+    assert len(loaded) == 30 and loaded[10]['metadata'] == {'index': 10}
+    assert loaded[0]['timestamp'] == START and loaded[0]['instrument_id'] == 'A'
\ No newline at end of file
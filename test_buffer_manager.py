@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+測試列式圓形緩存
+環形邊界的讀取、亂序插入、批量追加與容量調整，
+跨邊界的時間範圍查詢與多台儀器的 k 路合併
+"""
+
+import numpy as np
+
+from src.data.buffer_manager import BufferManager, ColumnarRingBuffer
+from src.data.memory_governor import MemoryGovernor
+from src.data.unified_data_manager import MeasurementPoint
+
+
+def point(ts, voltage=None, metadata=None):
+    return MeasurementPoint(ts, 'A', float(ts if voltage is None else voltage), 0.5, metadata=metadata)
+
+
+def filled(size, count, start=0):
+    buffer = ColumnarRingBuffer(size, 'A')
+    for ts in range(start, start + count):
+        buffer.append(point(ts))
+    return buffer
+
+
+def test_wraps_and_keeps_newest_points():
+    """超過容量時只保留最新的點，跨邊界的讀取按時間順序"""
+    buffer = filled(8, 13)
+    
+    assert buffer.size() == 8 and buffer.is_full()
+    assert buffer.column('timestamp').tolist() == list(range(5, 13))
+    assert buffer.column('voltage', 3).tolist() == [10.0, 11.0, 12.0]
+    assert [p.timestamp for p in buffer.get_recent(2)] == [11, 12]
+    assert buffer.point_at(0).timestamp == 5 and buffer.point_at(-1).timestamp == 12
+
+
+def test_unwrapped_window_is_read_only_view():
+    """未跨越邊界的讀取返回唯讀視圖，不複製數據"""
+    buffer = filled(8, 5)
+    view = buffer.column('voltage')
+    
+    assert np.shares_memory(view, buffer.columns['voltage'])
+    assert not view.flags.writeable
+
+
+def test_out_of_order_points_are_inserted_in_time_order():
+    """較舊的點按時間插入；滿載時比所有數據都舊的點被略過"""
+    buffer = filled(5, 5, start=10)
+    buffer.append(point(12, voltage=-1.0, metadata={'late': True}))
+    buffer.append(point(1))
+    
+    assert buffer.column('timestamp').tolist() == [11, 12, 12, 13, 14]
+    late = [p for p in buffer.get_all() if p.voltage == -1.0][0]
+    assert late.metadata == {'late': True}
+
+
+def test_append_block_and_resize_keep_latest_rows():
+    """批量追加超過容量時只保留最後 max_size 列；縮小容量保留最新數據"""
+    buffer = ColumnarRingBuffer(6, 'A')
+    buffer.append_block({'timestamp': np.arange(10), 'voltage': np.arange(10.0), 'current': np.ones(10)})
+    assert buffer.column('timestamp').tolist() == [4, 5, 6, 7, 8, 9]
+    assert np.isnan(buffer.column('temperature')).all()
+    assert buffer.get_all()[0].temperature is None
+    
+    buffer.resize(3)
+    assert buffer.max_size == 3 and buffer.column('voltage').tolist() == [7.0, 8.0, 9.0]
+
+
+def test_time_range_across_wrap_boundary():
+    """時間範圍跨越環形邊界時，二分定位與兩段視圖仍按時間順序"""
+    buffer = filled(8, 13)
+    
+    assert buffer.index_range(6, 10) == (1, 6)
+    assert buffer.index_range(100, None) == (8, 8)
+    assert buffer.time_window(6, 10)['timestamp'].tolist() == [6, 7, 8, 9, 10]
+    assert [p.timestamp for p in buffer.get_range(9, None)] == [9, 10, 11, 12]
+    
+    segments = buffer.time_segments(6, 10)
+    assert len(segments) == 2
+    joined = np.concatenate([segment['timestamp'] for segment in segments])
+    assert joined.tolist() == [6, 7, 8, 9, 10]
+    assert all(not segment['voltage'].flags.writeable for segment in segments)
+    assert len(buffer.time_segments(5, 7)) == 1
+
+
+def test_merge_points_interleaves_instruments_by_time():
+    """k 路合併多台儀器的緩存，結果按時間戳排序並套用時間範圍"""
+    manager = BufferManager(governor=MemoryGovernor(total_limit_mb=1000, group_limits_mb={}))
+    manager.create_buffer('A', 8)
+    manager.create_buffer('B', 8)
+    for ts in range(0, 24, 2):
+        manager.add_point('A', MeasurementPoint(ts, 'A', 1.0, 0.5))
+        manager.add_point('B', MeasurementPoint(ts + 1, 'B', 2.0, 0.5))
+        
+    merged = manager.merge_points()
+    assert [p.timestamp for p in merged] == list(range(8, 24))
+    assert [p.instrument_id for p in merged[:4]] == ['A', 'B', 'A', 'B']
+    
+    ranged = manager.merge_points(['B', 'A'], start_time=11, end_time=15)
+    assert [p.timestamp for p in ranged] == [11, 12, 13, 14, 15]
+    assert manager.merge_points(['missing']) == []
+    
+    assert [p.timestamp for p in manager.get_points_in_range('A', 10, 14)] == [10, 12, 14]
+    assert manager.get_window_in_range('B', start_time=19)['timestamp'].tolist() == [19, 21, 23]
\ No newline at end of file
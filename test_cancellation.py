@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+測試取消令牌與 Worker 生命週期
+停止請求立即打斷等待，停止延遲有上限
+"""
+
+import threading
+import time
+
+import pytest
+
+from src.engine.cancellation import CancellationToken, OperationCancelled
+from src.engine.lifecycle import WorkerState
+from src.engine.worker import EngineWorker
+
+
+class SleepyWorker(EngineWorker):
+    """每次操作休眠很久的 Worker"""
+    
+    def __init__(self, seconds=30.0):
+        super().__init__('Sleepy')
+        self.seconds = seconds
+        self.cleaned = threading.Event()
+        
+    def setup(self):
+        return True
+        
+    def execute_operation(self):
+        self.sleep(self.seconds)
+        return True
+        
+    def cleanup(self):
+        self.cleaned.set()
+
+
+def test_cancel_wakes_sleepers_and_runs_callbacks_once():
+    """cancel() 立即喚醒休眠，回調只執行一次；取消後註冊的回調立即執行"""
+    token = CancellationToken()
+    calls = []
+    token.register(lambda: calls.append('registered'))
+    unregister = token.register(lambda: calls.append('removed'))
+    unregister()
+    
+    results = []
+    sleeper = threading.Thread(target=lambda: results.append(token.sleep(30)))
+    sleeper.start()
+    time.sleep(0.05)
+    started = time.monotonic()
+    token.cancel()
+    token.cancel()
+    sleeper.join(2)
+    
+    assert results == [False]
+    assert time.monotonic() - started < 1.0
+    assert calls == ['registered']
+    token.register(lambda: calls.append('late'))
+    assert calls == ['registered', 'late']
+    with pytest.raises(OperationCancelled):
+        token.raise_if_cancelled()
+
+
+def test_stop_work_interrupts_long_sleep_within_bound():
+    """執行中的長時間休眠不延遲停止；每次啟動使用新的令牌"""
+    worker = SleepyWorker()
+    worker.start_work()
+    time.sleep(0.05)
+    first_token = worker.cancel_token
+    
+    assert worker.stop_work(timeout_ms=2000)
+    assert worker.last_stop_latency_ms is not None and worker.last_stop_latency_ms < 1000
+    assert worker.cleaned.is_set()
+    assert worker.state == WorkerState.IDLE
+    
+    worker.start_work()
+    assert worker.cancel_token is not first_token and not worker.cancel_token.is_cancelled
+    assert worker.stop_work(timeout_ms=2000)
+
+
+def test_stop_while_paused_returns_promptly():
+    """暫停中的 Worker 收到停止請求時立即結束"""
+    worker = SleepyWorker(seconds=0.01)
+    worker.start_work()
+    time.sleep(0.05)
+    worker.pause_work()
+    assert worker.state == WorkerState.PAUSED
+    time.sleep(0.05)
+    
+    assert worker.stop_work(timeout_ms=2000)
+    assert not worker.is_running()
\ No newline at end of file
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+測試時鐘服務的採集時刻估計
+查詢以共用的 monotonic 時基記錄，儀器記錄的往返時間與採樣校正優先採用
+"""
+
+import time
+
+from src.engine.clock import ClockService, StreamAligner
+
+
+class TimedInstrument:
+    """記錄每次查詢往返時間的模擬儀器"""
+    
+    name = 'timed'
+    
+    def __init__(self, delay_s=0.002):
+        self.delay_s = delay_s
+        self.last_round_trip = None
+        
+    def measure_all(self):
+        time.sleep(self.delay_s)
+        send_ns = time.monotonic_ns()
+        recv_ns = send_ns + 1000
+        self.last_round_trip = (send_ns, recv_ns)
+        time.sleep(self.delay_s)
+        return 1.0, 2.0, 0.5, 2.0
+
+
+def test_timed_query_prefers_instrument_round_trip():
+    """儀器記錄的往返時間在呼叫範圍內時以其為準"""
+    clock = ClockService()
+    instrument = TimedInstrument()
+    values, timing = clock.timed_query(instrument, instrument.measure_all)
+    
+    assert values == (1.0, 2.0, 0.5, 2.0)
+    assert (timing.send_ns, timing.recv_ns) == instrument.last_round_trip
+    assert timing.uncertainty_ns == 500
+    assert clock.acquired_epoch_ns(timing) == clock.to_epoch_ns(timing.send_ns + 500)
+
+
+def test_timed_query_applies_acquisition_offset_and_falls_back_to_call_window():
+    """沒有往返記錄時以整個呼叫為界，並套用儀器的採樣校正"""
+    clock = ClockService()
+    clock.set_acquisition_offset('timed', 250_000)
+    instrument = TimedInstrument()
+    instrument.last_round_trip = (0, 1)  # 舊的記錄，不在本次呼叫範圍內
+    
+    before = time.monotonic_ns()
+    _, timing = clock.timed_query(instrument, lambda: time.sleep(0.002))
+    after = time.monotonic_ns()
+    
+    assert before <= timing.send_ns < timing.recv_ns <= after
+    assert timing.acquired_ns == timing.send_ns + timing.rtt_ns // 2 + 250_000
+
+
+def test_aligner_interpolates_on_shared_time_base():
+    """兩台儀器的樣本以採集時刻對齊"""
+    aligner = StreamAligner()
+    aligner.add_samples('keithley', [
+        {'acquired_ns': 1_000, 'voltage': 1.0}, {'acquired_ns': 3_000, 'voltage': 3.0}
+    ], fields=('voltage',))
+    aligner.add_samples('rigol', [{'acquired_ns': 2_000, 'voltage': 5.0}], fields=('voltage',))
+    
+    rows = aligner.align('rigol')
+    assert rows == [{'acquired_ns': 2_000, 'keithley.voltage': 2.0, 'rigol.voltage': 5.0}]
\ No newline at end of file
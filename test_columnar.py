@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+測試列式會話數據與各存儲後端的列式讀取
+欄位型別、延遲解析的附加資訊、投影與時間範圍，不同後端讀回相同的陣列
+"""
+
+import numpy as np
+import pytest
+
+from src.data.columnar import MetadataColumn, SessionColumns, normalize_columns
+from src.data.storage_backends import CSVStorage, JSONStorage, SQLiteStorage
+from src.data.unified_data_manager import MeasurementPoint
+from src.engine.clock import as_epoch_ns
+
+
+START = 1_700_000_000_000_000_000
+STEP = 1_000_000
+
+
+def points(count):
+    return [
+        MeasurementPoint(START + i * STEP, 'A' if i % 2 else 'B', float(i), 0.5,
+                         temperature=25.0 if i % 3 == 0 else None,
+                         metadata={'index': i} if i % 5 == 0 else None)
+        for i in range(count)
+    ]
+
+
+def test_records_convert_to_typed_columns():
+    """字典列表轉為標準型別：時間戳 int64、數值缺值為 NaN、欄位按標準順序"""
+    data = SessionColumns.from_records([
+        {'timestamp': '2024-05-01T10:00:00', 'voltage': 1.0, 'instrument_id': 'A'},
+        {'timestamp': START, 'voltage': None, 'instrument_id': 'B', 'metadata': '{"x": 1}'}
+    ], ['voltage', 'timestamp', 'instrument_id', 'metadata'])
+    
+    assert data.names == ['timestamp', 'instrument_id', 'voltage', 'metadata']
+    assert data['timestamp'].dtype == np.int64
+    assert data['timestamp'].tolist() == [as_epoch_ns('2024-05-01T10:00:00'), START]
+    assert data['voltage'][0] == 1.0 and np.isnan(data['voltage'][1])
+    assert data.to_dicts()[1]['voltage'] is None and data.to_dicts()[1]['metadata'] == {'x': 1}
+    
+    with pytest.raises(ValueError):
+        normalize_columns(['voltage', 'unknown'])
+
+
+def test_metadata_is_decoded_on_access():
+    """附加資訊保持原始字串，取用時才解析並快取"""
+    column = MetadataColumn(['{"a": 1}', None, '', {'b': 2}])
+    
+    assert column.present().tolist() == [True, False, False, True]
+    assert column._decoded == {}
+    assert column[0] == {'a': 1} and column[0] is column[0]
+    assert list(column._decoded) == [0]
+    assert column.decode() == [{'a': 1}, None, None, {'b': 2}]
+    assert column[1:][-1] == {'b': 2}
+
+
+def test_between_project_and_chunks_do_not_copy():
+    """時間範圍、投影與分段以視圖取出，不複製數據"""
+    data = SessionColumns.from_points(points(10))
+    
+    assert data.between().project() is data
+    window = data.between(START + 2 * STEP, START + 5 * STEP)
+    assert window['voltage'].tolist() == [2.0, 3.0, 4.0, 5.0]
+    
+    projected = data.project(['voltage'])
+    assert projected.names == ['voltage']
+    assert np.shares_memory(projected['voltage'], data['voltage'])
+    
+    chunks = list(data.chunks(4))
+    assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+    assert np.shares_memory(chunks[1]['voltage'], data['voltage'])
+    assert len(SessionColumns.concat(chunks)) == 10
+    assert len(SessionColumns.concat([], ['voltage'])) == 0
+
+
+@pytest.mark.parametrize('backend', [CSVStorage, JSONStorage, SQLiteStorage])
+def test_backends_load_identical_columns(tmp_path, backend):
+    """各存儲後端對相同會話讀回相同的陣列 (投影、時間範圍與附加資訊)"""
+    storage = backend(base_path=str(tmp_path))
+    try:
+        storage.save_session('run', points(40))
+        expected = SessionColumns.from_points(points(40)).between(START + 10 * STEP, START + 19 * STEP)
+        
+        data = storage.load_columns('run', ['timestamp', 'instrument_id', 'temperature', 'metadata'],
+                                    start_ns=START + 10 * STEP, end_ns=START + 19 * STEP)
+        assert data.names == ['timestamp', 'instrument_id', 'temperature', 'metadata']
+        assert data['timestamp'].tolist() == expected['timestamp'].tolist()
+        assert data['instrument_id'].tolist() == expected['instrument_id'].tolist()
+        np.testing.assert_array_equal(data['temperature'], expected['temperature'])
+        assert data['metadata'].decode() == expected['metadata'].decode()
+        
+        voltage = storage.load_columns('run', ['voltage'])
+        assert voltage.names == ['voltage'] and voltage['voltage'].tolist() == [float(i) for i in range(40)]
+    finally:
+        storage.close()
+        if backend is SQLiteStorage:
+            storage.store.close()
\ No newline at end of file
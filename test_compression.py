@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+測試串流壓縮
+背景壓縮的讀寫往返、檢查點之前的數據在未寫入結尾時可讀，壓縮方式的解析，
+以及文字存儲後端與導出的透明壓縮
+"""
+
+import gzip
+import json
+
+import pytest
+
+from src.data.compression import (
+    codec_of, compressed_path, compression_options, open_input, open_output, resolve_codec,
+    zstd_available
+)
+from src.data.export_manager import ExportFormat, ExportManager
+from src.data.storage_backends import CSVStorage
+from src.data.unified_data_manager import MeasurementPoint
+
+
+START = 1_700_000_000_000_000_000
+
+CODECS = [
+    'gzip',
+    pytest.param('zstd', marks=pytest.mark.skipif(not zstd_available(), reason="需要 zstandard"))
+]
+
+
+def points(count):
+    return [MeasurementPoint(START + i * 1_000_000, 'A', float(i), 0.5) for i in range(count)]
+
+
+@pytest.mark.parametrize('codec', CODECS)
+def test_roundtrip_across_blocks(tmp_path, codec):
+    """跨越多個壓縮區塊的文字寫入可完整讀回，且確實被壓縮"""
+    path = compressed_path(tmp_path / 'data.csv', codec)
+    lines = [f"{i},電壓,{i * 0.001:.6f}\n" for i in range(5000)]
+    with open_output(path, codec, block_size=4096) as f:
+        f.writelines(lines)
+        
+    with open_input(path) as f:
+        assert [line.decode('utf-8') for line in f] == lines
+    assert path.stat().st_size < len(''.join(lines).encode('utf-8')) / 2
+    if codec == 'gzip':
+        with gzip.open(path, 'rt', encoding='utf-8', newline='') as f:
+            assert f.read() == ''.join(lines)
+
+
+@pytest.mark.parametrize('codec', CODECS)
+def test_checkpoint_is_readable_before_close(tmp_path, codec):
+    """flush() 加入同步點：寫入中 (或崩潰後) 的檔案可讀到最後一個檢查點"""
+    path = compressed_path(tmp_path / 'data.jsonl', codec)
+    stream = open_output(path, codec, block_size=1 << 20)
+    try:
+        stream.write('{"row": 1}\n{"row": 2}\n')
+        stream.flush()
+        stream.write('{"row": 3}\n')
+        
+        with open_input(path) as f:
+            assert [json.loads(line)['row'] for line in f] == [1, 2]
+    finally:
+        stream.close()
+    with open_input(path) as f:
+        assert [json.loads(line)['row'] for line in f] == [1, 2, 3]
+
+
+def test_codec_resolution_and_suffixes(tmp_path):
+    """配置值轉為壓縮方式；副檔名 (含 .partial) 決定讀取時的解壓縮"""
+    assert resolve_codec(False) is None and resolve_codec('none') is None
+    assert resolve_codec('gz') == 'gzip'
+    assert resolve_codec(True) == ('zstd' if zstd_available() else 'gzip')
+    with pytest.raises(ValueError):
+        resolve_codec('lz4')
+        
+    assert compressed_path(tmp_path / 'run.csv', None) == tmp_path / 'run.csv'
+    assert compressed_path(tmp_path / 'run.csv', 'gzip').name == 'run.csv.gz'
+    assert codec_of(tmp_path / 'run.csv.zst.partial') == 'zstd'
+    assert codec_of(tmp_path / 'run.csv') is None
+    assert compression_options('gzip')['compression'] == 'gzip'
+
+
+def test_compressed_storage_and_export(tmp_path):
+    """壓縮的CSV會話可直接以列式讀取；導出檔案名帶壓縮副檔名時依檔案名壓縮"""
+    storage = CSVStorage(base_path=str(tmp_path / 'data'))
+    storage._options.update(compression_options('gzip'))
+    storage.append_session('run', points(300))
+    path = storage.finalize_session('run')
+    
+    assert path.endswith('run.csv.gz')
+    assert storage.load_columns('run', ['voltage'])['voltage'].tolist() == [float(i) for i in range(300)]
+    
+    exporter = ExportManager(base_path=str(tmp_path / 'exports'))
+    exported = exporter.export_data(points(50), ExportFormat.JSON, 'run.json.gz')
+    assert exported.endswith('run.json.gz')
+    with gzip.open(exported, 'rt', encoding='utf-8') as f:
+        assert json.load(f)['export_info']['data_count'] == 50
\ No newline at end of file
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+測試無GUI連續測量在達到 max_measurements 後結束
+以模擬儀器執行 EXAMPLE_JOBS['continuous'] 範例任務 (縮短測量間隔)
+"""
+
+import copy
+
+from src.engine.cli import EXAMPLE_JOBS
+from src.engine.runner import JobRunner, MeasurementJob
+
+
+class SimulatedInstrument:
+    """回傳固定電阻讀數的模擬儀器"""
+    
+    name = 'simulated'
+    
+    def __init__(self):
+        self.connected = False
+        self.readings = 0
+        
+    def is_connected(self) -> bool:
+        return self.connected
+        
+    def connect(self, connection=None) -> bool:
+        self.connected = True
+        return True
+        
+    def disconnect(self):
+        self.connected = False
+        
+    def measure_all(self):
+        self.readings += 1
+        voltage, current = 1.0 + self.readings * 1e-3, 1e-3
+        return voltage, current, voltage / current, voltage * current
+
+
+def test_continuous_example_job_completes(tmp_path):
+    """範例任務在 max_measurements 個數據點後完成"""
+    config = copy.deepcopy(EXAMPLE_JOBS['continuous'])
+    config['measurement']['params']['interval_ms'] = 1
+    config['output'] = {'path': str(tmp_path), 'format': 'csv', 'session_name': 'continuous'}
+    job = MeasurementJob.from_dict(config)
+    max_measurements = job.params['max_measurements']
+    
+    sequence = []
+    runner = JobRunner(job, instrument=SimulatedInstrument(),
+                       progress_callback=lambda progress, data: sequence.append(data['sequence_number']))
+    summary = runner.run()
+    
+    assert summary['status'] == 'completed'
+    assert summary['points'] == max_measurements
+    assert sequence == list(range(1, max_measurements + 1))
+    assert runner.worker.strategy.get_progress() == 100
\ No newline at end of file
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+測試增強型數據記錄器的增量寫入
+待寫入的數據點只寫入一次，高水位隨數據推進，崩潰後以同名會話從高水位繼續編號
+"""
+
+import pytest
+
+pytest.importorskip('PyQt6')
+
+from src.data.measurement_store import get_measurement_store
+from src.enhanced_data_system import EnhancedDataLogger
+
+
+START = 1_700_000_000_000_000_000
+
+
+@pytest.fixture
+def make_logger(tmp_path):
+    loggers = []
+    
+    def make():
+        logger = EnhancedDataLogger(base_path=str(tmp_path), auto_save_interval=0)
+        loggers.append(logger)
+        return logger
+        
+    yield make
+    for logger in loggers:
+        logger.cleanup()
+    get_measurement_store(tmp_path / 'measurements.db').close()
+
+
+def log_points(logger, count, start=0):
+    for i in range(start, start + count):
+        logger.log_measurement(1.0 + i * 0.01, 0.5, timestamp=START + i * 1_000_000)
+
+
+def test_points_are_written_incrementally(make_logger):
+    """累積到閾值時只寫入新的數據點，結束會話時寫入剩餘部分"""
+    logger = make_logger()
+    logger.start_session('run')
+    log_points(logger, 250)
+    
+    assert logger.persisted_seq == 2 * EnhancedDataLogger.FLUSH_THRESHOLD
+    assert len(logger._pending) == 50
+    assert logger.save_buffer_to_db() == 50 and logger.save_buffer_to_db() == 0
+    
+    store = logger.store
+    logger.close_session()
+    assert store.get_session('run')['last_seq'] == 250
+    assert [row['seq'] for row in store.query('run')] == list(range(1, 251))
+
+
+def test_resumed_session_continues_after_high_water_mark(make_logger):
+    """崩潰後以同名會話重新開始時，從已寫入的高水位繼續編號"""
+    first = make_logger()
+    first.start_session('run')
+    log_points(first, 30)
+    first.save_buffer_to_db()
+    log_points(first, 5, start=30)  # 崩潰前尚未寫入
+    
+    second = make_logger()
+    second.start_session('run')
+    assert second.persisted_seq == 30
+    assert second.log_measurement(2.0, 0.5, timestamp=START + 10**9).seq == 31
+
+
+def test_failed_write_keeps_points_for_retry(make_logger, monkeypatch):
+    """寫入失敗時數據點保留在佇列中，高水位不前進，下次重試寫入"""
+    logger = make_logger()
+    logger.start_session('run')
+    log_points(logger, 10)
+    
+    def fail(*args, **kwargs):
+        raise OSError('database is locked')
+        
+    monkeypatch.setattr(logger.store, 'write', fail)
+    assert logger.save_buffer_to_db() == 0
+    assert len(logger._pending) == 10 and logger.persisted_seq == 0
+    
+    monkeypatch.undo()
+    assert logger.save_buffer_to_db() == 10
+    assert logger.store.get_session('run')['last_seq'] == 10
\ No newline at end of file
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+測試背景導出工作
+進度與完成信號、同時執行數量的上限、排隊中與執行中的取消 (移除 .partial 檔案)，
+以及失敗回報與工作執行緒的優先權
+"""
+
+import os
+import threading
+
+import pytest
+
+from src.data.columnar import chunk_points
+from src.data.export_jobs import ExportJobService, ExportJobState
+from src.data.export_manager import ExportFormat, ExportManager
+from src.data.unified_data_manager import MeasurementPoint
+
+
+START = 1_700_000_000_000_000_000
+
+
+def points(count):
+    return [MeasurementPoint(START + i * 1_000_000, 'A', float(i), 0.5) for i in range(count)]
+
+
+class Recorder:
+    """記錄服務信號，並可等待指定工作結束"""
+    
+    def __init__(self, service):
+        self.events = []
+        self._finished = threading.Condition()
+        service.job_started.connect(lambda job_id: self._record('started', job_id))
+        service.job_finished.connect(lambda job_id, path: self._record('finished', job_id, path))
+        service.job_failed.connect(lambda job_id, error: self._record('failed', job_id, error))
+        service.job_cancelled.connect(lambda job_id: self._record('cancelled', job_id))
+        
+    def _record(self, kind, job_id, *args):
+        with self._finished:
+            self.events.append((kind, job_id) + args)
+            self._finished.notify_all()
+            
+    def wait_done(self, job_id, timeout=5.0):
+        done = ('finished', 'failed', 'cancelled')
+        with self._finished:
+            return self._finished.wait_for(
+                lambda: any(event[0] in done and event[1] == job_id for event in self.events), timeout
+            )
+            
+    def kinds(self, job_id):
+        return [event[0] for event in self.events if event[1] == job_id]
+
+
+@pytest.fixture
+def service():
+    service = ExportJobService(max_concurrent=1, nice=5, yield_ms=0)
+    yield service
+    service.shutdown()
+
+
+def test_job_reports_progress_and_result(service, tmp_path):
+    """工作在低優先權執行緒中執行，完成後回報列數、百分比與檔案路徑"""
+    recorder = Recorder(service)
+    exporter = ExportManager(base_path=str(tmp_path))
+    priorities = []
+    
+    def task(job):
+        if os.name == 'posix':
+            priorities.append(os.getpriority(os.PRIO_PROCESS, threading.get_native_id()))
+        return exporter.export_columns(job.track(chunk_points(points(25), 10)), ExportFormat.CSV, 'run.csv')
+        
+    job = service.submit(task, 'run.csv', total_rows=25)
+    assert recorder.wait_done(job.job_id)
+    
+    assert job.state == ExportJobState.COMPLETED and job.result.endswith('run.csv')
+    assert recorder.kinds(job.job_id) == ['started', 'finished']
+    progress = job.progress()
+    assert progress['rows'] == 25 and progress['percent'] == 100.0
+    assert all(priority >= 5 for priority in priorities)
+
+
+def test_concurrency_limit_queues_and_cancels_before_start(service):
+    """超過同時執行上限的工作排隊；排隊中取消的工作不會開始"""
+    recorder = Recorder(service)
+    release = threading.Event()
+    running = threading.Event()
+    
+    def blocking(job):
+        running.set()
+        release.wait(5)
+        return 'first'
+        
+    first = service.submit(blocking, 'first')
+    second = service.submit(lambda job: 'second', 'second')
+    try:
+        assert running.wait(5)
+        stats = service.get_stats()
+        assert stats['running'] == 1 and stats['queued'] == 1
+        assert service.cancel(second.job_id)
+    finally:
+        release.set()
+        
+    assert recorder.wait_done(first.job_id) and recorder.wait_done(second.job_id)
+    assert second.state == ExportJobState.CANCELLED and second.result is None
+    assert recorder.kinds(second.job_id) == ['cancelled']
+    assert first.result == 'first' and not service.cancel(first.job_id)
+
+
+def test_running_export_cancels_between_chunks(service, tmp_path):
+    """執行中取消時在下一段數據前停止，並移除寫入中的檔案"""
+    recorder = Recorder(service)
+    exporter = ExportManager(base_path=str(tmp_path))
+    waiting = threading.Event()
+    proceed = threading.Event()
+    
+    def chunks():
+        data = list(chunk_points(points(30), 10))
+        yield data[0]
+        waiting.set()
+        proceed.wait(5)
+        yield from data[1:]
+        
+    job = service.submit(
+        lambda job: exporter.export_columns(job.track(chunks()), ExportFormat.CSV, 'run.csv'), 'run.csv'
+    )
+    assert waiting.wait(5)
+    job.cancel()
+    proceed.set()
+    
+    assert recorder.wait_done(job.job_id)
+    assert job.state == ExportJobState.CANCELLED and job.rows == 10
+    assert recorder.kinds(job.job_id) == ['started', 'cancelled']
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_failed_job_reports_error(service):
+    """工作函數拋出的錯誤以 job_failed 回報"""
+    recorder = Recorder(service)
+    
+    def failing(job):
+        raise ValueError('沒有數據可導出')
+        
+    job = service.submit(failing, 'empty')
+    assert recorder.wait_done(job.job_id)
+    assert job.state == ExportJobState.FAILED and job.error == '沒有數據可導出'
+    assert ('failed', job.job_id, '沒有數據可導出') in recorder.events
\ No newline at end of file
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+測試串流導出
+數據段逐段寫入 (表頭只寫一次)、JSON 陣列與導出資訊、失敗時移除 .partial 檔案，
+以及由存儲分段讀取已保存會話的導出
+"""
+
+import csv
+import json
+
+import pytest
+
+from src.data.columnar import SessionColumns, chunk_points
+from src.data.export_manager import ExportFormat, ExportManager
+from src.data.stream_writer import PARTIAL_SUFFIX
+from src.data.unified_data_manager import MeasurementPoint, UnifiedDataManager
+
+
+START = 1_700_000_000_000_000_000
+STEP = 1_000_000
+
+
+def points(count, instrument='A', start=0):
+    return [
+        MeasurementPoint(START + i * STEP, instrument, float(i), 0.5,
+                         metadata={'index': i} if i % 10 == 0 else None)
+        for i in range(start, start + count)
+    ]
+
+
+@pytest.fixture
+def exporter(tmp_path):
+    return ExportManager(base_path=str(tmp_path / 'exports'))
+
+
+def test_csv_streams_chunks_with_single_header(exporter):
+    """逐段寫入CSV，表頭只寫一次並加入本地時間欄位"""
+    path = exporter.export_columns(chunk_points(points(25), 10), ExportFormat.CSV, 'run.csv')
+    
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    assert rows[0][:3] == ['timestamp', 'datetime', 'instrument_id']
+    assert len(rows) == 26 and rows.count(rows[0]) == 1
+    assert [int(row[0]) for row in rows[1:]] == [START + i * STEP for i in range(25)]
+    assert json.loads(rows[11][-1]) == {'index': 10}
+
+
+def test_json_export_writes_info_after_data(exporter):
+    """JSON 陣列逐筆寫入，導出資訊記錄實際筆數"""
+    path = exporter.export_columns(chunk_points(points(15), 4), ExportFormat.JSON, 'run.json')
+    
+    with open(path, encoding='utf-8') as f:
+        document = json.load(f)
+    assert document['export_info']['data_count'] == 15
+    assert [record['voltage'] for record in document['data']] == [float(i) for i in range(15)]
+    assert document['data'][10]['metadata'] == {'index': 10}
+    assert document['data'][0]['temperature'] is None
+
+
+def test_parquet_export_writes_one_row_group_per_chunk(exporter):
+    """Parquet 每個數據段一個列組"""
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = exporter.export_columns(chunk_points(points(25), 10), ExportFormat.PARQUET, 'run.parquet')
+    
+    parquet = pq.ParquetFile(path)
+    assert parquet.num_row_groups == 3 and parquet.metadata.num_rows == 25
+    assert parquet.schema_arrow.names[:2] == ['timestamp', 'datetime']
+
+
+def test_failed_export_removes_partial_file(exporter, tmp_path):
+    """寫入途中出錯時移除 .partial 檔案，不留下不完整的導出"""
+    def broken():
+        yield SessionColumns.from_points(points(5))
+        raise OSError('disk full')
+        
+    with pytest.raises(OSError):
+        exporter.export_columns(broken(), ExportFormat.CSV, 'broken.csv')
+    with pytest.raises(ValueError):
+        exporter.export_columns(iter([]), ExportFormat.CSV, 'empty.csv')
+    assert list((tmp_path / 'exports').iterdir()) == []
+    assert not (tmp_path / 'exports' / ('broken.csv' + PARTIAL_SUFFIX)).exists()
+
+
+def test_saved_session_is_exported_from_storage(tmp_path):
+    """已保存的會話由存儲後端分段讀取導出，並套用儀器與時間過濾"""
+    manager = UnifiedDataManager(base_path=str(tmp_path / 'data'), default_format='csv', auto_save=False)
+    manager.export_manager = ExportManager(base_path=str(tmp_path / 'exports'))
+    manager.export_manager.chunk_rows = 7
+    try:
+        manager.start_session('saved')
+        for a, b in zip(points(30, 'A'), points(30, 'B')):
+            manager.add_measurement(a)
+            manager.add_measurement(b)
+        manager.end_session()
+        
+        path = manager.export_data(ExportFormat.CSV, instrument_id='B', session_name='saved',
+                                   time_range=(START + 5 * STEP, START + 24 * STEP),
+                                   filename='saved.csv')
+    finally:
+        manager.shutdown()
+        
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 20 and {row['instrument_id'] for row in rows} == {'B'}
+    assert [float(row['voltage']) for row in rows] == [float(i) for i in range(5, 25)]
\ No newline at end of file
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+測試連接健康監控
+指數退避延遲、連續心跳失敗判定斷線、退避重連與恢復後繼續測量
+"""
+
+import threading
+
+import pytest
+
+from src.engine.health import HeadlessHealthMonitor, LinkState, compute_backoff_delay
+from src.engine.lifecycle import WorkerState
+
+
+class FlakyInstrument:
+    """心跳與重連結果可控制的模擬儀器"""
+    
+    name = 'flaky'
+    
+    def __init__(self):
+        self.io_lock = threading.RLock()
+        self.connected = True
+        self.alive = True
+        self.connect_results = []
+        self.connect_calls = 0
+        
+    def is_connected(self):
+        return self.connected
+        
+    def idle_seconds(self):
+        return 100.0
+        
+    def heartbeat(self, timeout):
+        return self.alive
+        
+    def disconnect(self):
+        self.connected = False
+        
+    def connect(self, params):
+        self.connect_calls += 1
+        self.connected = self.connect_results.pop(0) if self.connect_results else True
+        return self.connected
+
+
+class PausableWorker:
+    """只記錄暫停/恢復的 Worker"""
+    
+    def __init__(self):
+        self.state = WorkerState.RUNNING
+        
+    def is_running(self):
+        return True
+        
+    def pause_work(self):
+        self.state = WorkerState.PAUSED
+        
+    def resume_work(self):
+        self.state = WorkerState.RUNNING
+
+
+def test_backoff_doubles_up_to_maximum_with_bounded_jitter():
+    """延遲逐次加倍直到上限，擾動不超過比例"""
+    assert [compute_backoff_delay(n, 1.0, 10.0) for n in range(1, 7)] == [1, 2, 4, 8, 10, 10]
+    delays = [compute_backoff_delay(3, 1.0, 10.0, jitter=0.2) for _ in range(200)]
+    assert all(3.2 <= delay <= 4.8 for delay in delays)
+    assert len(set(delays)) > 1
+
+
+@pytest.fixture
+def monitor():
+    monitor = HeadlessHealthMonitor()
+    monitor.heartbeat_interval = 0
+    monitor.max_missed_heartbeats = 2
+    monitor.reconnect_initial_delay = 0.5
+    monitor.reconnect_max_delay = 4.0
+    monitor.reconnect_jitter = 0.0
+    monitor.max_recovery_attempts = 0
+    return monitor
+
+
+def test_missed_heartbeats_pause_workers_and_backoff_recovers(monitor):
+    """連續失敗後判定斷線並暫停 Worker；重連失敗時延遲加倍，成功後恢復 Worker"""
+    instrument, worker = FlakyInstrument(), PausableWorker()
+    monitor.add_instrument(instrument, {'port': 'X'}, [worker])
+    link = monitor.links[id(instrument)]
+    events = []
+    monitor.connection_lost.connect(lambda name, detect: events.append('lost'))
+    monitor.recovery_attempted.connect(lambda name, attempt, delay: events.append(('retry', attempt, delay)))
+    monitor.connection_recovered.connect(lambda name, recover: events.append('recovered'))
+    
+    instrument.alive = False
+    monitor._check_link(link)
+    assert link.state == LinkState.HEALTHY and worker.state == WorkerState.RUNNING
+    monitor._check_link(link)
+    assert link.state == LinkState.LOST and worker.state == WorkerState.PAUSED
+    
+    instrument.connect_results = [False, False, True]
+    for _ in range(3):
+        link.next_attempt_at = 0.0  # 不等待退避時間
+        monitor._check_link(link)
+        
+    assert events == ['lost', ('retry', 1, 0.5), ('retry', 2, 1.0), 'recovered']
+    assert link.state == LinkState.HEALTHY and worker.state == WorkerState.RUNNING
+    assert monitor.get_health_metrics()['flaky']['outages'] == 1
+
+
+def test_recovery_is_abandoned_after_max_attempts(monitor):
+    """達到最大嘗試次數後放棄自動恢復"""
+    monitor.max_recovery_attempts = 2
+    instrument = FlakyInstrument()
+    monitor.add_instrument(instrument, {})
+    link = monitor.links[id(instrument)]
+    abandoned = []
+    monitor.recovery_abandoned.connect(abandoned.append)
+    
+    instrument.connected = False
+    instrument.connect_results = [False] * 5
+    monitor._check_link(link)
+    for _ in range(3):
+        link.next_attempt_at = 0.0
+        monitor._check_link(link)
+        
+    assert link.state == LinkState.FAILED
+    assert instrument.connect_calls == 2
+    assert abandoned == ['flaky']
\ No newline at end of file
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+測試數據接收管線
+SPSC 佇列的環繞與滿載、背壓與丟棄計數、停止後的 flush
+"""
+
+import threading
+
+from src.data.ingest import IngestStage, SPSCQueue
+
+
+def test_spsc_queue_wraps_and_reports_full():
+    """環繞後仍按放入順序取出，已滿時拒絕放入"""
+    queue = SPSCQueue(4)
+    for i in range(3):
+        assert queue.push(i)
+    assert queue.pop_batch(2) == [0, 1]
+    for i in range(3, 6):
+        assert queue.push(i)
+    assert not queue.push(6)
+    assert queue.pop_batch(10) == [2, 3, 4, 5]
+    assert len(queue) == 0 and queue.enqueued == 6 and queue.high_watermark == 4
+
+
+def test_full_queue_drops_after_timeout():
+    """消費者阻塞時，超過等待時間的數據被丟棄並計數"""
+    release = threading.Event()
+    stage = IngestStage('TestDrop', lambda batch: release.wait(5), queue_size=2,
+                        batch_size=1, put_timeout_s=0.01)
+    try:
+        results = [stage.put('A', i) for i in range(6)]
+        assert not all(results)
+        assert stage.stats()['dropped'] == results.count(False)
+    finally:
+        release.set()
+        stage.stop(5)
+
+
+def test_backpressure_never_drops():
+    """put_timeout_s 為 None 時生產者等待到有空間，所有數據依序處理"""
+    received = []
+    stage = IngestStage('TestBackpressure', received.extend, queue_size=8,
+                        batch_size=4, put_timeout_s=None)
+    try:
+        for i in range(1000):
+            assert stage.put('A', i)
+        assert stage.flush(5)
+    finally:
+        stage.stop(5)
+    assert received == list(range(1000))
+    assert stage.stats()['dropped'] == 0 and stage.stats()['full_waits'] > 0
+
+
+def test_flush_after_stop_drains_inline():
+    """階段執行緒已停止時 flush 不等待，直接處理剩餘數據"""
+    received = []
+    stage = IngestStage('TestStopped', received.extend)
+    stage.put('A', 1)
+    stage.stop(5)
+    assert not stage._thread.is_alive()
+    
+    # 停止後遺留在佇列中的數據 (如 stop 逾時)
+    next(iter(stage._queues.values())).push(2)
+    flusher = threading.Thread(target=stage.flush, daemon=True)
+    flusher.start()
+    flusher.join(2)
+    assert not flusher.is_alive()
+    assert received == [1, 2]
\ No newline at end of file
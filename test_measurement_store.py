@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+測試 SQLite 寫入執行緒與測量數據存儲
+批量交易、時間閾值、背壓、失敗批次，關閉後重新開啟時數據完整保存，
+以及與數據同一交易推進的會話高水位 (last_seq)
+"""
+
+import threading
+import time
+
+from src.data.measurement_store import MeasurementStore, SQLiteWriter
+
+
+START = 1_700_000_000_000_000_000
+
+
+def sample_rows(store, count, session='run', start=0):
+    session_key = store.session_key(session)
+    instrument_key = store.instrument_key('A')
+    return [
+        store.row(session_key, instrument_key, START + i * 1_000_000, voltage=float(i), current=0.5,
+                  seq=i + 1)
+        for i in range(start, start + count)
+    ]
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_rows_are_written_in_batched_transactions(tmp_path):
+    """背景寫入按 batch_size 分批提交，flush() 等待佇列清空"""
+    store = MeasurementStore(tmp_path / 'measurements.db', batch_size=50, flush_interval_s=10)
+    try:
+        store.submit(sample_rows(store, 120))
+        assert store.flush(timeout=5)
+        
+        stats = store.writer.stats()
+        assert stats['rows_written'] == 120 and stats['queue_depth'] == 0
+        assert stats['flushes'] == 3 and stats['avg_batch_size'] == 40
+        assert len(store.query('run')) == 120
+    finally:
+        store.close()
+
+
+def test_pending_rows_are_written_after_flush_interval(tmp_path):
+    """未滿一批的數據在最長等待時間後自動寫入"""
+    store = MeasurementStore(tmp_path / 'measurements.db', batch_size=1000, flush_interval_s=0.05)
+    try:
+        store.submit(sample_rows(store, 5))
+        assert wait_until(lambda: store.writer.rows_written == 5)
+    finally:
+        store.close()
+
+
+def test_close_persists_queued_rows_for_reopen(tmp_path):
+    """關閉時寫完佇列中的數據，重新開啟後完整讀回"""
+    path = tmp_path / 'measurements.db'
+    store = MeasurementStore(path, batch_size=1000, flush_interval_s=10)
+    store.submit(sample_rows(store, 300))
+    store.close()
+    
+    reopened = MeasurementStore(path)
+    try:
+        rows = reopened.query('run', 'A')
+        assert len(rows) == 300
+        assert [row['seq'] for row in rows[:3]] == [1, 2, 3]
+        assert rows[-1]['timestamp'] == START + 299 * 1_000_000
+    finally:
+        reopened.close()
+
+
+def test_full_queue_applies_backpressure(tmp_path):
+    """佇列達到上限時提交端等待，寫入恢復後全部完成"""
+    release = threading.Event()
+    written = []
+    
+    def slow_write(conn, batch):
+        release.wait(5)
+        written.extend(batch)
+        
+    writer = SQLiteWriter(tmp_path / 'slow.db', slow_write, batch_size=2,
+                          flush_interval_s=0.01, max_pending=4)
+                          
+    def produce():
+        for i in range(0, 20, 2):
+            writer.submit([i, i + 1])
+            
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        assert wait_until(lambda: writer.backpressure_waits > 0)
+        assert producer.is_alive() and writer.stats()['queue_depth'] <= 4
+    finally:
+        release.set()
+    producer.join(5)
+    
+    assert writer.flush(timeout=5)
+    writer.close()
+    assert written == list(range(20))
+    assert writer.high_watermark <= 4
+
+
+def test_failed_batch_is_counted_and_does_not_block_flush(tmp_path):
+    """寫入失敗的批次記錄為錯誤，flush() 不會因此卡住"""
+    def failing_write(conn, batch):
+        raise RuntimeError('disk full')
+        
+    writer = SQLiteWriter(tmp_path / 'failing.db', failing_write, flush_interval_s=0.01)
+    writer.submit([1, 2, 3])
+    
+    assert writer.flush(timeout=5)
+    stats = writer.stats()
+    assert stats['errors'] == 1 and stats['rows_written'] == 0
+    assert stats['last_error']
+    writer.close()
+
+
+def test_write_advances_high_water_mark_with_rows(tmp_path):
+    """同步寫入在同一交易中推進高水位；同名會話重新開啟時保留高水位"""
+    store = MeasurementStore(tmp_path / 'measurements.db')
+    try:
+        store.open_session('run', start_ns=START)
+        store.write(sample_rows(store, 40), session='run', last_seq=40)
+        
+        record = store.get_session('run')
+        assert record['last_seq'] == 40 and record['total_points'] == 40
+        
+        resumed = store.open_session('run', start_ns=START + 10**12, description='恢復')
+        assert resumed['last_seq'] == 40 and resumed['start_ns'] == START
+        assert resumed['description'] == '恢復'
+    finally:
+        store.close()
+
+
+def test_replayed_rows_are_not_counted_twice(tmp_path):
+    """重放已寫入的序號時樣本與彙總都不重複計入"""
+    store = MeasurementStore(tmp_path / 'measurements.db')
+    try:
+        store.write(sample_rows(store, 10), session='run', last_seq=10)
+        store.write(sample_rows(store, 10, start=5), session='run', last_seq=15)
+        
+        rows = store.query('run', 'A')
+        assert [row['seq'] for row in rows] == list(range(1, 16))
+        assert store.get_session('run')['last_seq'] == 15
+        assert store.summary('run')['A']['voltage']['count'] == 15
+    finally:
+        store.close()
\ No newline at end of file
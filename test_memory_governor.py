@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+測試內存預算管理
+各回收策略 (drop_oldest / decimate / spill) 的行為，以及超出預算時的回收壓力
+"""
+
+import pytest
+
+from src.data.buffer_manager import BufferManager
+from src.data.memory_governor import MB, BudgetedList, MemoryGovernor
+
+
+@pytest.fixture
+def governor(tmp_path):
+    return MemoryGovernor(total_limit_mb=1000, group_limits_mb={}, spill_path=str(tmp_path / 'spill'))
+
+
+def fill(items, count):
+    for i in range(count):
+        items.append((i, float(i)))
+    return items
+
+
+def test_drop_oldest_trims_to_low_watermark(governor):
+    """超過 max_items 時一次回收到低水位，保留最新的數據"""
+    items = fill(BudgetedList('trace', policy='drop_oldest', max_items=100, min_items=10,
+                              governor=governor), 101)
+                              
+    assert len(items) == 80
+    assert items[0][0] == 21 and items[-1][0] == 100
+    assert items.nbytes == len(items) * items.item_size
+    assert governor.total_bytes == items.nbytes
+
+
+def test_decimate_keeps_time_span(governor):
+    """抽稀只移除較舊一半中的隔點，最舊與最新的點都保留"""
+    items = fill(BudgetedList('trace', policy='decimate', max_items=100, min_items=10,
+                              governor=governor), 101)
+                              
+    assert len(items) == 80
+    assert items[0][0] == 0 and items[-1][0] == 100
+    assert [item[0] for item in items[:4]] == [0, 2, 4, 6]
+    
+    with pytest.raises(ValueError):
+        BudgetedList('trace', policy='compress', governor=governor)
+
+
+def test_spill_writes_oldest_items_to_disk(governor):
+    """spill 將最舊的數據寫出到磁碟，迭代時按原順序讀回"""
+    items = fill(BudgetedList('trace', policy='spill', max_items=100, min_items=10,
+                              governor=governor), 250)
+                              
+    assert len(items) < 250 and items.spilled_count + len(items) == 250
+    assert items.total_count == 250 and items.spill_pending == 0
+    assert items.first() == (0, 0.0)
+    assert [item[0] for item in items.iter_all()] == list(range(250))
+    
+    items.clear()
+    assert items.total_count == 0 and items.spill.path is None
+
+
+def test_deferred_spill_waits_for_flush(governor):
+    """defer_spill 時移出的數據先暫存，flush_spill() 後才寫入檔案"""
+    items = fill(BudgetedList('trace', policy='spill', max_items=100, min_items=10,
+                              governor=governor, defer_spill=True), 101)
+                              
+    assert items.spill_pending == 21 and items.spill.count == 0
+    assert items.to_list()[:2] == [(0, 0.0), (1, 1.0)]
+    
+    items.flush_spill()
+    assert items.spill_pending == 0 and items.spill.count == 21
+    assert [item[0] for item in items.iter_all()] == list(range(101))
+
+
+def test_budget_pressure_reclaims_owner_and_thread_safe_consumers():
+    """超出總預算時列表在自身變動時回收；緩存管理器立即將最大的緩存減半"""
+    governor = MemoryGovernor(total_limit_mb=0.01, group_limits_mb={})
+    items = fill(BudgetedList('trace', governor=governor, min_items=10), 500)
+    
+    assert len(items) < 500 and items[-1][0] == 499
+    assert governor.total_bytes <= governor.total_limit
+    assert governor.reclaim_count >= 1
+    
+    governor = MemoryGovernor(total_limit_mb=1000, group_limits_mb={'data': 0.06})
+    manager = BufferManager(governor=governor)
+    manager.create_buffer('A', 1000)
+    manager.create_buffer('B', 400)
+    
+    assert manager.buffers['A'].max_size < 1000
+    assert manager.buffers['B'].max_size == 400
+    assert manager.nbytes <= 0.06 * MB * governor.low_watermark
+    assert governor.usage()['groups']['data']['consumers']['ring_buffers'] == manager.nbytes
\ No newline at end of file
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+測試舊版數據庫轉換
+ISO 時間戳轉換、重複寫入的列去除、轉換不刪除來源
+"""
+
+import sqlite3
+
+import pytest
+
+from src.data.measurement_store import MeasurementStore, import_legacy, migrate_database
+from src.engine.clock import as_epoch_ns
+
+LEGACY_SCHEMA = '''
+    CREATE TABLE measurements (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT NOT NULL,
+        instrument_id TEXT NOT NULL,
+        session_name TEXT,
+        voltage REAL NOT NULL,
+        current REAL NOT NULL,
+        resistance REAL,
+        power REAL,
+        temperature REAL,
+        metadata TEXT,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+
+def legacy_database(path, rows):
+    with sqlite3.connect(str(path)) as conn:
+        conn.execute(LEGACY_SCHEMA)
+        conn.executemany('''
+            INSERT INTO measurements (timestamp, instrument_id, session_name, voltage, current,
+                                      resistance, power, temperature, metadata)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+    return path
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = MeasurementStore(tmp_path / 'measurements.db')
+    yield store
+    store.close()
+
+
+def test_double_written_rows_are_imported_once(tmp_path, store):
+    """(會話、儀器、時間戳、數值) 相同的列只保留一列，同時間不同數值的列保留"""
+    stamp = '2024-05-01T12:00:00.250000'
+    source = legacy_database(tmp_path / 'legacy.db', [
+        (stamp, 'A', 's1', 1.0, 0.1, 10.0, 0.1, None, '{"first": true}'),
+        (stamp, 'A', 's1', 1.0, 0.1, 10.0, 0.1, None, '{"first": false}'),
+        (stamp, 'A', 's1', 2.0, 0.1, 20.0, 0.2, None, None),
+        (stamp, 'B', 's1', 1.0, 0.1, 10.0, 0.1, None, None),
+        ('2024-05-01T12:00:01', 'A', 's1', 1.0, 0.1, 10.0, 0.1, None, None),
+    ])
+    with sqlite3.connect(str(source)) as conn:
+        assert import_legacy(store, conn) == 4
+        
+    rows = store.query('s1')
+    assert len(rows) == 4
+    first = [row for row in rows if row['instrument_id'] == 'A' and row['voltage'] == 1.0]
+    assert [row['timestamp'] for row in first] == [as_epoch_ns(stamp), as_epoch_ns('2024-05-01T12:00:01')]
+    assert first[0]['metadata'] == {'first': True}
+    
+    # 重複執行不會再增加數據
+    with sqlite3.connect(str(source)) as conn:
+        import_legacy(store, conn)
+    assert len(store.query('s1')) == 4
+
+
+def test_migrate_database_keeps_renamed_source(tmp_path):
+    """轉換到另一個檔案後，來源改名保留"""
+    source = legacy_database(tmp_path / 'measurement_data.db', [
+        ('2024-05-01T12:00:00', 'A', 's1', 1.0, 0.1, 10.0, 0.1, None, None),
+    ])
+    result = migrate_database(source, tmp_path / 'new' / 'measurements.db')
+    
+    assert result['rows'] == 1
+    assert not source.exists()
+    assert result['source'].endswith('measurement_data.db.migrated')
\ No newline at end of file
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+測試 Parquet 存儲後端
+列組寫入與檔案尾、型別化結構、欄位投影、依時間戳統計略過列組，以及亂序會話的排序重寫
+"""
+
+import pytest
+
+pq = pytest.importorskip('pyarrow.parquet')
+
+from src.data.storage_backends import ParquetStorage
+from src.data.stream_writer import PARTIAL_SUFFIX, ParquetStreamWriter
+from src.data.unified_data_manager import MeasurementPoint
+
+
+START = 1_700_000_000_000_000_000
+STEP = 1_000_000
+
+
+def points(count, instrument='A', start=0, metadata_every=None):
+    return [
+        MeasurementPoint(
+            START + i * STEP, instrument, float(i), 0.5,
+            metadata={'index': i} if metadata_every and i % metadata_every == 0 else None
+        )
+        for i in range(start, start + count)
+    ]
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = ParquetStorage(base_path=str(tmp_path))
+    storage._parquet_options.update(row_group_rows=10, fsync=False)
+    return storage
+
+
+def test_writer_emits_row_groups_and_footer_on_close(tmp_path):
+    """滿一個列組即寫入；檔案尾寫入前保持 .partial，完成後為型別化結構"""
+    writer = ParquetStreamWriter(tmp_path / 'run.parquet', row_group_rows=10, fsync=False)
+    writer.write_points(points(25))
+    
+    assert writer.row_groups == 2 and writer.records == 20
+    assert (tmp_path / ('run.parquet' + PARTIAL_SUFFIX)).exists()
+    assert not (tmp_path / 'run.parquet').exists()
+    
+    parts = writer.close()
+    assert parts == [tmp_path / 'run.parquet'] and writer.row_groups == 3
+    
+    parquet = pq.ParquetFile(parts[0])
+    assert parquet.num_row_groups == 3 and parquet.metadata.num_rows == 25
+    schema = parquet.schema_arrow
+    assert str(schema.field('timestamp').type) == 'int64'
+    assert str(schema.field('instrument_id').type).startswith('dictionary')
+    stats = parquet.metadata.row_group(1).column(0).statistics
+    assert (stats.min, stats.max) == (START + 10 * STEP, START + 19 * STEP)
+
+
+def test_session_roundtrip_with_projection_and_time_range(storage):
+    """會話讀回時只讀取需要的欄位，時間範圍外的列組不被讀取"""
+    storage.append_session('run', points(50, metadata_every=20))
+    storage.finalize_session('run')
+    
+    table = storage.read_table('run', columns=['timestamp', 'voltage'],
+                               start_ns=START + 12 * STEP, end_ns=START + 17 * STEP)
+    assert table.column_names == ['timestamp', 'voltage']
+    assert table.column('voltage').to_pylist() == [12.0, 13.0, 14.0, 15.0, 16.0, 17.0]
+    
+    loaded = storage.load_session('run')
+    assert len(loaded) == 50 and loaded[20]['metadata'] == {'index': 20}
+    assert loaded[1]['metadata'] is None
+    assert storage.read_table('missing', columns=['voltage']).num_rows == 0
+
+
+def test_iter_columns_skips_row_groups_outside_range(storage, monkeypatch):
+    """依列組的時間戳統計略過範圍外的列組"""
+    storage.append_session('run', points(50))
+    storage.finalize_session('run')
+    
+    read = []
+    original = pq.ParquetFile.read_row_group
+    
+    def counting(self, index, *args, **kwargs):
+        read.append(index)
+        return original(self, index, *args, **kwargs)
+        
+    monkeypatch.setattr(pq.ParquetFile, 'read_row_group', counting)
+    data = storage.load_columns('run', ['voltage'], start_ns=START + 22 * STEP, end_ns=START + 31 * STEP)
+    
+    assert data['voltage'].tolist() == [float(i) for i in range(22, 32)]
+    assert data.names == ['voltage']
+    assert read == [2, 3]
+
+
+def test_out_of_order_session_is_sorted_on_finalize(storage):
+    """多台儀器交錯且亂序寫入的會話，完成後按時間順序讀回"""
+    storage.append_session('run', points(10, 'A', start=10))
+    storage.append_session('run', points(10, 'B', start=0))
+    storage.append_session('run', points(5, 'A', start=20))
+    storage.finalize_session('run')
+    
+    data = storage.load_columns('run', ['timestamp', 'instrument_id'])
+    timestamps = data['timestamp'].tolist()
+    assert timestamps == sorted(timestamps) and len(timestamps) == 25
+    assert data['instrument_id'].tolist()[:10] == ['B'] * 10
\ No newline at end of file
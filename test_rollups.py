@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+測試多解析度彙總的範圍摘要
+範圍兩端不完整的 1 秒桶讀取原始數據，摘要應與直接統計原始數據相同
+"""
+
+import numpy as np
+import pytest
+
+from src.data.rollups import RESOLUTIONS, covering_ranges, edge_ranges
+from src.data.unified_data_manager import MeasurementPoint, UnifiedDataManager
+
+SECOND = 1_000_000_000
+START = 1_700_000_000 * SECOND
+
+
+def hours_at_1hz(hours=3):
+    """從整秒偏移 0.25 秒開始、每秒一個樣本的數據"""
+    ts = START + SECOND // 4 + np.arange(hours * 3600, dtype=np.int64) * SECOND
+    voltage = 5.0 + np.sin(np.arange(len(ts)) / 50.0) * (1 + np.arange(len(ts)) / len(ts))
+    return ts, voltage
+
+
+@pytest.mark.parametrize('fmt', ['sqlite', 'csv'])
+def test_range_summary_matches_raw_data(tmp_path, fmt):
+    """3 小時中 1 小時的摘要不包含範圍外的樣本"""
+    ts, voltage = hours_at_1hz()
+    manager = UnifiedDataManager(base_path=str(tmp_path), default_format=fmt, auto_save=False)
+    try:
+        manager.start_session('rollup')
+        for t, v in zip(ts.tolist(), voltage.tolist()):
+            manager.add_measurement(MeasurementPoint(t, 'A', v, 0.1))
+        manager.end_session()
+        
+        low, high = START + 3600 * SECOND + SECOND // 2, START + 7200 * SECOND + SECOND // 2
+        summary = manager.get_summary('rollup', 'A', ['voltage'], (low, high))['A']
+    finally:
+        manager.shutdown()
+        
+    inside = (ts >= low) & (ts <= high)
+    assert summary['rows'] == 3600
+    assert summary['voltage']['count'] == 3600
+    assert summary['voltage']['mean'] == pytest.approx(voltage[inside].mean(), rel=1e-12)
+    assert summary['voltage']['min'] == pytest.approx(voltage[inside].min())
+    assert summary['voltage']['max'] == pytest.approx(voltage[inside].max())
+    assert summary['voltage']['last'] == pytest.approx(voltage[inside][-1])
+    assert (summary['first_ts'], summary['last_ts']) == (ts[inside][0], ts[inside][-1])
+
+
+def test_ranges_cover_interval_exactly():
+    """彙總桶與兩端的原始數據範圍不重疊、不遺漏"""
+    finest = RESOLUTIONS['1s']
+    start, end = START + 3 * SECOND // 2, START + 7300 * SECOND + SECOND // 3
+    covered = [(low, high + width - 1) for width, low, high in covering_ranges(start, end)]
+    pieces = sorted(covered + edge_ranges(start, end))
+    
+    assert pieces[0][0] == start and pieces[-1][1] == end
+    assert all(a[1] + 1 == b[0] for a, b in zip(pieces, pieces[1:]))
+    assert edge_ranges(None, end) == [(end - end % finest, end)]
+    assert covering_ranges(start, start + SECOND // 2) == []
+    assert edge_ranges(start, start + SECOND // 2) == [(start, start + SECOND // 2)]
\ No newline at end of file
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+測試會話日誌
+檢查點之後崩潰的會話在下次啟動時於背景恢復，重播按段進行
+"""
+
+from src.data.session_journal import SessionJournal
+from src.data.unified_data_manager import MeasurementPoint, UnifiedDataManager
+
+START = 1_700_000_000_000_000_000
+
+
+def points(count, instrument='A'):
+    return [MeasurementPoint(START + i * 1_000_000, instrument, float(i), 0.5) for i in range(count)]
+
+
+def test_replay_in_write_order_is_chunked(tmp_path):
+    """ordered=False 時按寫入順序分段重播，各段不超過 chunk_size"""
+    journal = SessionJournal(tmp_path, fsync=False)
+    journal.begin('s1')
+    journal.append('s1', points(50, 'A') + points(50, 'B'))
+    journal.checkpoint()
+    
+    chunks = list(journal.replay('s1', chunk_size=16, ordered=False))
+    assert [len(chunk) for chunk in chunks] == [16] * 6 + [4]
+    assert list(chunks[0]['instrument_id'][:1]) == ['A'] and list(chunks[-1]['instrument_id']) == ['B'] * 4
+    
+    ordered = [ts for chunk in journal.replay('s1', chunk_size=16) for ts in chunk['timestamp']]
+    assert ordered == sorted(ordered) and len(ordered) == 100
+    journal.commit('s1')
+
+
+def test_crashed_session_is_recovered_in_background(tmp_path):
+    """未結束的會話 (只有日誌) 由下一個管理器在背景寫入 SQLite 存儲"""
+    crashed = UnifiedDataManager(base_path=str(tmp_path), default_format='sqlite', auto_save=True)
+    crashed.auto_save_timer.stop()
+    crashed.start_session('crashed')
+    for point in points(300):
+        crashed.add_measurement(point)
+    crashed._ingest.flush()
+    crashed._persist.flush()
+    crashed.journal.checkpoint()
+    # 模擬崩潰：不結束會話，只停止背景執行緒
+    crashed._ingest.stop()
+    crashed._persist.stop()
+    
+    manager = UnifiedDataManager(base_path=str(tmp_path), default_format='sqlite', auto_save=True)
+    try:
+        assert manager.wait_for_recovery(30)
+        assert manager.journal.pending() == []
+        data = manager.load_session_columns('crashed', ['timestamp', 'voltage'])
+        assert len(data) == 300
+        assert data['voltage'].tolist() == [float(i) for i in range(300)]
+        assert manager.recover_sessions() == []
+    finally:
+        manager.shutdown()
\ No newline at end of file
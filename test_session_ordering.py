@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+測試增量寫入的會話檔案按時間排序
+兩台儀器的數據按持久化順序分批追加 (交錯)，完成會話後讀取應為時間順序
+"""
+
+import numpy as np
+import pytest
+
+from src.data.storage_backends import CSVStorage, JSONStorage
+from src.data.unified_data_manager import MeasurementPoint
+
+
+def interleaved_batches(count=300, batch=100):
+    """兩台儀器各自按時間產生數據，每批先寫入A再寫入B"""
+    start = 1_700_000_000_000_000_000
+    points_a = [MeasurementPoint(start + i * 1000, 'A', 1.0 + i, 0.5) for i in range(count)]
+    points_b = [MeasurementPoint(start + i * 1000 + 500, 'B', 2.0 + i, 0.25,
+                                 metadata={'index': i}) for i in range(count)]
+    for offset in range(0, count, batch):
+        yield points_a[offset:offset + batch]
+        yield points_b[offset:offset + batch]
+
+
+@pytest.mark.parametrize('storage_class', [CSVStorage, JSONStorage])
+def test_interleaved_instruments_are_time_ordered(tmp_path, storage_class):
+    """兩台儀器交錯追加，完成會話後按時間排序"""
+    storage = storage_class(base_path=str(tmp_path))
+    for points in interleaved_batches():
+        storage.append_session('interleaved', points)
+    storage.finalize_session('interleaved')
+    
+    data = storage.load_columns('interleaved')
+    timestamps = np.asarray(data['timestamp'])
+    assert len(timestamps) == 600
+    assert np.all(np.diff(timestamps) >= 0)
+    assert list(data['instrument_id'][:4]) == ['A', 'B', 'A', 'B']
+    assert data['metadata'][1] == {'index': 0}
+    assert not list(tmp_path.glob('.sorting_*'))
+    
+    records = storage.load_session('interleaved')
+    assert [record['timestamp'] for record in records] == timestamps.tolist()
+
+
+@pytest.mark.parametrize('storage_class', [CSVStorage, JSONStorage])
+def test_finalize_merges_without_loading_session(tmp_path, storage_class, monkeypatch):
+    """完成會話時逐段合併，不一次載入整個會話"""
+    storage = storage_class(base_path=str(tmp_path))
+    monkeypatch.setattr(storage, 'MERGE_CHUNK_ROWS', 64)
+    monkeypatch.setattr(storage, 'load_columns', None)  # 呼叫即失敗
+    for points in interleaved_batches(count=1000, batch=50):
+        storage.append_session('merged', points)
+    storage.finalize_session('merged')
+    
+    timestamps = [record['timestamp'] for record in storage.load_session('merged')]
+    assert len(timestamps) == 2000
+    assert timestamps == sorted(timestamps)
+
+
+def test_instrument_going_backwards_starts_new_run(tmp_path):
+    """同一儀器內時間戳倒退時另起有序段，合併後仍為時間順序且不遺失數據"""
+    storage = CSVStorage(base_path=str(tmp_path))
+    start = 1_700_000_000_000_000_000
+    first = [MeasurementPoint(start + i * 10, 'A', float(i), 0.0) for i in range(100, 200)]
+    second = [MeasurementPoint(start + i * 10, 'A', float(i), 0.0) for i in range(100)]
+    storage.append_session('backwards', first)
+    storage.append_session('backwards', second)
+    storage.finalize_session('backwards')
+    
+    data = storage.load_columns('backwards')
+    assert data['voltage'].tolist() == [float(i) for i in range(200)]
\ No newline at end of file
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+測試串流檔案寫入
+輪替大小以編碼後的位元組計算，舊版 (ISO 時間戳) CSV 會話仍可讀取
+"""
+
+import numpy as np
+
+from src.data.storage_backends import CSVStorage
+from src.data.stream_writer import RotatingFileWriter
+from src.engine.clock import as_epoch_ns
+
+
+def test_rotation_counts_encoded_bytes(tmp_path):
+    """非ASCII記錄以 UTF-8 位元組數計入輪替上限"""
+    writer = RotatingFileWriter(tmp_path / 'text.csv', max_bytes=1000, fsync=False)
+    record = '電壓測量,1.0\n'  # 9 個字元，UTF-8 為 17 位元組
+    for _ in range(200):
+        writer.write(record)
+    parts = writer.close()
+    
+    assert writer.bytes_written == 200 * len(record.encode('utf-8'))
+    assert all(part.stat().st_size <= 1000 + len(record.encode('utf-8')) for part in parts)
+    assert len(parts) == 4
+
+
+def test_legacy_csv_with_iso_timestamps_loads(tmp_path):
+    """基準版本寫出的CSV (ISO 時間戳) 可由列式讀取載入"""
+    (tmp_path / 'legacy.csv').write_text(
+        'timestamp,instrument_id,voltage,current,resistance,power,temperature,metadata\n'
+        '2024-05-01T10:00:00.250000,keithley,1.0,0.5,2.0,0.5,,\n'
+        '2024-05-01T10:00:01.250000,keithley,2.0,0.5,4.0,1.0,,\n',
+        encoding='utf-8'
+    )
+    storage = CSVStorage(base_path=str(tmp_path))
+    
+    data = storage.load_columns('legacy', ['timestamp', 'voltage'])
+    assert data['timestamp'].dtype == np.int64
+    assert data['timestamp'].tolist() == [
+        as_epoch_ns('2024-05-01T10:00:00.250000'), as_epoch_ns('2024-05-01T10:00:01.250000')
+    ]
+    assert data['voltage'].tolist() == [1.0, 2.0]
+    
+    later = storage.load_columns('legacy', start_ns=as_epoch_ns('2024-05-01T10:00:01'))
+    assert later['voltage'].tolist() == [2.0]
\ No newline at end of file
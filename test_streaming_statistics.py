@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+測試串流統計的會話範圍
+同一管理器的連續會話、以及先後建立的管理器，對相同數據應得到相同的會話統計
+"""
+
+import pytest
+
+from src.data.streaming_stats import StreamingStatistics
+from src.data.unified_data_manager import MeasurementPoint, UnifiedDataManager
+
+
+def feed_session(manager, session_name, count=200):
+    """以相同數據跑完一個會話，返回會話統計"""
+    start = 1_700_000_000_000_000_000
+    manager.start_session(session_name)
+    for i in range(count):
+        manager.add_measurement(MeasurementPoint(start + i * 1_000_000, 'A', 1.0 + i % 7, 0.5))
+    return manager.end_session()['instruments']['A']
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = UnifiedDataManager(base_path=str(tmp_path), default_format='csv', auto_save=False)
+    yield manager
+    manager.shutdown()
+
+
+def test_back_to_back_sessions_do_not_accumulate(manager):
+    """第二個會話不沿用第一個會話的累計與滑動窗口"""
+    first = feed_session(manager, 'first')
+    second = feed_session(manager, 'second')
+    
+    assert first['voltage']['count'] == second['voltage']['count'] == 200
+    assert second['total_energy'] == pytest.approx(first['total_energy'])
+    assert manager.analytics.get_stream('A').count == 100
+
+
+def test_new_manager_starts_from_clean_statistics(manager, tmp_path):
+    """新建的管理器不讀取其他管理器的串流統計"""
+    first = feed_session(manager, 'first')
+    other = UnifiedDataManager(base_path=str(tmp_path / 'other'), default_format='csv', auto_save=False)
+    try:
+        second = feed_session(other, 'second')
+    finally:
+        other.shutdown()
+        
+    assert second['total_energy'] == pytest.approx(first['total_energy'])
+    assert other.analytics.get_stream('A') is not manager.analytics.get_stream('A')
+
+
+def test_shared_stream_counts_each_sample_once():
+    """記錄器與GUI共用的串流，每個樣本只更新一次"""
+    stream = StreamingStatistics(window_size=10)
+    for i in range(25):
+        stream.update(voltage=float(i), current=1.0, power=float(i), resistance=1.0)
+        
+    snapshot = stream.snapshot()
+    assert snapshot['voltage']['count'] == 10
+    assert snapshot['voltage']['mean'] == pytest.approx(19.5)
+    assert stream.session_snapshot()['voltage']['count'] == 25
+    
+    stream.reset()
+    assert stream.snapshot() == {}
\ No newline at end of file
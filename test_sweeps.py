@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+測試掃描策略
+自適應掃描的細分順序、巢狀掃描的換點順序，以模擬儀器直接驅動策略
+"""
+
+import math
+
+import pytest
+
+from src.engine.strategies import AdaptiveSweepStrategy, NestedSweepStrategy
+
+
+class DiodeInstrument:
+    """在 1V 附近電流急劇上升的模擬電壓源，記錄施加的設定點"""
+    
+    def __init__(self):
+        self.setpoints = []
+        self.voltage = 0.0
+        
+    def set_voltage(self, voltage, current_limit=None):
+        self.voltage = voltage
+        self.setpoints.append(voltage)
+        
+    def measure_all(self):
+        current = 0.05 * (1 + math.tanh((self.voltage - 1.0) * 20))
+        return self.voltage, current, self.voltage / current if current else float('inf'), self.voltage * current
+
+
+def run_adaptive(params):
+    strategy = AdaptiveSweepStrategy()
+    instrument = DiodeInstrument()
+    strategy.setup(instrument, dict({'delay': 0, 'current_limit': 1.0}, **params))
+    phases = []
+    while strategy.should_continue():
+        result = strategy.execute_single_measurement(instrument)
+        if result is not None:
+            phases.append(result['phase'])
+    return strategy, instrument.setpoints, phases
+
+
+def monotonic_runs(values, descending=False):
+    """依方向單調的連續段數"""
+    runs = 1
+    for a, b in zip(values, values[1:]):
+        if (b > a) == descending:
+            runs += 1
+    return runs
+
+
+@pytest.mark.parametrize('start, stop', [(0.0, 2.0), (2.0, 0.0)])
+def test_refinement_passes_follow_sweep_direction(start, stop):
+    """細分點以輪次依掃描方向單調施加，集中在轉折附近"""
+    strategy, setpoints, phases = run_adaptive({'start': start, 'stop': stop, 'step': 0.25, 'max_points': 60})
+    refined = [v for v, phase in zip(setpoints, phases) if phase == 'refine']
+    
+    assert refined
+    assert monotonic_runs(refined, descending=stop < start) < len(refined) / 3
+    assert sum(abs(v - 1.0) < 0.25 for v in refined) > len(refined) / 2
+    voltages, _ = strategy.get_curve()
+    assert voltages == sorted(voltages) and len(set(voltages)) == len(voltages)
+    assert strategy.points_measured <= 60
+
+
+def test_score_order_is_opt_in():
+    """refine_order="score" 每次細分得分最高的區間；不支援的值被拒絕"""
+    _, monotonic, _ = run_adaptive({'start': 0.0, 'stop': 2.0, 'step': 0.25, 'max_points': 40})
+    _, scored, _ = run_adaptive({'start': 0.0, 'stop': 2.0, 'step': 0.25, 'max_points': 40,
+                                 'refine_order': 'score'})
+    assert monotonic_runs(scored[9:]) > monotonic_runs(monotonic[9:])
+    
+    with pytest.raises(Exception, match='細分順序'):
+        AdaptiveSweepStrategy().setup(DiodeInstrument(), {'start': 0, 'stop': 1, 'step': 0.1,
+                                                          'refine_order': 'random'})
+
+
+class PowerSupply:
+    """只能作為電壓源的外層電源 (如 DP711)，記錄操作順序"""
+    
+    def __init__(self, events):
+        self.events = events
+        
+    def set_voltage(self, voltage, current_limit=None):
+        self.events.append(('outer', voltage))
+        
+    def set_current(self, current):
+        self.events.append(('limit', current))
+
+
+class SweepingSourceMeter:
+    """支援硬體掃描的內層源表，讀數為外層設定點與內層電壓的函數"""
+    
+    def __init__(self, events):
+        self.events = events
+        self.points = []
+        
+    def configure_voltage_sweep(self, start, stop, points, delay=0.0, current_limit=0.1):
+        self.points = [start + (stop - start) * k / (points - 1) for k in range(points)]
+        
+    def start_sweep(self):
+        self.events.append(('sweep',))
+        
+    def is_sweep_running(self):
+        return False
+        
+    def read_sweep_buffer(self, count):
+        outer = [event[1] for event in self.events if event[0] == 'outer'][-1]
+        self.events.append(('read',))
+        return self.points[:count], [outer * v for v in self.points[:count]]
+
+
+def test_nested_sweep_reads_buffer_before_stepping_outer():
+    """每條曲線讀回後才設定下一個外層點，讀數屬於正確的外層點"""
+    events = []
+    strategy = NestedSweepStrategy(PowerSupply(events))
+    instrument = SweepingSourceMeter(events)
+    strategy.setup(instrument, {
+        'start': 0.0, 'stop': 1.0, 'step': 0.5, 'outer_values': [1.0, 2.0, 3.0], 'outer_settle': 0
+    })
+    results = []
+    while strategy.should_continue():
+        results.append(strategy.execute_single_measurement(instrument))
+        
+    assert events == [('outer', 1.0), ('sweep',), ('read',), ('outer', 2.0), ('sweep',), ('read',),
+                      ('outer', 3.0), ('sweep',), ('read',)]
+    family = strategy.get_family()
+    assert family['reading'].tolist() == [[0.0, 0.5, 1.0], [0.0, 1.0, 2.0], [0.0, 1.5, 3.0]]
+    assert [r['outer_value'] for r in results] == [1.0] * 3 + [2.0] * 3 + [3.0] * 3
+
+
+def test_nested_sweep_rejects_current_steps_on_voltage_supply():
+    """set_current 只設定限流的電源不能作為電流步進軸"""
+    strategy = NestedSweepStrategy(PowerSupply([]))
+    with pytest.raises(Exception, match='電流源'):
+        strategy.setup(SweepingSourceMeter([]), {
+            'start': 0.0, 'stop': 1.0, 'step': 0.5, 'outer_values': [0.001, 0.002],
+            'outer_source': 'current'
+        })
\ No newline at end of file
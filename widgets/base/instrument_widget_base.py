@@ -13,6 +13,7 @@ from PyQt6.QtGui import QFont
 
 from src.config import get_config
 from src.data import get_data_manager, MeasurementPoint
+from src.engine.clock import as_epoch_ns
 from src.workers import UnifiedWorkerBase
 from src.unified_logger import get_logger
 from .connection_mixin import ConnectionMixin
@@ -65,6 +66,9 @@ class InstrumentWidgetBase(QWidget, ConnectionMixin, MeasurementMixin, DataVisua
         # Worker管理
         self.active_workers: List[UnifiedWorkerBase] = []
         
+        # 連接健康監控 (連接成功後啟用)
+        self.health_monitor = None
+        
         # 狀態定時器
         self.status_timer = QTimer()
         self.status_timer.timeout.connect(self._update_status)
@@ -253,6 +257,9 @@ class InstrumentWidgetBase(QWidget, ConnectionMixin, MeasurementMixin, DataVisua
             # 停止所有測量
             self.stop_measurement()
             
+            # 主動斷線前停止健康監控，避免觸發自動恢復
+            self._stop_health_monitoring()
+            
             # 斷開儀器
             if hasattr(self.instrument, 'disconnect'):
                 self.instrument.disconnect()
@@ -278,6 +285,11 @@ class InstrumentWidgetBase(QWidget, ConnectionMixin, MeasurementMixin, DataVisua
             measurement_worker.data_ready.connect(self._on_measurement_ready)
             measurement_worker.error_occurred.connect(self._on_measurement_error)
             
+            # 斷線時暫停測量，恢復後繼續
+            if self.health_monitor is not None and hasattr(measurement_worker, 'health_monitor'):
+                measurement_worker.health_monitor = self.health_monitor
+                self.health_monitor.attach_worker(self.instrument, measurement_worker)
+                
             self.add_worker(measurement_worker)
             measurement_worker.start_work()
             
@@ -295,6 +307,8 @@ class InstrumentWidgetBase(QWidget, ConnectionMixin, MeasurementMixin, DataVisua
         # 停止所有測量Worker
         for worker in self.active_workers[:]:
             if hasattr(worker, 'measurement') or 'Measurement' in worker.__class__.__name__:
+                if self.health_monitor is not None:
+                    self.health_monitor.detach_worker(self.instrument, worker)
                 worker.stop_work()
                 self.remove_worker(worker)
                 
@@ -356,6 +370,58 @@ class InstrumentWidgetBase(QWidget, ConnectionMixin, MeasurementMixin, DataVisua
     def _on_connection_success(self, instrument_name: str, connection_info: Dict[str, Any]):
         """連接成功處理"""
         self.connection_changed.emit(True, connection_info.get('identity', '已連接'))
+        self._start_health_monitoring(connection_info.get('connection_params', self.get_connection_params()))
+        
+    def _start_health_monitoring(self, connection_params: Dict[str, Any]):
+        """啟用連接健康監控"""
+        if not self.config.get('safety.monitoring.connection_health_check', True):
+            return
+            
+        from src.workers import get_health_monitor
+        
+        self.health_monitor = get_health_monitor()
+        self.health_monitor.add_instrument(self.instrument, connection_params)
+        self.health_monitor.connection_lost.connect(self._on_link_lost)
+        self.health_monitor.connection_recovered.connect(self._on_link_recovered)
+        self.health_monitor.recovery_abandoned.connect(self._on_link_abandoned)
+        
+        if not self.health_monitor.isRunning():
+            self.health_monitor.start_work()
+            
+    def _stop_health_monitoring(self):
+        """停用連接健康監控"""
+        if self.health_monitor is None:
+            return
+            
+        self.health_monitor.remove_instrument(self.instrument)
+        for signal, slot in ((self.health_monitor.connection_lost, self._on_link_lost),
+                             (self.health_monitor.connection_recovered, self._on_link_recovered),
+                             (self.health_monitor.recovery_abandoned, self._on_link_abandoned)):
+            try:
+                signal.disconnect(slot)
+            except TypeError:
+                pass
+        self.health_monitor = None
+        
+    def _on_link_lost(self, instrument_name: str, time_to_detect: float):
+        """健康監控偵測到斷線"""
+        if not self.instrument or instrument_name != self.instrument.name:
+            return
+        self.connection_changed.emit(False, "連接中斷，正在恢復...")
+        self.status_changed.emit(f"連接中斷 (偵測 {time_to_detect:.1f}s)，自動恢復中...")
+        
+    def _on_link_recovered(self, instrument_name: str, time_to_recover: float):
+        """健康監控恢復連接"""
+        if not self.instrument or instrument_name != self.instrument.name:
+            return
+        self.connection_changed.emit(True, "已恢復連接")
+        self.status_changed.emit(f"連接已恢復 (耗時 {time_to_recover:.1f}s)")
+        
+    def _on_link_abandoned(self, instrument_name: str):
+        """健康監控放棄自動恢復"""
+        if not self.instrument or instrument_name != self.instrument.name:
+            return
+        self.error_occurred.emit("connection_lost", "連接中斷且自動恢復失敗，請檢查儀器")
         
     def _on_connection_failed(self, error_type: str, error_message: str):
         """連接失敗處理"""
@@ -367,18 +433,10 @@ class InstrumentWidgetBase(QWidget, ConnectionMixin, MeasurementMixin, DataVisua
         
     def _on_measurement_data(self, data: Dict[str, Any]):
         """測量數據處理"""
-        # 處理時間戳：如果是字串則轉換為datetime物件
-        timestamp = data.get('timestamp')
-        if isinstance(timestamp, str):
-            from datetime import datetime
-            timestamp = datetime.fromisoformat(timestamp)
-        elif timestamp is None:
-            from datetime import datetime
-            timestamp = datetime.now()
-            
+        # 時間戳為採集時刻的 epoch ns；舊格式 (ISO字串) 或缺失時由 as_epoch_ns 轉換
         # 創建MeasurementPoint並添加到數據管理器
         point = MeasurementPoint(
-            timestamp=timestamp,
+            timestamp=as_epoch_ns(data.get('timestamp')),
             instrument_id=self.instrument_type,
             voltage=data.get('voltage', 0),
             current=data.get('current', 0),
@@ -428,6 +486,8 @@ class InstrumentWidgetBase(QWidget, ConnectionMixin, MeasurementMixin, DataVisua
             
     def closeEvent(self, event):
         """關閉事件處理"""
+        self._stop_health_monitoring()
+        
         # 停止所有Worker
         for worker in self.active_workers[:]:
             worker.stop_work()
@@ -5,9 +5,8 @@ Keithley 2461 Professional SourceMeter Control Widget
 """
 
 import logging
-import time
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Optional, List, Dict, Tuple, Any
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QGridLayout, 
                             QLabel, QPushButton, QLineEdit, QGroupBox, 
@@ -26,12 +25,18 @@ from src.enhanced_data_system import EnhancedDataLogger
 from widgets.unit_input_widget import UnitInputWidget, UnitDisplayWidget
 from widgets.connection_status_widget import ConnectionStatusWidget
 from widgets.floating_settings_panel import FloatingSettingsPanel
+from src.engine.cancellation import CancellationToken
+from src.engine.clock import epoch_ns_to_datetime, get_clock, now_epoch_ns
+from src.engine.lifecycle import PauseControl
+from src.data.streaming_stats import StreamingStatistics
+from src.data.memory_governor import BudgetedList
+from src.data.qt_adapter import QtExportJobAdapter
 # from src.connection_worker import ConnectionStateManager  # 已整合到統一系統
 
 
-class SweepMeasurementWorker(QThread):
-    """掃描測量工作執行緒"""
-    data_point_ready = pyqtSignal(float, float, float, float, int)  # voltage, current, resistance, power, point_number
+class SweepMeasurementWorker(QThread, PauseControl):
+    """掃描測量工作執行緒 (關聯健康監控時，斷線暫停、恢復後從失敗的點繼續)"""
+    data_point_ready = pyqtSignal(float, float, float, float, int, object)  # voltage, current, resistance, power, point_number, acquired_ns
     sweep_completed = pyqtSignal()
     sweep_progress = pyqtSignal(int)  # percentage
     error_occurred = pyqtSignal(str)
@@ -41,10 +46,17 @@ class SweepMeasurementWorker(QThread):
         self.keithley = keithley
         self.sweep_params = sweep_params
         self.running = False
+        self._cancel_token = CancellationToken()
+        self._init_pause(keithley)
+        
+    def is_running(self) -> bool:
+        return self.isRunning()
         
     def run(self):
         """執行掃描測量"""
         self.running = True
+        self._mark_running()
+        clock = get_clock()
         start_v = self.sweep_params['start']
         stop_v = self.sweep_params['stop'] 
         step_v = self.sweep_params['step']
@@ -60,24 +72,35 @@ class SweepMeasurementWorker(QThread):
             self.keithley.set_source_function("VOLT")
             self.keithley.output_on()
             
-            for i, voltage in enumerate(voltage_points):
-                if not self.running:
+            index = 0
+            while index < total_points:
+                if not self.running or not self.wait_if_paused(self._cancel_token):
                     break
-                    
-                # 設定電壓
-                self.keithley.set_voltage(str(voltage), current_limit=current_limit)
+                voltage = voltage_points[index]
                 
-                # 等待穩定
-                time.sleep(delay_ms / 1000.0)
-                
-                # 測量
-                v, i, r, p = self.keithley.measure_all()
+                try:
+                    # 設定電壓
+                    self.keithley.set_voltage(str(voltage), current_limit=current_limit)
+                    
+                    # 等待穩定 (停止請求會立即打斷)
+                    if not self._cancel_token.sleep(delay_ms / 1000.0):
+                        break
+                    
+                    # 測量 (記錄估計的採集時刻)
+                    (v, i, r, p), timing = clock.timed_query(self.keithley, self.keithley.measure_all)
+                except Exception:
+                    # 交由健康監控探測鏈路，恢復後重測此點
+                    if self.pause_on_failure():
+                        continue
+                    raise
+                self._operation_succeeded()
                 
                 # 發送數據點 (包含儀器計算的功率值)
-                self.data_point_ready.emit(v, i, r, p, i+1)
+                self.data_point_ready.emit(v, i, r, p, index + 1, clock.acquired_epoch_ns(timing))
                 
                 # 更新進度
-                progress = int((i + 1) * 100 / total_points)
+                index += 1
+                progress = int(index * 100 / total_points)
                 self.sweep_progress.emit(progress)
                 
             # 關閉輸出
@@ -92,53 +115,76 @@ class SweepMeasurementWorker(QThread):
                 self.keithley.output_off()
             except:
                 pass
+        finally:
+            self._mark_stopped()
                 
     def stop_sweep(self):
-        """停止掃描"""
+        """停止掃描 - 立即打斷穩定延遲，不阻塞呼叫端"""
         self.running = False
+        self._cancel_token.cancel()
 
 
-class ContinuousMeasurementWorker(QThread):
-    """連續測量工作執行緒"""
-    data_ready = pyqtSignal(float, float, float, float)  # voltage, current, resistance, power
+class ContinuousMeasurementWorker(QThread, PauseControl):
+    """連續測量工作執行緒 (關聯健康監控時，斷線暫停、恢復後繼續)
+    
+    每個樣本附帶以共用時鐘服務估計的採集時刻，與其他儀器在同一時間軸上。
+    """
+    data_ready = pyqtSignal(float, float, float, float, object)  # voltage, current, resistance, power, acquired_ns (epoch ns)
     error_occurred = pyqtSignal(str)
     
     def __init__(self, keithley):
         super().__init__()
         self.keithley = keithley
         self.running = False
+        self._cancel_token = CancellationToken()
+        self._init_pause(keithley)
+        
+    def is_running(self) -> bool:
+        return self.isRunning()
         
     def run(self):
         """執行連續測量"""
+        self._mark_running()
+        clock = get_clock()
         measurement_count = 0
-        while self.running:
+        while self.running and self.wait_if_paused(self._cancel_token):
             try:
                 if self.keithley and self.keithley.connected:
-                    v, i, r, p = self.keithley.measure_all()
-                    self.data_ready.emit(v, i, r, p)
+                    (v, i, r, p), timing = clock.timed_query(self.keithley, self.keithley.measure_all)
+                    self._operation_succeeded()
+                    self.data_ready.emit(v, i, r, p, clock.acquired_epoch_ns(timing))
                     measurement_count += 1
-                    self.msleep(1000)  # 1000ms間隔 (1秒)
-                else:
-                    self.msleep(1000)
+                self._cancel_token.sleep(1.0)  # 1000ms間隔 (1秒)，停止時立即喚醒
             except Exception as e:
+                if self.pause_on_failure():
+                    continue
                 self.error_occurred.emit(str(e))
                 break
+        self._mark_stopped()
                 
     def start_measurement(self):
         """開始測量"""
         self.running = True
+        self._cancel_token = CancellationToken()
         self.start()
         
-    def stop_measurement(self):
-        """停止測量"""
+    def stop_measurement(self, timeout_ms: int = 1000) -> bool:
+        """停止測量 - 打斷間隔等待，最多等待 timeout_ms
+        
+        Returns:
+            bool: 執行緒是否已結束 (False 表示仍在等待儀器I/O)
+        """
         self.running = False
-        self.quit()
-        self.wait()
+        self._cancel_token.cancel()
+        return self.wait(timeout_ms)
 
 
 class ProfessionalKeithleyWidget(QWidget):
     """Keithley 2461 專業控制 Widget"""
     
+    # 數據記錄使用的儀器ID
+    INSTRUMENT_ID = "keithley_2461"
+    
     # 狀態更新信號
     connection_changed = pyqtSignal(bool, str)
     
@@ -148,14 +194,24 @@ class ProfessionalKeithleyWidget(QWidget):
         self.data_logger = None
         self.sweep_worker = None
         self.continuous_worker = None
+        self.health_monitor = None
+        
+        # 背景導出工作 (進度與結果經由Qt轉接器回到GUI執行緒)
+        self._export_job = None
+        self.export_jobs = QtExportJobAdapter(parent=self)
+        self.export_jobs.job_progress.connect(self._on_export_progress)
+        self.export_jobs.job_finished.connect(self._on_export_finished)
+        self.export_jobs.job_failed.connect(self._on_export_failed)
+        self.export_jobs.job_cancelled.connect(self._on_export_cancelled)
         
         # 連接管理 - 已整合到統一系統
         # 不再需要單獨的ConnectionStateManager
         
-        # 測量數據存儲
-        self.iv_data = []  # [(voltage, current, resistance, power), ...]
-        self.time_series_data = []  # [(time, voltage, current), ...]
-        self.start_time = datetime.now()
+        # 測量數據存儲 (受全局內存預算管理，長時間運行時時間序列按配置抽稀)
+        self.iv_data = BudgetedList('keithley.iv_data')  # [(voltage, current, resistance, power), ...]
+        self.time_series_data = BudgetedList('keithley.time_series_data')  # [(time, voltage, current), ...]
+        # 測量開始時刻 (共用時鐘的 epoch ns)，時間序列以採集時刻相對此時刻計算
+        self.start_ns = now_epoch_ns()
         
         # 操作狀態
         self.is_measuring = False
@@ -174,11 +230,9 @@ class ProfessionalKeithleyWidget(QWidget):
         # 統計數據緩存
         self._last_avg_voltage = None
         
-        # 本地滾動統計緩存（最近100個數據點）
-        self._voltage_buffer = []
-        self._current_buffer = []
-        self._power_buffer = []
+        # 滾動統計（最近100個數據點，每點 O(1) 更新）- 傳給數據記錄器共用
         self.buffer_size = 100
+        self._stream = StreamingStatistics(self.buffer_size)
         
         # 懸浮設定面板
         self.floating_settings = None
@@ -894,48 +948,21 @@ class ProfessionalKeithleyWidget(QWidget):
         except Exception as e:
             self.logger.debug(f"統計面板更新錯誤: {e}")
     
-    def _update_local_statistics(self, voltage, current, power):
-        """更新本地統計緩存 - 高效的滾動窗口統計"""
-        # 添加新數據到緩存
-        self._voltage_buffer.append(voltage)
-        self._current_buffer.append(current) 
-        self._power_buffer.append(power)
-        
-        # 保持緩存大小
-        if len(self._voltage_buffer) > self.buffer_size:
-            self._voltage_buffer.pop(0)
-        if len(self._current_buffer) > self.buffer_size:
-            self._current_buffer.pop(0)
-        if len(self._power_buffer) > self.buffer_size:
-            self._power_buffer.pop(0)
-            
-        # 計算統計數據（需要至少5個數據點）
-        if len(self._voltage_buffer) >= 5:
-            import statistics
-            
-            # 電壓統計
-            self._last_voltage_stats = {
-                'mean': statistics.mean(self._voltage_buffer),
-                'max': max(self._voltage_buffer),
-                'min': min(self._voltage_buffer),
-                'count': len(self._voltage_buffer)
-            }
-            
-            # 電流統計
-            self._last_current_stats = {
-                'mean': statistics.mean(self._current_buffer),
-                'max': max(self._current_buffer),
-                'min': min(self._current_buffer),
-                'count': len(self._current_buffer)
-            }
-            
-            # 功率統計
-            self._last_power_stats = {
-                'mean': statistics.mean(self._power_buffer),
-                'max': max(self._power_buffer),
-                'min': min(self._power_buffer),
-                'count': len(self._power_buffer)
-            }
+    def _update_local_statistics(self, voltage, current, resistance, power, recorded=False):
+        """更新統計顯示 - 讀取共用串流的滾動窗口統計
+        
+        Args:
+            recorded: 數據點已由數據記錄器寫入共用串流，此處只讀取
+        """
+        if not recorded:
+            self._stream.update(voltage=voltage, current=current, resistance=resistance, power=power)
+        
+        # 計算統計數據（需要至少5個數據點）- 快照在串流鎖內取得，不與記錄器的更新交錯
+        snapshot = self._stream.snapshot()
+        if snapshot.get('voltage', {}).get('count', 0) >= 5:
+            self._last_voltage_stats = snapshot.get('voltage')
+            self._last_current_stats = snapshot.get('current')
+            self._last_power_stats = snapshot.get('power')
         else:
             # 數據不足時清空統計
             self._last_voltage_stats = None
@@ -1428,6 +1455,9 @@ class ProfessionalKeithleyWidget(QWidget):
             # 停止所有測量
             self.stop_measurement()
             
+            # 主動斷線前停止健康監控，避免觸發自動恢復
+            self._stop_health_monitoring()
+            
             if self.keithley and self.keithley.connected:
                 self.keithley.output_off()
                 self.keithley.disconnect()
@@ -1517,11 +1547,58 @@ class ProfessionalKeithleyWidget(QWidget):
         # 初始化數據記錄器
         self._initialize_enhanced_data_logger()
         
+        # 啟用連接健康監控
+        if self.keithley and hasattr(self, 'connection_worker') and self.connection_worker:
+            self._start_health_monitoring(self.connection_worker.connection_params)
+        
         # 發送信號通知父組件
         self.connection_changed.emit(True, device_info)
         
         self.log_message(f"✅ 連線成功: {device_info}")
         
+    def _start_health_monitoring(self, connection_params):
+        """啟用連接健康監控 - 閒置心跳、斷線偵測與自動重連"""
+        from src.config import get_config
+        if not get_config().get('safety.monitoring.connection_health_check', True):
+            return
+            
+        from src.workers import get_health_monitor
+        
+        self.health_monitor = get_health_monitor()
+        self.health_monitor.add_instrument(self.keithley, connection_params)
+        self.health_monitor.connection_lost.connect(self._on_link_lost)
+        self.health_monitor.connection_recovered.connect(self._on_link_recovered)
+        
+        if not self.health_monitor.isRunning():
+            self.health_monitor.start_work()
+            
+    def _stop_health_monitoring(self):
+        """停用連接健康監控"""
+        if not getattr(self, 'health_monitor', None):
+            return
+            
+        if self.keithley:
+            self.health_monitor.remove_instrument(self.keithley)
+        for signal, slot in ((self.health_monitor.connection_lost, self._on_link_lost),
+                             (self.health_monitor.connection_recovered, self._on_link_recovered)):
+            try:
+                signal.disconnect(slot)
+            except TypeError:
+                pass
+        self.health_monitor = None
+        
+    def _on_link_lost(self, instrument_name: str, time_to_detect: float):
+        """健康監控偵測到斷線"""
+        if not self.keithley or instrument_name != self.keithley.name:
+            return
+        self.log_message(f"⚠️ 連接中斷 (偵測耗時 {time_to_detect:.1f}s)，自動恢復中...")
+        
+    def _on_link_recovered(self, instrument_name: str, time_to_recover: float):
+        """健康監控恢復連接"""
+        if not self.keithley or instrument_name != self.keithley.name:
+            return
+        self.log_message(f"✅ 連接已恢復 (恢復耗時 {time_to_recover:.1f}s)")
+        
     def _on_connection_failed(self, error_message: str):
         """連線失敗回調"""
         self.connection_status_widget.set_connection_failed_state(error_message)
@@ -1574,7 +1651,9 @@ class ProfessionalKeithleyWidget(QWidget):
                 self.data_logger = EnhancedDataLogger(
                     base_path="data",
                     auto_save_interval=900,  # 15分鐘自動保存
-                    max_memory_points=5000   # 5000個數據點內存限制
+                    max_memory_points=5000,  # 5000個數據點內存限制
+                    instrument_id=self.INSTRUMENT_ID,
+                    stream=self._stream
                 )
                 
                 # 連接數據系統信號
@@ -1664,7 +1743,7 @@ class ProfessionalKeithleyWidget(QWidget):
             # 清除舊數據
             self.iv_data.clear()
             self.time_series_data.clear()
-            self.start_time = datetime.now()
+            self.start_ns = now_epoch_ns()
             
             # 啟動狀態更新定時器
             self.status_update_timer.start(1000)  # 每秒更新一次
@@ -1721,6 +1800,7 @@ class ProfessionalKeithleyWidget(QWidget):
             self.sweep_worker.sweep_progress.connect(self.update_progress)
             self.sweep_worker.sweep_completed.connect(self.on_sweep_completed)
             self.sweep_worker.error_occurred.connect(self.handle_measurement_error)
+            self._monitor_worker(self.sweep_worker)
             
             self.sweep_worker.start()
             
@@ -1756,6 +1836,7 @@ class ProfessionalKeithleyWidget(QWidget):
             self.continuous_worker = ContinuousMeasurementWorker(self.keithley)
             self.continuous_worker.data_ready.connect(self.update_continuous_data)
             self.continuous_worker.error_occurred.connect(self.handle_measurement_error)
+            self._monitor_worker(self.continuous_worker)
             
             self.continuous_worker.start_measurement()
             
@@ -1875,10 +1956,13 @@ class ProfessionalKeithleyWidget(QWidget):
             # 停止工作執行緒
             if self.sweep_worker:
                 self.sweep_worker.stop_sweep()
+                self._release_worker(self.sweep_worker)
                 self.sweep_worker = None
                 
             if self.continuous_worker:
-                self.continuous_worker.stop_measurement()
+                if not self.continuous_worker.stop_measurement():
+                    self.log_message("⚠️ 測量執行緒仍在等待儀器回應，將在完成後結束")
+                self._release_worker(self.continuous_worker)
                 self.continuous_worker = None
             
             # 關閉輸出
@@ -1897,6 +1981,26 @@ class ProfessionalKeithleyWidget(QWidget):
         except Exception as e:
             self.log_message(f"❌ 停止測量時發生錯誤: {e}")
     
+    def _monitor_worker(self, worker):
+        """關聯健康監控：斷線時暫停測量，恢復後繼續"""
+        if self.health_monitor is not None:
+            worker.health_monitor = self.health_monitor
+            self.health_monitor.attach_worker(self.keithley, worker)
+            
+    def _unmonitor_worker(self, worker):
+        """解除健康監控關聯"""
+        if self.health_monitor is not None:
+            self.health_monitor.detach_worker(self.keithley, worker)
+        worker.health_monitor = None
+        
+    def _release_worker(self, worker):
+        """釋放工作執行緒；仍在執行 (如等待儀器I/O) 時交由Qt在結束後刪除"""
+        self._unmonitor_worker(worker)
+        if worker.isRunning():
+            # 由Widget持有直到執行緒結束，避免銷毀仍在執行的QThread
+            worker.setParent(self)
+            worker.finished.connect(worker.deleteLater)
+    
     # ==================== 數據更新方法 ====================
     
     def format_engineering_value(self, value, unit_type='V'):
@@ -1953,7 +2057,7 @@ class ProfessionalKeithleyWidget(QWidget):
         
         return f"{sign}{abs_value:.2f}", unit_type
     
-    def update_iv_data(self, voltage, current, resistance, power, point_num):
+    def update_iv_data(self, voltage, current, resistance, power, point_num, acquired_ns):
         """更新IV數據 (使用儀器計算的功率值)"""
         # power 參數現在來自儀器的 SCPI 計算，不再本地重新計算
         
@@ -1992,20 +2096,25 @@ class ProfessionalKeithleyWidget(QWidget):
         
         # 記錄數據
         if self.record_data_cb.isChecked() and self.data_logger:
-            self.data_logger.log_measurement(voltage, current, resistance, power)
+            self.data_logger.log_measurement(voltage, current, resistance, power, timestamp=acquired_ns)
         
         # 更新狀態
         # 數據點統一在狀態欄顯示
     
-    def update_continuous_data(self, voltage, current, resistance, power):
-        """更新連續測量數據"""
-        current_time = (datetime.now() - self.start_time).total_seconds()
+    def update_continuous_data(self, voltage, current, resistance, power, acquired_ns):
+        """更新連續測量數據 (acquired_ns 為估計的採集時刻，epoch ns)"""
+        current_time = (acquired_ns - self.start_ns) / 1e9
         
         # 存儲數據
         self.time_series_data.append((current_time, voltage, current, resistance, power))
         
-        # 更新本地統計緩存
-        self._update_local_statistics(voltage, current, power)
+        # 記錄數據 (數據記錄器會更新共用串流統計)
+        recorded = bool(self.record_data_cb.isChecked() and self.data_logger)
+        if recorded:
+            self.data_logger.log_measurement(voltage, current, resistance, power, timestamp=acquired_ns)
+        
+        # 更新統計緩存 - 每個數據點只更新串流一次
+        self._update_local_statistics(voltage, current, resistance, power, recorded)
         
         # 更新LCD顯示 - 使用工程計數法格式
         v_val, v_unit = self.format_engineering_value(voltage, 'V')
@@ -2059,10 +2168,6 @@ class ProfessionalKeithleyWidget(QWidget):
             point_num = len(self.time_series_data) // 5
             self.add_data_to_table(point_num, voltage, current, resistance, power)
         
-        # 記錄數據
-        if self.record_data_cb.isChecked() and self.data_logger:
-            self.data_logger.log_measurement(voltage, current, resistance, power)
-        
         # 更新狀態
         # 數據點統一在狀態欄顯示
     
@@ -2112,6 +2217,8 @@ class ProfessionalKeithleyWidget(QWidget):
         self.start_btn.setEnabled(True)
         self.stop_btn.setEnabled(False)
         self.is_measuring = False
+        if self.sweep_worker:
+            self._unmonitor_worker(self.sweep_worker)
         
         total_points = len(self.iv_data)
         self.log_message(f"✅ IV掃描完成，共獲得 {total_points} 個數據點")
@@ -2130,17 +2237,22 @@ class ProfessionalKeithleyWidget(QWidget):
     # ==================== 數據管理方法 ====================
     
     def export_data(self):
-        """導出數據"""
+        """導出數據 (在背景導出工作中執行，導出中再按一次則取消)"""
+        if self._export_job is not None and not self._export_job.done:
+            self._export_job.cancel()
+            self.log_message("⏹️ 正在取消導出...")
+            return
+            
         if not self.iv_data and not self.time_series_data:
             QMessageBox.information(self, "提示", "沒有數據可導出")
             return
             
         try:
             if self.data_logger:
-                # 使用增強數據系統的匯出功能
-                csv_file = self.data_logger.export_session_data('csv')
-                QMessageBox.information(self, "成功", f"數據已導出到:\n{csv_file}")
-                self.log_message(f"📊 數據已導出到: {csv_file}")
+                # 使用增強數據系統的匯出功能 (讀取與寫檔不佔用GUI執行緒)
+                self._export_job = self.data_logger.export_session_data_async('csv')
+                self.export_btn.setText("⏹️ 取消導出")
+                self.log_message(f"📊 開始導出: {self._export_job.description}")
             else:
                 # 如果沒有data_logger，創建臨時導出
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -2155,7 +2267,7 @@ class ProfessionalKeithleyWidget(QWidget):
                             f.write(f"{i+1},{v:.6f},{i_val:.6f},{r:.2f},{p:.6f},{timestamp}\n")
                     else:
                         for i, (t, v, i_val, r, p) in enumerate(self.time_series_data):
-                            timestamp = (self.start_time + timedelta(seconds=t)).strftime("%Y-%m-%d %H:%M:%S")
+                            timestamp = epoch_ns_to_datetime(self.start_ns + int(t * 1e9)).strftime("%Y-%m-%d %H:%M:%S")
                             f.write(f"{i+1},{v:.6f},{i_val:.6f},{r:.2f},{p:.6f},{timestamp}\n")
                 
                 QMessageBox.information(self, "成功", f"數據已導出到:\n{filename}")
@@ -2164,6 +2276,49 @@ class ProfessionalKeithleyWidget(QWidget):
         except Exception as e:
             QMessageBox.critical(self, "導出錯誤", f"導出數據時發生錯誤:\n{str(e)}")
             self.log_message(f"❌ 導出錯誤: {e}")
+            
+    def _is_current_export(self, job_id: int) -> bool:
+        return self._export_job is not None and self._export_job.job_id == job_id
+        
+    def _reset_export_button(self):
+        self._export_job = None
+        self.export_btn.setText("📊 導出數據")
+        
+    def _on_export_progress(self, job_id: int, progress: dict):
+        """導出進度 (按鈕顯示百分比或已寫出列數)"""
+        if not self._is_current_export(job_id) or progress['state'] != 'running':
+            return
+        if progress['percent'] is not None:
+            text = f"{progress['percent']:.0f}%"
+        else:
+            text = f"{progress['rows']} 列"
+        self.export_btn.setText(f"⏹️ 取消導出 ({text})")
+        
+    def _on_export_finished(self, job_id: int, filepath: str):
+        """導出完成"""
+        if not self._is_current_export(job_id):
+            return
+        progress = self._export_job.progress()
+        self._reset_export_button()
+        self.log_message(
+            f"📊 數據已導出到: {filepath} ({progress['rows']} 列, {progress['elapsed_s']:.1f}s)"
+        )
+        QMessageBox.information(self, "成功", f"數據已導出到:\n{filepath}")
+        
+    def _on_export_failed(self, job_id: int, error: str):
+        """導出失敗"""
+        if not self._is_current_export(job_id):
+            return
+        self._reset_export_button()
+        QMessageBox.critical(self, "導出錯誤", f"導出數據時發生錯誤:\n{error}")
+        self.log_message(f"❌ 導出錯誤: {error}")
+        
+    def _on_export_cancelled(self, job_id: int):
+        """導出已取消"""
+        if not self._is_current_export(job_id):
+            return
+        self._reset_export_button()
+        self.log_message("⏹️ 導出已取消")
     
     def clear_data(self):
         """清除數據"""
@@ -2215,12 +2370,12 @@ class ProfessionalKeithleyWidget(QWidget):
         
     def update_runtime_display(self):
         """使用QTimer更新運行時間顯示 - 簡化版本"""
-        if not self.is_measuring or not hasattr(self, 'start_time') or not self.start_time:
+        if not self.is_measuring or not getattr(self, 'start_ns', None):
             return
             
         try:
             # 計算運行時間
-            duration = (datetime.now() - self.start_time).total_seconds()
+            duration = (now_epoch_ns() - self.start_ns) / 1e9
             hours = int(duration // 3600)
             minutes = int((duration % 3600) // 60)
             seconds = int(duration % 60)
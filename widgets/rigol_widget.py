@@ -27,44 +27,69 @@ from src.enhanced_data_system import EnhancedDataLogger
 from widgets.unit_input_widget import UnitInputWidget, UnitDisplayWidget
 from widgets.connection_status_widget import ConnectionStatusWidget
 from widgets.floating_settings_panel import FloatingSettingsPanel
+from src.engine.cancellation import CancellationToken
+from src.engine.clock import epoch_ns_to_datetime, get_clock, now_epoch_ns
+from src.engine.lifecycle import PauseControl
+from src.data.memory_governor import BudgetedList
+from src.data.export_jobs import get_export_service
+from src.data.qt_adapter import QtExportJobAdapter
+from src.data.compression import codec_of, open_output
+from src.data.stream_writer import PARTIAL_SUFFIX
 
 
-class ContinuousMeasurementWorker(QThread):
-    """連續測量工作執行緒 - 與Keithley架構統一"""
-    data_ready = pyqtSignal(float, float, float)  # voltage, current, power
+class ContinuousMeasurementWorker(QThread, PauseControl):
+    """連續測量工作執行緒 - 與Keithley架構統一 (關聯健康監控時，斷線暫停、恢復後繼續)
+    
+    每個樣本附帶以共用時鐘服務估計的採集時刻，與其他儀器在同一時間軸上。
+    """
+    data_ready = pyqtSignal(float, float, float, object)  # voltage, current, power, acquired_ns (epoch ns)
     error_occurred = pyqtSignal(str)
     
     def __init__(self, rigol_device):
         super().__init__()
         self.rigol = rigol_device
         self.running = False
+        self._cancel_token = CancellationToken()
+        self._init_pause(rigol_device)
+        
+    def is_running(self) -> bool:
+        return self.isRunning()
         
     def run(self):
         """執行連續測量"""
+        self._mark_running()
+        clock = get_clock()
         measurement_count = 0
-        while self.running:
+        while self.running and self.wait_if_paused(self._cancel_token):
             try:
                 if self.rigol and self.rigol.is_connected():
-                    v, i, p = self.rigol.measure_all()
-                    self.data_ready.emit(v, i, p)
+                    (v, i, p), timing = clock.timed_query(self.rigol, self.rigol.measure_all)
+                    self._operation_succeeded()
+                    self.data_ready.emit(v, i, p, clock.acquired_epoch_ns(timing))
                     measurement_count += 1
-                    self.msleep(1000)  # 1000ms間隔 (1秒)
-                else:
-                    self.msleep(1000)
+                self._cancel_token.sleep(1.0)  # 1000ms間隔 (1秒)，停止時立即喚醒
             except Exception as e:
+                if self.pause_on_failure():
+                    continue
                 self.error_occurred.emit(str(e))
                 break
+        self._mark_stopped()
                 
     def start_measurement(self):
         """開始測量"""
         self.running = True
+        self._cancel_token = CancellationToken()
         self.start()
         
-    def stop_measurement(self):
-        """停止測量"""
+    def stop_measurement(self, timeout_ms: int = 1000) -> bool:
+        """停止測量 - 打斷間隔等待，最多等待 timeout_ms
+        
+        Returns:
+            bool: 執行緒是否已結束 (False 表示仍在等待儀器I/O)
+        """
         self.running = False
-        self.quit()
-        self.wait()
+        self._cancel_token.cancel()
+        return self.wait(timeout_ms)
 
 
 class ProfessionalRigolWidget(QWidget):
@@ -79,14 +104,24 @@ class ProfessionalRigolWidget(QWidget):
         self.data_logger = None
         self.continuous_worker = None
         self.connection_worker = None
+        self.health_monitor = None
         
         # 連接狀態Widget - 統一的連接管理
         self.connection_status_widget = None
         
         # 測量數據存儲
-        self.measurement_data = []  # [(time, voltage, current, power), ...]
+        self.measurement_data = BudgetedList('rigol.measurement_data', max_items=1000)  # [(acquired_ns, voltage, current, power), ...]
+        # 圖表時間軸起點 (共用時鐘的 epoch ns)
+        self.chart_start_ns: Optional[int] = None
         self.start_time = datetime.now()
         
+        # 背景導出工作 (進度與結果經由Qt轉接器回到GUI執行緒)
+        self._export_job = None
+        self.export_jobs = QtExportJobAdapter(parent=self)
+        self.export_jobs.job_finished.connect(self._on_export_finished)
+        self.export_jobs.job_failed.connect(self._on_export_failed)
+        self.export_jobs.job_cancelled.connect(self._on_export_cancelled)
+        
         # 操作狀態
         self.is_measuring = False
         
@@ -760,6 +795,7 @@ class ProfessionalRigolWidget(QWidget):
             
             # 保存設備實例引用
             self.pending_device = rigol_device
+            self.pending_connection_params = connection_params
             
             # 啟動工作執行緒
             self.connection_worker.start()
@@ -818,6 +854,9 @@ class ProfessionalRigolWidget(QWidget):
             # 重新啟用掃描按鈕
             self.auto_scan_btn.setEnabled(True)
             
+            # 啟用連接健康監控
+            self._start_health_monitoring(getattr(self, 'pending_connection_params', {}))
+            
             # 發送連接狀態信號
             self.connection_changed.emit(True, identity)
 
@@ -878,6 +917,9 @@ class ProfessionalRigolWidget(QWidget):
             if self.is_measuring:
                 self.stop_measurement()
             
+            # 主動斷線前停止健康監控，避免觸發自動恢復
+            self._stop_health_monitoring()
+            
             # 關閉輸出
             if self.rigol and self.rigol.is_connected():
                 self.rigol.output_off()
@@ -897,6 +939,49 @@ class ProfessionalRigolWidget(QWidget):
         except Exception as e:
             self.logger.error(f"斷開連接時發生錯誤: {e}")
 
+    def _start_health_monitoring(self, connection_params):
+        """啟用連接健康監控 - 閒置心跳、斷線偵測與自動重連"""
+        from src.config import get_config
+        if not get_config().get('safety.monitoring.connection_health_check', True):
+            return
+            
+        from src.workers import get_health_monitor
+
+        self.health_monitor = get_health_monitor()
+        self.health_monitor.add_instrument(self.rigol, connection_params)
+        self.health_monitor.connection_lost.connect(self._on_link_lost)
+        self.health_monitor.connection_recovered.connect(self._on_link_recovered)
+
+        if not self.health_monitor.isRunning():
+            self.health_monitor.start_work()
+            
+    def _stop_health_monitoring(self):
+        """停用連接健康監控"""
+        if not getattr(self, 'health_monitor', None):
+            return
+            
+        if self.rigol:
+            self.health_monitor.remove_instrument(self.rigol)
+        for signal, slot in ((self.health_monitor.connection_lost, self._on_link_lost),
+                             (self.health_monitor.connection_recovered, self._on_link_recovered)):
+            try:
+                signal.disconnect(slot)
+            except TypeError:
+                pass
+        self.health_monitor = None
+
+    def _on_link_lost(self, instrument_name: str, time_to_detect: float):
+        """健康監控偵測到斷線"""
+        if not self.rigol or instrument_name != self.rigol.name:
+            return
+        self.log_message(f"[WARNING] 連接中斷 (偵測耗時 {time_to_detect:.1f}s)，自動恢復中...")
+
+    def _on_link_recovered(self, instrument_name: str, time_to_recover: float):
+        """健康監控恢復連接"""
+        if not self.rigol or instrument_name != self.rigol.name:
+            return
+        self.log_message(f"[SUCCESS] 連接已恢復 (恢復耗時 {time_to_recover:.1f}s)")
+
     def _handle_connection_cancel(self):
         """處理連接取消"""
         if self.connection_worker:
@@ -973,6 +1058,7 @@ class ProfessionalRigolWidget(QWidget):
             self.continuous_worker = ContinuousMeasurementWorker(self.rigol)
             self.continuous_worker.data_ready.connect(self.on_measurement_data)
             self.continuous_worker.error_occurred.connect(self.on_measurement_error)
+            self._monitor_worker(self.continuous_worker)
             self.continuous_worker.start_measurement()
             
             self.is_measuring = True
@@ -980,8 +1066,8 @@ class ProfessionalRigolWidget(QWidget):
             self.stop_measurement_btn.setEnabled(True)
             self.log_message("開始連續測量")
             
-            # 重置圖表起始時間
-            self.chart_start_time = datetime.now()
+            # 重置圖表起始時間 (與採集時刻同一時基)
+            self.chart_start_ns = now_epoch_ns()
             
         except Exception as e:
             self.logger.error(f"啟動測量時發生錯誤: {e}")
@@ -989,7 +1075,9 @@ class ProfessionalRigolWidget(QWidget):
     def stop_measurement(self):
         """停止測量"""
         if self.continuous_worker:
-            self.continuous_worker.stop_measurement()
+            if not self.continuous_worker.stop_measurement():
+                self.log_message("測量執行緒仍在等待儀器回應，將在完成後結束")
+            self._release_worker(self.continuous_worker)
             self.continuous_worker = None
             
         self.is_measuring = False
@@ -997,8 +1085,28 @@ class ProfessionalRigolWidget(QWidget):
         self.stop_measurement_btn.setEnabled(False)
         self.log_message("測量已停止")
 
-    def on_measurement_data(self, voltage, current, power):
-        """處理測量數據"""
+    def _monitor_worker(self, worker):
+        """關聯健康監控：斷線時暫停測量，恢復後繼續"""
+        if self.health_monitor is not None:
+            worker.health_monitor = self.health_monitor
+            self.health_monitor.attach_worker(self.rigol, worker)
+
+    def _unmonitor_worker(self, worker):
+        """解除健康監控關聯"""
+        if self.health_monitor is not None:
+            self.health_monitor.detach_worker(self.rigol, worker)
+        worker.health_monitor = None
+
+    def _release_worker(self, worker):
+        """釋放工作執行緒；仍在執行 (如等待儀器I/O) 時交由Qt在結束後刪除"""
+        self._unmonitor_worker(worker)
+        if worker.isRunning():
+            # 由Widget持有直到執行緒結束，避免銷毀仍在執行的QThread
+            worker.setParent(self)
+            worker.finished.connect(worker.deleteLater)
+
+    def on_measurement_data(self, voltage, current, power, acquired_ns):
+        """處理測量數據 (acquired_ns 為估計的採集時刻，epoch ns)"""
         # 更新LCD顯示
         voltage_lcd = self.voltage_display.findChild(QLCDNumber)
         if voltage_lcd:
@@ -1019,29 +1127,24 @@ class ProfessionalRigolWidget(QWidget):
             efficiency_lcd.display(f"{efficiency:.2f}")
         
         # 更新圖表
-        self.update_chart(voltage, current, power)
+        self.update_chart(voltage, current, power, acquired_ns)
         
-        # 存儲數據
-        timestamp = datetime.now()
-        self.measurement_data.append((timestamp, voltage, current, power))
-        
-        # 保持數據緩存大小
-        if len(self.measurement_data) > 1000:
-            self.measurement_data = self.measurement_data[-1000:]
+        # 存儲數據 (以採集時刻為時間戳)
+        # 超過1000點或內存預算時按策略回收 (預設移除最舊數據)
+        self.measurement_data.append((acquired_ns, voltage, current, power))
 
     def on_measurement_error(self, error_message):
         """處理測量錯誤"""
         self.logger.error(f"測量錯誤: {error_message}")
         self.stop_measurement()
 
-    def update_chart(self, voltage, current, power):
-        """更新圖表顯示"""
-        if not hasattr(self, 'chart_start_time'):
-            self.chart_start_time = datetime.now()
+    def update_chart(self, voltage, current, power, acquired_ns):
+        """更新圖表顯示 (時間軸為採集時刻相對測量開始的秒數)"""
+        if self.chart_start_ns is None:
+            self.chart_start_ns = acquired_ns
             
         # 計算時間軸
-        current_time = datetime.now()
-        elapsed_seconds = (current_time - self.chart_start_time).total_seconds()
+        elapsed_seconds = (acquired_ns - self.chart_start_ns) / 1e9
         
         # 添加數據點
         self.plot_time_data.append(elapsed_seconds)
@@ -1120,7 +1223,12 @@ class ProfessionalRigolWidget(QWidget):
 
     # ===== 數據管理方法 =====
     def export_csv(self):
-        """導出CSV數據"""
+        """導出CSV數據 (GUI執行緒只選擇檔案並取得快照，寫檔在背景導出工作中執行)"""
+        if self._export_job is not None and not self._export_job.done:
+            self._export_job.cancel()
+            self.log_message("正在取消導出...")
+            return
+            
         if not self.measurement_data:
             QMessageBox.information(self, "信息", "沒有可導出的測量數據")
             return
@@ -1132,29 +1240,78 @@ class ProfessionalRigolWidget(QWidget):
                 self, 
                 "保存測量數據", 
                 f"rigol_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                "CSV文件 (*.csv)"
+                "CSV文件 (*.csv);;壓縮CSV文件 (*.csv.zst *.csv.gz)"
             )
             
             if filename:
-                import csv
-                with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-                    writer = csv.writer(csvfile)
-                    writer.writerow(['時間', '電壓(V)', '電流(A)', '功率(W)'])
-                    
-                    for timestamp, voltage, current, power in self.measurement_data:
-                        writer.writerow([
-                            timestamp.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3],
-                            f"{voltage:.6f}",
-                            f"{current:.6f}",
-                            f"{power:.6f}"
-                        ])
-                
-                self.log_message(f"數據已導出到: {filename}")
-                QMessageBox.information(self, "導出完成", f"數據已導出到:\n{filename}")
+                data = self.measurement_data.to_list()
+                self._export_job = get_export_service().submit(
+                    lambda job: self._write_csv(job, filename, data),
+                    description=filename, total_rows=len(data)
+                )
+                self.export_csv_btn.setText("⏹️ 取消導出")
                 
         except Exception as e:
             self.logger.error(f"導出CSV時發生錯誤: {e}")
             QMessageBox.critical(self, "導出錯誤", f"導出失敗: {str(e)}")
+            
+    @staticmethod
+    def _write_csv(job, filename: str, data: list) -> str:
+        """寫出CSV (在導出工作執行緒中執行，每1000列回報進度並檢查取消；.csv.gz/.csv.zst 壓縮寫入)"""
+        import csv
+        import os
+        
+        partial = filename + PARTIAL_SUFFIX
+        try:
+            with open_output(partial, codec_of(filename)) as csvfile:
+                writer = csv.writer(csvfile)
+                writer.writerow(['時間', '電壓(V)', '電流(A)', '功率(W)'])
+                
+                for start in range(0, len(data), 1000):
+                    rows = data[start:start + 1000]
+                    writer.writerows([
+                        epoch_ns_to_datetime(timestamp).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3],
+                        f"{voltage:.6f}",
+                        f"{current:.6f}",
+                        f"{power:.6f}"
+                    ] for timestamp, voltage, current, power in rows)
+                    job.advance(len(rows))
+            os.replace(partial, filename)
+            return filename
+            
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+            
+    def _is_current_export(self, job_id: int) -> bool:
+        return self._export_job is not None and self._export_job.job_id == job_id
+        
+    def _on_export_finished(self, job_id: int, filename: str):
+        """導出完成"""
+        if not self._is_current_export(job_id):
+            return
+        self._export_job = None
+        self.export_csv_btn.setText("📄 導出CSV")
+        self.log_message(f"數據已導出到: {filename}")
+        QMessageBox.information(self, "導出完成", f"數據已導出到:\n{filename}")
+        
+    def _on_export_failed(self, job_id: int, error: str):
+        """導出失敗"""
+        if not self._is_current_export(job_id):
+            return
+        self._export_job = None
+        self.export_csv_btn.setText("📄 導出CSV")
+        self.logger.error(f"導出CSV時發生錯誤: {error}")
+        QMessageBox.critical(self, "導出錯誤", f"導出失敗: {error}")
+        
+    def _on_export_cancelled(self, job_id: int):
+        """導出已取消"""
+        if not self._is_current_export(job_id):
+            return
+        self._export_job = None
+        self.export_csv_btn.setText("📄 導出CSV")
+        self.log_message("導出已取消")
 
     def clear_measurement_data(self):
         """清除測量數據"""